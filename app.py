@@ -0,0 +1,54 @@
+"""
+Aplicación GTK4/Adwaita del Panel de VMs
+
+Separada de main.py para que el modo --headless pueda arrancar sin
+importar gi, GTK ni cairo.
+"""
+import gi
+
+gi.require_version('Gtk', '4.0')
+gi.require_version('Adw', '1')
+
+from gi.repository import Gtk, Adw, GLib, Gio
+
+import startup
+from ui import VMPanelWindow
+
+startup.mark('GTK e interfaz importados')
+
+class VMPanelApp(Adw.Application):
+    def __init__(self, options=None):
+        super().__init__(application_id='com.manjaro.vmpanel')
+        self.options = options
+        self.create_action('quit', self.quit, ['<primary>q'])
+
+    def do_activate(self):
+        win = self.props.active_window
+        if not win:
+            win = VMPanelWindow(
+                application=self,
+                exporter_port=getattr(self.options, 'exporter_port', None),
+                exporter_address=getattr(self.options, 'exporter_address', '127.0.0.1'),
+                fast_interval=getattr(self.options, 'fast_interval', None),
+                connection_uri=getattr(self.options, 'connect', 'qemu:///system'),
+                vm_names=getattr(self.options, 'vms', None),
+                balloon=getattr(self.options, 'balloon', None),
+                balloon_limits=getattr(self.options, 'balloon_limits', None),
+                vcpu_autoscale=getattr(self.options, 'vcpu_autoscale', None),
+                vcpu_limits=getattr(self.options, 'vcpu_limits', None),
+            )
+            print("✓ Ventana creada")
+            startup.mark('ventana creada')
+        
+        # Asegurar que la ventana sea visible
+        win.set_visible(True)
+        win.present()
+        print("✓ Ventana presentada")
+        startup.mark('ventana presentada')
+
+    def create_action(self, name, callback, shortcuts=None):
+        action = Gio.SimpleAction.new(name, None)
+        action.connect('activate', callback)
+        self.add_action(action)
+        if shortcuts:
+            self.set_accels_for_action(f'app.{name}', shortcuts)
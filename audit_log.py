@@ -0,0 +1,51 @@
+"""
+Registro de auditoría de las políticas automáticas
+
+Cada decisión de una política (balloon, vCPUs) se añade como una línea
+JSON a un archivo en XDG_DATA_HOME y se guarda en memoria con las más
+recientes, para que la interfaz o el modo headless las muestren. Las
+decisiones en modo simulación se registran igual, marcadas con
+'dry_run'. No importa GTK.
+"""
+import json
+import logging
+import os
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RECENT_ENTRIES = 200  # Decisiones recientes en memoria
+
+
+def default_audit_path(name: str) -> str:
+    """Ruta por defecto del registro de una política (XDG_DATA_HOME)"""
+    base = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+    return os.path.join(base, 'manjaro-vm-panel', f'{name}-audit.jsonl')
+
+
+class AuditLog:
+    """Registro de decisiones en un archivo JSON Lines (path=None: solo en memoria)"""
+
+    def __init__(self, path: Optional[str] = None, recent: int = RECENT_ENTRIES):
+        self.path = path
+        self._recent = deque(maxlen=recent)
+        self._lock = threading.Lock()
+
+    def record(self, entry: Dict):
+        with self._lock:
+            self._recent.append(entry)
+            if not self.path:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            except OSError as e:
+                logger.warning(f"No se pudo escribir el registro de auditoría {self.path}: {e}")
+
+    def recent(self, vm_name: Optional[str] = None) -> List[Dict]:
+        """Decisiones recientes, de la más antigua a la más nueva"""
+        with self._lock:
+            return [entry for entry in self._recent if vm_name is None or entry.get('vm') == vm_name]
@@ -0,0 +1,176 @@
+"""
+Política automática de balloon para VMs inactivas
+
+Con cada FleetSnapshot (listener del recolector) decide, por VM en
+ejecución con estadísticas del balloon (memory_stats.py):
+
+- encoger: si la VM lleva SHRINK_AFTER muestras seguidas inactiva (CPU
+  baja, sin swap ni fallos mayores y más de SHRINK_FREE_PERCENT de su
+  memoria utilizable), baja el balloon hacia la memoria usada sin caché
+  más un margen, como mucho MAX_SHRINK_FRACTION de golpe,
+- crecer: ante presión (swap, fallos mayores o menos de
+  GROW_USABLE_PERCENT utilizable) sube el balloon GROW_FRACTION, sin
+  esperar a varias muestras.
+
+La histéresis sale de que el objetivo de encoger deja la VM muy por
+encima del umbral de crecer y por debajo del de volver a encoger, de los
+periodos de espera tras cada cambio y de que, tras un cambio, no se
+decide nada hasta que el guest envía un informe nuevo. Cada VM se mueve
+entre sus límites (por defecto DEFAULT_MIN_KB y balloon.maximum). Los
+cambios se aplican con setmem --live (o solo se registran en modo
+simulación) y todas las decisiones quedan en el registro de auditoría.
+Funciona con cualquier URI de libvirt (test:///default para pruebas) y
+con snapshots sintéticos. No importa GTK.
+"""
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+import memory_stats
+from audit_log import AuditLog
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_KB = 1024 * 1024      # Límite inferior por defecto (1 GiB)
+IDLE_CPU_PERCENT = 10.0           # CPU por debajo de la que la VM cuenta como inactiva
+SHRINK_FREE_PERCENT = 30.0        # Memoria utilizable a partir de la que se puede encoger
+SHRINK_AFTER = 12                 # Muestras inactivas seguidas antes de encoger
+SHRINK_HEADROOM = 0.25            # Margen sobre la memoria usada sin caché
+SHRINK_RESERVE_KB = 256 * 1024    # Margen mínimo absoluto
+MAX_SHRINK_FRACTION = 0.25        # Máximo encogimiento por decisión (fracción del balloon actual)
+GROW_USABLE_PERCENT = 10.0        # Memoria utilizable por debajo de la que se crece
+GROW_FRACTION = 0.25              # Crecimiento por decisión (fracción del balloon actual)
+GROW_MIN_KB = 512 * 1024
+MIN_CHANGE_KB = 128 * 1024        # Cambios menores no se aplican
+SHRINK_COOLDOWN = 300.0           # Segundos desde el último cambio antes de volver a encoger
+GROW_COOLDOWN = 10.0              # Segundos desde el último cambio antes de volver a crecer
+
+
+def parse_limit(text: str) -> Tuple[str, Tuple[Optional[int], Optional[int]]]:
+    """'web=1024:4096' -> ('web', (mín KB, máx KB)); límites en MiB, vacío = por defecto
+
+    Lanza ValueError si el texto no tiene ese formato.
+    """
+    vm_name, sep, bounds = text.partition('=')
+    low, sep2, high = bounds.partition(':')
+    if not vm_name or not sep or not sep2:
+        raise ValueError(f"Límite de balloon inválido '{text}' (formato NOMBRE=MÍN_MIB:MÁX_MIB)")
+    try:
+        min_kb = int(low) * 1024 if low else None
+        max_kb = int(high) * 1024 if high else None
+    except ValueError:
+        raise ValueError(f"Límite de balloon inválido '{text}': los tamaños van en MiB") from None
+    if min_kb is not None and max_kb is not None and min_kb > max_kb:
+        raise ValueError(f"Límite de balloon inválido '{text}': el mínimo supera al máximo")
+    return vm_name, (min_kb, max_kb)
+
+
+class BalloonPolicy:
+    """Decisiones de balloon por VM a partir de cada snapshot"""
+
+    def __init__(self, vm_manager=None, dry_run: bool = True,
+                 limits: Optional[Dict[str, Tuple[Optional[int], Optional[int]]]] = None,
+                 audit: Optional[AuditLog] = None, clock=time.monotonic):
+        self.vm_manager = vm_manager
+        self.dry_run = dry_run or vm_manager is None
+        self.limits = dict(limits or {})
+        self.audit = audit or AuditLog()
+        self._clock = clock
+        # {vm: {'id', 'idle', 'last_change', 'reported'}}
+        self._state: Dict[str, Dict] = {}
+
+    def __call__(self, snapshot):
+        self.update(snapshot)
+
+    def limits_for(self, vm_name: str, stats: Dict) -> Tuple[int, int]:
+        """(mín, máx) en KB de una VM: los configurados o los de por defecto"""
+        maximum = stats.get('memory_available') or stats.get('memory_actual')
+        low, high = self.limits.get(vm_name, (None, None))
+        high = min(high, maximum) if high else maximum
+        low = min(low if low is not None else DEFAULT_MIN_KB, high)
+        return low, high
+
+    def update(self, snapshot) -> List[Dict]:
+        """Evalúa el snapshot; retorna las decisiones tomadas (aplicadas o simuladas)"""
+        if snapshot.stale:
+            return []
+        decisions = []
+        running = set()
+        for vm_name, vm in snapshot.vms.items():
+            stats = vm.get('stats')
+            if not vm.get('running') or not stats:
+                continue
+            running.add(vm_name)
+            decision = self._evaluate(vm_name, vm, stats, vm.get('rates'))
+            if decision:
+                decisions.append(self._apply(decision))
+        for vm_name in list(self._state):
+            if vm_name not in running:
+                del self._state[vm_name]
+        return decisions
+
+    def _evaluate(self, vm_name: str, vm: Dict, stats: Dict, rates: Optional[Dict]) -> Optional[Dict]:
+        state = self._state.get(vm_name)
+        if state is None or state['id'] != vm.get('id'):
+            state = self._state[vm_name] = {'id': vm.get('id'), 'idle': 0, 'last_change': None, 'reported': None}
+
+        guest = memory_stats.guest_memory(stats)
+        current = stats.get('memory_actual')
+        if not guest or not current or rates is None:
+            state['idle'] = 0
+            return None
+        # Tras un cambio las estadísticas siguen describiendo el balloon anterior hasta el próximo informe
+        reported = stats.get('memory_stats_updated')
+        if state['reported'] is not None and (reported is None or reported <= state['reported']):
+            return None
+        state['reported'] = None
+
+        now = self._clock()
+        since_change = now - state['last_change'] if state['last_change'] is not None else None
+        low, high = self.limits_for(vm_name, stats)
+        usable = stats.get('memory_usable')
+        usable_percent = usable / guest['total_kb'] * 100 if usable is not None else 100 - guest['used_percent']
+        level, reasons = memory_stats.pressure(stats, rates)
+        if usable_percent < GROW_USABLE_PERCENT:
+            reasons.append(f"{usable_percent:.0f}% utilizable")
+
+        if reasons:
+            state['idle'] = 0
+            target = min(high, current + max(GROW_MIN_KB, int(current * GROW_FRACTION)))
+            if target - current < MIN_CHANGE_KB or (since_change is not None and since_change < GROW_COOLDOWN):
+                return None
+            return self._decision(vm_name, 'grow', current, target, ", ".join(reasons), state, stats)
+
+        cpu_percent = rates.get('cpu_percent')
+        idle = (level == memory_stats.LEVEL_OK and cpu_percent is not None and cpu_percent < IDLE_CPU_PERCENT
+                and usable_percent > SHRINK_FREE_PERCENT)
+        state['idle'] = state['idle'] + 1 if idle else 0
+        if state['idle'] < SHRINK_AFTER or (since_change is not None and since_change < SHRINK_COOLDOWN):
+            return None
+        safe = guest['used_kb'] + max(SHRINK_RESERVE_KB, int(guest['used_kb'] * SHRINK_HEADROOM))
+        target = max(safe, int(current * (1 - MAX_SHRINK_FRACTION)), low)
+        if current - target < MIN_CHANGE_KB:
+            return None
+        reason = (f"inactiva {state['idle']} muestras (CPU {cpu_percent:.0f}%, "
+                  f"{usable_percent:.0f}% utilizable, {guest['used_kb'] // 1024} MiB usada sin caché)")
+        return self._decision(vm_name, 'shrink', current, target, reason, state, stats)
+
+    def _decision(self, vm_name: str, action: str, current: int, target: int, reason: str,
+                  state: Dict, stats: Dict) -> Dict:
+        state['idle'] = 0
+        state['last_change'] = self._clock()
+        state['reported'] = stats.get('memory_stats_updated')
+        return {'time': time.time(), 'vm': vm_name, 'action': action, 'from_kb': current, 'to_kb': target,
+                'reason': reason, 'dry_run': self.dry_run, 'ok': None, 'error': None}
+
+    def _apply(self, decision: Dict) -> Dict:
+        if not self.dry_run:
+            success, error_info = self.vm_manager.set_memory(decision['vm'], decision['to_kb'])
+            decision['ok'] = success
+            decision['error'] = None if success else (error_info or {}).get('message')
+        prefix = "[simulación] " if self.dry_run else ""
+        verb = "crece" if decision['action'] == 'grow' else "encoge"
+        logger.info(f"{prefix}Balloon de {decision['vm']} {verb} {decision['from_kb'] // 1024} → "
+                    f"{decision['to_kb'] // 1024} MiB: {decision['reason']}")
+        self.audit.record(decision)
+        return decision
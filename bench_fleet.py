@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los agregados de la flota (dashboard de resumen)
+
+Genera snapshots sintéticos de N VMs y mide, por snapshot, el cálculo de
+los totales con un bucle por VM sobre los diccionarios (como hacía
+_update_summary_stats) frente a la tabla columnar de fleet_summary.py,
+con NumPy y en Python puro, y el coste que queda en el hilo de GTK
+cuando el recolector ya trae la tabla construida. No necesita libvirt ni
+GTK.
+
+Uso: python3 bench_fleet.py [--vms 1000] [--snapshots 200]
+"""
+import argparse
+import sys
+import time
+
+import fleet_summary
+from collector import FleetSnapshot
+from rates import RateEngine
+
+
+def synthetic_fleet(vm_count, frames, changing=0.05):
+    """Snapshots sintéticos: en cada ciclo solo cambia la carga de una fracción de las VMs
+
+    Cada VM tiene un disco y una interfaz; las tasas de vm['rates'] las
+    calcula un RateEngine como en el recolector.
+    """
+    engine = RateEngine()
+    load = [(i * 37 % 100) / 100 for i in range(vm_count)]
+    cpu_time = [0] * vm_count
+    snapshots = []
+    for frame in range(frames + 1):
+        for i in range(frame * 7 % vm_count, vm_count, max(1, int(1 / changing))):
+            load[i] = (load[i] + 0.37) % 1.0
+        vms = {}
+        for i in range(vm_count):
+            name = f"vm-{i:04d}"
+            cpu_time[i] += int(load[i] * 5 * 2 * 1_000_000_000)
+            disk = {'name': 'vda', 'rd_reqs': cpu_time[i] // 10_000_000, 'wr_reqs': cpu_time[i] // 20_000_000,
+                    'rd_bytes': cpu_time[i] // 10, 'wr_bytes': cpu_time[i] // 20}
+            nic = {'name': 'vnet0', 'rx_bytes': cpu_time[i] // 5, 'tx_bytes': cpu_time[i] // 8}
+            stats = {'cpu_time': cpu_time[i], 'vcpu_count': 2, 'vcpu_current': 2,
+                     'memory_actual': 4194304, 'memory_unused': int(4194304 * (1 - load[i])),
+                     'memory_rss': 4194304,
+                     'block_read_reqs': disk['rd_reqs'], 'block_write_reqs': disk['wr_reqs'],
+                     'block_read_bytes': disk['rd_bytes'], 'block_write_bytes': disk['wr_bytes'],
+                     'net_rx_bytes': nic['rx_bytes'], 'net_tx_bytes': nic['tx_bytes'],
+                     'block_devices': [disk], 'net_devices': [nic]}
+            vms[name] = {
+                'name': name, 'id': i + 1, 'state': 'running', 'running': True, 'stats': stats,
+                'rates': engine.update(name, i + 1, stats, frame * 5.0),
+            }
+        snapshots.append(FleetSnapshot(frame + 1, frame * 5.0, vms, {}, {}))
+    return snapshots
+
+
+class ReferenceAggregator:
+    """Bucle por VM sobre los diccionarios del snapshot (con las tres ramas de memoria)"""
+
+    def __init__(self):
+        self._previous = {}
+        self._previous_time = None
+
+    def update(self, snapshot):
+        elapsed = snapshot.timestamp - self._previous_time if self._previous_time is not None else 0
+        total_ram_kb = 0
+        cpu_ns = vcpus = 0
+        iops = read_bytes = write_bytes = rx_bytes = tx_bytes = 0
+        current = {}
+        for vm_info in snapshot.vms.values():
+            stats = vm_info.get('stats')
+            if not stats:
+                continue
+            mem_actual = stats.get('memory_actual')
+            mem_unused = stats.get('memory_unused')
+            mem_rss = stats.get('memory_rss')
+            if mem_actual and mem_unused is not None:
+                total_ram_kb += mem_actual - mem_unused
+            elif mem_actual and mem_rss:
+                total_ram_kb += mem_rss
+            elif mem_actual:
+                total_ram_kb += mem_actual
+
+            current[vm_info['name']] = stats
+            before = self._previous.get(vm_info['name'])
+            if before is not None and elapsed > 0:
+                cpu_ns += max(0, stats['cpu_time'] - before['cpu_time'])
+                vcpus += stats.get('vcpu_current') or stats.get('vcpu_count') or 1
+                iops += max(0, stats['block_read_reqs'] - before['block_read_reqs'])
+                iops += max(0, stats['block_write_reqs'] - before['block_write_reqs'])
+                read_bytes += max(0, stats['block_read_bytes'] - before['block_read_bytes'])
+                write_bytes += max(0, stats['block_write_bytes'] - before['block_write_bytes'])
+                rx_bytes += max(0, stats['net_rx_bytes'] - before['net_rx_bytes'])
+                tx_bytes += max(0, stats['net_tx_bytes'] - before['net_tx_bytes'])
+
+        self._previous = current
+        self._previous_time = snapshot.timestamp
+        if not vcpus:
+            return {'memory_used_gb': total_ram_kb / (1024 * 1024)}
+        return {
+            'cpu_percent': cpu_ns / (elapsed * 1e9 * vcpus) * 100,
+            'memory_used_gb': total_ram_kb / (1024 * 1024),
+            'iops': iops / elapsed,
+            'disk_read_mbps': read_bytes / elapsed / (1024 * 1024),
+            'disk_write_mbps': write_bytes / elapsed / (1024 * 1024),
+            'net_rx_mbps': rx_bytes / elapsed / (1024 * 1024),
+            'net_tx_mbps': tx_bytes / elapsed / (1024 * 1024),
+        }
+
+
+def _time_snapshots(aggregator, snapshots):
+    """Retorna (ms por snapshot, último resumen)"""
+    aggregator.update(snapshots[0])
+    started = time.perf_counter()
+    for snapshot in snapshots[1:]:
+        summary = aggregator.update(snapshot)
+    return (time.perf_counter() - started) * 1000 / (len(snapshots) - 1), summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mide el cálculo de los agregados de la flota')
+    parser.add_argument('--vms', type=int, default=1000, help='VMs por snapshot (por defecto 1000)')
+    parser.add_argument('--snapshots', type=int, default=200, help='Snapshots a procesar (por defecto 200)')
+    args = parser.parse_args()
+
+    snapshots = synthetic_fleet(args.vms, args.snapshots)
+    numpy_module = fleet_summary.np
+    cases = [('referencia', ReferenceAggregator, None)]
+    if numpy_module is not None:
+        cases.append(('columnar NumPy', fleet_summary.FleetAggregator, numpy_module))
+    cases.append(('columnar Python', fleet_summary.FleetAggregator, None))
+
+    print(f"Agregados de {args.vms} VMs ({args.snapshots} snapshots):")
+    results = []
+    try:
+        for label, aggregator_class, np_module in cases:
+            if aggregator_class is fleet_summary.FleetAggregator:
+                fleet_summary.np = np_module
+            # Cada caso construye su propia tabla (la del snapshot se guarda al pedirla)
+            for snapshot in snapshots:
+                snapshot.columns = None
+            results.append((label, *_time_snapshots(aggregator_class(), snapshots)))
+    finally:
+        fleet_summary.np = numpy_module
+
+    # En el panel la tabla se construye en el listener del recolector: en el hilo de GTK solo queda agregar
+    for snapshot in snapshots:
+        snapshot.columns = fleet_summary.FleetColumns(snapshot)
+    results.append(('tabla del recolector', *_time_snapshots(fleet_summary.FleetAggregator(), snapshots)))
+
+    baseline = results[0][1]
+    for label, ms_per_snapshot, summary in results:
+        speedup = baseline / ms_per_snapshot if ms_per_snapshot > 0 else float('inf')
+        print(f"  {label:<22} {ms_per_snapshot:8.3f} ms/snapshot  (x{speedup:.1f})  "
+              f"CPU {summary.get('cpu_percent', 0):.1f}%  RAM {summary['memory_used_gb']:.1f} GB  "
+              f"{summary.get('iops', 0):.0f} IOPS")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark de arranque del Panel de VMs
+
+Lanza la aplicación varias veces con VMPANEL_STARTUP_BENCH=1 (se cierra
+sola al mostrar los primeros datos) y resume el tiempo hasta el primer
+frame y hasta los primeros datos.
+
+Uso: python3 bench_startup.py [--runs N] [-- argumentos del panel]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from startup import BENCH_PREFIX
+
+PHASES = ('primer frame', 'primeros datos')
+
+
+def run_once(app_args, timeout):
+    """Ejecuta un arranque y retorna {fase: ms}"""
+    env = dict(os.environ, VMPANEL_STARTUP_BENCH='1')
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    result = subprocess.run([sys.executable, script] + app_args, env=env,
+                            capture_output=True, text=True, timeout=timeout)
+    phases = {}
+    for line in result.stdout.splitlines():
+        if line.startswith(BENCH_PREFIX + ' '):
+            _, elapsed_ms, phase = line.split(' ', 2)
+            phases[phase] = float(elapsed_ms)
+    return phases
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mide el tiempo de arranque del panel')
+    parser.add_argument('--runs', type=int, default=5, help='Número de arranques (por defecto 5)')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Segundos máximos por arranque')
+    args, app_args = parser.parse_known_args()
+    if app_args and app_args[0] == '--':
+        app_args = app_args[1:]
+
+    results = []
+    for run in range(args.runs):
+        phases = run_once(app_args, args.timeout)
+        results.append(phases)
+        summary = ', '.join(f"{phase}: {phases[phase]:.0f} ms" for phase in PHASES if phase in phases)
+        print(f"Arranque {run + 1}: {summary or 'sin datos'}")
+
+    print()
+    for phase in PHASES:
+        values = [phases[phase] for phases in results if phase in phases]
+        if values:
+            print(f"{phase}: mediana {statistics.median(values):.0f} ms, "
+                  f"mín {min(values):.0f} ms, máx {max(values):.0f} ms ({len(values)}/{args.runs})")
+        else:
+            print(f"{phase}: no alcanzado")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Benchmark de dibujo de los widgets de métricas (sin pantalla)
+
+Dibuja cada widget muchas veces sobre una cairo.ImageSurface y compara
+el tiempo por frame de la implementación actual con la de referencia
+(dibujo completo en cada frame, como antes de cachear las capas).
+No necesita un display: solo cairo, Pango y PangoCairo.
+
+Los casos *-nodos comparan el dibujo cairo actual con los nodos de GSK de
+snapshot_widgets.py (necesitan GTK >= 4.14): cuánto cuesta construir los
+nodos de un frame y cuánto construirlos y rasterizarlos con cairo, que es
+el peor caso (sin GPU); con el renderer GL/Vulkan la rasterización la
+hace la GPU y los nodos estáticos quedan cacheados en texturas.
+
+Uso: python3 bench_widgets.py [--frames N] [--scale S] [--only circular ...]
+"""
+import argparse
+import math
+import sys
+import time
+
+import cairo
+
+import widgets
+
+
+def reference_circular_draw(ctx, width, height, size, percentage, label, title):
+    """Dibujo original de CircularProgressWidget (todo en cada frame, API toy)"""
+    center_x = width / 2
+    center_y = height - (size / 2)
+    radius = (size / 2) - 12
+    line_width = 14
+
+    ctx.save()
+    ctx.set_line_width(line_width + 2)
+    ctx.set_source_rgba(0, 0, 0, 0.15)
+    ctx.arc(center_x + 2, center_y + 2, radius, 0, 2 * math.pi)
+    ctx.stroke()
+    ctx.restore()
+
+    ctx.save()
+    ctx.set_line_width(line_width)
+    pattern = cairo.RadialGradient(center_x, center_y, 0, center_x, center_y, radius)
+    pattern.add_color_stop_rgba(0, 0.15, 0.15, 0.15, 0.3)
+    pattern.add_color_stop_rgba(1, 0.05, 0.05, 0.05, 0.1)
+    ctx.set_source(pattern)
+    ctx.arc(center_x, center_y, radius, 0, 2 * math.pi)
+    ctx.stroke()
+    ctx.restore()
+
+    if percentage > 0:
+        r, g, b = (0.15, 0.76, 0.41) if percentage < 70 else ((0.96, 0.76, 0.07) if percentage < 85
+                                                               else (0.88, 0.11, 0.14))
+        start_angle = -math.pi / 2
+        end_angle = start_angle + (2 * math.pi * percentage / 100)
+
+        ctx.save()
+        ctx.set_line_width(line_width + 1)
+        ctx.set_source_rgba(r, g, b, 0.3)
+        ctx.set_line_cap(cairo.LINE_CAP_ROUND)
+        ctx.arc(center_x + 1, center_y + 1, radius, start_angle, end_angle)
+        ctx.stroke()
+        ctx.restore()
+
+        ctx.save()
+        ctx.set_line_width(line_width)
+        ctx.set_line_cap(cairo.LINE_CAP_ROUND)
+        pattern = cairo.LinearGradient(center_x - radius, center_y, center_x + radius, center_y)
+        pattern.add_color_stop_rgba(0, r, g, b, 0.8)
+        pattern.add_color_stop_rgba(0.5, r + 0.1, g + 0.1, b + 0.1, 1.0)
+        pattern.add_color_stop_rgba(1, r, g, b, 0.8)
+        ctx.set_source(pattern)
+        ctx.arc(center_x, center_y, radius, start_angle, end_angle)
+        ctx.stroke()
+        ctx.restore()
+
+        ctx.save()
+        ctx.set_line_width(line_width - 4)
+        ctx.set_source_rgba(1, 1, 1, 0.2)
+        ctx.set_line_cap(cairo.LINE_CAP_ROUND)
+        ctx.arc(center_x, center_y, radius, start_angle, end_angle)
+        ctx.stroke()
+        ctx.restore()
+
+    ctx.save()
+    ctx.select_font_face("Sans", cairo.FONT_SLANT_NORMAL, cairo.FONT_WEIGHT_BOLD)
+    ctx.set_font_size(24)
+    ctx.set_source_rgba(0, 0, 0, 0.5)
+    text_extents = ctx.text_extents(label)
+    text_x = center_x - text_extents.width / 2
+    text_y = center_y + text_extents.height / 2
+    ctx.move_to(text_x + 1, text_y + 1)
+    ctx.show_text(label)
+    ctx.set_source_rgb(0.95, 0.95, 0.95)
+    ctx.move_to(text_x, text_y)
+    ctx.show_text(label)
+    ctx.restore()
+
+    if title:
+        ctx.save()
+        ctx.select_font_face("Sans", cairo.FONT_SLANT_NORMAL, cairo.FONT_WEIGHT_NORMAL)
+        ctx.set_font_size(13)
+        ctx.set_source_rgba(0, 0, 0, 0.4)
+        title_extents = ctx.text_extents(title)
+        title_x = center_x - title_extents.width / 2
+        title_y = center_y - radius - 18
+        ctx.move_to(title_x + 1, title_y + 1)
+        ctx.show_text(title)
+        ctx.set_source_rgb(0.8, 0.8, 0.8)
+        ctx.move_to(title_x, title_y)
+        ctx.show_text(title)
+        ctx.restore()
+
+
+def reference_chart_draw(ctx, width, height, data_points, max_points, title, color):
+    """Dibujo original de MiniLineChartWidget (fondo, rejilla y 3 gradientes por punto en cada frame)"""
+    margin_left, margin_right, margin_top, margin_bottom = 12, 12, 22, 12
+    chart_width = width - margin_left - margin_right
+    chart_height = height - margin_top - margin_bottom
+
+    pattern = cairo.LinearGradient(margin_left, margin_top, margin_left, margin_top + chart_height)
+    pattern.add_color_stop_rgba(0, 0.08, 0.08, 0.08, 0.4)
+    pattern.add_color_stop_rgba(1, 0.04, 0.04, 0.04, 0.2)
+    ctx.set_source(pattern)
+    ctx.rectangle(margin_left, margin_top, chart_width, chart_height)
+    ctx.fill()
+
+    ctx.set_line_width(1)
+    ctx.set_source_rgba(0.2, 0.2, 0.2, 0.6)
+    ctx.rectangle(margin_left, margin_top, chart_width, chart_height)
+    ctx.stroke()
+
+    ctx.set_line_width(0.5)
+    for i in range(5):
+        y = margin_top + (chart_height / 4) * i
+        if i == 0 or i == 4:
+            ctx.set_source_rgba(0.3, 0.3, 0.3, 0.7)
+        else:
+            ctx.set_source_rgba(0.2, 0.2, 0.2, 0.4)
+        ctx.move_to(margin_left, y)
+        ctx.line_to(margin_left + chart_width, y)
+        ctx.stroke()
+
+    r, g, b = color
+    x_step = chart_width / (max_points - 1)
+    points = [(margin_left + i * x_step, margin_top + chart_height - (value / 100 * chart_height))
+              for i, value in enumerate(data_points)]
+
+    pattern = cairo.LinearGradient(margin_left, margin_top + chart_height, margin_left, margin_top)
+    pattern.add_color_stop_rgba(0, r, g, b, 0.3)
+    pattern.add_color_stop_rgba(1, r, g, b, 0.05)
+    ctx.set_source(pattern)
+    ctx.move_to(margin_left, margin_top + chart_height)
+    for x, y in points:
+        ctx.line_to(x, y)
+    ctx.line_to(margin_left + len(points) * x_step, margin_top + chart_height)
+    ctx.close_path()
+    ctx.fill()
+
+    pattern = cairo.LinearGradient(margin_left, 0, margin_left + chart_width, 0)
+    pattern.add_color_stop_rgba(0, r, g, b, 0.8)
+    pattern.add_color_stop_rgba(0.5, r + 0.1, g + 0.1, b + 0.1, 1.0)
+    pattern.add_color_stop_rgba(1, r, g, b, 0.8)
+    ctx.set_source(pattern)
+    ctx.set_line_width(2.5)
+    ctx.move_to(*points[0])
+    for x, y in points[1:]:
+        ctx.line_to(x, y)
+    ctx.stroke()
+
+    for x, y in points:
+        ctx.set_source_rgba(0, 0, 0, 0.3)
+        ctx.arc(x + 1, y + 1, 3, 0, 2 * math.pi)
+        ctx.fill()
+        pattern = cairo.RadialGradient(x, y, 0, x, y, 3)
+        pattern.add_color_stop_rgba(0, 1, 1, 1, 0.8)
+        pattern.add_color_stop_rgba(0.5, r, g, b, 1.0)
+        pattern.add_color_stop_rgba(1, r * 0.7, g * 0.7, b * 0.7, 1.0)
+        ctx.set_source(pattern)
+        ctx.arc(x, y, 3, 0, 2 * math.pi)
+        ctx.fill()
+        ctx.set_source_rgba(1, 1, 1, 0.6)
+        ctx.arc(x, y, 1.5, 0, 2 * math.pi)
+        ctx.fill()
+
+    ctx.select_font_face("Sans", cairo.FONT_SLANT_NORMAL, cairo.FONT_WEIGHT_NORMAL)
+    ctx.set_font_size(11)
+    ctx.set_source_rgb(0.85, 0.85, 0.85)
+    ctx.move_to(margin_left, 12)
+    ctx.show_text(title)
+    text = f"{data_points[-1]:.1f}%"
+    ctx.select_font_face("Sans", cairo.FONT_SLANT_NORMAL, cairo.FONT_WEIGHT_BOLD)
+    text_extents = ctx.text_extents(text)
+    ctx.move_to(width - margin_right - text_extents.width, 12)
+    ctx.show_text(text)
+
+
+def _new_target(width, height, scale):
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, math.ceil(width * scale), math.ceil(height * scale))
+    surface.set_device_scale(scale, scale)
+    return surface
+
+
+def _time_frames(frames, draw_frame):
+    """Retorna ms por frame de draw_frame(i)"""
+    started = time.perf_counter()
+    for i in range(frames):
+        draw_frame(i)
+    return (time.perf_counter() - started) * 1000 / frames
+
+
+def bench_circular(frames, scale):
+    """CircularProgressWidget: referencia vs capas estáticas + layouts cacheados"""
+    size = 100
+    width, height = size, size + 30
+    target = _new_target(width, height, scale)
+    values = [(i * 7.3) % 100 for i in range(frames)]
+
+    def reference(i):
+        ctx = cairo.Context(target)
+        reference_circular_draw(ctx, width, height, size, values[i], f"{values[i]:.1f}%", "CPU")
+
+    widgets.clear_static_layers()
+    renderer = widgets.CircularProgressRenderer(size)
+    renderer.title = "CPU"
+
+    def cached(i):
+        ctx = cairo.Context(target)
+        renderer.percentage = values[i]
+        renderer.set_label(f"{values[i]:.1f}%")
+        renderer.draw(ctx, width, height, scale)
+
+    return [('referencia', _time_frames(frames, reference)), ('capas cacheadas', _time_frames(frames, cached))]
+
+
+def bench_chart(frames, scale, max_points=30):
+    """MiniLineChartWidget: un punto nuevo por frame con el historial lleno"""
+    width, height = 280, 70
+    target = _new_target(width, height, scale)
+    values = [50 + 45 * math.sin(i / 5) for i in range(frames + max_points)]
+    color = (0.26, 0.59, 0.98)
+
+    def reference(i):
+        ctx = cairo.Context(target)
+        reference_chart_draw(ctx, width, height, values[i:i + max_points], max_points, "CPU", color)
+
+    results = [('referencia', _time_frames(frames, reference))]
+    for label, show_markers in (('incremental', True), ('incremental sin marcadores', False)):
+        widgets.clear_static_layers()
+        renderer = widgets.MiniLineChartRenderer(max_points, show_markers)
+        renderer.title = "CPU"
+        renderer.set_color(*color)
+        for value in values[:max_points - 1]:
+            renderer.add_data_point(value)
+
+        def incremental(i):
+            ctx = cairo.Context(target)
+            renderer.add_data_point(values[i + max_points - 1])
+            renderer.draw(ctx, width, height, scale)
+
+        results.append((label, _time_frames(frames, incremental)))
+    return results
+
+
+def _time_nodes(frames, target, snapshot_frame):
+    """[(construir nodos, ms/frame), (construir + rasterizar con cairo, ms/frame)]"""
+    from gi.repository import Gtk
+
+    def build(i):
+        snapshot = Gtk.Snapshot.new()
+        snapshot_frame(snapshot, i)
+        return snapshot.to_node()
+
+    def build_and_draw(i):
+        node = build(i)
+        if node is not None:
+            node.draw(cairo.Context(target))
+
+    return [('nodos: construir', _time_frames(frames, build)),
+            ('nodos: + rasterizar', _time_frames(frames, build_and_draw))]
+
+
+def bench_circular_nodes(frames, scale):
+    """CircularProgressWidget: capas cairo cacheadas vs nodos de GSK"""
+    import snapshot_widgets
+    if not snapshot_widgets.HAVE_GSK_PATHS:
+        return []
+
+    size = 100
+    width, height = size, size + 30
+    target = _new_target(width, height, scale)
+    values = [(i * 7.3) % 100 for i in range(frames)]
+    results = bench_circular(frames, scale)[1:]
+
+    snapshot_widgets.clear_static_nodes()
+    renderer = snapshot_widgets.CircularProgressNodeRenderer(size)
+    renderer.title = "CPU"
+
+    def snapshot_frame(snapshot, i):
+        renderer.percentage = values[i]
+        renderer.set_label(f"{values[i]:.1f}%")
+        renderer.snapshot(snapshot, width, height)
+
+    return results + _time_nodes(frames, target, snapshot_frame)
+
+
+def bench_chart_nodes(frames, scale, max_points=30):
+    """MiniLineChartWidget: superficie incremental cairo vs nodos de segmento reutilizados"""
+    import snapshot_widgets
+    if not snapshot_widgets.HAVE_GSK_PATHS:
+        return []
+
+    width, height = 280, 70
+    target = _new_target(width, height, scale)
+    values = [50 + 45 * math.sin(i / 5) for i in range(2 * frames + max_points)]
+    color = (0.26, 0.59, 0.98)
+    results = bench_chart(frames, scale, max_points)[1:2]
+
+    snapshot_widgets.clear_static_nodes()
+    renderer = snapshot_widgets.MiniLineChartNodeRenderer(max_points)
+    renderer.title = "CPU"
+    renderer.set_color(*color)
+    feed = iter(values)
+    for _ in range(max_points - 1):
+        renderer.add_data_point(next(feed))
+
+    def snapshot_frame(snapshot, i):
+        renderer.add_data_point(next(feed))
+        renderer.snapshot(snapshot, width, height)
+
+    return results + _time_nodes(frames, target, snapshot_frame)
+
+
+def bench_heatmap(frames, scale, vm_count=1000):
+    """FleetHeatmapWidget con 1000 VMs: repintar todas las celdas vs solo las que cambian"""
+    import heatmap
+    from bench_fleet import synthetic_fleet
+
+    frames = min(frames, 500)  # Los snapshots sintéticos ocupan memoria
+    snapshots = synthetic_fleet(vm_count, frames)
+    width = 800
+    results = []
+    for label, full_repaint in (('referencia', True), ('celdas cambiadas', False)):
+        model = heatmap.HeatmapModel('cpu')
+        model.update(snapshots[0])
+        renderer = widgets.FleetHeatmapRenderer(model)
+        height = renderer.height_for(width)
+        target = _new_target(width, height, scale)
+
+        def frame(i):
+            dirty = model.update(snapshots[i + 1])
+            renderer.invalidate(range(len(model)) if full_repaint else dirty)
+            renderer.draw(cairo.Context(target), width, height, scale)
+
+        results.append((label, _time_frames(frames, frame)))
+    return results
+
+
+def _draw_series(ctx, width, height, start, end, times, values):
+    """Polilínea de la serie sobre el ancho dado (lo mismo que HistoryChartWidget)"""
+    x_scale = width / (end - start)
+    ctx.move_to((times[0] - start) * x_scale, height - values[0] / 100 * height)
+    for t, value in zip(times, values):
+        ctx.line_to((t - start) * x_scale, height - value / 100 * height)
+    ctx.set_source_rgb(0.26, 0.59, 0.98)
+    ctx.set_line_width(1.5)
+    ctx.stroke()
+
+
+def bench_history(frames, scale):
+    """Historial de 7 días (nivel de 1 min): todos los puntos vs LTTB por teselas desplazando la vista"""
+    import history_chart
+
+    width, height = 600, 120
+    target = _new_target(width, height, scale)
+    now = 1_700_000_000.0
+    points = [(now - (10080 - i) * 60, 0.0, 50 + 45 * math.sin(i / 40) * math.sin(i / 7), 0.0) for i in range(10080)]
+
+    class Store:
+        def load(self, vm_name, tier):
+            return {'cpu': points}
+
+    times = [t for t, _min, _avg, _max in points]
+    values = [avg for _t, _min, avg, _max in points]
+
+    def reference(i):
+        ctx = cairo.Context(target)
+        _draw_series(ctx, width, height, now - 7 * 86400, now, times, values)
+
+    model = history_chart.HistoryChartModel(Store(), 'bench', range_seconds=7 * 86400)
+    model.end = now
+
+    def downsampled(i):
+        # Desplazamiento continuo hacia el pasado y vuelta: las teselas se reutilizan
+        model.end = now - (i % 200) * 600
+        ctx = cairo.Context(target)
+        start, end, xs, ys = model.visible(width)
+        _draw_series(ctx, width, height, start, end, xs, ys)
+
+    results = [('referencia', _time_frames(frames, reference)), ('LTTB + teselas', _time_frames(frames, downsampled))]
+    print(f"  (teselas: {model.tiles_built} reducidas, {model.tiles_reused} reutilizadas, "
+          f"NumPy: {'sí' if history_chart.np is not None else 'no'})")
+    return results
+
+
+BENCHMARKS = {
+    'circular': bench_circular,
+    'chart': bench_chart,
+    'circular-nodos': bench_circular_nodes,
+    'chart-nodos': bench_chart_nodes,
+    'heatmap': bench_heatmap,
+    'history': bench_history,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mide el tiempo de dibujo de los widgets')
+    parser.add_argument('--frames', type=int, default=2000, help='Frames por caso (por defecto 2000)')
+    parser.add_argument('--scale', type=float, default=1.0, help='Factor de escala del monitor (1, 2, ...)')
+    parser.add_argument('--only', nargs='*', choices=sorted(BENCHMARKS), help='Casos a ejecutar')
+    args = parser.parse_args()
+
+    for name in args.only or BENCHMARKS:
+        results = BENCHMARKS[name](args.frames, args.scale)
+        if not results:
+            print(f"{name}: no disponible (se necesita GTK >= 4.14 con GskPath)")
+            continue
+        baseline = results[0][1]
+        print(f"{name} ({args.frames} frames, escala {args.scale:g}):")
+        for label, ms_per_frame in results:
+            speedup = baseline / ms_per_frame if ms_per_frame > 0 else float('inf')
+            print(f"  {label:<20} {ms_per_frame * 1000:8.1f} µs/frame  (x{speedup:.1f})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -26,10 +26,11 @@ mkdir -p "${PACKAGE_DIR}"
 
 # Copiar archivos necesarios
 echo -e "${BLUE}📦 Copiando archivos del proyecto...${NC}"
-cp main.py vm_manager.py ui.py notifications.py widgets.py "${PACKAGE_DIR}/"
+cp main.py vm_manager.py ui.py notifications.py widgets.py metrics_store.py collector.py exporter.py app.py headless.py startup.py state_cache.py frame_stats.py card_view.py snapshot_widgets.py heatmap.py history_chart.py fleet_summary.py rates.py disk_stats.py host_metrics.py qemu_proc.py cgroup_stats.py qemu_threads.py host_topology.py placement.py pinning.py memory_stats.py audit_log.py balloon_policy.py vcpu_policy.py "${PACKAGE_DIR}/"
 cp style.css requirements.txt "${PACKAGE_DIR}/"
 cp manjaro-vm-panel "${PACKAGE_DIR}/"
 cp manjaro-vm-panel.desktop "${PACKAGE_DIR}/"
+cp manjaro-vm-panel-headless.service "${PACKAGE_DIR}/"
 cp README.md CHANGELOG_ERRORES.md CONFIGURACION_MANUAL.md comando.md "${PACKAGE_DIR}/"
 
 # Copiar scripts de instalación
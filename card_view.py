@@ -0,0 +1,394 @@
+"""
+Modelo de vista de las tarjetas de VM
+
+El formateo de textos (estado, CPU, memoria, disco, red, configuración)
+se hace aquí, sin GTK, y produce un diccionario {campo: valor}. El
+ViewModel compara cada campo con el valor anterior y solo llama al
+enlace (set_text, set_markup, set_value, ...) de los campos que
+cambiaron, de modo que las etiquetas sin cambios no provocan relayout.
+"""
+import time
+from html import escape
+from typing import Any, Callable, Dict, Optional
+
+import frame_stats
+import memory_stats
+
+IOTHREAD_SATURATED_PERCENT = 90.0  # % de un núcleo a partir del que un IOThread se marca como saturado
+
+
+class ViewModel:
+    """Campos comparables enlazados a funciones que actualizan widgets"""
+
+    def __init__(self):
+        self._values: Dict[str, Any] = {}
+        self._bindings: Dict[str, Callable[[Any], None]] = {}
+        self.applied = 0
+        self.skipped = 0
+
+    def bind(self, field: str, apply: Callable[[Any], None]):
+        """Enlaza un campo; si ya tiene valor se aplica en el momento"""
+        self._bindings[field] = apply
+        if field in self._values:
+            apply(self._values[field])
+
+    def get(self, field: str, default=None):
+        return self._values.get(field, default)
+
+    def update(self, values: Dict[str, Any]):
+        """Guarda los valores nuevos y aplica solo los que cambiaron"""
+        for field, value in values.items():
+            if field in self._values and self._values[field] == value:
+                self.skipped += 1
+                frame_stats.count('labels_skipped')
+                continue
+            self._values[field] = value
+            apply = self._bindings.get(field)
+            if apply is not None:
+                apply(value)
+                self.applied += 1
+                frame_stats.count('label_updates')
+
+
+def format_bytes(bytes_val) -> str:
+    if bytes_val >= 1024 * 1024 * 1024:
+        return f"{bytes_val / (1024 * 1024 * 1024):.2f} GB"
+    elif bytes_val >= 1024 * 1024:
+        return f"{bytes_val / (1024 * 1024):.2f} MB"
+    elif bytes_val >= 1024:
+        return f"{bytes_val / 1024:.2f} KB"
+    else:
+        return f"{bytes_val} B"
+
+
+def format_status(vm_info: Dict, stale_since: Optional[float] = None, now: Optional[float] = None) -> Dict[str, Any]:
+    """Campos de la cabecera y la información básica de una tarjeta"""
+    state = vm_info['state']
+    running = vm_info['running']
+    off = state in ['shut off', 'apagado', 'apagada']
+
+    if running:
+        status = '<span color="#26a269">● En ejecución</span>'
+    elif off:
+        status = '<span color="#c01c28">● Apagada</span>'
+    else:
+        status = f'<span color="#f57c00">● {escape(state)}</span>'
+
+    # Indicador de datos obsoletos (último estado conocido)
+    if stale_since is not None:
+        age_minutes = max(0, int(((now or time.time()) - stale_since) // 60))
+        status += f' <span alpha="60%">(hace {age_minutes} min)</span>'
+
+    fields = {
+        'status': status,
+        'stale': stale_since is not None,
+        'start_visible': not running,
+        'shutdown_visible': running,
+        'reboot_visible': running,
+        'save_visible': running,
+        'details_visible': running,
+    }
+
+    if not running:
+        fields.update({
+            'cpu': "⚙️ CPU: VM apagada",
+            'memory': "💾 Memoria: VM apagada",
+            'ip': "🌐 IP: N/A",
+            'uptime': "⏰ Uptime: N/A",
+        })
+        return fields
+
+    # IP
+    ip = vm_info.get('ip')
+    fields['ip'] = f'<span>🌐 IP: <b>{escape(ip)}</b></span>' if ip else "🌐 IP: Obteniendo..."
+
+    # Uptime
+    uptime_seconds = vm_info.get('uptime')
+    if uptime_seconds:
+        hours = uptime_seconds // 3600
+        minutes = (uptime_seconds % 3600) // 60
+        fields['uptime'] = f"⏰ Uptime: {hours}h {minutes}m" if hours > 0 else f"⏰ Uptime: {minutes}m"
+    else:
+        fields['uptime'] = "⏰ Uptime: N/A"
+
+    stats = vm_info.get('stats')
+    if not stats:
+        fields['cpu'] = "⚙️ CPU: Información no disponible"
+        fields['memory'] = "💾 Memoria: Información no disponible"
+        return fields
+
+    # CPU básico
+    cpu_time = stats.get('cpu_time')
+    vcpu_current = stats.get('vcpu_current', 0)
+    if cpu_time:
+        cpu_seconds = cpu_time / 1_000_000_000
+        cpu_hours = cpu_seconds / 3600
+        if cpu_hours >= 1:
+            fields['cpu'] = f"⚙️ CPU: {vcpu_current} vCPUs | {cpu_hours:.1f}h"
+        else:
+            fields['cpu'] = f"⚙️ CPU: {vcpu_current} vCPUs | {cpu_seconds / 60:.1f}m"
+    else:
+        fields['cpu'] = f"⚙️ CPU: {vcpu_current} vCPUs activas"
+
+    # Memoria básica - usar datos consistentes de domstats
+    mem_actual = stats.get('memory_actual')  # Memoria asignada al balloon
+    mem_rss = stats.get('memory_rss')  # Memoria RSS del host
+    guest = memory_stats.guest_memory(stats)
+    if guest:
+        # Memoria usada dentro del guest sin la caché de páginas (más preciso)
+        fields['memory'] = (f"💾 Memoria: {guest['used_kb'] / (1024 * 1024):.1f}/"
+                            f"{guest['total_kb'] / (1024 * 1024):.1f} GB ({guest['used_percent']:.0f}%)")
+    elif mem_actual and mem_rss:
+        # RSS como aproximación del uso real
+        mem_percent = (mem_rss / mem_actual) * 100 if mem_actual > 0 else 0
+        fields['memory'] = (f"💾 Memoria: {mem_rss / (1024 * 1024):.1f}/{mem_actual / (1024 * 1024):.1f} GB "
+                            f"({mem_percent:.0f}%)")
+    elif mem_actual:
+        # Fallback: solo memoria asignada
+        fields['memory'] = f"💾 Memoria: {mem_actual / (1024 * 1024):.1f} GB (Asignada)"
+    else:
+        fields['memory'] = "💾 Memoria: N/A"
+
+    # Presión de memoria del guest (swap, fallos mayores, uso sin caché)
+    level, reasons = memory_stats.pressure(stats, vm_info.get('rates'))
+    if level > memory_stats.LEVEL_OK:
+        fields['memory'] += f" {memory_stats.LEVEL_ICONS[level]} {reasons[0]}"
+
+    return fields
+
+
+# Valores del panel de detalles con la VM apagada o sin estadísticas
+CLEARED_DETAILS = {
+    'cpu_gauge': (0, "0%", None),
+    'memory_gauge': (0, "0 GB", "RAM Asignada"),
+    'vcpu_info': "VM apagada",
+    'pressure': "",
+    'guest_memory': "",
+    'threads': "",
+    'disk_bar': (0, 0, 0),
+    'disk_detail': "VM apagada",
+    'disk_iops': "",
+    'disk_latency': "",
+    'net_rx_total': "⬇️ Recibido: N/A",
+    'net_tx_total': "⬆️ Enviado: N/A",
+    'net_interfaces': "",
+    'virtio': "",
+    'cpu_features': "",
+    'hugepages': "",
+    'blkio': "",
+    'host_temp': "",
+    'guest_users': "",
+}
+
+
+def format_details(stats: Dict, vm_info: Dict, host: Dict, metrics: Dict) -> Dict[str, Any]:
+    """Campos del panel de detalles a partir de las métricas ya calculadas"""
+    mem_actual = stats.get('memory_actual')
+    mem_unused = stats.get('memory_unused')
+    mem_rss = stats.get('memory_rss')
+    vcpu_count = stats.get('vcpu_count', 1)
+    vcpu_current = stats.get('vcpu_current', 0)
+    cpu_percent = metrics['cpu_percent']
+    mem_percent = metrics['mem_percent']
+
+    if mem_unused is not None:
+        memory_title = "RAM Guest"
+    elif mem_rss:
+        memory_title = "RAM RSS"
+    elif mem_actual:
+        memory_title = "RAM Asignada"
+    else:
+        memory_title = "RAM"
+
+    fields = {
+        'cpu_gauge': (cpu_percent, f"{cpu_percent:.1f}%", "CPU"),
+        'memory_gauge': (mem_percent, f"{mem_percent:.1f}%", memory_title),
+    }
+
+    # vCPUs con tiempo de CPU
+    cpu_time = stats.get('cpu_time')
+    if cpu_time:
+        cpu_seconds = cpu_time / 1_000_000_000
+        cpu_hours = cpu_seconds / 3600
+        if cpu_hours >= 1:
+            fields['vcpu_info'] = f"Activas: {vcpu_current} / {vcpu_count} | Tiempo total: {cpu_hours:.1f}h"
+        else:
+            fields['vcpu_info'] = f"Activas: {vcpu_current} / {vcpu_count} | Tiempo total: {cpu_seconds / 60:.1f}m"
+    else:
+        fields['vcpu_info'] = f"Activas: {vcpu_current} / {vcpu_count}"
+
+    # CPU por rol de hilo de QEMU (rates['threads'])
+    threads = metrics.get('threads')
+    if threads:
+        roles = threads['roles']
+        parts = [f"vCPU {roles['vcpu']:.0f}%", f"emulador {roles['emulator']:.0f}%"]
+        if threads['source'] == 'procfs':
+            if roles['vhost']:
+                parts.append(f"vhost {roles['vhost']:.0f}%")
+            for name, percent in sorted(threads['iothreads'].items()):
+                saturated = " ⚠️ saturado" if percent >= IOTHREAD_SATURATED_PERCENT else ""
+                parts.append(f"{name} {percent:.0f}%{saturated}")
+            fields['threads'] = "🧵 Hilos QEMU: " + " · ".join(parts)
+        else:
+            fields['threads'] = "🧵 Hilos QEMU (libvirt, sin desglose de IOThreads): " + " · ".join(parts)
+    else:
+        fields['threads'] = "🧵 Hilos QEMU: N/A"
+
+    # Memoria del guest descontando la caché de páginas (estadísticas del balloon)
+    guest = memory_stats.guest_memory(stats)
+    if guest:
+        def gb(kb):
+            return f"{kb / (1024 * 1024):.1f} GB"
+        text = (f"🧠 Guest: {gb(guest['used_kb'])} usada ({guest['used_percent']:.0f}%) · "
+                f"{gb(guest['cache_kb'])} caché · {gb(guest['free_kb'])} libre")
+        memory_rates = metrics.get('memory') or {}
+        if memory_rates.get('swap_in_kbps') is not None:
+            text += (f"\n🔁 Swap: ↓{memory_rates['swap_in_kbps']:.0f} ↑{memory_rates['swap_out_kbps'] or 0:.0f} KB/s"
+                     f" · fallos mayores {memory_rates.get('major_faults_ps') or 0:.0f}/s")
+        level, reasons = memory_stats.pressure(stats, memory_rates)
+        if level > memory_stats.LEVEL_OK:
+            text += f"\n{memory_stats.LEVEL_ICONS[level]} Presión de memoria: {', '.join(reasons)}"
+        fields['guest_memory'] = text
+    else:
+        fields['guest_memory'] = "🧠 Guest: sin estadísticas del balloon (virtio-balloon)"
+
+    # Presión (PSI) del cgroup: solo con cgroup v2 y a partir del segundo ciclo
+    pressure = metrics.get('pressure') or {}
+    if any(value is not None for value in pressure.values()):
+        def pressure_text(key):
+            value = pressure.get(key)
+            return f"{value:.1f}%" if value is not None else "—"
+        fields['pressure'] = (f"⏳ Presión (PSI): CPU {pressure_text('cpu_pressure_some')} · "
+                              f"memoria {pressure_text('memory_pressure_some')} · "
+                              f"E/S {pressure_text('io_pressure_some')}")
+        stalled = pressure.get('memory_pressure_full') or 0
+        if stalled >= 1:
+            fields['pressure'] += f" (bloqueada por memoria {stalled:.1f}%)"
+    else:
+        fields['pressure'] = "⏳ Presión (PSI): N/A"
+
+    # Quick stat de red
+    net_rx_mbps = metrics['net_rx_mbps']
+    net_tx_mbps = metrics['net_tx_mbps']
+    if net_rx_mbps > 0 or net_tx_mbps > 0:
+        fields['net_mini'] = f'<span size="large" weight="bold">↓{net_rx_mbps:.1f} ↑{net_tx_mbps:.1f} MB/s</span>'
+    else:
+        fields['net_mini'] = '<span size="large">0 MB/s</span>'
+
+    # === Disco: IOPS y latencia ===
+    block_capacity = stats.get('block_capacity', 0)
+    block_allocation = stats.get('block_allocation', 0)
+    block_read_reqs = stats.get('block_read_reqs', 0)
+    block_write_reqs = stats.get('block_write_reqs', 0)
+
+    # Latencia del último intervalo (rates.py); la media desde el arranque apenas se mueve
+    def latency_text(latency_ms):
+        return f"{latency_ms:.2f}ms" if latency_ms is not None else "—"
+
+    avg_read_latency_ms = 0
+    avg_write_latency_ms = 0
+    if block_read_reqs > 0:
+        avg_read_latency_ms = (stats.get('block_rd_total_times', 0) / block_read_reqs) / 1_000_000
+    if block_write_reqs > 0:
+        avg_write_latency_ms = (stats.get('block_wr_total_times', 0) / block_write_reqs) / 1_000_000
+
+    if block_capacity > 0:
+        capacity_gb = block_capacity / (1024 * 1024 * 1024)
+        allocation_gb = block_allocation / (1024 * 1024 * 1024)
+        usage_percent = (block_allocation / block_capacity) * 100
+        fields.update({
+            'disk_bar': (usage_percent, allocation_gb, capacity_gb),
+            'disk_detail': f"Dispositivos: {stats.get('block_count', 0)}",
+            'disk_iops': (f"📊 IOPS: {metrics['read_iops']:.1f} lectura/s, {metrics['write_iops']:.1f} escritura/s · "
+                          f"{metrics['disk_read_mbps']:.1f}/{metrics['disk_write_mbps']:.1f} MB/s"),
+            'disk_latency': (f"⏱️ Latencia: {latency_text(metrics['read_latency_ms'])} lectura, "
+                             f"{latency_text(metrics['write_latency_ms'])} escritura "
+                             f"(desde el arranque: {avg_read_latency_ms:.2f}/{avg_write_latency_ms:.2f}ms)"),
+            'disk_mini': f'<span size="large" weight="bold">{allocation_gb:.1f}/{capacity_gb:.1f} GB</span>',
+        })
+    else:
+        fields.update({
+            'disk_bar': (0, 0, 0),
+            'disk_detail': "Sin información de disco",
+            'disk_iops': "",
+            'disk_latency': "",
+            'disk_mini': '<span size="large">N/A</span>',
+        })
+
+    # Red acumulada
+    fields['net_rx_total'] = f"⬇️ Recibido total: {format_bytes(stats.get('net_rx_bytes', 0))}"
+    fields['net_tx_total'] = f"⬆️ Enviado total: {format_bytes(stats.get('net_tx_bytes', 0))}"
+
+    # === Información Avanzada ===
+    config = vm_info.get('config') or {}
+
+    # Interfaces de red con detalles
+    net_interfaces = config.get('interfaces')
+    if net_interfaces:
+        iface_details = []
+        for iface in net_interfaces:
+            state_icon = "🟢" if iface.get('link_state', 'up') == "up" else "🔴"
+            iface_details.append(f"{state_icon} {iface.get('mac', 'N/A')} ({iface.get('model', 'N/A')}) "
+                                 f"→ {iface.get('source', 'N/A')}")
+
+        # Mostrar drops si los hay
+        net_rx_drop = stats.get('net_rx_drop', 0)
+        net_tx_drop = stats.get('net_tx_drop', 0)
+        if net_rx_drop > 0 or net_tx_drop > 0:
+            iface_details.append(f"⚠️ Drops: RX {net_rx_drop}, TX {net_tx_drop}")
+        fields['net_interfaces'] = "🔌 Interfaces: " + ", ".join(iface_details)
+    else:
+        fields['net_interfaces'] = "🔌 Interfaces: N/A"
+
+    # Drivers virtio
+    virtio_info = config.get('virtio')
+    if virtio_info:
+        virtio_enabled = [k for k, v in virtio_info.items() if v]
+        fields['virtio'] = f"⚡ Virtio: {', '.join(virtio_enabled)}" if virtio_enabled else "⚡ Virtio: Ninguno activo"
+    else:
+        fields['virtio'] = "⚡ Virtio: N/A"
+
+    # CPU features (solo los más importantes: SSE, AVX, AES, modo)
+    cpu_features = config.get('cpu_features')
+    if cpu_features:
+        important = [f for f in cpu_features if any(x in f.lower() for x in ['sse', 'avx', 'aes', 'mode:'])]
+        if important:
+            fields['cpu_features'] = f"🔧 CPU: {', '.join(important[:10])}"
+        else:
+            fields['cpu_features'] = f"🔧 CPU: {len(cpu_features)} features habilitados"
+    else:
+        fields['cpu_features'] = "🔧 CPU: N/A"
+
+    # Hugepages
+    hugepages = config.get('hugepages')
+    if hugepages and hugepages.get('enabled'):
+        pages_info = hugepages.get('pages', [])
+        if pages_info:
+            page_sizes = [f"{p['size']}{p['unit']}" for p in pages_info]
+            fields['hugepages'] = f"📄 Hugepages: Habilitadas ({', '.join(page_sizes)})"
+        else:
+            fields['hugepages'] = "📄 Hugepages: Habilitadas"
+    else:
+        fields['hugepages'] = "📄 Hugepages: Deshabilitadas"
+
+    # Blkio weight
+    blkio_weight = config.get('blkio_weight')
+    if blkio_weight:
+        priority = "Alta" if blkio_weight > 700 else ("Normal" if blkio_weight >= 300 else "Baja")
+        fields['blkio'] = f"⚖️ Prioridad I/O: {blkio_weight} ({priority})"
+    else:
+        fields['blkio'] = "⚖️ Prioridad I/O: N/A"
+
+    # Temperatura del host
+    host_temp = host.get('cpu_temp')
+    if host_temp:
+        temp_color = "🟢" if host_temp < 60 else ("🟡" if host_temp < 80 else "🔴")
+        fields['host_temp'] = f"{temp_color} Temp. Host: {host_temp:.1f}°C"
+    else:
+        fields['host_temp'] = "🌡️ Temp. Host: N/A"
+
+    # Usuarios conectados
+    users = vm_info.get('guest_users')
+    fields['guest_users'] = f"👥 Usuarios: {', '.join(users)}" if users else "👥 Usuarios: Ninguno"
+
+    return fields
@@ -0,0 +1,172 @@
+"""
+Métricas de cgroup v2 de cada dominio (machine.slice)
+
+libvirt coloca cada dominio en su propio scope de systemd bajo
+machine.slice (machine-qemu\\x2d<id>\\x2d<nombre>.scope). Una vez por
+ciclo se lista machine.slice, se asocia cada scope a su dominio por el id
+y se leen en bloque cpu.stat, memory.current, memory.stat,
+memory.swap.current, memory.numa_stat, io.stat y los archivos de presión
+(PSI: cpu.pressure, memory.pressure, io.pressure), sin ningún subproceso. Los valores se
+añaden a las stats de get_vm_detailed_stats con el prefijo 'cgroup_'; los
+totales de PSI permiten a rates.py calcular el % de tiempo en espera de
+cada intervalo. La raíz del cgroupfs es configurable para probarlo contra
+un árbol sintético. No importa GTK.
+"""
+import logging
+import os
+import re
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MACHINE_SLICE = 'machine.slice'
+_SCOPE_RE = re.compile(r'^machine-qemu\\x2d(\d+)\\x2d(.+)\.scope$')
+_ESCAPE_RE = re.compile(r'\\x([0-9a-fA-F]{2})')
+
+# Campos de cpu.stat y memory.stat que se publican: {campo del archivo: clave en stats}
+_CPU_STAT_FIELDS = {
+    'usage_usec': 'cgroup_cpu_usage_usec',
+    'user_usec': 'cgroup_cpu_user_usec',
+    'system_usec': 'cgroup_cpu_system_usec',
+    'nr_throttled': 'cgroup_cpu_nr_throttled',
+    'throttled_usec': 'cgroup_cpu_throttled_usec',
+}
+_MEMORY_STAT_FIELDS = {
+    'anon': 'cgroup_memory_anon',
+    'file': 'cgroup_memory_file',
+    'shmem': 'cgroup_memory_shmem',
+    'pgmajfault': 'cgroup_memory_pgmajfault',
+}
+_IO_STAT_FIELDS = {
+    'rbytes': 'cgroup_io_rbytes',
+    'wbytes': 'cgroup_io_wbytes',
+    'rios': 'cgroup_io_rios',
+    'wios': 'cgroup_io_wios',
+}
+PRESSURE_RESOURCES = ('cpu', 'memory', 'io')
+
+
+def unescape_unit_name(name: str) -> str:
+    """Deshace el escape de systemd (\\x2d -> '-') en el nombre de una unidad"""
+    return _ESCAPE_RE.sub(lambda match: chr(int(match.group(1), 16)), name)
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _parse_flat_keyed(content: str, fields: Dict[str, str], stats: Dict):
+    """Archivos 'clave valor' por línea (cpu.stat, memory.stat)"""
+    for line in content.splitlines():
+        key, _, value = line.partition(' ')
+        if key in fields:
+            stats[fields[key]] = int(value)
+
+
+def _parse_io_stat(content: str, stats: Dict):
+    """io.stat: una línea por dispositivo ('8:0 rbytes=... wbytes=...'); se suman todos"""
+    for key in _IO_STAT_FIELDS.values():
+        stats[key] = 0
+    for line in content.splitlines():
+        for item in line.split()[1:]:
+            key, _, value = item.partition('=')
+            if key in _IO_STAT_FIELDS:
+                stats[_IO_STAT_FIELDS[key]] += int(value)
+
+
+def _parse_numa_anon(content: str) -> List[int]:
+    """Línea 'anon N0=... N1=...' de memory.numa_stat: bytes anónimos por nodo (índice = nodo)"""
+    for line in content.splitlines():
+        key, *items = line.split()
+        if key != 'anon':
+            continue
+        per_node = {}
+        for item in items:
+            node, _, value = item.partition('=')
+            per_node[int(node[1:])] = int(value)
+        return [per_node.get(node, 0) for node in range(max(per_node) + 1)] if per_node else []
+    return []
+
+
+def _parse_pressure(content: str, resource: str, stats: Dict):
+    """cpu/memory/io.pressure: líneas 'some' y 'full' con avg10 (%) y total (µs)"""
+    for line in content.splitlines():
+        kind, *items = line.split()
+        values = dict(item.split('=', 1) for item in items)
+        if 'avg10' in values:
+            stats[f'cgroup_{resource}_{kind}_avg10'] = float(values['avg10'])
+        if 'total' in values:
+            stats[f'cgroup_{resource}_{kind}_total_usec'] = int(values['total'])
+
+
+class CgroupCollector:
+    """Lee las métricas de cgroup v2 de todos los dominios en un solo recorrido"""
+
+    def __init__(self, root: str = '/sys/fs/cgroup'):
+        self.root = root
+        self._warned = False
+
+    @property
+    def slice_path(self) -> str:
+        return os.path.join(self.root, MACHINE_SLICE)
+
+    def scopes(self) -> Dict[int, tuple]:
+        """{id de dominio: (nombre, ruta del scope)} de los scopes QEMU de machine.slice"""
+        try:
+            entries = os.listdir(self.slice_path)
+        except OSError as e:
+            if not self._warned:
+                logger.info(f"Sin métricas de cgroup v2 ({self.slice_path}: {e})")
+                self._warned = True
+            return {}
+        scopes = {}
+        for entry in entries:
+            match = _SCOPE_RE.match(entry)
+            if match:
+                scopes[int(match.group(1))] = (unescape_unit_name(match.group(2)),
+                                               os.path.join(self.slice_path, entry))
+        return scopes
+
+    def read_scope(self, path: str) -> Dict:
+        """Métricas de un scope (solo las claves de los archivos que existen)"""
+        stats = {}
+        content = _read(os.path.join(path, 'cpu.stat'))
+        if content:
+            _parse_flat_keyed(content, _CPU_STAT_FIELDS, stats)
+        content = _read(os.path.join(path, 'memory.current'))
+        if content:
+            stats['cgroup_memory_current'] = int(content)
+        content = _read(os.path.join(path, 'memory.swap.current'))
+        if content:
+            stats['cgroup_memory_swap_current'] = int(content)
+        content = _read(os.path.join(path, 'memory.stat'))
+        if content:
+            _parse_flat_keyed(content, _MEMORY_STAT_FIELDS, stats)
+        content = _read(os.path.join(path, 'memory.numa_stat'))
+        if content:
+            stats['cgroup_memory_numa_anon'] = _parse_numa_anon(content)
+        content = _read(os.path.join(path, 'io.stat'))
+        if content is not None:
+            _parse_io_stat(content, stats)
+        for resource in PRESSURE_RESOURCES:
+            content = _read(os.path.join(path, f'{resource}.pressure'))
+            if content:
+                _parse_pressure(content, resource, stats)
+        return stats
+
+    def collect(self) -> Dict[int, Dict]:
+        """{id de dominio: métricas 'cgroup_*'} de todos los dominios con scope"""
+        result = {}
+        for domain_id, (name, path) in self.scopes().items():
+            try:
+                stats = self.read_scope(path)
+            except (ValueError, IndexError) as e:
+                logger.debug(f"Métricas de cgroup ilegibles para {name}: {e}")
+                continue
+            stats['cgroup_scope'] = os.path.basename(path)
+            result[domain_id] = stats
+        return result
@@ -0,0 +1,341 @@
+"""
+Recolector de métricas de la flota de VMs
+
+Ejecuta en un hilo propio todas las llamadas a virsh de un ciclo y
+publica el resultado como un FleetSnapshot inmutable. La interfaz, el
+exportador y el modo headless solo leen snapshots: ninguno de ellos
+ejecuta virsh por su cuenta. No importa GTK.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import startup
+from cgroup_stats import CgroupCollector
+from host_metrics import HostCollector
+from memory_stats import STATS_PERIOD
+from qemu_threads import QemuThreadCollector
+from rates import RateEngine
+
+logger = logging.getLogger(__name__)
+
+
+class FleetSnapshot:
+    """Estado de todas las VMs en un ciclo de recolección"""
+
+    def __init__(self, generation: int, timestamp: float, vms: Dict[str, Dict],
+                 host: Dict, timings: Dict, stale: bool = False):
+        self.generation = generation  # Crece en 1 por cada ciclo publicado
+        self.timestamp = timestamp    # time.time() al terminar el ciclo
+        self.vms = vms                # {nombre: estado de la VM}
+        self.host = host              # Métricas del host (temperatura, ...)
+        self.timings = timings        # Coste de la propia recolección
+        self.stale = stale            # True si viene de la caché de una ejecución anterior
+        self.monotonic = None         # time.monotonic() al terminar el ciclo (no se serializa)
+        self._columns = None
+
+    def to_dict(self) -> Dict:
+        """Representación serializable (JSON) del snapshot"""
+        return {
+            'generation': self.generation,
+            'timestamp': self.timestamp,
+            'vms': self.vms,
+            'host': self.host,
+            'timings': self.timings,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'FleetSnapshot':
+        """Reconstruye un snapshot guardado; siempre se marca como obsoleto"""
+        return cls(data['generation'], data['timestamp'], data['vms'], data['host'], data['timings'],
+                   stale=True)
+
+    def get(self, vm_name: str) -> Optional[Dict]:
+        return self.vms.get(vm_name)
+
+    def build_columns(self):
+        """Construye (una sola vez) y retorna la tabla columnar de fleet_summary.FleetColumns
+
+        Import diferido: fleet_summary puede cargar NumPy, que el modo
+        headless no necesita.
+        """
+        if self._columns is None:
+            from fleet_summary import FleetColumns
+            self._columns = FleetColumns(self)
+        return self._columns
+
+    @property
+    def columns(self):
+        """Tabla columnar del snapshot (ver build_columns)"""
+        return self.build_columns()
+
+    @columns.setter
+    def columns(self, columns):
+        self._columns = columns
+
+    @property
+    def running_count(self) -> int:
+        return sum(1 for vm in self.vms.values() if vm['running'])
+
+
+class FleetCollector:
+    """Bucle de recolección periódica sobre un VMManager
+
+    Cada ciclo produce un FleetSnapshot con, por cada VM configurada:
+    'name', 'id', 'state', 'running', 'stats' (get_vm_detailed_stats más
+    las claves 'cgroup_*' de su scope de cgroup v2, ver cgroup_stats.py,
+    y 'qemu_threads' con el tiempo de CPU de cada hilo de QEMU, ver
+    qemu_threads.py),
+    'ip', 'uptime', 'guest_users', 'config' (get_vm_domain_config) y
+    'rates' (tasas desde el ciclo anterior, ver rates.py; None sin intervalo).
+    snapshot.host lleva las métricas del host (host_metrics.HostCollector),
+    leídas una vez por ciclo para todas las VMs.
+    Los listeners se invocan desde el hilo del recolector.
+
+    Con fast_interval, un segundo hilo lee cada fast_interval segundos la
+    CPU y el RSS de los procesos QEMU directamente de procfs
+    (qemu_proc.QemuProcCollector, sin virsh) y avisa a los fast listeners
+    con {vm: {'cpu_percent', 'rss_kb', 'cpu_time'}}.
+    """
+
+    def __init__(self, vm_manager, interval: float = 5.0, host_collector: Optional[HostCollector] = None,
+                 fast_interval: Optional[float] = None, proc_collector=None,
+                 cgroup_collector: Optional[CgroupCollector] = None,
+                 thread_collector: Optional[QemuThreadCollector] = None):
+        self.vm_manager = vm_manager
+        self.host_collector = host_collector or HostCollector()
+        self.cgroup_collector = cgroup_collector or CgroupCollector()
+        self.thread_collector = thread_collector or QemuThreadCollector()
+        self.interval = interval
+        self.fast_interval = fast_interval
+        self.proc_collector = proc_collector
+        if fast_interval and proc_collector is None:
+            from qemu_proc import QemuProcCollector
+            self.proc_collector = QemuProcCollector()
+        self._fast_listeners: List[Callable[[Dict[str, Dict]], None]] = []
+        self._fast_previous: Dict[str, tuple] = {}  # {vm: (id de dominio, instante monótono, cpu_time)}
+        self._fast_thread = None
+        self.generation = 0
+        self.cycles_failed = 0
+        self._latest: Optional[FleetSnapshot] = None
+        self._listeners: List[Callable[[FleetSnapshot], None]] = []
+        self._config_cache: Dict[str, tuple] = {}  # {nombre: (id de dominio, config)}
+        self._stats_period_set: Dict[str, object] = {}  # {nombre: id de dominio} con periodo de balloon fijado
+        self.rate_engine = RateEngine()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def latest(self) -> Optional[FleetSnapshot]:
+        """Último snapshot publicado (None antes del primer ciclo)"""
+        return self._latest
+
+    def add_listener(self, callback: Callable[[FleetSnapshot], None]):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[FleetSnapshot], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def add_fast_listener(self, callback: Callable[[Dict[str, Dict]], None]):
+        self._fast_listeners.append(callback)
+
+    def start(self):
+        """Inicia el hilo de recolección (el primer ciclo es inmediato)"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="fleet-collector", daemon=True)
+        self._thread.start()
+        if self.fast_interval:
+            self._fast_thread = threading.Thread(target=self._run_fast, name="fleet-fast", daemon=True)
+            self._fast_thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        if self._fast_thread is not None:
+            self._fast_thread.join(timeout=timeout)
+            self._fast_thread = None
+        self.host_collector.close()
+        self.thread_collector.close()
+        if self.proc_collector is not None:
+            self.proc_collector.close()
+
+    def seed(self, snapshot: FleetSnapshot):
+        """Reutiliza la config de dominio de un snapshot anterior (arranque en caliente)
+
+        Solo se aprovecha mientras el id del dominio no cambie, así que
+        una VM reiniciada vuelve a leer su XML en el primer ciclo.
+        """
+        for vm in snapshot.vms.values():
+            if vm.get('id') and vm.get('config') is not None:
+                self._config_cache.setdefault(vm['name'], (vm['id'], vm['config']))
+
+    def request_refresh(self):
+        """Adelanta el siguiente ciclo (p. ej. tras iniciar o apagar una VM)"""
+        self._wakeup.set()
+
+    def _run(self):
+        # Comprobación diferida de requisitos: no retrasa la primera ventana
+        if not self.vm_manager.requirements_checked:
+            self.vm_manager.check_system_requirements()
+            startup.mark('requisitos comprobados')
+
+        while not self._stop.is_set():
+            try:
+                self.collect_once()
+            except Exception as e:
+                self.cycles_failed += 1
+                logger.error(f"Error en el ciclo de recolección: {e}")
+
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def _run_fast(self):
+        while not self._stop.wait(self.fast_interval):
+            try:
+                samples = self.sample_fast()
+            except Exception as e:
+                logger.error(f"Error en la muestra rápida: {e}")
+                continue
+            for callback in list(self._fast_listeners):
+                try:
+                    callback(samples)
+                except Exception as e:
+                    logger.error(f"Error en listener de muestras rápidas: {e}")
+
+    def sample_fast(self) -> Dict[str, Dict]:
+        """CPU % y RSS por procfs de las VMs en ejecución del último snapshot"""
+        latest = self._latest
+        if latest is None or self.proc_collector is None:
+            return {}
+        now = time.monotonic()
+        samples = {}
+        for vm in latest.vms.values():
+            vm_name = vm['name']
+            sample = self.proc_collector.sample(vm_name, vm['id']) if vm['running'] else None
+            if sample is None:
+                if not vm['running']:
+                    self.proc_collector.forget(vm_name)
+                self._fast_previous.pop(vm_name, None)
+                continue
+
+            previous = self._fast_previous.get(vm_name)
+            self._fast_previous[vm_name] = (vm['id'], now, sample['cpu_time'])
+            cpu_percent = None
+            if previous is not None and previous[0] == vm['id'] and now > previous[1] \
+                    and sample['cpu_time'] >= previous[2]:
+                stats = vm.get('stats') or {}
+                vcpus = stats.get('vcpu_current') or stats.get('vcpu_count') or 1
+                cpu_percent = min(100.0, (sample['cpu_time'] - previous[2]) / 1e9 / ((now - previous[1]) * vcpus) * 100)
+            samples[vm_name] = dict(sample, cpu_percent=cpu_percent)
+        return samples
+
+    def _get_domain_config(self, vm: Dict) -> Optional[Dict]:
+        """Config del dominio cacheada mientras no cambie su id (reinicio)"""
+        cached = self._config_cache.get(vm['name'])
+        if cached is not None and cached[0] == vm['id']:
+            return cached[1]
+        config = self.vm_manager.get_vm_domain_config(vm['name'])
+        if config is not None:
+            self._config_cache[vm['name']] = (vm['id'], config)
+        return config
+
+    def _ensure_stats_period(self, vm: Dict, stats: Dict):
+        """Activa el periodo de estadísticas del balloon si el guest no informa (una vez por arranque)"""
+        if stats.get('memory_actual') is None or stats.get('memory_stats_updated') is not None:
+            return
+        if self._stats_period_set.get(vm['name']) == vm['id']:
+            return
+        self._stats_period_set[vm['name']] = vm['id']
+        self.vm_manager.set_memory_stats_period(vm['name'], STATS_PERIOD)
+
+    def _collect_vm(self, vm: Dict, cgroup: Optional[Dict] = None) -> Dict:
+        """Recolecta el estado completo de una VM en ejecución"""
+        vm_name = vm['name']
+        stats = self.vm_manager.get_vm_detailed_stats(vm_name)
+        if stats and cgroup:
+            stats.update(cgroup)
+        if stats:
+            stats['qemu_threads'] = self.thread_collector.sample(vm_name, vm['id'])
+            self._ensure_stats_period(vm, stats)
+            rates = self.rate_engine.update(vm_name, vm['id'], stats, time.monotonic())
+        else:
+            self.rate_engine.forget(vm_name)
+            rates = None
+        return {
+            'stats': stats,
+            'rates': rates,
+            'ip': self.vm_manager.get_vm_ip_address(vm_name),
+            'uptime': self.vm_manager.get_vm_uptime(vm_name, detailed_stats=stats),
+            'guest_users': self.vm_manager.get_vm_guest_users(vm_name),
+            'config': self._get_domain_config(vm),
+        }
+
+    def collect_once(self) -> FleetSnapshot:
+        """Ejecuta un ciclo completo y publica el snapshot resultante"""
+        started = time.monotonic()
+        calls_before = self.vm_manager.virsh_calls
+        virsh_seconds_before = self.vm_manager.virsh_seconds
+
+        listed = {vm['name']: vm for vm in self.vm_manager.list_all_vms()}
+        list_seconds = time.monotonic() - started
+        # Un solo recorrido de machine.slice para todos los dominios (por id numérico; virsh lo da como texto)
+        cgroups = self.cgroup_collector.collect()
+
+        vms = {}
+        vm_seconds = {}
+        for vm_name in self.vm_manager.vm_names:
+            vm_started = time.monotonic()
+            vm = listed.get(vm_name)
+            if vm is None:
+                # No definida (o virsh no respondió): se publica como ausente
+                entry = {'name': vm_name, 'id': None, 'state': None, 'running': False}
+            else:
+                entry = dict(vm)
+            entry.update({'stats': None, 'rates': None, 'ip': None, 'uptime': None, 'guest_users': None,
+                          'config': None})
+
+            if entry['running']:
+                cgroup = cgroups.get(int(entry['id'])) if entry['id'] is not None else None
+                entry.update(self._collect_vm(entry, cgroup))
+            else:
+                self.rate_engine.forget(vm_name)
+                self.thread_collector.forget(vm_name)
+            vms[vm_name] = entry
+            vm_seconds[vm_name] = time.monotonic() - vm_started
+
+        host = self.host_collector.collect()
+
+        finished = time.monotonic()
+        self.generation += 1
+        timings = {
+            'cycle_seconds': finished - started,
+            'list_seconds': list_seconds,
+            'vm_seconds': vm_seconds,
+            'virsh_calls': self.vm_manager.virsh_calls - calls_before,
+            'virsh_seconds': self.vm_manager.virsh_seconds - virsh_seconds_before,
+            'cycles_failed': self.cycles_failed,
+        }
+        snapshot = FleetSnapshot(self.generation, time.time(), vms, host, timings)
+        snapshot.monotonic = finished
+        self._latest = snapshot
+        if snapshot.generation == 1:
+            startup.mark('primer snapshot')
+
+        logger.debug(f"Ciclo {snapshot.generation}: {timings['virsh_calls']} llamadas virsh "
+                     f"en {timings['cycle_seconds']:.2f}s")
+
+        for callback in list(self._listeners):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logger.error(f"Error en listener del recolector: {e}")
+
+        return snapshot
@@ -0,0 +1,118 @@
+"""
+Desglose por disco para la pestaña de almacenamiento
+
+Guarda un historial corto de las métricas de intervalo de cada disco de
+una VM (latencia, IOPS, MB/s y tamaño medio de petición, calculadas por
+rates.RateEngine) y marca como lento el disco cuya latencia del último
+intervalo supera un umbral absoluto o se dispara respecto a su propia
+mediana reciente, para que se vea en cuanto llega la muestra. No importa
+GTK.
+"""
+from collections import deque
+from typing import Dict, List, Optional
+
+HISTORY = 30             # Muestras por disco (2.5 min con el intervalo por defecto)
+SLOW_LATENCY_MS = 20.0   # Latencia a partir de la que un disco se marca como lento
+SLOW_FACTOR = 4.0        # ... o veces su mediana reciente
+_MIN_BASELINE = 5        # Muestras necesarias para comparar con la mediana
+_MIN_BASELINE_MS = 0.5   # Por debajo, la mediana no sirve de referencia (disco en caché)
+
+# Métricas con historial por disco
+METRICS = ('latency_ms', 'iops', 'mbps', 'kb_per_request')
+
+
+def _median(values: List[float]) -> float:
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+class DiskHistory:
+    """Métricas de intervalo por disco de una VM con su historial corto"""
+
+    def __init__(self, maxlen: int = HISTORY):
+        self.maxlen = maxlen
+        self._history: Dict[str, Dict[str, deque]] = {}
+        self._rows: List[Dict] = []
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def clear(self):
+        self._history.clear()
+        self._rows = []
+
+    def update(self, devices: List[Dict], block_rates: Optional[Dict[str, Dict]]) -> List[Dict]:
+        """Aplica una muestra: devices de stats['block_devices'], block_rates de rates['block']
+
+        Retorna una fila por disco con los valores del último intervalo
+        (None si no hay intervalo), su historial y si está lento.
+        """
+        block_rates = block_rates or {}
+        names = [device.get('name') for device in devices]
+        for name in list(self._history):
+            if name not in names:
+                del self._history[name]
+
+        rows = []
+        for device in devices:
+            name = device.get('name')
+            history = self._history.get(name)
+            if history is None:
+                history = self._history[name] = {metric: deque(maxlen=self.maxlen) for metric in METRICS}
+
+            rates = block_rates.get(name)
+            row = {
+                'name': name,
+                'path': device.get('path'),
+                'latency_ms': None,
+                'read_latency_ms': None,
+                'write_latency_ms': None,
+                'iops': None,
+                'mbps': None,
+                'kb_per_request': None,
+                'slow': False,
+            }
+            if rates is not None:
+                latency = rates['latency_ms']
+                baseline = [value for value in history['latency_ms'] if value is not None]
+                row.update({
+                    'latency_ms': latency,
+                    'read_latency_ms': rates['read_latency_ms'],
+                    'write_latency_ms': rates['write_latency_ms'],
+                    'iops': rates['read_iops'] + rates['write_iops'],
+                    'mbps': rates['read_mbps'] + rates['write_mbps'],
+                    'kb_per_request': rates['kb_per_request'],
+                })
+                if latency is not None:
+                    row['slow'] = latency >= SLOW_LATENCY_MS
+                    if len(baseline) >= _MIN_BASELINE:
+                        median = _median(baseline)
+                        row['slow'] = row['slow'] or (median >= _MIN_BASELINE_MS and latency >= SLOW_FACTOR * median)
+                for metric in METRICS:
+                    history[metric].append(row[metric])
+            row['history'] = {metric: list(values) for metric, values in history.items()}
+            rows.append(row)
+
+        self._rows = rows
+        return rows
+
+    @property
+    def rows(self) -> List[Dict]:
+        return self._rows
+
+    @staticmethod
+    def tooltip(row: Dict) -> str:
+        """Texto del tooltip de la fila de un disco"""
+        lines = [row['name'] + (f" ({row['path']})" if row.get('path') else "")]
+        latencies = [value for value in row['history']['latency_ms'] if value is not None]
+        if latencies:
+            lines.append(f"Latencia reciente: mín {min(latencies):.2f} ms · "
+                         f"mediana {_median(latencies):.2f} ms · máx {max(latencies):.2f} ms")
+        if row['read_latency_ms'] is not None or row['write_latency_ms'] is not None:
+            read = f"{row['read_latency_ms']:.2f}" if row['read_latency_ms'] is not None else "—"
+            write = f"{row['write_latency_ms']:.2f}" if row['write_latency_ms'] is not None else "—"
+            lines.append(f"Último intervalo: {read} ms lectura, {write} ms escritura")
+        if row['slow']:
+            lines.append("⚠️ Latencia muy por encima de lo habitual")
+        return "\n".join(lines)
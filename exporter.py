@@ -0,0 +1,265 @@
+"""
+Exportador de métricas en formato OpenMetrics (Prometheus)
+
+Sirve por HTTP (solo localhost por defecto) el último FleetSnapshot del
+recolector. El texto se genera una sola vez por generación de snapshot,
+en el hilo del recolector; cada scrape solo devuelve los bytes cacheados
+y nunca ejecuta virsh.
+"""
+import logging
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# Contadores de get_vm_detailed_stats: (clave, métrica, ayuda, factor de escala)
+_VM_COUNTERS = (
+    ('cpu_time', 'vmpanel_vm_cpu_seconds', 'Tiempo de CPU consumido por la VM', 1e-9),
+    ('cpu_user', 'vmpanel_vm_cpu_user_seconds', 'Tiempo de CPU en modo usuario', 1e-9),
+    ('cpu_system', 'vmpanel_vm_cpu_system_seconds', 'Tiempo de CPU en modo sistema', 1e-9),
+    ('vcpu_time', 'vmpanel_vm_vcpu_seconds', 'Tiempo acumulado de todas las vCPUs', 1e-9),
+    ('block_read_bytes', 'vmpanel_vm_block_read_bytes', 'Bytes leídos de disco', 1),
+    ('block_write_bytes', 'vmpanel_vm_block_write_bytes', 'Bytes escritos en disco', 1),
+    ('block_read_reqs', 'vmpanel_vm_block_read_requests', 'Operaciones de lectura de disco', 1),
+    ('block_write_reqs', 'vmpanel_vm_block_write_requests', 'Operaciones de escritura de disco', 1),
+    ('block_rd_total_times', 'vmpanel_vm_block_read_time_seconds', 'Tiempo total en lecturas de disco', 1e-9),
+    ('block_wr_total_times', 'vmpanel_vm_block_write_time_seconds', 'Tiempo total en escrituras de disco', 1e-9),
+    ('net_rx_bytes', 'vmpanel_vm_network_receive_bytes', 'Bytes recibidos por red', 1),
+    ('net_tx_bytes', 'vmpanel_vm_network_transmit_bytes', 'Bytes enviados por red', 1),
+    ('net_rx_pkts', 'vmpanel_vm_network_receive_packets', 'Paquetes recibidos', 1),
+    ('net_tx_pkts', 'vmpanel_vm_network_transmit_packets', 'Paquetes enviados', 1),
+    ('net_rx_drop', 'vmpanel_vm_network_receive_drop_packets', 'Paquetes recibidos descartados', 1),
+    ('net_tx_drop', 'vmpanel_vm_network_transmit_drop_packets', 'Paquetes enviados descartados', 1),
+    ('cgroup_cpu_usage_usec', 'vmpanel_vm_cgroup_cpu_seconds', 'Tiempo de CPU del cgroup del dominio', 1e-6),
+    ('cgroup_cpu_throttled_usec', 'vmpanel_vm_cgroup_cpu_throttled_seconds',
+     'Tiempo limitado por la cuota de CPU del cgroup', 1e-6),
+    ('cgroup_io_rbytes', 'vmpanel_vm_cgroup_io_read_bytes', 'Bytes leídos por el cgroup del dominio', 1),
+    ('cgroup_io_wbytes', 'vmpanel_vm_cgroup_io_write_bytes', 'Bytes escritos por el cgroup del dominio', 1),
+    ('cgroup_memory_pgmajfault', 'vmpanel_vm_cgroup_major_page_faults', 'Fallos de página mayores del cgroup', 1),
+    ('memory_swap_in', 'vmpanel_vm_guest_swap_in_bytes', 'Swap leída dentro del guest (balloon)', 1024),
+    ('memory_swap_out', 'vmpanel_vm_guest_swap_out_bytes', 'Swap escrita dentro del guest (balloon)', 1024),
+    ('memory_major_faults', 'vmpanel_vm_guest_major_page_faults', 'Fallos de página mayores del guest (balloon)', 1),
+    ('cgroup_cpu_some_total_usec', 'vmpanel_vm_cgroup_cpu_pressure_waiting_seconds',
+     'Tiempo con tareas esperando CPU (PSI some)', 1e-6),
+    ('cgroup_memory_some_total_usec', 'vmpanel_vm_cgroup_memory_pressure_waiting_seconds',
+     'Tiempo con tareas esperando memoria (PSI some)', 1e-6),
+    ('cgroup_memory_full_total_usec', 'vmpanel_vm_cgroup_memory_pressure_stalled_seconds',
+     'Tiempo con todas las tareas esperando memoria (PSI full)', 1e-6),
+    ('cgroup_io_some_total_usec', 'vmpanel_vm_cgroup_io_pressure_waiting_seconds',
+     'Tiempo con tareas esperando E/S (PSI some)', 1e-6),
+    ('cgroup_io_full_total_usec', 'vmpanel_vm_cgroup_io_pressure_stalled_seconds',
+     'Tiempo con todas las tareas esperando E/S (PSI full)', 1e-6),
+)
+
+# Valores instantáneos de get_vm_detailed_stats: (clave, métrica, ayuda, unidad, factor)
+_VM_GAUGES = (
+    ('vcpu_current', 'vmpanel_vm_vcpus', 'vCPUs activas', None, 1),
+    ('vcpu_count', 'vmpanel_vm_vcpus_maximum', 'vCPUs máximas', None, 1),
+    ('memory_actual', 'vmpanel_vm_memory_balloon_bytes', 'Memoria asignada al balloon', 'bytes', 1024),
+    ('memory_available', 'vmpanel_vm_memory_maximum_bytes', 'Memoria máxima configurada', 'bytes', 1024),
+    ('memory_unused', 'vmpanel_vm_memory_unused_bytes', 'Memoria libre dentro del guest', 'bytes', 1024),
+    ('memory_usable', 'vmpanel_vm_memory_usable_bytes', 'Memoria utilizable dentro del guest', 'bytes', 1024),
+    ('memory_rss', 'vmpanel_vm_memory_rss_bytes', 'Memoria residente del proceso QEMU', 'bytes', 1024),
+    ('memory_disk_caches', 'vmpanel_vm_guest_cache_bytes', 'Caché de páginas dentro del guest', 'bytes', 1024),
+    ('memory_guest_total', 'vmpanel_vm_guest_memory_bytes', 'Memoria total vista por el guest', 'bytes', 1024),
+    ('block_count', 'vmpanel_vm_block_devices', 'Dispositivos de bloque', None, 1),
+    ('block_capacity', 'vmpanel_vm_block_capacity_bytes', 'Capacidad total de disco', 'bytes', 1),
+    ('block_allocation', 'vmpanel_vm_block_allocation_bytes', 'Espacio de disco asignado', 'bytes', 1),
+    ('block_physical', 'vmpanel_vm_block_physical_bytes', 'Espacio físico ocupado en el host', 'bytes', 1),
+    ('cgroup_memory_current', 'vmpanel_vm_cgroup_memory_bytes', 'Memoria usada por el cgroup del dominio', 'bytes', 1),
+    ('cgroup_memory_swap_current', 'vmpanel_vm_cgroup_swap_bytes', 'Swap usada por el cgroup del dominio',
+     'bytes', 1),
+)
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        # OpenMetrics solo admite +Inf, -Inf y NaN (repr daría inf/nan y rompería todo el scrape)
+        if math.isnan(value):
+            return 'NaN'
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
+    return str(value)
+
+
+class _Family:
+    """Familia de métricas OpenMetrics en construcción"""
+
+    def __init__(self, name: str, metric_type: str, help_text: str, unit: Optional[str] = None):
+        self.name = name
+        self.metric_type = metric_type
+        self.help_text = help_text
+        self.unit = unit
+        self.samples: List[Tuple[str, str]] = []
+
+    def add(self, value, **labels):
+        label_text = ','.join(f'{key}="{_escape_label(val)}"' for key, val in labels.items())
+        self.samples.append((label_text, _format_value(value)))
+
+    def render(self, lines: List[str]):
+        if not self.samples:
+            return
+        lines.append(f"# TYPE {self.name} {self.metric_type}")
+        if self.unit:
+            lines.append(f"# UNIT {self.name} {self.unit}")
+        lines.append(f"# HELP {self.name} {self.help_text}")
+        sample_name = f"{self.name}_total" if self.metric_type == 'counter' else self.name
+        for label_text, value in self.samples:
+            if label_text:
+                lines.append(f"{sample_name}{{{label_text}}} {value}")
+            else:
+                lines.append(f"{sample_name} {value}")
+
+
+def render_snapshot(snapshot) -> bytes:
+    """Genera la exposición OpenMetrics completa de un FleetSnapshot"""
+    families = []
+
+    up = _Family('vmpanel_vm_running', 'gauge', 'Indica si la VM está en ejecución')
+    families.append(up)
+    for vm in snapshot.vms.values():
+        if vm['state'] is not None:
+            up.add(1 if vm['running'] else 0, vm=vm['name'])
+
+    for key, name, help_text, scale in _VM_COUNTERS:
+        unit = 'seconds' if name.endswith('_seconds') else ('bytes' if name.endswith('_bytes') else None)
+        family = _Family(name, 'counter', help_text, unit)
+        families.append(family)
+        for vm in snapshot.vms.values():
+            stats = vm.get('stats')
+            if stats and stats.get(key) is not None:
+                value = stats[key] * scale if scale != 1 else stats[key]
+                family.add(value, vm=vm['name'])
+
+    for key, name, help_text, unit, scale in _VM_GAUGES:
+        family = _Family(name, 'gauge', help_text, unit)
+        families.append(family)
+        for vm in snapshot.vms.values():
+            stats = vm.get('stats')
+            if stats and stats.get(key) is not None:
+                family.add(stats[key] * scale, vm=vm['name'])
+
+    host = snapshot.host
+    host_gauges = (
+        ('cpu_temp', 'vmpanel_host_cpu_temperature_celsius', 'Temperatura de CPU del host', 'celsius', 1),
+        ('cpu_percent', 'vmpanel_host_cpu_usage_ratio', 'Uso de CPU del host en el último ciclo', 'ratio', 0.01),
+        ('cpu_iowait_percent', 'vmpanel_host_cpu_iowait_ratio', 'Tiempo de CPU del host en iowait', 'ratio', 0.01),
+        ('memory_total_kb', 'vmpanel_host_memory_total_bytes', 'Memoria total del host', 'bytes', 1024),
+        ('memory_available_kb', 'vmpanel_host_memory_available_bytes', 'Memoria disponible del host', 'bytes', 1024),
+        ('swap_used_kb', 'vmpanel_host_swap_used_bytes', 'Swap usada en el host', 'bytes', 1024),
+    )
+    for key, name, help_text, unit, scale in host_gauges:
+        if host.get(key) is not None:
+            family = _Family(name, 'gauge', help_text, unit)
+            family.add(host[key] * scale)
+            families.append(family)
+    if host.get('load'):
+        family = _Family('vmpanel_host_load_average', 'gauge', 'Carga media del host')
+        for period, value in zip(('1m', '5m', '15m'), host['load']):
+            family.add(value, period=period)
+        families.append(family)
+
+    # Métricas del propio recolector
+    timings = snapshot.timings
+    collector_gauges = (
+        ('vmpanel_collector_generation', 'Generación del snapshot publicado', None, snapshot.generation),
+        ('vmpanel_collector_snapshot_timestamp_seconds', 'Momento en que terminó el último ciclo',
+         'seconds', snapshot.timestamp),
+        ('vmpanel_collector_cycle_duration_seconds', 'Duración del último ciclo de recolección',
+         'seconds', timings.get('cycle_seconds', 0.0)),
+        ('vmpanel_collector_list_duration_seconds', 'Duración de virsh list en el último ciclo',
+         'seconds', timings.get('list_seconds', 0.0)),
+        ('vmpanel_collector_virsh_calls', 'Llamadas a virsh en el último ciclo', None,
+         timings.get('virsh_calls', 0)),
+        ('vmpanel_collector_virsh_duration_seconds', 'Tiempo total en virsh en el último ciclo',
+         'seconds', timings.get('virsh_seconds', 0.0)),
+    )
+    for name, help_text, unit, value in collector_gauges:
+        family = _Family(name, 'gauge', help_text, unit)
+        family.add(value)
+        families.append(family)
+
+    failed = _Family('vmpanel_collector_failed_cycles', 'counter', 'Ciclos de recolección fallidos')
+    failed.add(timings.get('cycles_failed', 0))
+    families.append(failed)
+
+    vm_seconds = _Family('vmpanel_collector_vm_duration_seconds', 'gauge',
+                         'Tiempo de recolección por VM en el último ciclo', 'seconds')
+    for vm_name, seconds in timings.get('vm_seconds', {}).items():
+        vm_seconds.add(seconds, vm=vm_name)
+    families.append(vm_seconds)
+
+    lines: List[str] = []
+    for family in families:
+        family.render(lines)
+    lines.append("# EOF")
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class MetricsExporter:
+    """Servidor HTTP opcional que expone /metrics"""
+
+    def __init__(self, collector, port: int, address: str = '127.0.0.1'):
+        self.collector = collector
+        self.port = port
+        self.address = address
+        self._rendered = (0, b"# EOF\n")  # (generación, cuerpo)
+        self._server = None
+        self._thread = None
+
+    def _on_snapshot(self, snapshot):
+        """Genera el cuerpo una vez por snapshot (hilo del recolector)"""
+        try:
+            self._rendered = (snapshot.generation, render_snapshot(snapshot))
+        except Exception as e:
+            logger.error(f"Error generando métricas OpenMetrics: {e}")
+
+    @property
+    def body(self) -> bytes:
+        return self._rendered[1]
+
+    def start(self):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = exporter.body
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Exporter: {format % args}")
+
+        self._server = ThreadingHTTPServer((self.address, self.port), Handler)
+        self._server.daemon_threads = True
+
+        latest = self.collector.latest
+        if latest is not None:
+            self._on_snapshot(latest)
+        self.collector.add_listener(self._on_snapshot)
+
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-exporter", daemon=True)
+        self._thread.start()
+        logger.info(f"Exportador OpenMetrics escuchando en http://{self.address}:{self.port}/metrics")
+
+    def stop(self):
+        self.collector.remove_listener(self._on_snapshot)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
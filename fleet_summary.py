@@ -0,0 +1,176 @@
+"""
+Agregados de la flota para el dashboard de resumen
+
+Convierte cada FleetSnapshot en una tabla columnar (una fila por VM en
+ejecución; FleetSnapshot.build_columns() la construye una sola vez, y la
+ventana la pide desde el listener del recolector, fuera del hilo de GTK)
+y calcula los totales de la flota —CPU %, memoria usada,
+IOPS y rendimiento de disco y red— con unas pocas operaciones
+vectorizadas de NumPy. Las tasas son las de vm['rates'] (RateEngine del
+recolector, con su tratamiento de reinicios por dispositivo); aquí solo
+se suman. Sin NumPy se usa el mismo cálculo en Python puro. No importa
+GTK.
+"""
+import logging
+import math
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Columnas de la tabla: (origen, clave) por columna; la memoria en KB de
+# get_vm_detailed_stats y las tasas del intervalo de vm['rates']
+COLUMNS = (
+    ('balloon', 'stats', 'memory_actual'),              # balloon.current
+    ('unused', 'stats', 'memory_unused'),               # memoria libre dentro del guest (None sin balloon stats)
+    ('rss', 'stats', 'memory_rss'),                     # RSS del proceso QEMU
+    ('vcpus', None, None),                              # vcpu.current (o vcpu.maximum)
+    ('cpu_percent', 'rates', 'cpu_percent'),            # % de las vCPUs de la VM
+    ('read_iops', 'rates', 'read_iops'),
+    ('write_iops', 'rates', 'write_iops'),
+    ('disk_read_mbps', 'rates', 'disk_read_mbps'),
+    ('disk_write_mbps', 'rates', 'disk_write_mbps'),
+    ('net_rx_mbps', 'rates', 'net_rx_mbps'),
+    ('net_tx_mbps', 'rates', 'net_tx_mbps'),
+)
+_COL = {name: i for i, (name, _source, _key) in enumerate(COLUMNS)}
+_STATS_KEYS = tuple(key for _name, source, key in COLUMNS if source == 'stats')
+_RATES_KEYS = tuple(key for _name, source, key in COLUMNS if source == 'rates')
+_SUM_COLUMNS = ('read_iops', 'write_iops', 'disk_read_mbps', 'disk_write_mbps', 'net_rx_mbps', 'net_tx_mbps')
+
+_MB = 1024 * 1024
+_NAN = float('nan')
+_NO_RATES = (None,) * len(_RATES_KEYS)
+
+
+def _row(stats: Dict, rates: Optional[Dict]) -> tuple:
+    """Fila de la tabla para una VM (None donde falta el dato; las tasas, sin intervalo)"""
+    return (*map(stats.get, _STATS_KEYS), stats.get('vcpu_current') or stats.get('vcpu_count') or 1,
+            *(map(rates.get, _RATES_KEYS) if rates else _NO_RATES))
+
+
+class FleetColumns:
+    """Tabla columnar de las VMs en ejecución de un snapshot"""
+
+    def __init__(self, snapshot):
+        self.stale = snapshot.stale
+        self.keys: List[tuple] = []      # (nombre, id de dominio) por fila
+        rows = []
+        for vm in snapshot.vms.values():
+            stats = vm.get('stats')
+            if vm.get('running') and stats:
+                self.keys.append((vm['name'], vm.get('id')))
+                rows.append(_row(stats, vm.get('rates')))
+        if np is not None:
+            # NumPy convierte los None en NaN al crear la tabla
+            self.data = np.array(rows, dtype=np.float64).reshape(len(rows), len(COLUMNS))
+        else:
+            self.data = [tuple(_NAN if value is None else float(value) for value in row) for row in rows]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+def _empty_summary(running: int) -> Dict[str, Optional[float]]:
+    return {
+        'running': running,
+        'cpu_percent': None,
+        'memory_used_gb': 0.0,
+        'memory_assigned_gb': 0.0,
+        'iops': None,
+        'disk_read_mbps': None,
+        'disk_write_mbps': None,
+        'net_rx_mbps': None,
+        'net_tx_mbps': None,
+    }
+
+
+class FleetAggregator:
+    """Totales de la flota a partir de cada snapshot
+
+    Las tasas suman las de las VMs con intervalo (vm['rates']); sin
+    ninguna, o en un snapshot de la caché, quedan en None. La CPU % de la
+    flota pondera el % de cada VM por sus vCPUs.
+    """
+
+    def update(self, snapshot) -> Dict[str, Optional[float]]:
+        """Totales del snapshot (usa la tabla del snapshot si ya está construida)"""
+        columns = snapshot.columns
+        summary = _empty_summary(len(columns))
+        if not len(columns):
+            return summary
+        if np is not None:
+            self._aggregate_numpy(columns, summary)
+        else:
+            self._aggregate_python(columns, summary)
+        return summary
+
+    def _aggregate_numpy(self, columns: FleetColumns, summary: Dict):
+        data = columns.data
+        balloon = data[:, _COL['balloon']]
+        unused = data[:, _COL['unused']]
+        rss = data[:, _COL['rss']]
+
+        # Memoria usada: balloon - unused; sin balloon stats, RSS; si no, lo asignado
+        used = np.where(np.isnan(unused), np.where(np.isnan(rss), balloon, rss), balloon - unused)
+        summary['memory_used_gb'] = float(np.nansum(used)) / _MB
+        summary['memory_assigned_gb'] = float(np.nansum(balloon)) / _MB
+
+        cpu_percent = data[:, _COL['cpu_percent']]
+        with_rates = ~np.isnan(cpu_percent)
+        if columns.stale or not with_rates.any():
+            return
+
+        vcpus = data[with_rates, _COL['vcpus']]
+        summary['cpu_percent'] = min(100.0, float((cpu_percent[with_rates] * vcpus).sum() / vcpus.sum()))
+        totals = np.nansum(data[:, [_COL[name] for name in _SUM_COLUMNS]], axis=0)
+        read_iops, write_iops, read_mbps, write_mbps, rx_mbps, tx_mbps = totals.tolist()
+        summary['iops'] = read_iops + write_iops
+        summary['disk_read_mbps'] = read_mbps
+        summary['disk_write_mbps'] = write_mbps
+        summary['net_rx_mbps'] = rx_mbps
+        summary['net_tx_mbps'] = tx_mbps
+
+    def _aggregate_python(self, columns: FleetColumns, summary: Dict):
+        c = _COL
+        used_kb = assigned_kb = 0.0
+        for row in columns.data:
+            balloon, unused, rss = row[c['balloon']], row[c['unused']], row[c['rss']]
+            if not math.isnan(unused):
+                used = balloon - unused
+            elif not math.isnan(rss):
+                used = rss
+            else:
+                used = balloon
+            if not math.isnan(used):
+                used_kb += used
+            if not math.isnan(balloon):
+                assigned_kb += balloon
+        summary['memory_used_gb'] = used_kb / _MB
+        summary['memory_assigned_gb'] = assigned_kb / _MB
+        if columns.stale:
+            return
+
+        busy = vcpus = 0.0
+        totals = dict.fromkeys(_SUM_COLUMNS, 0.0)
+        for row in columns.data:
+            if math.isnan(row[c['cpu_percent']]):
+                continue
+            busy += row[c['cpu_percent']] * row[c['vcpus']]
+            vcpus += row[c['vcpus']]
+            for name in _SUM_COLUMNS:
+                if not math.isnan(row[c[name]]):
+                    totals[name] += row[c[name]]
+        if not vcpus:
+            return
+
+        summary['cpu_percent'] = min(100.0, busy / vcpus)
+        summary['iops'] = totals['read_iops'] + totals['write_iops']
+        summary['disk_read_mbps'] = totals['disk_read_mbps']
+        summary['disk_write_mbps'] = totals['disk_write_mbps']
+        summary['net_rx_mbps'] = totals['net_rx_mbps']
+        summary['net_tx_mbps'] = totals['net_tx_mbps']
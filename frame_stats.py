@@ -0,0 +1,62 @@
+"""
+Contadores de trabajo de dibujo por frame
+
+Los widgets y la ventana anotan aquí cuántos dibujos, layouts de texto
+y actualizaciones de etiquetas hacen; la ventana cierra cada frame desde
+la señal 'after-paint' del GdkFrameClock. Con VMPANEL_FRAME_STATS=1 cada
+frame con actividad se escribe en el log. No importa GTK.
+"""
+import logging
+import os
+from collections import deque
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+ENABLED_LOG = os.environ.get('VMPANEL_FRAME_STATS') == '1'
+
+# Contadores conocidos (otros nombres también se aceptan)
+COUNTERS = (
+    'snapshots',       # Snapshots aplicados en el frame
+    'draws',           # Llamadas a funciones de dibujo de widgets
+    'text_layouts',    # Layouts Pango rehechos (cambió el texto)
+    'label_updates',   # Gtk.Label con texto nuevo (pueden provocar relayout)
+    'labels_skipped',  # Actualizaciones de etiquetas omitidas por no cambiar
+)
+
+
+class FrameStats:
+    """Acumula contadores del frame actual y de los últimos frames"""
+
+    def __init__(self, history: int = 300):
+        self.frame = 0
+        self.current: Dict[str, int] = {}
+        self.recent = deque(maxlen=history)  # Frames con actividad: (nº de frame, contadores)
+
+    def count(self, name: str, amount: int = 1):
+        self.current[name] = self.current.get(name, 0) + amount
+
+    def end_frame(self):
+        """Cierra el frame actual (llamar desde 'after-paint')"""
+        self.frame += 1
+        if not self.current:
+            return
+        counters, self.current = self.current, {}
+        self.recent.append((self.frame, counters))
+        if ENABLED_LOG:
+            text = ', '.join(f"{name}={value}" for name, value in sorted(counters.items()))
+            logger.info(f"Frame {self.frame}: {text}")
+
+    def summary(self) -> Dict[str, float]:
+        """Media por frame con actividad de cada contador en los frames recientes"""
+        if not self.recent:
+            return {}
+        totals: Dict[str, int] = {}
+        for _frame, counters in self.recent:
+            for name, value in counters.items():
+                totals[name] = totals.get(name, 0) + value
+        return {name: value / len(self.recent) for name, value in totals.items()}
+
+
+stats = FrameStats()
+count = stats.count
@@ -0,0 +1,97 @@
+"""
+Modo headless del Panel de VMs
+
+Ejecuta VMManager y el bucle del recolector sin cargar gi, GTK, cairo ni
+widgets.py, para usarlo como servicio systemd de usuario en servidores
+sin pantalla. Las métricas se escriben en el log y, opcionalmente, se
+exponen con el exportador OpenMetrics.
+"""
+import logging
+import signal
+import threading
+
+from vm_manager import VMManager
+from collector import FleetCollector
+import memory_stats
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotLogger:
+    """Escribe en el log un resumen por VM de cada snapshot"""
+
+    def __call__(self, snapshot):
+        timings = snapshot.timings
+        logger.info(f"Ciclo {snapshot.generation}: {snapshot.running_count}/{len(snapshot.vms)} VMs activas, "
+                    f"{timings['virsh_calls']} llamadas virsh en {timings['cycle_seconds']:.2f}s")
+
+        for vm in snapshot.vms.values():
+            stats = vm.get('stats')
+            if not vm['running'] or not stats:
+                continue
+
+            # % de CPU del intervalo (calculado por el recolector)
+            rates = vm.get('rates')
+            cpu_percent = rates['cpu_percent'] if rates else None
+
+            mem_actual = stats.get('memory_actual')
+            guest = memory_stats.guest_memory(stats)
+            if guest:
+                memory_text = f"{guest['used_kb'] / (1024 * 1024):.1f}/{guest['total_kb'] / (1024 * 1024):.1f} GB"
+            elif mem_actual:
+                memory_text = f"{mem_actual / (1024 * 1024):.1f} GB asignada"
+            else:
+                memory_text = "N/A"
+
+            cpu_text = f"{cpu_percent:.1f}%" if cpu_percent is not None else "N/A"
+            logger.info(f"  {vm['name']}: CPU {cpu_text} | RAM {memory_text} | IP {vm.get('ip') or 'N/A'}")
+
+
+def run_headless(options) -> int:
+    """Ejecuta el recolector hasta recibir SIGINT/SIGTERM"""
+    vm_manager = VMManager(check_requirements=False, connection_uri=options.connect, vm_names=options.vms)
+    collector = FleetCollector(vm_manager, interval=options.interval)
+    collector.add_listener(SnapshotLogger())
+    if options.balloon:
+        from audit_log import AuditLog, default_audit_path
+        from balloon_policy import BalloonPolicy
+        collector.add_listener(BalloonPolicy(vm_manager, dry_run=options.balloon == 'dry-run',
+                                             limits=options.balloon_limits or None,
+                                             audit=AuditLog(default_audit_path('balloon'))))
+    vcpu_policy = None
+    if options.vcpu_autoscale:
+        from audit_log import AuditLog, default_audit_path
+        from vcpu_policy import VcpuPolicy
+        vcpu_policy = VcpuPolicy(vm_manager, dry_run=options.vcpu_autoscale == 'dry-run',
+                                 limits=options.vcpu_limits or None, audit=AuditLog(default_audit_path('vcpu')))
+        collector.add_listener(vcpu_policy)
+
+    exporter = None
+    if options.exporter_port:
+        from exporter import MetricsExporter
+        exporter = MetricsExporter(collector, options.exporter_port, options.exporter_address)
+        try:
+            exporter.start()
+        except OSError as e:
+            logger.error(f"No se pudo iniciar el exportador de métricas: {e}")
+            return 1
+
+    stop_event = threading.Event()
+
+    def on_signal(signum, _frame):
+        logger.info(f"Señal {signum} recibida, deteniendo el recolector")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+
+    logger.info(f"Modo headless: {len(vm_manager.vm_names)} VMs, ciclo cada {options.interval:g}s")
+    collector.start()
+    stop_event.wait()
+
+    if exporter:
+        exporter.stop()
+    collector.stop()
+    if vcpu_policy:
+        logger.info("Autoescalado de vCPUs:\n" + (vcpu_policy.report() or "sin datos"))
+    return 0
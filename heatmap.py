@@ -0,0 +1,171 @@
+"""
+Modelo del mapa de calor de la flota
+
+Cada VM configurada es una celda coloreada por CPU, memoria o IOPS. El
+modelo se alimenta directamente de los FleetSnapshot: toma las tasas que
+ya calculó el recolector (vm['rates']), cuantiza cada valor en un número fijo de
+niveles de color y retorna solo las celdas cuyo color cambió, para que
+el widget repinte únicamente esas. No importa GTK.
+"""
+import math
+from typing import Dict, List, Optional, Set, Tuple
+
+import memory_stats
+
+METRICS = {
+    'cpu': 'CPU',
+    'memory': 'Memoria',
+    'iops': 'IOPS',
+}
+
+LEVELS = 20           # Niveles de color por métrica
+IOPS_MAX = 10000      # IOPS que corresponden al color máximo (escala logarítmica)
+
+# Niveles especiales (celdas sin valor)
+NO_DATA = -1          # En ejecución, todavía sin muestra anterior para calcular tasas
+STOPPED = -2          # Apagada o pausada
+ABSENT = -3           # No definida en libvirt
+
+SPECIAL_COLORS = {
+    NO_DATA: (0.30, 0.33, 0.38),
+    STOPPED: (0.20, 0.21, 0.24),
+    ABSENT: (0.12, 0.12, 0.14),
+}
+
+# Escala verde -> amarillo -> rojo (los mismos colores que los gráficos circulares)
+_RAMP = ((0.15, 0.76, 0.41), (0.96, 0.76, 0.07), (0.88, 0.11, 0.14))
+
+
+def level_color(level: int) -> Tuple[float, float, float]:
+    """Color RGB de un nivel (0..LEVELS-1) o de un nivel especial"""
+    if level < 0:
+        return SPECIAL_COLORS[level]
+    position = level / (LEVELS - 1) * (len(_RAMP) - 1)
+    low = min(int(position), len(_RAMP) - 2)
+    fraction = position - low
+    start, end = _RAMP[low], _RAMP[low + 1]
+    return tuple(a + (b - a) * fraction for a, b in zip(start, end))
+
+
+def memory_percent(stats: Dict) -> Optional[float]:
+    """% de memoria usada dentro del guest (mismas fuentes que las tarjetas)"""
+    mem_actual = stats.get('memory_actual')
+    if not mem_actual:
+        return None
+    guest = memory_stats.guest_memory(stats)
+    if guest:
+        return guest['used_percent']
+    mem_rss = stats.get('memory_rss')
+    if mem_rss:
+        return max(0.0, min(100.0, mem_rss / mem_actual * 100))
+    return None
+
+
+class HeatmapModel:
+    """Valores y niveles de color de cada celda (una por VM configurada)"""
+
+    def __init__(self, metric: str = 'cpu'):
+        if metric not in METRICS:
+            raise ValueError(f"Métrica desconocida: {metric}")
+        self.metric = metric
+        self.names: List[str] = []
+        self.states: List[Optional[str]] = []
+        self.values: List[Dict[str, Optional[float]]] = []
+        self.levels: List[int] = []
+        self.stale = False
+        self._index: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def index_of(self, vm_name: str) -> Optional[int]:
+        return self._index.get(vm_name)
+
+    @staticmethod
+    def _sample(vm: Dict, stale: bool) -> Dict[str, Optional[float]]:
+        """CPU %, memoria % e IOPS de una VM; las tasas necesitan una muestra anterior"""
+        stats = vm.get('stats') if vm.get('running') else None
+        if not stats:
+            return {'cpu': None, 'memory': None, 'iops': None}
+
+        values = {'cpu': None, 'memory': memory_percent(stats), 'iops': None}
+        rates = vm.get('rates')
+        # Las tasas de un snapshot de la caché no corresponden al momento actual
+        if rates and not stale:
+            values['cpu'] = rates['cpu_percent']
+            values['iops'] = rates['read_iops'] + rates['write_iops']
+        return values
+
+    def _level(self, index: int) -> int:
+        state = self.states[index]
+        if state is None:
+            return ABSENT
+        value = self.values[index].get(self.metric)
+        if value is None:
+            return NO_DATA if self.values[index].get('memory') is not None else STOPPED
+        if self.metric == 'iops':
+            fraction = math.log1p(value) / math.log1p(IOPS_MAX)
+        else:
+            fraction = value / 100
+        return max(0, min(LEVELS - 1, int(fraction * LEVELS)))
+
+    def update(self, snapshot) -> Set[int]:
+        """Aplica un FleetSnapshot; retorna los índices de las celdas que cambian de color"""
+        names = list(snapshot.vms)
+        if names != self.names:
+            # Cambió el conjunto de VMs: todas las celdas se recolocan
+            self.names = names
+            self._index = {name: i for i, name in enumerate(names)}
+            self.states = [None] * len(names)
+            self.values = [{} for _ in names]
+            self.levels = [None] * len(names)
+        self.stale = snapshot.stale
+
+        dirty = set()
+        for i, name in enumerate(names):
+            vm = snapshot.vms[name]
+            self.states[i] = vm.get('state')
+            self.values[i] = self._sample(vm, snapshot.stale)
+            level = self._level(i)
+            if level != self.levels[i]:
+                self.levels[i] = level
+                dirty.add(i)
+        return dirty
+
+    def set_metric(self, metric: str) -> Set[int]:
+        """Cambia la métrica mostrada; retorna las celdas que cambian de color"""
+        if metric not in METRICS:
+            raise ValueError(f"Métrica desconocida: {metric}")
+        self.metric = metric
+        dirty = set()
+        for i in range(len(self.names)):
+            level = self._level(i)
+            if level != self.levels[i]:
+                self.levels[i] = level
+                dirty.add(i)
+        return dirty
+
+    def color(self, index: int) -> Tuple[float, float, float]:
+        return level_color(self.levels[index])
+
+    def tooltip(self, index: int) -> str:
+        """Texto del tooltip de una celda"""
+        name = self.names[index]
+        state = self.states[index]
+        if state is None:
+            return f"{name}: no definida"
+        values = self.values[index]
+        if values.get('memory') is None and values.get('cpu') is None:
+            return f"{name}: {state}"
+
+        parts = []
+        if values.get('cpu') is not None:
+            parts.append(f"CPU {values['cpu']:.1f}%")
+        if values.get('memory') is not None:
+            parts.append(f"RAM {values['memory']:.0f}%")
+        if values.get('iops') is not None:
+            parts.append(f"{values['iops']:.0f} IOPS")
+        text = f"{name}: " + " · ".join(parts)
+        if self.stale:
+            text += " (último estado conocido)"
+        return text
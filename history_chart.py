@@ -0,0 +1,263 @@
+"""
+Historial de largo alcance para los gráficos con zoom (5 min a 7 días)
+
+Lee las series del MetricsStore (nivel de 1 s hasta una hora, de 1 min
+hasta siete días) y las reduce al ancho en píxeles con
+Largest-Triangle-Three-Buckets (LTTB), vectorizado con NumPy si está
+instalado. El eje de tiempo se divide en teselas alineadas de TILE_PX
+píxeles; cada tesela se reduce una sola vez por nivel de zoom y se
+reutiliza al desplazar la vista, así que el coste de dibujar depende del
+ancho del widget y no de la longitud del historial. No importa GTK.
+"""
+import logging
+import math
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: hay implementación en Python puro
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Rangos seleccionables: (etiqueta, segundos)
+RANGES = (
+    ('5 min', 5 * 60),
+    ('1 h', 3600),
+    ('6 h', 6 * 3600),
+    ('24 h', 24 * 3600),
+    ('7 días', 7 * 24 * 3600),
+)
+MIN_RANGE = RANGES[0][1]
+MAX_RANGE = RANGES[-1][1]
+
+TILE_PX = 128          # Ancho en píxeles de cada tesela reducida
+_TILE_CACHE_MAX = 256  # Teselas reducidas en memoria (por gráfico)
+_NUMPY_BUCKET_MIN = 24  # Puntos por bucket a partir de los que compensa NumPy
+
+
+def _to_list(values: Sequence[float]) -> List[float]:
+    return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+def _lttb_python(xs: Sequence[float], ys: Sequence[float], threshold: int) -> Tuple[List[float], List[float]]:
+    bucket_size = (len(xs) - 2) / (threshold - 2)
+    out_x, out_y = [xs[0]], [ys[0]]
+    selected = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, len(xs))
+
+        # Promedio del siguiente bucket: tercer vértice del triángulo
+        count = next_end - end
+        avg_x = sum(xs[end:next_end]) / count
+        avg_y = sum(ys[end:next_end]) / count
+
+        ax, ay = xs[selected], ys[selected]
+        best_area = -1.0
+        best = start
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        out_x.append(xs[best])
+        out_y.append(ys[best])
+        selected = best
+
+    out_x.append(xs[-1])
+    out_y.append(ys[-1])
+    return out_x, out_y
+
+
+def _lttb_numpy(xs: Sequence[float], ys: Sequence[float], threshold: int) -> Tuple[List[float], List[float]]:
+    x = np.asarray(xs, dtype=np.float64)
+    y = np.asarray(ys, dtype=np.float64)
+    n = len(x)
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+
+    # Promedios de todos los buckets de una vez (el último "bucket" es el punto final)
+    counts = np.diff(np.append(edges, n))
+    avg_x = (np.add.reduceat(x, edges) / counts).tolist()
+    avg_y = (np.add.reduceat(y, edges) / counts).tolist()
+
+    # La elección de cada bucket depende de la anterior, así que el bucle es
+    # secuencial; dentro de cada bucket el área de todos sus puntos va de una vez
+    edges = edges.tolist()
+    selected = [0]
+    a = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        ax, ay = x[a], y[a]
+        areas = np.abs((ax - avg_x[bucket + 1]) * (y[start:end] - ay) - (ax - x[start:end]) * (avg_y[bucket + 1] - ay))
+        a = start + int(areas.argmax())
+        selected.append(a)
+    selected.append(n - 1)
+    return x[selected].tolist(), y[selected].tolist()
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], threshold: int) -> Tuple[List[float], List[float]]:
+    """Reduce la serie (xs, ys) a `threshold` puntos conservando su forma (LTTB)
+
+    Siempre conserva el primer y el último punto. Si la serie ya tiene
+    `threshold` puntos o menos se retorna completa.
+    """
+    if threshold < 3 or len(xs) <= threshold:
+        return _to_list(xs), _to_list(ys)
+    # Con buckets de pocos puntos la llamada a NumPy por bucket cuesta más que el cálculo
+    if np is not None and len(xs) >= _NUMPY_BUCKET_MIN * threshold:
+        return _lttb_numpy(xs, ys, threshold)
+    return _lttb_python(_to_list(xs), _to_list(ys), threshold)
+
+
+def tier_for_range(range_seconds: float) -> str:
+    """Nivel del MetricsStore adecuado para un rango (el de 1 s guarda una hora)"""
+    return '1s' if range_seconds <= 3600 else '1m'
+
+
+def format_range(range_seconds: float) -> str:
+    """Texto corto de un rango ("5 min", "6 h", "2 días")"""
+    if range_seconds < 3600:
+        return f"{range_seconds / 60:.0f} min"
+    if range_seconds < 2 * 86400:
+        return f"{range_seconds / 3600:.0f} h"
+    return f"{range_seconds / 86400:.0f} días"
+
+
+class HistoryChartModel:
+    """Ventana visible (rango + fin) sobre el historial de una métrica de una VM
+
+    Con `end` a None la ventana sigue al momento actual; al desplazarla
+    queda fija hasta que se vuelve a `follow_live()`.
+    """
+
+    # Segundos entre relecturas del archivo por nivel
+    RELOAD_INTERVAL = {'1s': 0.0, '1m': 60.0}
+
+    def __init__(self, metrics_store, vm_name: str, metric: str = 'cpu', range_seconds: float = MIN_RANGE):
+        self.metrics_store = metrics_store
+        self.vm_name = vm_name
+        self.metric = metric
+        self.range_seconds = range_seconds
+        self.end: Optional[float] = None
+        self.tiles_built = 0
+        self.tiles_reused = 0
+        self._series: Dict[str, Tuple[List[float], List[float]]] = {}
+        self._loaded_at: Dict[str, float] = {}
+        self._tiles: "OrderedDict[tuple, Tuple[List[float], List[float]]]" = OrderedDict()
+
+    @property
+    def tier(self) -> str:
+        return tier_for_range(self.range_seconds)
+
+    @property
+    def live(self) -> bool:
+        return self.end is None
+
+    def set_metric(self, metric: str):
+        if metric != self.metric:
+            self.metric = metric
+            self._series.clear()
+            self._loaded_at.clear()
+            self._tiles.clear()
+
+    def set_range(self, range_seconds: float):
+        self.range_seconds = max(MIN_RANGE, min(MAX_RANGE, range_seconds))
+
+    def zoom(self, factor: float, anchor: float = 1.0, now: Optional[float] = None):
+        """Multiplica el rango por factor manteniendo fijo el instante en la fracción anchor (0-1)"""
+        end = self.end if self.end is not None else (now or time.time())
+        anchor_time = end - self.range_seconds * (1 - anchor)
+        self.set_range(self.range_seconds * factor)
+        if self.end is not None:
+            self.end = anchor_time + self.range_seconds * (1 - anchor)
+
+    def pan(self, seconds: float, now: Optional[float] = None):
+        """Desplaza la ventana (positivo hacia el futuro); al llegar al presente vuelve a seguirlo"""
+        now = now or time.time()
+        end = (self.end if self.end is not None else now) + seconds
+        self.end = None if end >= now else end
+
+    def follow_live(self):
+        self.end = None
+
+    def refresh(self) -> bool:
+        """Relee el nivel visible si toca; retorna True si hay datos nuevos"""
+        now = time.monotonic()
+        tier = self.tier
+        loaded_at = self._loaded_at.get(tier)
+        if loaded_at is not None and now - loaded_at < self.RELOAD_INTERVAL[tier]:
+            return False
+        self._loaded_at[tier] = now
+
+        previous = self._series.get(tier)
+        points = self.metrics_store.load(self.vm_name, tier).get(self.metric, [])
+        times = [ts for ts, _min, _avg, _max in points]
+        values = [avg for _ts, _min, avg, _max in points]
+        if np is not None:
+            times, values = np.asarray(times, dtype=np.float64), np.asarray(values, dtype=np.float64)
+        self._series[tier] = (times, values)
+
+        previous_end = float(previous[0][-1]) if previous is not None and len(previous[0]) else None
+        new_end = float(times[-1]) if len(times) else None
+        if previous is not None and previous_end == new_end:
+            return False
+
+        # Solo cambian las teselas desde el último dato que ya se tenía
+        changed_since = previous_end
+        for key in list(self._tiles):
+            tile_tier, seconds_per_px, index = key
+            if tile_tier == tier and (changed_since is None or (index + 1) * TILE_PX * seconds_per_px > changed_since):
+                del self._tiles[key]
+        return True
+
+    def _tile(self, tier: str, seconds_per_px: float, index: int) -> Tuple[List[float], List[float]]:
+        """Tesela `index` (tiempo absoluto alineado) reducida a TILE_PX puntos"""
+        key = (tier, seconds_per_px, index)
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+            self.tiles_reused += 1
+            return tile
+
+        times, values = self._series.get(tier, ([], []))
+        tile_seconds = TILE_PX * seconds_per_px
+        if np is not None:
+            first, last = np.searchsorted(times, (index * tile_seconds, (index + 1) * tile_seconds)).tolist()
+        else:
+            first = bisect_left(times, index * tile_seconds)
+            last = bisect_left(times, (index + 1) * tile_seconds)
+        tile = lttb(times[first:last], values[first:last], TILE_PX)
+
+        self._tiles[key] = tile
+        if len(self._tiles) > _TILE_CACHE_MAX:
+            self._tiles.popitem(last=False)
+        self.tiles_built += 1
+        return tile
+
+    def visible(self, width: int, now: Optional[float] = None) -> Tuple[float, float, List[float], List[float]]:
+        """(inicio, fin, tiempos, valores) de la ventana visible reducida a ~width puntos"""
+        end = self.end if self.end is not None else (now or time.time())
+        start = end - self.range_seconds
+        tier = self.tier
+        if tier not in self._series:
+            self.refresh()
+        if width <= 0:
+            return start, end, [], []
+
+        # Escala cuantizada a potencias de 2^(1/4): un cambio pequeño de ancho no invalida las teselas
+        seconds_per_px = 2 ** (math.ceil(math.log2(self.range_seconds / width) * 4) / 4)
+        tile_seconds = TILE_PX * seconds_per_px
+        xs: List[float] = []
+        ys: List[float] = []
+        # Una tesela más por cada lado para que la línea llegue a los bordes
+        for index in range(math.floor(start / tile_seconds) - 1, math.floor(end / tile_seconds) + 2):
+            tile_xs, tile_ys = self._tile(tier, seconds_per_px, index)
+            xs.extend(tile_xs)
+            ys.extend(tile_ys)
+        return start, end, xs, ys
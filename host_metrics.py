@@ -0,0 +1,232 @@
+"""
+Métricas del host: temperatura de CPU, uso de CPU, memoria y carga
+
+El sensor de temperatura se busca una sola vez (prefiriendo el del
+paquete de CPU: x86_pkg_temp, coretemp, k10temp) y su archivo queda
+abierto; cada ciclo se relee con os.pread sobre el mismo descriptor, igual
+que /proc/stat, /proc/meminfo y /proc/loadavg. El recolector lo lee una
+vez por ciclo y lo comparte con todas las VMs en snapshot.host. Las
+raíces de sysfs y procfs son configurables para probarlo contra un árbol
+falso. No importa GTK.
+"""
+import glob
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Tipos de thermal_zone y nombres de hwmon por preferencia (menor = mejor)
+_THERMAL_ZONE_PRIORITY = {'x86_pkg_temp': 0}
+_HWMON_PRIORITY = {'coretemp': 1, 'k10temp': 2, 'zenpower': 2}
+_HWMON_LABELS = ('Package id 0', 'Tctl', 'Tdie')  # Etiqueta del sensor del paquete en cada driver
+_FALLBACK_PRIORITY = 9                             # Cualquier otra zona (acpitz, ...)
+
+_REDISCOVER_INTERVAL = 60.0  # Segundos entre búsquedas si no hay sensor o dejó de responder
+_READ_SIZE = 64 * 1024       # /proc/stat crece con el número de CPUs
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class _Handle:
+    """Archivo abierto una vez y releído con os.pread desde el principio"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+
+    def read(self) -> str:
+        return os.pread(self.fd, _READ_SIZE, 0).decode('ascii', 'replace')
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class HostCollector:
+    """Lee las métricas del host con descriptores persistentes"""
+
+    def __init__(self, sys_root: str = '/sys', proc_root: str = '/proc'):
+        self.sys_root = sys_root
+        self.proc_root = proc_root
+        self.sensor: Optional[Tuple[str, str]] = None  # (descripción, ruta del archivo de temperatura)
+        self._sensor_handle: Optional[_Handle] = None
+        self._discovered_at: Optional[float] = None
+        self._handles: Dict[str, Optional[_Handle]] = {}
+        self._previous_cpu: Optional[List[int]] = None
+
+    def _candidates(self) -> List[Tuple[int, str, str]]:
+        """(prioridad, descripción, ruta) de los sensores de temperatura disponibles"""
+        candidates = []
+        for zone in sorted(glob.glob(os.path.join(self.sys_root, 'class/thermal/thermal_zone*'))):
+            zone_type = _read_text(os.path.join(zone, 'type'))
+            if zone_type is None or not os.path.exists(os.path.join(zone, 'temp')):
+                continue
+            priority = _THERMAL_ZONE_PRIORITY.get(zone_type, _FALLBACK_PRIORITY)
+            candidates.append((priority, f"{os.path.basename(zone)} ({zone_type})", os.path.join(zone, 'temp')))
+
+        for hwmon in sorted(glob.glob(os.path.join(self.sys_root, 'class/hwmon/hwmon*'))):
+            name = _read_text(os.path.join(hwmon, 'name'))
+            if name not in _HWMON_PRIORITY:
+                continue
+            inputs = sorted(glob.glob(os.path.join(hwmon, 'temp*_input')))
+            if not inputs:
+                continue
+            chosen = inputs[0]
+            for path in inputs:
+                if _read_text(path.replace('_input', '_label')) in _HWMON_LABELS:
+                    chosen = path
+                    break
+            candidates.append((_HWMON_PRIORITY[name], f"{os.path.basename(hwmon)} ({name})", chosen))
+        return sorted(candidates)
+
+    def discover_sensor(self) -> Optional[Tuple[str, str]]:
+        """Busca el sensor de temperatura de la CPU y deja su archivo abierto"""
+        self._close_sensor()
+        self._discovered_at = time.monotonic()
+        for _priority, description, path in self._candidates():
+            try:
+                self._sensor_handle = _Handle(path)
+                int(self._sensor_handle.read().strip())
+            except (OSError, ValueError):
+                self._close_sensor()
+                continue
+            self.sensor = (description, path)
+            logger.info(f"Sensor de temperatura del host: {description}")
+            return self.sensor
+        logger.info("No se encontró sensor de temperatura del host")
+        return None
+
+    def _close_sensor(self):
+        if self._sensor_handle is not None:
+            self._sensor_handle.close()
+        self._sensor_handle = None
+        self.sensor = None
+
+    def read_cpu_temp(self) -> Optional[float]:
+        """Temperatura de CPU en °C (None sin sensor)"""
+        if self._sensor_handle is None:
+            if self._discovered_at is not None and time.monotonic() - self._discovered_at < _REDISCOVER_INTERVAL:
+                return None
+            if self.discover_sensor() is None:
+                return None
+        try:
+            return int(self._sensor_handle.read().strip()) / 1000.0
+        except (OSError, ValueError) as e:
+            logger.debug(f"Error leyendo el sensor {self.sensor}: {e}")
+            self._close_sensor()
+            return None
+
+    def _read_proc(self, name: str) -> Optional[str]:
+        """Contenido de /proc/<name> con el descriptor reutilizado (None si no existe)"""
+        if name not in self._handles:
+            try:
+                self._handles[name] = _Handle(os.path.join(self.proc_root, name))
+            except OSError as e:
+                logger.debug(f"No se pudo abrir {name} en {self.proc_root}: {e}")
+                self._handles[name] = None
+        handle = self._handles[name]
+        if handle is None:
+            return None
+        try:
+            return handle.read()
+        except OSError as e:
+            logger.debug(f"Error leyendo {handle.path}: {e}")
+            return None
+
+    def _cpu(self, metrics: Dict):
+        """% de CPU, iowait y steal del host desde la línea 'cpu' de /proc/stat"""
+        content = self._read_proc('stat')
+        if not content:
+            return
+        cpu_count = 0
+        totals = None
+        for line in content.splitlines():
+            if line.startswith('cpu '):
+                totals = [int(value) for value in line.split()[1:]]
+            elif line.startswith('cpu'):
+                cpu_count += 1
+        if totals is None:
+            return
+        metrics['cpu_count'] = cpu_count
+
+        # user nice system idle iowait irq softirq steal (guest ya va incluido en user)
+        totals = (totals + [0] * 8)[:8]
+        previous, self._previous_cpu = self._previous_cpu, totals
+        if previous is None:
+            return
+        deltas = [current - before for current, before in zip(totals, previous)]
+        elapsed = sum(deltas)
+        if elapsed <= 0:
+            return
+        idle = deltas[3] + deltas[4]
+        metrics['cpu_percent'] = (elapsed - idle) / elapsed * 100
+        metrics['cpu_iowait_percent'] = deltas[4] / elapsed * 100
+        metrics['cpu_steal_percent'] = deltas[7] / elapsed * 100
+
+    def _memory(self, metrics: Dict):
+        content = self._read_proc('meminfo')
+        if not content:
+            return
+        values = {}
+        for line in content.splitlines():
+            key, _, rest = line.partition(':')
+            fields = rest.split()
+            if fields:
+                values[key] = int(fields[0])  # KB
+        total = values.get('MemTotal')
+        available = values.get('MemAvailable')
+        if total:
+            metrics['memory_total_kb'] = total
+            if available is not None:
+                metrics['memory_available_kb'] = available
+                metrics['memory_percent'] = (total - available) / total * 100
+        if 'SwapTotal' in values:
+            metrics['swap_total_kb'] = values['SwapTotal']
+            metrics['swap_used_kb'] = values['SwapTotal'] - values.get('SwapFree', 0)
+
+    def _load(self, metrics: Dict):
+        content = self._read_proc('loadavg')
+        if not content:
+            return
+        fields = content.split()
+        if len(fields) >= 3:
+            metrics['load'] = tuple(float(value) for value in fields[:3])
+
+    def collect(self) -> Dict:
+        """Métricas del host del ciclo; las que no se pueden leer quedan en None"""
+        metrics = {
+            'cpu_temp': self.read_cpu_temp(),
+            'cpu_count': None,
+            'cpu_percent': None,          # None en el primer ciclo (hace falta un intervalo)
+            'cpu_iowait_percent': None,
+            'cpu_steal_percent': None,
+            'memory_total_kb': None,
+            'memory_available_kb': None,
+            'memory_percent': None,
+            'swap_total_kb': None,
+            'swap_used_kb': None,
+            'load': None,                 # (1, 5, 15 min)
+        }
+        self._cpu(metrics)
+        self._memory(metrics)
+        self._load(metrics)
+        return metrics
+
+    def close(self):
+        self._close_sensor()
+        self._discovered_at = None
+        self._previous_cpu = None
+        for handle in self._handles.values():
+            if handle is not None:
+                handle.close()
+        self._handles.clear()
@@ -0,0 +1,107 @@
+"""
+Topología de CPUs y nodos NUMA del host
+
+Se lee una sola vez de /sys/devices/system/cpu y /sys/devices/system/node
+(no cambia mientras el panel está abierto, salvo hotplug de CPUs): para
+cada CPU lógica, su paquete, su núcleo físico, sus hermanos SMT y su nodo
+NUMA. La raíz de sysfs es configurable para probarlo contra un árbol
+sintético. No importa GTK.
+"""
+import glob
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def parse_cpu_list(text: str) -> List[int]:
+    """'0-3,8,10-11' -> [0, 1, 2, 3, 8, 10, 11] (formato cpulist del kernel)"""
+    cpus = []
+    for part in text.strip().split(','):
+        if not part:
+            continue
+        start, _, end = part.partition('-')
+        cpus.extend(range(int(start), int(end or start) + 1))
+    return cpus
+
+
+def format_cpu_list(cpus) -> str:
+    """[0, 1, 2, 3, 8] -> '0-3,8' (inverso de parse_cpu_list)"""
+    ranges = []
+    for cpu in sorted(set(cpus)):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ','.join(str(start) if start == end else f"{start}-{end}" for start, end in ranges)
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class HostTopology:
+    """CPUs lógicas del host agrupadas por núcleo físico y nodo NUMA"""
+
+    def __init__(self, cpus: Dict[int, Dict]):
+        # {cpu: {'package', 'core', 'node', 'siblings'}}; 'core' identifica el núcleo físico
+        self.cpus = cpus
+        self.nodes: Dict[int, List[int]] = {}
+        self.cores: Dict[Tuple[int, int], List[int]] = {}
+        for cpu in sorted(cpus):
+            info = cpus[cpu]
+            self.nodes.setdefault(info['node'], []).append(cpu)
+            self.cores.setdefault(info['core'], []).append(cpu)
+
+    def __len__(self) -> int:
+        return len(self.cpus)
+
+    @classmethod
+    def read(cls, sys_root: str = '/sys') -> 'HostTopology':
+        """Lee la topología de sysfs (CPUs en línea)"""
+        base = os.path.join(sys_root, 'devices/system')
+        online = _read(os.path.join(base, 'cpu/online'))
+        if online:
+            cpu_ids = parse_cpu_list(online)
+        else:
+            cpu_ids = sorted(int(os.path.basename(path)[3:])
+                             for path in glob.glob(os.path.join(base, 'cpu/cpu[0-9]*')))
+
+        node_of = {}
+        for node_dir in glob.glob(os.path.join(base, 'node/node[0-9]*')):
+            cpulist = _read(os.path.join(node_dir, 'cpulist'))
+            if cpulist:
+                node = int(os.path.basename(node_dir)[4:])
+                for cpu in parse_cpu_list(cpulist):
+                    node_of[cpu] = node
+
+        cpus = {}
+        for cpu in cpu_ids:
+            topology = os.path.join(base, f'cpu/cpu{cpu}/topology')
+            package = _read(os.path.join(topology, 'physical_package_id'))
+            core_id = _read(os.path.join(topology, 'core_id'))
+            siblings = _read(os.path.join(topology, 'thread_siblings_list'))
+            package = int(package) if package and package.lstrip('-').isdigit() else 0
+            cpus[cpu] = {
+                'package': package,
+                'core': (package, int(core_id)) if core_id and core_id.isdigit() else (package, cpu),
+                'node': node_of.get(cpu, 0),
+                'siblings': tuple(parse_cpu_list(siblings)) if siblings else (cpu,),
+            }
+        topology = cls(cpus)
+        logger.info(f"Topología del host: {len(cpus)} CPUs, {len(topology.cores)} núcleos, "
+                    f"{len(topology.nodes)} nodos NUMA")
+        return topology
+
+    def node_of(self, cpu: int) -> Optional[int]:
+        info = self.cpus.get(cpu)
+        return info['node'] if info else None
+
+    def core_of(self, cpu: int) -> Optional[Tuple[int, int]]:
+        info = self.cpus.get(cpu)
+        return info['core'] if info else None
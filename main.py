@@ -1,43 +1,69 @@
 #!/usr/bin/env python3
 
-import gi
-
-gi.require_version('Gtk', '4.0')
-gi.require_version('Adw', '1')
-
-from gi.repository import Gtk, Adw, GLib, Gio
+import startup  # Primero: fija el instante de arranque
+import argparse
 import sys
 import os
 
-from vm_manager import VMManager
-from ui import VMPanelWindow
+def parse_args(argv):
+    """Separa las opciones propias del panel de las de GTK
 
-class VMPanelApp(Adw.Application):
-    def __init__(self):
-        super().__init__(application_id='com.manjaro.vmpanel')
-        self.create_action('quit', self.quit, ['<primary>q'])
+    Retorna (opciones, argv restante para Gtk.Application.run).
+    """
+    parser = argparse.ArgumentParser(prog='manjaro-vm-panel', add_help=True)
+    parser.add_argument('--headless', action='store_true',
+                        help='Ejecuta solo el recolector, sin ventana ni GTK (p. ej. como servicio systemd)')
+    parser.add_argument('--interval', type=float, default=5.0,
+                        help='Segundos entre ciclos de recolección en modo headless (por defecto 5)')
+    parser.add_argument('--fast-interval', type=float, default=None,
+                        help='Lee CPU y RSS de los procesos QEMU por procfs cada N segundos para el gráfico '
+                             'de CPU (p. ej. 1; por defecto desactivado)')
+    parser.add_argument('--connect', default='qemu:///system', metavar='URI',
+                        help='URI de libvirt (por defecto qemu:///system; test:///default para pruebas)')
+    parser.add_argument('--vm', dest='vms', action='append', default=None, metavar='NOMBRE',
+                        help='VM a mostrar (repetible; por defecto manjaro1 y manjaro2)')
+    parser.add_argument('--exporter-port', type=int, default=None,
+                        help='Sirve métricas OpenMetrics en http://127.0.0.1:PUERTO/metrics')
+    parser.add_argument('--exporter-address', default='127.0.0.1',
+                        help='Dirección de escucha del exportador (por defecto 127.0.0.1)')
+    parser.add_argument('--balloon', choices=('dry-run', 'apply'), default=None,
+                        help='Política automática de balloon: encoge las VMs inactivas y las hace crecer con '
+                             'presión de memoria (dry-run solo registra las decisiones)')
+    parser.add_argument('--balloon-limit', dest='balloon_limits', action='append', default=[],
+                        metavar='NOMBRE=MÍN:MÁX',
+                        help='Límites en MiB del balloon de una VM (repetible; p. ej. web=1024:4096)')
+    parser.add_argument('--vcpu-autoscale', choices=('dry-run', 'apply'), default=None,
+                        help='Autoescalado de vCPUs activas (setvcpus --live) según el uso de CPU reciente '
+                             '(dry-run solo registra las decisiones)')
+    parser.add_argument('--vcpu-limit', dest='vcpu_limits', action='append', default=[], metavar='NOMBRE=MÍN:MÁX',
+                        help='vCPUs activas mínimas y máximas de una VM (repetible; p. ej. web=2:8)')
+    options, remaining = parser.parse_known_args(argv[1:])
+    if options.balloon_limits:
+        from balloon_policy import parse_limit
+        try:
+            options.balloon_limits = dict(parse_limit(text) for text in options.balloon_limits)
+        except ValueError as e:
+            parser.error(str(e))
+    if options.vcpu_limits:
+        from vcpu_policy import parse_limit
+        try:
+            options.vcpu_limits = dict(parse_limit(text) for text in options.vcpu_limits)
+        except ValueError as e:
+            parser.error(str(e))
+    startup.mark('argumentos procesados')
+    return options, [argv[0]] + remaining
 
-    def do_activate(self):
-        win = self.props.active_window
-        if not win:
-            win = VMPanelWindow(application=self)
-            print("✓ Ventana creada")
-        
-        # Asegurar que la ventana sea visible
-        win.set_visible(True)
-        win.present()
-        print("✓ Ventana presentada")
+def main():
+    options, gtk_argv = parse_args(sys.argv)
 
-    def create_action(self, name, callback, shortcuts=None):
-        action = Gio.SimpleAction.new(name, None)
-        action.connect('activate', callback)
-        self.add_action(action)
-        if shortcuts:
-            self.set_accels_for_action(f'app.{name}', shortcuts)
+    # El modo headless no debe cargar gi, GTK, cairo ni widgets.py
+    if options.headless:
+        from headless import run_headless
+        return run_headless(options)
 
-def main():
-    app = VMPanelApp()
-    return app.run(sys.argv)
+    from app import VMPanelApp
+    app = VMPanelApp(options)
+    return app.run(gtk_argv)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Análisis de presión de memoria de los guests
+
+El balloon de virtio informa, cada periodo de estadísticas, la memoria
+libre, la utilizable y la caché de páginas del guest, además de sus
+contadores de swap y de fallos de página mayores (balloon.* en domstats).
+Con ellos se distingue una VM con el 90 % de la RAM en caché de páginas
+(sin problema) de otra que está paginando:
+
+- memoria usada descontando la caché: total - utilizable (o, sin ese dato,
+  total - libre - caché),
+- swap de entrada/salida en KB/s y fallos mayores por segundo del
+  intervalo (rates.py, medidos entre informes del guest).
+
+El recolector fija el periodo de estadísticas (dommemstat --period) de
+los guests que no lo tienen para que sigan enviando datos nuevos. No
+importa GTK.
+"""
+from typing import Dict, List, Optional, Tuple
+
+STATS_PERIOD = 2  # Segundos entre informes del guest (por debajo del ciclo del recolector)
+
+# Umbrales de presión (aviso, crítico)
+SWAP_KBPS = (64.0, 1024.0)        # Swap de entrada + salida
+MAJOR_FAULTS_PS = (50.0, 500.0)   # Fallos de página mayores por segundo
+USED_PERCENT = (90.0, 97.0)       # Memoria usada descontando la caché
+
+LEVEL_OK, LEVEL_WARNING, LEVEL_CRITICAL = 0, 1, 2
+LEVEL_ICONS = {LEVEL_OK: "🟢", LEVEL_WARNING: "🟡", LEVEL_CRITICAL: "🔴"}
+
+# Tasas de memoria del intervalo (claves de vm['rates'])
+RATE_COUNTERS = (
+    ('swap_in_kbps', 'memory_swap_in'),
+    ('swap_out_kbps', 'memory_swap_out'),
+    ('major_faults_ps', 'memory_major_faults'),
+)
+
+
+def guest_memory(stats: Dict) -> Optional[Dict]:
+    """Reparto de la memoria del guest en KB; None si el guest no informa (sin balloon stats)
+
+    {'total_kb', 'used_kb', 'cache_kb', 'free_kb', 'used_percent', 'cache_percent'}
+    """
+    total = stats.get('memory_guest_total') or stats.get('memory_actual')
+    free = stats.get('memory_unused')
+    if not total or free is None:
+        return None
+    cache = stats.get('memory_disk_caches') or 0
+    usable = stats.get('memory_usable')
+    used = total - usable if usable is not None else total - free - cache
+    used = max(0, min(total, used))
+    return {
+        'total_kb': total,
+        'used_kb': used,
+        'cache_kb': cache,
+        'free_kb': free,
+        'used_percent': used / total * 100,
+        'cache_percent': cache / total * 100,
+    }
+
+
+def _level(value: Optional[float], thresholds: Tuple[float, float]) -> int:
+    if value is None or value < thresholds[0]:
+        return LEVEL_OK
+    return LEVEL_CRITICAL if value >= thresholds[1] else LEVEL_WARNING
+
+
+def pressure(stats: Dict, rates: Optional[Dict]) -> Tuple[int, List[str]]:
+    """Nivel de presión de memoria (LEVEL_*) y sus motivos, del más grave al más leve"""
+    reasons = []
+    rates = rates or {}
+    swap_in, swap_out = rates.get('swap_in_kbps'), rates.get('swap_out_kbps')
+    swap = (swap_in or 0) + (swap_out or 0) if swap_in is not None or swap_out is not None else None
+    memory = guest_memory(stats)
+    checks = (
+        (_level(swap, SWAP_KBPS), lambda: f"swap {swap:.0f} KB/s"),
+        (_level(rates.get('major_faults_ps'), MAJOR_FAULTS_PS),
+         lambda: f"{rates['major_faults_ps']:.0f} fallos mayores/s"),
+        (_level(memory['used_percent'] if memory else None, USED_PERCENT),
+         lambda: f"{memory['used_percent']:.0f}% usada sin caché"),
+    )
+    level = LEVEL_OK
+    for check_level, describe in sorted(checks, key=lambda check: -check[0]):
+        if check_level > LEVEL_OK:
+            reasons.append(describe())
+            level = max(level, check_level)
+    return level, reasons
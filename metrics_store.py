@@ -0,0 +1,289 @@
+"""
+Almacén persistente de historial de métricas (round-robin en disco)
+
+Cada VM tiene un archivo de tamaño fijo mapeado en memoria con tres
+niveles de resolución (1 s, 1 min y 1 h). Cada muestra se agrega a los
+tres niveles a la vez: en el nivel fino se guarda tal cual y en los
+niveles gruesos se combina (mín/promedio/máx) con las muestras del mismo
+intervalo, de modo que al cerrar el panel no se pierde nada pendiente.
+"""
+import logging
+import mmap
+import os
+import queue
+import re
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Métricas guardadas por muestra (el orden define el formato del archivo)
+METRICS = ('cpu', 'memory', 'net_rx', 'net_tx', 'disk_read_iops', 'disk_write_iops')
+
+# Niveles de resolución: (nombre, segundos por slot, número de slots)
+TIERS = (
+    ('1s', 1, 3600),        # 1 hora
+    ('1m', 60, 7 * 1440),   # 7 días
+    ('1h', 3600, 365 * 24), # 1 año
+)
+
+_MAGIC = b'VMRRD\x00\x01\x00'
+_FILE_HEADER = struct.Struct('<8sIII')          # magic, n_metrics, n_tiers, record_size
+_TIER_HEADER = struct.Struct('<II')             # step, slots
+_RECORD_HEAD = struct.Struct('<dI4x')           # timestamp del slot, número de muestras
+_RECORD_VALUES = struct.Struct('<' + 'fff' * len(METRICS))  # (mín, prom, máx) por métrica
+_RECORD_SIZE = _RECORD_HEAD.size + _RECORD_VALUES.size
+_HEADER_SIZE = 4096  # Los datos empiezan alineados a página
+
+_FLUSH_INTERVAL = 60  # Segundos entre msync del archivo
+
+
+def default_history_dir() -> str:
+    """Directorio por defecto para el historial (XDG_DATA_HOME)"""
+    base = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+    return os.path.join(base, 'manjaro-vm-panel', 'history')
+
+
+class RoundRobinFile:
+    """Archivo round-robin de tamaño fijo para una VM
+
+    El hilo escritor combina muestras en los slots mientras la interfaz
+    los lee: escrituras y lecturas del mmap van bajo el mismo lock.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._offsets = []
+        offset = _HEADER_SIZE
+        for _name, _step, slots in TIERS:
+            self._offsets.append(offset)
+            offset += slots * _RECORD_SIZE
+        self.size = offset
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size != self.size or not self._header_matches():
+            self._initialize()
+        self._mm = mmap.mmap(self._fd, self.size)
+
+    def _header_matches(self) -> bool:
+        """Comprueba que el archivo existente tenga el mismo formato"""
+        header = os.pread(self._fd, _FILE_HEADER.size + _TIER_HEADER.size * len(TIERS), 0)
+        try:
+            magic, n_metrics, n_tiers, record_size = _FILE_HEADER.unpack_from(header, 0)
+        except struct.error:
+            return False
+        if (magic, n_metrics, n_tiers, record_size) != (_MAGIC, len(METRICS), len(TIERS), _RECORD_SIZE):
+            return False
+        for i, (_name, step, slots) in enumerate(TIERS):
+            if _TIER_HEADER.unpack_from(header, _FILE_HEADER.size + i * _TIER_HEADER.size) != (step, slots):
+                return False
+        return True
+
+    def _initialize(self):
+        """Crea (o recrea) el archivo vacío con la cabecera actual"""
+        logger.info(f"Inicializando historial en {self.path}")
+        os.ftruncate(self._fd, 0)
+        os.ftruncate(self._fd, self.size)
+        header = _FILE_HEADER.pack(_MAGIC, len(METRICS), len(TIERS), _RECORD_SIZE)
+        for _name, step, slots in TIERS:
+            header += _TIER_HEADER.pack(step, slots)
+        os.pwrite(self._fd, header, 0)
+
+    def _slot_offset(self, tier_index: int, bucket: int) -> int:
+        slots = TIERS[tier_index][2]
+        return self._offsets[tier_index] + (bucket % slots) * _RECORD_SIZE
+
+    def write(self, timestamp: float, values: Sequence[float]):
+        """Agrega una muestra a todos los niveles"""
+        with self._lock:
+            self._write(timestamp, values)
+
+    def _write(self, timestamp: float, values: Sequence[float]):
+        for tier_index, (_name, step, _slots) in enumerate(TIERS):
+            bucket = int(timestamp // step)
+            bucket_ts = float(bucket * step)
+            offset = self._slot_offset(tier_index, bucket)
+            slot_ts, count = _RECORD_HEAD.unpack_from(self._mm, offset)
+
+            if slot_ts == bucket_ts and count > 0:
+                # Mismo intervalo: combinar con lo ya acumulado
+                old = _RECORD_VALUES.unpack_from(self._mm, offset + _RECORD_HEAD.size)
+                merged = []
+                for i, value in enumerate(values):
+                    old_min, old_avg, old_max = old[i * 3:i * 3 + 3]
+                    merged.extend((
+                        min(old_min, value),
+                        (old_avg * count + value) / (count + 1),
+                        max(old_max, value),
+                    ))
+                count += 1
+            else:
+                # Slot vacío o de una vuelta anterior: sobrescribir
+                merged = []
+                for value in values:
+                    merged.extend((value, value, value))
+                count = 1
+
+            _RECORD_HEAD.pack_into(self._mm, offset, bucket_ts, count)
+            _RECORD_VALUES.pack_into(self._mm, offset + _RECORD_HEAD.size, *merged)
+
+    def read(self, tier_index: int, since: float = 0.0) -> List[Tuple[float, Tuple[float, ...]]]:
+        """Lee los slots válidos de un nivel ordenados por tiempo
+
+        Retorna una lista de (timestamp, valores) donde valores es la
+        tupla plana (mín, prom, máx) por cada métrica de METRICS.
+        """
+        _name, step, slots = TIERS[tier_index]
+        oldest = max(since, time.time() - step * slots)
+        start = self._offsets[tier_index]
+        # La copia se hace con el lock: sin él se podría leer un slot a medio combinar por el hilo escritor
+        with self._lock:
+            data = self._mm[start:start + slots * _RECORD_SIZE]
+
+        records = []
+        head_size = _RECORD_HEAD.size
+        for offset in range(0, len(data), _RECORD_SIZE):
+            slot_ts, count = _RECORD_HEAD.unpack_from(data, offset)
+            if count and slot_ts >= oldest:
+                records.append((slot_ts, _RECORD_VALUES.unpack_from(data, offset + head_size)))
+        records.sort(key=lambda record: record[0])
+        return records
+
+    def flush(self):
+        with self._lock:
+            self._mm.flush()
+
+    def close(self):
+        with self._lock:
+            try:
+                self._mm.flush()
+                self._mm.close()
+            finally:
+                os.close(self._fd)
+
+
+class MetricsStore:
+    """Historial persistente de métricas de todas las VMs
+
+    Las escrituras se encolan y las realiza un hilo propio, por lo que
+    `record` nunca bloquea el hilo de la interfaz.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or default_history_dir()
+        self._files: Dict[str, RoundRobinFile] = {}
+        self._files_lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[Tuple[str, float, Tuple[float, ...]]]]" = queue.Queue()
+        self._writer = None
+        self._closed = False
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self.enabled = True
+        except OSError as e:
+            logger.warning(f"No se pudo crear el directorio de historial {self.directory}: {e}")
+            self.enabled = False
+
+    def _file_for(self, vm_name: str) -> Optional[RoundRobinFile]:
+        """Abre (una sola vez) el archivo de una VM"""
+        with self._files_lock:
+            rr_file = self._files.get(vm_name)
+            if rr_file is None:
+                safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', vm_name)
+                try:
+                    rr_file = RoundRobinFile(os.path.join(self.directory, f"{safe_name}.rrd"))
+                except (OSError, ValueError) as e:
+                    logger.warning(f"No se pudo abrir el historial de {vm_name}: {e}")
+                    return None
+                self._files[vm_name] = rr_file
+            return rr_file
+
+    def record(self, vm_name: str, values: Dict[str, float], timestamp: Optional[float] = None):
+        """Encola una muestra; las métricas ausentes se guardan como 0"""
+        if not self.enabled or self._closed:
+            return
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._writer_loop, name="metrics-store", daemon=True)
+            self._writer.start()
+        sample = tuple(float(values.get(name) or 0.0) for name in METRICS)
+        self._queue.put((vm_name, timestamp if timestamp is not None else time.time(), sample))
+
+    def _writer_loop(self):
+        """Hilo escritor: vacía la cola y hace msync periódicamente"""
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=_FLUSH_INTERVAL)
+            except queue.Empty:
+                item = ()
+
+            if item is None:
+                break
+            if item:
+                vm_name, timestamp, sample = item
+                rr_file = self._file_for(vm_name)
+                if rr_file is not None:
+                    try:
+                        rr_file.write(timestamp, sample)
+                    except Exception as e:
+                        logger.error(f"Error escribiendo historial de {vm_name}: {e}")
+
+            if time.monotonic() - last_flush >= _FLUSH_INTERVAL:
+                self.flush()
+                last_flush = time.monotonic()
+
+    def load(self, vm_name: str, tier: str = '1s', since: float = 0.0) -> Dict[str, List[Tuple[float, float, float, float]]]:
+        """Carga el historial de una VM desde disco
+
+        Retorna {métrica: [(timestamp, mín, prom, máx), ...]} ordenado
+        por tiempo. No parsea logs: solo recorre los slots del archivo.
+        """
+        history = {name: [] for name in METRICS}
+        if not self.enabled:
+            return history
+
+        tier_index = next((i for i, t in enumerate(TIERS) if t[0] == tier), None)
+        if tier_index is None:
+            raise ValueError(f"Nivel de historial desconocido: {tier}")
+
+        rr_file = self._file_for(vm_name)
+        if rr_file is None:
+            return history
+
+        for timestamp, values in rr_file.read(tier_index, since):
+            for i, name in enumerate(METRICS):
+                history[name].append((timestamp, values[i * 3], values[i * 3 + 1], values[i * 3 + 2]))
+        return history
+
+    def recent(self, vm_name: str, metric: str, count: int) -> List[float]:
+        """Últimos `count` promedios de una métrica en el nivel de 1 s"""
+        points = self.load(vm_name, '1s').get(metric, [])
+        return [avg for _ts, _min, avg, _max in points[-count:]]
+
+    def flush(self):
+        with self._files_lock:
+            files = list(self._files.values())
+        for rr_file in files:
+            try:
+                rr_file.flush()
+            except Exception as e:
+                logger.debug(f"Error sincronizando historial {rr_file.path}: {e}")
+
+    def close(self):
+        """Vacía la cola pendiente y cierra los archivos"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout=5)
+        with self._files_lock:
+            for rr_file in self._files.values():
+                try:
+                    rr_file.close()
+                except Exception as e:
+                    logger.debug(f"Error cerrando historial {rr_file.path}: {e}")
+            self._files.clear()
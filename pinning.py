@@ -0,0 +1,293 @@
+"""
+Asistente de pinning de vCPUs y ubicación NUMA
+
+Propone, para las VMs elegidas, un reparto de núcleos físicos del host
+en el que ninguna de ellas comparte núcleo con otra:
+
+- vcpupin: cada vCPU a una CPU lógica; las vCPUs consecutivas ocupan los
+  hilos hermanos de un mismo núcleo, tantos como hilos por núcleo ve el
+  guest (<cpu><topology> de la config del dominio; con threads=1, una
+  vCPU por núcleo físico) y cada VM recibe núcleos completos,
+- emulatorpin e iothreadpin: a los núcleos de mantenimiento del nodo (los
+  primeros de cada nodo, que no se dan a ninguna vCPU),
+- numatune: la memoria en el nodo de esos núcleos (se prefiere el nodo
+  donde ya está la memoria de la VM, memory.numa_stat del cgroup). Con
+  memoria en hugepages (<memoryBacking>) numatune en caliente no la
+  migra: se omite ese paso, se avisa y se prefiere el nodo de las páginas.
+
+El plan se aplica en caliente (--live) con VMManager y, como no cambia la
+configuración persistente, se pierde al apagar la VM. PinningComparison
+compara el robo de CPU (vcpu.N.delay), la presión de CPU y la latencia de
+disco antes y después de aplicarlo. Funciona contra cualquier
+HostTopology (p. ej. un árbol sysfs sintético) y cualquier URI de libvirt
+(test:///default para pruebas). No importa GTK.
+"""
+import logging
+import math
+import re
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from host_topology import HostTopology, format_cpu_list, parse_cpu_list
+from placement import memory_node
+
+logger = logging.getLogger(__name__)
+
+HOUSEKEEPING_CORES = 1  # Núcleos por nodo reservados al host, emuladores e IOThreads
+COMPARE_WINDOW = 12     # Muestras (ciclos) antes y después de aplicar el plan
+
+# Métricas de la comparación: (clave, etiqueta, unidad)
+COMPARE_METRICS = (
+    ('cpu_steal_percent', "Robo de CPU", "%"),
+    ('cpu_pressure_some', "Presión de CPU", "%"),
+    ('read_latency_ms', "Latencia lectura", "ms"),
+    ('write_latency_ms', "Latencia escritura", "ms"),
+)
+
+_IOTHREAD_ID_RE = re.compile(r'(\d+)$')
+
+
+def iothread_ids(vm: Dict) -> List[int]:
+    """Ids de IOThread de una VM a partir de sus hilos ('IO iothread2' -> 2)"""
+    threads = ((vm.get('stats') or {}).get('qemu_threads') or {}).get('threads', ())
+    ids = set()
+    for thread in threads:
+        if thread['role'] == 'iothread':
+            match = _IOTHREAD_ID_RE.search(thread['name'])
+            if match:
+                ids.add(int(match.group(1)))
+    return sorted(ids)
+
+
+def guest_threads(vm: Dict) -> Optional[int]:
+    """Hilos por núcleo que ve el guest (cpu_topology de la config); None si no está definida"""
+    topology = (vm.get('config') or {}).get('cpu_topology')
+    return topology.get('threads') if topology else None
+
+
+def hugepages_backed(vm: Dict) -> bool:
+    """True si la memoria de la VM está en hugepages (hugepages de la config)"""
+    hugepages = (vm.get('config') or {}).get('hugepages')
+    return bool(hugepages and hugepages.get('enabled'))
+
+
+def hugepages_node(vm: Dict) -> Optional[int]:
+    """Nodo de las hugepages si todas sus páginas están fijadas a uno solo"""
+    hugepages = (vm.get('config') or {}).get('hugepages') or {}
+    nodes = set()
+    for page in hugepages.get('pages', ()):
+        nodeset = page.get('nodeset', 'all')
+        if nodeset == 'all':
+            return None
+        try:
+            nodes.update(parse_cpu_list(nodeset))
+        except ValueError:  # Exclusiones ('^1') u otros formatos: no se sabe
+            return None
+    return nodes.pop() if len(nodes) == 1 else None
+
+
+def propose_plan(topology: HostTopology, snapshot, vm_names: List[str],
+                 housekeeping_cores: int = HOUSEKEEPING_CORES) -> Dict:
+    """Plan de pinning para las VMs en ejecución de vm_names
+
+    Retorna {'vms': {vm: {'node', 'nodeset', 'numatune', 'vcpus': {vCPU:
+    cpu}, 'emulator': [cpus], 'iothreads': {id: [cpus]}}}, 'housekeeping':
+    {nodo: [cpus]}, 'warnings': [texto]}. 'numatune' es False si la
+    memoria está en hugepages (el paso no se aplica).
+    """
+    housekeeping = {}
+    free_cores: Dict[int, List[Tuple[int, int]]] = {}
+    for node, cpus in sorted(topology.nodes.items()):
+        cores = sorted({topology.core_of(cpu) for cpu in cpus})
+        reserved = cores[:housekeeping_cores] if len(cores) > housekeeping_cores else []
+        housekeeping[node] = sorted(cpu for core in reserved for cpu in topology.cores[core])
+        free_cores[node] = [core for core in cores if core not in reserved]
+
+    plan = {'vms': {}, 'housekeeping': housekeeping, 'warnings': []}
+    candidates = []
+    for vm_name in vm_names:
+        vm = snapshot.get(vm_name)
+        if vm is None or not vm.get('running') or not vm.get('stats'):
+            plan['warnings'].append(f"{vm_name}: no está en ejecución, se omite")
+            continue
+        vcpus = vm['stats'].get('vcpu_current') or vm['stats'].get('vcpu_count') or 1
+        candidates.append((vcpus, vm_name, vm))
+
+    # Primero las VMs más grandes: son las que más cuesta encajar en un nodo
+    for vcpus, vm_name, vm in sorted(candidates, key=lambda item: (-item[0], item[1])):
+        threads_per_core = max(len(topology.cores[core]) for cores in free_cores.values() for core in cores) \
+            if any(free_cores.values()) else 1
+        # Hilos del núcleo que se dan a vCPUs: los que el guest cree que comparten núcleo
+        per_core = min(guest_threads(vm) or threads_per_core, threads_per_core)
+        needed = math.ceil(vcpus / per_core)
+        hugepages = hugepages_backed(vm)
+        preferred = hugepages_node(vm) if hugepages else memory_node(vm)
+        fitting = [node for node, cores in free_cores.items() if len(cores) >= needed]
+        if preferred in fitting:
+            nodes = [preferred]
+        elif fitting:
+            nodes = [max(fitting, key=lambda node: len(free_cores[node]))]
+        else:
+            # No cabe en un nodo: se reparte empezando por los nodos con más núcleos libres
+            nodes = sorted(free_cores, key=lambda node: -len(free_cores[node]))
+            plan['warnings'].append(f"{vm_name}: {vcpus} vCPUs no caben en un solo nodo NUMA")
+
+        cpus = []
+        taken = []
+        for node in nodes:
+            while free_cores[node] and len(cpus) < vcpus:
+                core = free_cores[node].pop(0)
+                taken.append((node, core))
+                cpus.extend(topology.cores[core][:per_core])
+        if len(cpus) < vcpus:
+            # Los núcleos vuelven a quedar libres para las VMs más pequeñas
+            for node, core in reversed(taken):
+                free_cores[node].insert(0, core)
+            plan['warnings'].append(f"{vm_name}: no quedan núcleos libres para sus {vcpus} vCPUs, se omite")
+            continue
+        used_nodes = list(dict.fromkeys(node for node, _core in taken))
+
+        shared = sorted(cpu for node in used_nodes for cpu in housekeeping[node]) or sorted(cpus)
+        plan['vms'][vm_name] = {
+            'node': used_nodes[0],
+            'nodeset': format_cpu_list(used_nodes),
+            'numatune': not hugepages,
+            'vcpus': {vcpu: cpu for vcpu, cpu in zip(range(vcpus), cpus)},
+            'emulator': shared,
+            'iothreads': {iothread: shared for iothread in iothread_ids(vm)},
+        }
+        if hugepages:
+            plan['warnings'].append(f"{vm_name}: memoria en hugepages, numatune en caliente no la migra y se "
+                                    f"omite (fije el nodo con <numatune> en la definición)")
+            if preferred is not None and used_nodes[0] != preferred:
+                plan['warnings'].append(f"{vm_name}: sus hugepages están en el nodo {preferred} y las vCPUs "
+                                        f"quedan en el {used_nodes[0]} (memoria remota)")
+        elif preferred is not None and used_nodes[0] != preferred:
+            plan['warnings'].append(f"{vm_name}: su memoria está en el nodo {preferred} y se mueve al "
+                                    f"{used_nodes[0]} (la migración de páginas puede tardar)")
+
+    running_others = [name for name, vm in snapshot.vms.items()
+                      if vm.get('running') and name not in plan['vms']]
+    if running_others and plan['vms']:
+        plan['warnings'].append(f"Sin pinning, {', '.join(sorted(running_others))} pueden seguir "
+                                f"corriendo en los núcleos asignados")
+    return plan
+
+
+def describe_plan(plan: Dict) -> str:
+    """Texto del plan para mostrarlo antes de aplicarlo"""
+    lines = []
+    for vm_name, vm_plan in plan['vms'].items():
+        vcpus = ", ".join(f"{vcpu}→{cpu}" for vcpu, cpu in sorted(vm_plan['vcpus'].items()))
+        memory = "" if vm_plan.get('numatune', True) else ", memoria sin mover"
+        lines.append(f"{vm_name} (nodo {vm_plan['nodeset']}{memory}): vCPU {vcpus}")
+        lines.append(f"    emulador → {format_cpu_list(vm_plan['emulator'])}")
+        for iothread, cpus in sorted(vm_plan['iothreads'].items()):
+            lines.append(f"    IOThread {iothread} → {format_cpu_list(cpus)}")
+    lines.extend(f"⚠️ {warning}" for warning in plan['warnings'])
+    return "\n".join(lines) or "Nada que aplicar"
+
+
+def apply_plan(vm_manager, plan: Dict) -> List[Dict]:
+    """Aplica el plan en caliente; retorna un resultado por paso
+
+    [{'vm', 'step', 'ok', 'error'}]. Un paso fallido no detiene los
+    demás: p. ej. numatune en caliente falla si la memoria no está en
+    modo strict, pero el pinning de CPU sigue siendo válido.
+    """
+    results = []
+
+    def record(vm_name, step, outcome):
+        success, error_info = outcome
+        results.append({'vm': vm_name, 'step': step, 'ok': success,
+                        'error': None if success else (error_info or {}).get('message')})
+
+    for vm_name, vm_plan in plan['vms'].items():
+        if vm_plan.get('numatune', True):
+            record(vm_name, f"numatune {vm_plan['nodeset']}",
+                   vm_manager.set_numa_nodeset(vm_name, vm_plan['nodeset']))
+        emulator = format_cpu_list(vm_plan['emulator'])
+        record(vm_name, f"emulatorpin {emulator}", vm_manager.pin_emulator(vm_name, emulator))
+        for iothread, cpus in sorted(vm_plan['iothreads'].items()):
+            cpulist = format_cpu_list(cpus)
+            record(vm_name, f"iothreadpin {iothread} {cpulist}", vm_manager.pin_iothread(vm_name, iothread, cpulist))
+        for vcpu, cpu in sorted(vm_plan['vcpus'].items()):
+            record(vm_name, f"vcpupin {vcpu} {cpu}", vm_manager.pin_vcpu(vm_name, vcpu, str(cpu)))
+    failed = sum(1 for result in results if not result['ok'])
+    logger.info(f"Plan de pinning aplicado: {len(results) - failed} pasos correctos, {failed} fallidos")
+    return results
+
+
+def _average(values) -> Optional[float]:
+    known = [value for value in values if value is not None]
+    return sum(known) / len(known) if known else None
+
+
+class PinningComparison:
+    """Métricas de las VMs del plan antes y después de aplicarlo
+
+    observe() se llama con cada snapshot: hasta mark_applied() guarda una
+    ventana deslizante con las últimas muestras ("antes") de todas las VMs
+    observadas, para que proponer otro plan con otras VMs no pierda lo ya
+    acumulado; después llena la ventana "después" hasta COMPARE_WINDOW
+    muestras. El informe se limita a las VMs del plan aplicado.
+    """
+
+    def __init__(self, vm_names: List[str], window: int = COMPARE_WINDOW):
+        self.vm_names = list(vm_names)
+        self.window = window
+        self.applied = False
+        self.reported = list(self.vm_names)
+        self._before = {vm_name: deque(maxlen=window) for vm_name in self.vm_names}
+        self._after = {vm_name: [] for vm_name in self.vm_names}
+
+    def observe(self, snapshot):
+        if snapshot.stale:
+            return
+        for vm_name in self.vm_names:
+            vm = snapshot.get(vm_name)
+            rates = vm.get('rates') if vm else None
+            if not rates:
+                continue
+            sample = {key: rates.get(key) for key, _label, _unit in COMPARE_METRICS}
+            if not self.applied:
+                self._before[vm_name].append(sample)
+            elif len(self._after[vm_name]) < self.window:
+                self._after[vm_name].append(sample)
+
+    def before_samples(self, vm_name: str) -> int:
+        return len(self._before.get(vm_name, ()))
+
+    def mark_applied(self, vm_names: Optional[List[str]] = None):
+        """Empieza la ventana "después"; vm_names limita el informe a las VMs del plan"""
+        self.applied = True
+        if vm_names is not None:
+            self.reported = [vm_name for vm_name in vm_names if vm_name in self._before]
+
+    @property
+    def done(self) -> bool:
+        return self.applied and all(len(self._after[vm_name]) >= self.window for vm_name in self.reported)
+
+    def report(self) -> Dict[str, Dict[str, Tuple[Optional[float], Optional[float]]]]:
+        """{vm: {métrica: (media antes, media después)}}"""
+        return {
+            vm_name: {key: (_average(sample[key] for sample in self._before[vm_name]),
+                            _average(sample[key] for sample in self._after[vm_name]))
+                      for key, _label, _unit in COMPARE_METRICS}
+            for vm_name in self.reported
+        }
+
+    def describe(self) -> str:
+        """Tabla de texto antes/después para la interfaz"""
+        lines = []
+        for vm_name, metrics in self.report().items():
+            if self.applied:
+                lines.append(f"{vm_name} ({len(self._after[vm_name])}/{self.window} muestras tras aplicar)")
+            else:
+                lines.append(f"{vm_name} ({self.before_samples(vm_name)}/{self.window} muestras antes)")
+            for key, label, unit in COMPARE_METRICS:
+                before, after = metrics[key]
+                before_text = f"{before:.2f}{unit}" if before is not None else "—"
+                after_text = f"{after:.2f}{unit}" if after is not None else "—"
+                lines.append(f"    {label}: {before_text} → {after_text}")
+        return "\n".join(lines)
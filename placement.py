@@ -0,0 +1,167 @@
+"""
+Modelo del mapa de ubicación de vCPUs sobre la topología del host
+
+Con cada FleetSnapshot coloca cada vCPU de las VMs en ejecución en la CPU
+del host donde corrió por última vez (campo 'processor' de sus hilos en
+stats['qemu_threads'], ver qemu_threads.py), así que no lanza ningún
+subproceso propio. Señala:
+
+- núcleos físicos con más vCPUs que hilos (sobresuscripción),
+- vCPUs que corren en un nodo NUMA distinto del nodo de memoria de su VM
+  (el que más memoria anónima tiene en memory.numa_stat del cgroup o, sin
+  ese dato, el nodo donde corren la mayoría de sus vCPUs),
+- VMs cuyas vCPUs saltan de núcleo en muestras consecutivas.
+
+La topología (host_topology.HostTopology) se lee una sola vez. No
+importa GTK.
+"""
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from host_topology import HostTopology
+
+BOUNCE_WINDOW = 6  # Muestras por vCPU para detectar saltos entre núcleos
+BOUNCE_MOVES = 3   # Cambios de núcleo en la ventana a partir de los que una vCPU "salta"
+
+
+def vcpu_placement(vm: Dict) -> Optional[Dict[int, int]]:
+    """{índice de vCPU: CPU del host} de una VM del snapshot; None sin datos de procfs"""
+    stats = vm.get('stats') if vm.get('running') else None
+    threads = (stats or {}).get('qemu_threads')
+    if not threads:
+        return None
+    return {thread['vcpu']: thread['processor'] for thread in threads['threads']
+            if thread['role'] == 'vcpu' and thread['vcpu'] is not None}
+
+
+def memory_node(vm: Dict) -> Optional[int]:
+    """Nodo NUMA con más memoria anónima del dominio (memory.numa_stat); None si no se sabe"""
+    per_node = ((vm.get('stats') or {}).get('cgroup_memory_numa_anon')) or []
+    if not any(per_node):
+        return None
+    return max(range(len(per_node)), key=per_node.__getitem__)
+
+
+class PlacementModel:
+    """vCPUs por CPU del host y avisos de sobresuscripción, NUMA y saltos"""
+
+    def __init__(self, topology: HostTopology, bounce_window: int = BOUNCE_WINDOW,
+                 bounce_moves: int = BOUNCE_MOVES):
+        self.topology = topology
+        self.bounce_window = bounce_window
+        self.bounce_moves = bounce_moves
+        self.stale = False
+        self.by_cpu: Dict[int, List[Tuple[str, int]]] = {}   # {cpu: [(vm, vCPU)]}
+        self.core_load: Dict[Tuple[int, int], int] = {}      # {núcleo: vCPUs colocadas}
+        self.overcommitted: List[Tuple[int, int]] = []       # Núcleos con más vCPUs que hilos
+        self.remote: List[Tuple[str, int, int, int]] = []    # (vm, vCPU, nodo de la CPU, nodo de memoria)
+        self.bouncing: Dict[str, List[int]] = {}             # {vm: vCPUs que saltan de núcleo}
+        self.home_nodes: Dict[str, int] = {}
+        self.unplaced: List[str] = []                        # En ejecución pero sin datos de procfs
+        self._cores_seen: Dict[Tuple[str, int], deque] = {}  # {(vm, vCPU): núcleos recientes}
+
+    def update(self, snapshot):
+        """Aplica un FleetSnapshot"""
+        self.stale = snapshot.stale
+        by_cpu = {cpu: [] for cpu in self.topology.cpus}
+        remote = []
+        bouncing = {}
+        home_nodes = {}
+        unplaced = []
+        seen = set()
+
+        for vm_name, vm in snapshot.vms.items():
+            if not vm.get('running'):
+                continue
+            placement = vcpu_placement(vm)
+            if not placement:
+                unplaced.append(vm_name)
+                continue
+
+            nodes = [self.topology.node_of(cpu) for cpu in placement.values()]
+            home = memory_node(vm)
+            if home is None:
+                known = [node for node in nodes if node is not None]
+                home = max(set(known), key=known.count) if known else None
+            if home is not None:
+                home_nodes[vm_name] = home
+
+            for vcpu, cpu in sorted(placement.items()):
+                if cpu in by_cpu:
+                    by_cpu[cpu].append((vm_name, vcpu))
+                node = self.topology.node_of(cpu)
+                if home is not None and node is not None and node != home:
+                    remote.append((vm_name, vcpu, node, home))
+
+                # Los snapshots de la caché no dicen nada del movimiento actual
+                if snapshot.stale:
+                    continue
+                key = (vm_name, vcpu)
+                seen.add(key)
+                cores = self._cores_seen.get(key)
+                if cores is None:
+                    cores = self._cores_seen[key] = deque(maxlen=self.bounce_window)
+                cores.append(self.topology.core_of(cpu))
+                moves = sum(1 for before, after in zip(cores, list(cores)[1:]) if before != after)
+                if moves >= self.bounce_moves:
+                    bouncing.setdefault(vm_name, []).append(vcpu)
+
+        if not snapshot.stale:
+            for key in list(self._cores_seen):
+                if key not in seen:
+                    del self._cores_seen[key]
+
+        core_load = {core: 0 for core in self.topology.cores}
+        for cpu, vcpus in by_cpu.items():
+            core_load[self.topology.core_of(cpu)] += len(vcpus)
+
+        self.by_cpu = by_cpu
+        self.core_load = core_load
+        self.overcommitted = [core for core, load in core_load.items() if load > len(self.topology.cores[core])]
+        self.remote = remote
+        self.bouncing = bouncing
+        self.home_nodes = home_nodes
+        self.unplaced = unplaced
+
+    def is_overcommitted(self, cpu: int) -> bool:
+        core = self.topology.core_of(cpu)
+        return core is not None and self.core_load.get(core, 0) > len(self.topology.cores[core])
+
+    def has_remote(self, cpu: int) -> bool:
+        """True si alguna vCPU colocada en la CPU corre fuera del nodo de memoria de su VM"""
+        node = self.topology.node_of(cpu)
+        return any(self.home_nodes.get(vm_name, node) != node for vm_name, _vcpu in self.by_cpu.get(cpu, ()))
+
+    def tooltip(self, cpu: int) -> str:
+        """Texto del tooltip de una CPU del host"""
+        info = self.topology.cpus[cpu]
+        core = info['core']
+        text = f"CPU {cpu} (núcleo {core[1]}, paquete {core[0]}, nodo {info['node']})"
+        vcpus = self.by_cpu.get(cpu) or []
+        if vcpus:
+            text += "\n" + "\n".join(f"{vm_name}: vCPU {vcpu}" for vm_name, vcpu in vcpus)
+        else:
+            text += "\nSin vCPUs"
+        if self.is_overcommitted(cpu):
+            text += (f"\n⚠️ Núcleo con {self.core_load[core]} vCPUs para "
+                     f"{len(self.topology.cores[core])} hilos")
+        if self.stale:
+            text += "\n(último estado conocido)"
+        return text
+
+    def summary(self) -> str:
+        """Avisos del último snapshot, uno por línea ('' si no hay nada que señalar)"""
+        lines = []
+        if self.overcommitted:
+            lines.append(f"🔴 {len(self.overcommitted)} núcleos con más vCPUs que hilos")
+        remote_by_vm: Dict[str, List[int]] = {}
+        for vm_name, vcpu, _node, _home in self.remote:
+            remote_by_vm.setdefault(vm_name, []).append(vcpu)
+        for vm_name, vcpus in sorted(remote_by_vm.items()):
+            lines.append(f"🟠 {vm_name}: vCPUs {', '.join(map(str, vcpus))} fuera del nodo "
+                         f"{self.home_nodes[vm_name]} de su memoria")
+        for vm_name, vcpus in sorted(self.bouncing.items()):
+            lines.append(f"🔀 {vm_name}: vCPUs {', '.join(map(str, vcpus))} saltan entre núcleos")
+        if self.unplaced:
+            lines.append(f"Sin datos de ubicación (procfs): {', '.join(sorted(self.unplaced))}")
+        return "\n".join(lines)
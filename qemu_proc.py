@@ -0,0 +1,128 @@
+"""
+Camino rápido por procfs para la CPU y la memoria residente de cada VM
+
+Resuelve una sola vez el PID del proceso QEMU de cada dominio en
+ejecución (/run/libvirt/qemu/<nombre>.pid) y después lee
+/proc/<pid>/stat y /proc/<pid>/statm directamente, con descriptores
+abiertos que se reutilizan (os.pread). Cada muestra cuesta unas decenas
+de microsegundos y no lanza ningún subproceso, así que permite gráficos
+de CPU a 1 Hz o más sin pasar por virsh ni libvirtd. Las raíces de procfs
+y del directorio de PIDs de libvirt son configurables para probarlo
+contra un árbol falso. No importa GTK.
+"""
+import logging
+import os
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+_PAGE_KB = os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def read_comm(stat: str) -> str:
+    """Nombre del proceso (campo 2 de /proc/<pid>/stat, entre paréntesis)"""
+    return stat[stat.index('(') + 1:stat.rindex(')')]
+
+
+def resolve_qemu_pid(proc_root: str, run_root: str, vm_name: str) -> int:
+    """PID del proceso QEMU de una VM según el archivo de PID de libvirt
+
+    Lanza OSError si no se puede leer y ValueError si el PID no es de un
+    proceso QEMU (archivo de PID obsoleto y PID reutilizado).
+    """
+    with open(os.path.join(run_root, f"{vm_name}.pid")) as f:
+        pid = int(f.read().strip())
+    with open(os.path.join(proc_root, str(pid), 'stat')) as f:
+        comm = read_comm(f.read())
+    if not comm.startswith(('qemu', 'kvm')):
+        raise ValueError(f"el PID {pid} es '{comm}', no un proceso QEMU")
+    return pid
+
+
+class _ProcessHandles:
+    """Descriptores de /proc/<pid>/stat y statm de un proceso QEMU"""
+
+    def __init__(self, proc_root: str, pid: int):
+        self.pid = pid
+        self.stat_fd = os.open(os.path.join(proc_root, str(pid), 'stat'), os.O_RDONLY)
+        try:
+            self.statm_fd = os.open(os.path.join(proc_root, str(pid), 'statm'), os.O_RDONLY)
+        except OSError:
+            os.close(self.stat_fd)
+            raise
+
+    def read(self) -> Dict[str, int]:
+        stat = os.pread(self.stat_fd, 4096, 0).decode('ascii', 'replace')
+        statm = os.pread(self.statm_fd, 256, 0).split()
+        # El nombre del proceso (campo 2) va entre paréntesis y puede tener espacios
+        fields = stat[stat.rindex(')') + 2:].split()
+        utime, stime = int(fields[11]), int(fields[12])  # Campos 14 y 15 de proc(5)
+        return {
+            'cpu_time': (utime + stime) * 1_000_000_000 // _CLOCK_TICKS,  # ns, como cpu.time de domstats
+            'rss_kb': int(statm[1]) * _PAGE_KB,
+        }
+
+    def close(self):
+        for fd in (self.stat_fd, self.statm_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class QemuProcCollector:
+    """CPU y RSS de los procesos QEMU leídos directamente de procfs"""
+
+    def __init__(self, proc_root: str = '/proc', run_root: str = '/run/libvirt/qemu'):
+        self.proc_root = proc_root
+        self.run_root = run_root
+        self._handles: Dict[str, tuple] = {}  # {vm: (id de dominio, _ProcessHandles)}
+        self._failed: Dict[str, object] = {}  # {vm: id de dominio} cuyo PID no se pudo resolver
+
+    def _resolve(self, vm_name: str, domain_id) -> Optional[_ProcessHandles]:
+        try:
+            pid = resolve_qemu_pid(self.proc_root, self.run_root, vm_name)
+            handles = _ProcessHandles(self.proc_root, pid)
+        except (OSError, ValueError) as e:
+            # Se reintenta solo cuando cambie el id del dominio (p. ej. al reiniciar la VM)
+            self._failed[vm_name] = domain_id
+            logger.debug(f"Sin camino rápido para {vm_name}: {e}")
+            return None
+        self._failed.pop(vm_name, None)
+        logger.debug(f"Proceso QEMU de {vm_name}: PID {pid}")
+        return handles
+
+    def sample(self, vm_name: str, domain_id) -> Optional[Dict[str, int]]:
+        """{'cpu_time' (ns), 'rss_kb'} del proceso QEMU de la VM; None si no está disponible"""
+        cached = self._handles.get(vm_name)
+        if cached is not None and cached[0] != domain_id:
+            self.forget(vm_name)
+            cached = None
+        if cached is None:
+            if vm_name in self._failed and self._failed[vm_name] == domain_id:
+                return None
+            handles = self._resolve(vm_name, domain_id)
+            if handles is None:
+                return None
+            cached = self._handles[vm_name] = (domain_id, handles)
+
+        try:
+            return cached[1].read()
+        except (OSError, ValueError, IndexError) as e:
+            # El proceso terminó: se resuelve de nuevo en la siguiente muestra
+            logger.debug(f"Proceso QEMU de {vm_name} (PID {cached[1].pid}) no disponible: {e}")
+            self.forget(vm_name)
+            return None
+
+    def forget(self, vm_name: str):
+        """Cierra los descriptores de una VM (apagada o reiniciada)"""
+        cached = self._handles.pop(vm_name, None)
+        if cached is not None:
+            cached[1].close()
+        self._failed.pop(vm_name, None)
+
+    def close(self):
+        for vm_name in list(self._handles):
+            self.forget(vm_name)
+        self._failed.clear()
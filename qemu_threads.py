@@ -0,0 +1,206 @@
+"""
+Desglose del tiempo de CPU de cada proceso QEMU por hilo
+
+Un solo número (cpu.time) no distingue si el tiempo se va en las vCPUs,
+en el hilo del emulador o en los IOThreads. Una vez por ciclo se lista
+/proc/<pid>/task y se clasifica cada hilo por su nombre (libvirt arranca
+QEMU con debug-threads=on):
+
+    'CPU 0/KVM'      -> vcpu (con su índice, el N de vcpu.N en domstats)
+    'IO iothread1'   -> iothread
+    'vhost-<pid>'    -> vhost (hilos vhost del kernel dentro del proceso)
+    cualquier otro   -> emulator (hilo principal, workers, SPICE, ...)
+
+El nombre de cada hilo se lee una vez y su /proc/<pid>/task/<tid>/stat
+queda abierto y se relee con os.pread, igual que en qemu_proc.py, hasta
+un presupuesto de descriptores (una fracción de RLIMIT_NOFILE): por
+encima, los hilos nuevos se leen abriendo y cerrando el archivo en cada
+ciclo, para no dejar al proceso sin descriptores para virsh, el historial
+o el exportador. Si aun así se agotan (EMFILE) el presupuesto baja a los
+descriptores ya abiertos y la VM se queda sin desglose ese ciclo. Además
+del tiempo de CPU se guarda la última CPU del host en la que corrió cada
+hilo (campo 39 de stat). Las tasas por rol las calcula rates.RateEngine.
+No importa GTK.
+"""
+import errno
+import logging
+import os
+import re
+import resource
+from typing import Dict, Optional, Tuple
+
+from qemu_proc import read_comm, resolve_qemu_pid
+
+logger = logging.getLogger(__name__)
+
+ROLES = ('vcpu', 'emulator', 'iothread', 'vhost')
+ROLE_LABELS = {'vcpu': "vCPU", 'emulator': "Emulador", 'iothread': "IOThread", 'vhost': "vhost"}
+
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+_VCPU_RE = re.compile(r'^CPU (\d+)/')  # 'CPU 0/KVM', 'CPU 1/TCG'
+
+MAX_PERSISTENT_FDS = 256  # Descriptores abiertos como máximo (si RLIMIT_NOFILE / 4 no es menor)
+_FD_EXHAUSTED = (errno.EMFILE, errno.ENFILE)
+
+
+def default_fd_budget() -> int:
+    """Descriptores persistentes permitidos: MAX_PERSISTENT_FDS o un cuarto del límite del proceso"""
+    try:
+        soft, _hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    except (OSError, ValueError):
+        return MAX_PERSISTENT_FDS
+    if soft == resource.RLIM_INFINITY:
+        return MAX_PERSISTENT_FDS
+    return max(0, min(MAX_PERSISTENT_FDS, soft // 4))
+
+
+def thread_role(comm: str) -> Tuple[str, Optional[int]]:
+    """(rol, índice de vCPU o None) a partir del nombre de un hilo de QEMU"""
+    match = _VCPU_RE.match(comm)
+    if match:
+        return 'vcpu', int(match.group(1))
+    if comm.startswith('IO '):
+        return 'iothread', None
+    if comm.startswith('vhost-'):
+        return 'vhost', None
+    return 'emulator', None
+
+
+class _Thread:
+    """/proc/<pid>/task/<tid>/stat de un hilo ya clasificado
+
+    Con persistent el descriptor queda abierto y se relee con pread; sin
+    él se abre y se cierra en cada lectura.
+    """
+
+    def __init__(self, task_dir: str, tid: int, persistent: bool = True):
+        self.tid = tid
+        self.path = os.path.join(task_dir, str(tid), 'stat')
+        self.fd = os.open(self.path, os.O_RDONLY) if persistent else None
+        try:
+            self.name = read_comm(self._read())
+        except (OSError, ValueError):
+            self.close()
+            raise
+        self.role, self.vcpu = thread_role(self.name)
+
+    def _read(self) -> str:
+        if self.fd is not None:
+            return os.pread(self.fd, 4096, 0).decode('ascii', 'replace')
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            return os.pread(fd, 4096, 0).decode('ascii', 'replace')
+        finally:
+            os.close(fd)
+
+    def read(self) -> Dict:
+        stat = self._read()
+        fields = stat[stat.rindex(')') + 2:].split()
+        return {
+            'tid': self.tid,
+            'name': self.name,
+            'role': self.role,
+            'vcpu': self.vcpu,
+            'cpu_time': (int(fields[11]) + int(fields[12])) * 1_000_000_000 // _CLOCK_TICKS,  # ns
+            'processor': int(fields[36]),  # Campo 39 de proc(5): última CPU del host
+        }
+
+    def close(self):
+        if self.fd is None:
+            return
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+        self.fd = None
+
+
+class QemuThreadCollector:
+    """Tiempo de CPU por hilo de los procesos QEMU leído de procfs"""
+
+    def __init__(self, proc_root: str = '/proc', run_root: str = '/run/libvirt/qemu',
+                 fd_budget: Optional[int] = None):
+        self.proc_root = proc_root
+        self.run_root = run_root
+        self.fd_budget = default_fd_budget() if fd_budget is None else fd_budget
+        self.open_fds = 0  # Descriptores persistentes abiertos entre todas las VMs
+        self._processes: Dict[str, tuple] = {}  # {vm: (id de dominio, pid, {tid: _Thread})}
+        self._failed: Dict[str, object] = {}    # {vm: id de dominio} cuyo PID no se pudo resolver
+
+    def sample(self, vm_name: str, domain_id) -> Optional[Dict]:
+        """{'pid', 'threads': [{'tid', 'name', 'role', 'vcpu', 'cpu_time', 'processor'}]}
+
+        None si el proceso QEMU de la VM no está disponible.
+        """
+        cached = self._processes.get(vm_name)
+        if cached is not None and cached[0] != domain_id:
+            self.forget(vm_name)
+            cached = None
+        if cached is None:
+            if vm_name in self._failed and self._failed[vm_name] == domain_id:
+                return None
+            try:
+                pid = resolve_qemu_pid(self.proc_root, self.run_root, vm_name)
+            except (OSError, ValueError) as e:
+                # Se reintenta solo cuando cambie el id del dominio (p. ej. al reiniciar la VM)
+                self._failed[vm_name] = domain_id
+                logger.debug(f"Sin desglose por hilos para {vm_name}: {e}")
+                return None
+            self._failed.pop(vm_name, None)
+            cached = self._processes[vm_name] = (domain_id, pid, {})
+
+        _domain_id, pid, threads = cached
+        task_dir = os.path.join(self.proc_root, str(pid), 'task')
+        try:
+            tids = {int(entry) for entry in os.listdir(task_dir)}
+        except OSError as e:
+            # El proceso terminó: se resuelve de nuevo en el siguiente ciclo
+            logger.debug(f"Proceso QEMU de {vm_name} (PID {pid}) no disponible: {e}")
+            self.forget(vm_name)
+            return None
+
+        for tid in list(threads):
+            if tid not in tids:
+                self._close(threads.pop(tid))
+        samples = []
+        for tid in sorted(tids):
+            thread = threads.get(tid)
+            try:
+                if thread is None:
+                    thread = threads[tid] = _Thread(task_dir, tid, persistent=self.open_fds < self.fd_budget)
+                    if thread.fd is not None:
+                        self.open_fds += 1
+                samples.append(thread.read())
+            except OSError as e:
+                if e.errno in _FD_EXHAUSTED:
+                    # Sin descriptores libres: no es un hilo terminado y un desglose parcial engañaría
+                    if self.fd_budget > self.open_fds:
+                        logger.warning(f"Descriptores agotados leyendo los hilos de {vm_name}; se dejan de "
+                                       f"abrir descriptores persistentes ({self.open_fds} abiertos)")
+                        self.fd_budget = self.open_fds
+                    return None
+                # Hilo terminado entre el listado y la lectura
+                if tid in threads:
+                    self._close(threads.pop(tid))
+            except (ValueError, IndexError):
+                if tid in threads:
+                    self._close(threads.pop(tid))
+        return {'pid': pid, 'threads': samples}
+
+    def _close(self, thread: _Thread):
+        if thread.fd is not None:
+            self.open_fds -= 1
+        thread.close()
+
+    def forget(self, vm_name: str):
+        """Cierra los descriptores de una VM (apagada o reiniciada)"""
+        cached = self._processes.pop(vm_name, None)
+        if cached is not None:
+            for thread in cached[2].values():
+                self._close(thread)
+        self._failed.pop(vm_name, None)
+
+    def close(self):
+        for vm_name in list(self._processes):
+            self.forget(vm_name)
+        self._failed.clear()
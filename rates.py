@@ -0,0 +1,224 @@
+"""
+Tasas derivadas de los contadores de domstats
+
+El recolector pasa cada muestra de get_vm_detailed_stats por un
+RateEngine, que la compara con la anterior de la misma VM usando el
+reloj monótono (time.monotonic no salta con los ajustes de NTP) y
+calcula en una sola pasada todas las tasas: % de CPU, IOPS, MB/s,
+latencia y tamaño medio de petición del intervalo en disco, MB/s y
+paquetes/s de red, por dispositivo y por VM, el robo de CPU de las
+vCPUs (vcpu.N.delay), el swap y los fallos mayores del guest, el % de
+tiempo con presión (PSI) de CPU, memoria y E/S del cgroup del dominio y
+la CPU por rol de hilo de QEMU (vCPU, emulador, IOThread, vhost). La interfaz,
+el mapa de calor y el modo headless solo muestran los valores ya
+calculados en vm['rates']. No importa GTK.
+
+Un reinicio o una restauración de la VM pone los contadores a cero:
+si cambia el id del dominio o baja el tiempo de CPU se descarta la
+muestra anterior, y un dispositivo cuyos contadores bajan (desconectado
+y vuelto a conectar) se omite en ese intervalo, en lugar de producir
+picos o tasas negativas.
+"""
+import logging
+from typing import Dict, Optional
+
+from memory_stats import RATE_COUNTERS as MEMORY_COUNTERS
+from qemu_threads import ROLES
+
+logger = logging.getLogger(__name__)
+
+_MB = 1024 * 1024
+
+# Contadores acumulados por tipo de dispositivo (claves de block.N.* y net.N.* en domstats)
+BLOCK_COUNTERS = ('rd_reqs', 'wr_reqs', 'rd_bytes', 'wr_bytes', 'rd_times', 'wr_times')
+NET_COUNTERS = ('rx_bytes', 'tx_bytes', 'rx_pkts', 'tx_pkts', 'rx_drop', 'tx_drop')
+PRESSURE_KINDS = (('cpu', 'some'), ('memory', 'some'), ('memory', 'full'), ('io', 'some'), ('io', 'full'))
+PRESSURE_FIELDS = tuple(f'{resource}_pressure_{kind}' for resource, kind in PRESSURE_KINDS)
+
+# Tasas por VM cuando aún no hay intervalo (primera muestra o contadores reiniciados)
+EMPTY_RATES = {
+    'cpu_percent': 0.0,
+    'read_iops': 0.0,
+    'write_iops': 0.0,
+    'disk_read_mbps': 0.0,
+    'disk_write_mbps': 0.0,
+    'read_latency_ms': None,   # None: sin peticiones en el intervalo
+    'write_latency_ms': None,
+    'net_rx_mbps': 0.0,
+    'net_tx_mbps': 0.0,
+}
+
+
+def _per_request(total: int, requests: int, unit: float) -> Optional[float]:
+    """Media por petición del intervalo (latencia, tamaño); None si no hubo peticiones"""
+    return total / requests / unit if requests else None
+
+
+def _device_deltas(current: Dict, previous: Optional[Dict], counters) -> Optional[Dict[str, int]]:
+    """Deltas de los contadores de un dispositivo; None si no hay muestra anterior o se reinició"""
+    if previous is None:
+        return None
+    deltas = {}
+    for counter in counters:
+        delta = current.get(counter, 0) - previous.get(counter, 0)
+        if delta < 0:
+            return None
+        deltas[counter] = delta
+    return deltas
+
+
+def _thread_rates(stats: Dict, before: Dict, elapsed: float) -> Optional[Dict]:
+    """CPU por rol de hilo de QEMU en % de un núcleo del host; None sin datos
+
+    Con el desglose de procfs (stats['qemu_threads']) los hilos se
+    emparejan por tid; sin él se usa lo que da domstats: las vCPUs
+    (vcpu.N.time) y el resto del tiempo del dominio como emulador.
+    """
+    current, previous = stats.get('qemu_threads'), before.get('qemu_threads')
+    if current and previous and current['pid'] == previous['pid']:
+        previous_threads = {thread['tid']: thread for thread in previous['threads']}
+        roles = dict.fromkeys(ROLES, 0.0)
+        iothreads = {}
+        vcpus = {}
+        for thread in current['threads']:
+            old = previous_threads.get(thread['tid'])
+            if old is None or thread['cpu_time'] < old['cpu_time']:
+                continue  # Hilo nuevo en este intervalo
+            percent = (thread['cpu_time'] - old['cpu_time']) / 1e9 / elapsed * 100
+            roles[thread['role']] += percent
+            if thread['role'] == 'iothread':
+                iothreads[thread['name'][3:]] = percent  # 'IO iothread1' -> 'iothread1'
+            elif thread['vcpu'] is not None:
+                vcpus[thread['vcpu']] = percent
+        return {'source': 'procfs', 'roles': roles, 'iothreads': iothreads, 'vcpus': vcpus}
+
+    vcpu_time, vcpu_before = stats.get('vcpu_time'), before.get('vcpu_time')
+    cpu_time, cpu_before = stats.get('cpu_time'), before.get('cpu_time')
+    if None in (vcpu_time, vcpu_before, cpu_time, cpu_before) or vcpu_time < vcpu_before:
+        return None
+    vcpu_delta = vcpu_time - vcpu_before
+    previous_vcpus = {vcpu['index']: vcpu for vcpu in before.get('vcpus', ())}
+    vcpus = {}
+    for vcpu in stats.get('vcpus', ()):
+        old = previous_vcpus.get(vcpu['index'])
+        if old is not None and isinstance(vcpu.get('time'), int) and vcpu['time'] >= old.get('time', 0):
+            vcpus[vcpu['index']] = (vcpu['time'] - old.get('time', 0)) / 1e9 / elapsed * 100
+    roles = dict.fromkeys(ROLES, 0.0)
+    roles['vcpu'] = vcpu_delta / 1e9 / elapsed * 100
+    roles['emulator'] = max(0, (cpu_time - cpu_before) - vcpu_delta) / 1e9 / elapsed * 100
+    return {'source': 'libvirt', 'roles': roles, 'iothreads': {}, 'vcpus': vcpus}
+
+
+class RateEngine:
+    """Tasas por VM a partir de muestras consecutivas de sus contadores
+
+    Guarda solo la última muestra de cada VM; update() retorna el dict de
+    tasas del intervalo o None en la primera muestra y tras un reinicio
+    de contadores.
+    """
+
+    def __init__(self):
+        self._previous: Dict[str, tuple] = {}  # {vm: (id de dominio, instante monótono, stats)}
+        self.resets = 0                        # Reinicios de contadores detectados
+
+    def forget(self, vm_name: str):
+        """Descarta la muestra guardada (VM apagada o sin stats)"""
+        self._previous.pop(vm_name, None)
+
+    def update(self, vm_name: str, domain_id, stats: Dict, sampled_at: float) -> Optional[Dict]:
+        """Registra la muestra de una VM y retorna las tasas desde la anterior"""
+        previous = self._previous.get(vm_name)
+        self._previous[vm_name] = (domain_id, sampled_at, stats)
+        if previous is None:
+            return None
+
+        previous_id, previous_at, before = previous
+        elapsed = sampled_at - previous_at
+        if elapsed <= 0:
+            return None
+        cpu_time, cpu_before = stats.get('cpu_time'), before.get('cpu_time')
+        if previous_id != domain_id or (cpu_time is not None and cpu_before is not None and cpu_time < cpu_before):
+            self.resets += 1
+            logger.info(f"Contadores de {vm_name} reiniciados (id {previous_id} → {domain_id}); "
+                        f"se omite el intervalo")
+            return None
+
+        rates = dict(EMPTY_RATES, interval=elapsed, block={}, net={})
+        if cpu_time is not None and cpu_before is not None:
+            vcpus = stats.get('vcpu_current') or stats.get('vcpu_count') or 1
+            rates['cpu_percent'] = min(100.0, (cpu_time - cpu_before) / 1e9 / (elapsed * vcpus) * 100)
+
+        # Disco y red: por dispositivo (emparejados por nombre) y la suma por VM
+        block_totals = dict.fromkeys(BLOCK_COUNTERS, 0)
+        previous_block = {device.get('name'): device for device in before.get('block_devices', ())}
+        for device in stats.get('block_devices', ()):
+            deltas = _device_deltas(device, previous_block.get(device.get('name')), BLOCK_COUNTERS)
+            if deltas is None:
+                continue
+            requests = deltas['rd_reqs'] + deltas['wr_reqs']
+            device_rates = {
+                'read_iops': deltas['rd_reqs'] / elapsed,
+                'write_iops': deltas['wr_reqs'] / elapsed,
+                'read_mbps': deltas['rd_bytes'] / elapsed / _MB,
+                'write_mbps': deltas['wr_bytes'] / elapsed / _MB,
+                # Latencia del intervalo (rd/wr.times en ns), no la media desde el arranque
+                'read_latency_ms': _per_request(deltas['rd_times'], deltas['rd_reqs'], 1e6),
+                'write_latency_ms': _per_request(deltas['wr_times'], deltas['wr_reqs'], 1e6),
+                'latency_ms': _per_request(deltas['rd_times'] + deltas['wr_times'], requests, 1e6),
+                'kb_per_request': _per_request(deltas['rd_bytes'] + deltas['wr_bytes'], requests, 1024),
+            }
+            rates['block'][device.get('name')] = device_rates
+            for counter in BLOCK_COUNTERS:
+                block_totals[counter] += deltas[counter]
+
+        rates['read_iops'] = block_totals['rd_reqs'] / elapsed
+        rates['write_iops'] = block_totals['wr_reqs'] / elapsed
+        rates['disk_read_mbps'] = block_totals['rd_bytes'] / elapsed / _MB
+        rates['disk_write_mbps'] = block_totals['wr_bytes'] / elapsed / _MB
+        rates['read_latency_ms'] = _per_request(block_totals['rd_times'], block_totals['rd_reqs'], 1e6)
+        rates['write_latency_ms'] = _per_request(block_totals['wr_times'], block_totals['wr_reqs'], 1e6)
+
+        previous_net = {device.get('name'): device for device in before.get('net_devices', ())}
+        for device in stats.get('net_devices', ()):
+            deltas = _device_deltas(device, previous_net.get(device.get('name')), NET_COUNTERS)
+            if deltas is None:
+                continue
+            device_rates = {
+                'rx_mbps': deltas['rx_bytes'] / elapsed / _MB,
+                'tx_mbps': deltas['tx_bytes'] / elapsed / _MB,
+                'rx_pps': deltas['rx_pkts'] / elapsed,
+                'tx_pps': deltas['tx_pkts'] / elapsed,
+                'rx_drop_ps': deltas['rx_drop'] / elapsed,
+                'tx_drop_ps': deltas['tx_drop'] / elapsed,
+            }
+            rates['net'][device.get('name')] = device_rates
+            rates['net_rx_mbps'] += device_rates['rx_mbps']
+            rates['net_tx_mbps'] += device_rates['tx_mbps']
+
+        # Presión (PSI) del cgroup: % del intervalo con tareas del dominio esperando el recurso
+        for resource, kind in PRESSURE_KINDS:
+            key = f'cgroup_{resource}_{kind}_total_usec'
+            current, previous_total = stats.get(key), before.get(key)
+            if current is not None and previous_total is not None and current >= previous_total:
+                rates[f'{resource}_pressure_{kind}'] = min(100.0, (current - previous_total) / (elapsed * 1e6) * 100)
+
+        # Robo de CPU: tiempo de las vCPUs esperando en la cola del planificador del host (vcpu.N.delay)
+        previous_delays = {vcpu['index']: vcpu.get('delay') for vcpu in before.get('vcpus', ())}
+        delays = []
+        for vcpu in stats.get('vcpus', ()):
+            delay, delay_before = vcpu.get('delay'), previous_delays.get(vcpu['index'])
+            if isinstance(delay, int) and isinstance(delay_before, int) and delay >= delay_before:
+                delays.append(delay - delay_before)
+        if delays:
+            rates['cpu_steal_percent'] = min(100.0, sum(delays) / 1e9 / (elapsed * len(delays)) * 100)
+
+        # Memoria del guest: sus contadores solo avanzan cuando informa el balloon (balloon.last-update)
+        updated, updated_before = stats.get('memory_stats_updated'), before.get('memory_stats_updated')
+        if updated and updated_before and updated > updated_before:
+            for key, counter in MEMORY_COUNTERS:
+                current, previous_value = stats.get(counter), before.get(counter)
+                if current is not None and previous_value is not None and current >= previous_value:
+                    rates[key] = (current - previous_value) / (updated - updated_before)
+
+        rates['threads'] = _thread_rates(stats, before, elapsed)
+        return rates
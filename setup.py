@@ -30,6 +30,32 @@ setup(
         'ui',
         'notifications',
         'widgets',
+        'metrics_store',
+        'collector',
+        'exporter',
+        'app',
+        'headless',
+        'startup',
+        'state_cache',
+        'frame_stats',
+        'card_view',
+        'snapshot_widgets',
+        'heatmap',
+        'history_chart',
+        'fleet_summary',
+        'rates',
+        'disk_stats',
+        'host_metrics',
+        'qemu_proc',
+        'cgroup_stats',
+        'qemu_threads',
+        'host_topology',
+        'placement',
+        'pinning',
+        'memory_stats',
+        'audit_log',
+        'balloon_policy',
+        'vcpu_policy',
         'debug_memory'
     ],
     
@@ -41,6 +67,8 @@ setup(
     
     # Dependencias del sistema (informativo)
     extras_require={
+        # Opcional: reducción LTTB vectorizada del historial largo
+        'numpy': ['numpy'],
         'system': [
             'gtk4',
             'libadwaita',
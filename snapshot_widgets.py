@@ -0,0 +1,670 @@
+"""
+Widgets de métricas dibujados con nodos de render de GSK (Gtk.Snapshot)
+
+Los widgets de widgets.py son Gtk.DrawingArea: GTK no puede reutilizar
+lo que dibujan y los rasteriza en software en cada frame. Aquí cada
+widget implementa do_snapshot() y emite nodos de color, gradiente y
+trazo/relleno que el renderer de GSK (normalmente GL/Vulkan) compone y
+cachea. Las partes estáticas (fondos, anillos, rejilla, títulos,
+marcadores) se construyen una vez como nodos y se reutilizan.
+
+Los trazos necesitan GskPath (GTK >= 4.14). Si no está disponible, o con
+VMPANEL_CAIRO_WIDGETS=1, este módulo exporta los widgets cairo de
+widgets.py con la misma API.
+"""
+import gi
+gi.require_version('Gtk', '4.0')
+gi.require_version('Gsk', '4.0')
+gi.require_version('Graphene', '1.0')
+from gi.repository import Gtk, Gdk, Gsk, Graphene, Pango
+import frame_stats
+import math
+import os
+from collections import deque
+from typing import Callable, Dict, List, Tuple
+
+import widgets
+from widgets import ValueAnimation, new_layout, theme_key
+
+HAVE_GSK_PATHS = hasattr(Gsk, 'PathBuilder') and hasattr(Gtk.Snapshot, 'append_stroke')
+USE_RENDER_NODES = HAVE_GSK_PATHS and os.environ.get('VMPANEL_CAIRO_WIDGETS') != '1'
+
+# Nodos estáticos compartidos por todos los widgets del mismo tipo
+# {(tipo, ancho, alto, tema, ...): Gsk.RenderNode}
+_static_nodes: Dict[tuple, Gsk.RenderNode] = {}
+_STATIC_NODES_MAX = 64
+
+
+def get_static_node(key: tuple, build: Callable[[Gtk.Snapshot], None]) -> Gsk.RenderNode:
+    """Retorna el nodo estático para key, construyéndolo con build() si no existe
+
+    Los nodos no dependen de la escala del monitor: GSK los rasteriza a
+    la resolución de cada superficie y puede cachear el resultado.
+    """
+    node = _static_nodes.get(key)
+    if node is not None:
+        return node
+
+    if len(_static_nodes) >= _STATIC_NODES_MAX:
+        _static_nodes.clear()
+
+    snapshot = Gtk.Snapshot.new()
+    build(snapshot)
+    node = snapshot.to_node()
+    _static_nodes[key] = node
+    return node
+
+
+def clear_static_nodes():
+    """Descarta todos los nodos estáticos (p. ej. en benchmarks)"""
+    _static_nodes.clear()
+
+
+def _rgba(r: float, g: float, b: float, a: float = 1.0) -> Gdk.RGBA:
+    color = Gdk.RGBA()
+    color.red = min(1.0, r)
+    color.green = min(1.0, g)
+    color.blue = min(1.0, b)
+    color.alpha = a
+    return color
+
+
+def _rect(x: float, y: float, width: float, height: float) -> Graphene.Rect:
+    return Graphene.Rect().init(x, y, width, height)
+
+
+def _point(x: float, y: float) -> Graphene.Point:
+    return Graphene.Point().init(x, y)
+
+
+def _stops(stops: List[Tuple[float, Tuple[float, ...]]]) -> List[Gsk.ColorStop]:
+    """[(offset, (r, g, b[, a])), ...] -> lista de Gsk.ColorStop"""
+    result = []
+    for offset, color in stops:
+        stop = Gsk.ColorStop()
+        stop.offset = offset
+        stop.color = _rgba(*color)
+        result.append(stop)
+    return result
+
+
+def _stroke(line_width: float, round_caps: bool = True) -> Gsk.Stroke:
+    stroke = Gsk.Stroke.new(line_width)
+    if round_caps:
+        stroke.set_line_cap(Gsk.LineCap.ROUND)
+        stroke.set_line_join(Gsk.LineJoin.ROUND)
+    return stroke
+
+
+def _circle_path(x: float, y: float, radius: float) -> Gsk.Path:
+    builder = Gsk.PathBuilder.new()
+    builder.add_circle(_point(x, y), radius)
+    return builder.to_path()
+
+
+def _rect_path(x: float, y: float, width: float, height: float) -> Gsk.Path:
+    builder = Gsk.PathBuilder.new()
+    builder.add_rect(_rect(x, y, width, height))
+    return builder.to_path()
+
+
+def _append_layout_with_shadow(snapshot: Gtk.Snapshot, layout: Pango.Layout, x: float, y: float,
+                               shadow_alpha: float, rgb: Tuple[float, float, float]):
+    """Añade un layout con sombra desplazada 1px"""
+    snapshot.save()
+    snapshot.translate(_point(x + 1, y + 1))
+    snapshot.append_layout(layout, _rgba(0, 0, 0, shadow_alpha))
+    snapshot.restore()
+    snapshot.save()
+    snapshot.translate(_point(x, y))
+    snapshot.append_layout(layout, _rgba(*rgb))
+    snapshot.restore()
+
+
+class CircularProgressNodeRenderer:
+    """Nodos del gráfico circular, independiente del widget
+
+    Sombra, anillo de fondo y título forman un nodo estático por
+    (tamaño, tema, título); en cada frame solo se emiten el arco y la
+    etiqueta.
+    """
+
+    LINE_WIDTH = 14
+
+    def __init__(self, size: int = 120):
+        self.size = size
+        self.percentage = 0.0
+        self.title = ""
+        self._label = None
+        self._label_layout = new_layout("Sans Bold 24px")
+        self._label_size = (0, 0)
+        self._title_layout = new_layout("Sans 13px")
+
+    def set_label(self, label: str):
+        """Actualiza la etiqueta; el layout solo se rehace si cambia el texto"""
+        if label != self._label:
+            self._label = label
+            self._label_layout.set_text(label, -1)
+            frame_stats.count('text_layouts')
+            self._label_size = self._label_layout.get_pixel_size()
+
+    def _geometry(self, width: int, height: int) -> Tuple[float, float, float]:
+        # Círculo en la parte inferior para dejar espacio al título
+        center_x = width / 2
+        center_y = height - (self.size / 2)
+        radius = (self.size / 2) - 12
+        return center_x, center_y, radius
+
+    def _build_static(self, snapshot: Gtk.Snapshot, width: int, height: int):
+        """Nodo estático: sombra, anillo de fondo con gradiente y título"""
+        center_x, center_y, radius = self._geometry(width, height)
+
+        # Sombra del fondo del círculo
+        snapshot.append_stroke(_circle_path(center_x + 2, center_y + 2, radius),
+                               _stroke(self.LINE_WIDTH + 2, False), _rgba(0, 0, 0, 0.15))
+
+        # Fondo del círculo con gradiente radial (el trazo hace de máscara)
+        outer = radius + self.LINE_WIDTH / 2
+        snapshot.push_stroke(_circle_path(center_x, center_y, radius), _stroke(self.LINE_WIDTH, False))
+        snapshot.append_radial_gradient(
+            _rect(center_x - outer, center_y - outer, 2 * outer, 2 * outer), _point(center_x, center_y),
+            radius, radius, 0, 1,
+            _stops([(0, (0.15, 0.15, 0.15, 0.3)), (1, (0.05, 0.05, 0.05, 0.1))])
+        )
+        snapshot.pop()
+
+        # Título encima del círculo
+        if self.title:
+            self._title_layout.set_text(self.title, -1)
+            title_width, _title_height = self._title_layout.get_pixel_size()
+            title_x = center_x - title_width / 2
+            # Línea base 18px por encima del anillo
+            title_y = center_y - radius - 18 - self._title_layout.get_baseline() / Pango.SCALE
+            _append_layout_with_shadow(snapshot, self._title_layout, title_x, title_y, 0.4, (0.8, 0.8, 0.8))
+
+    def _get_color(self) -> Tuple[float, float, float]:
+        """Retorna color según porcentaje"""
+        if self.percentage < 70:
+            # Verde
+            return (0.15, 0.76, 0.41)
+        elif self.percentage < 85:
+            # Amarillo/Naranja
+            return (0.96, 0.76, 0.07)
+        else:
+            # Rojo
+            return (0.88, 0.11, 0.14)
+
+    def _arc_path(self, center_x: float, center_y: float, radius: float) -> Gsk.Path:
+        """Arco desde las 12 en sentido horario hasta el porcentaje actual"""
+        builder = Gsk.PathBuilder.new()
+        if self.percentage >= 99.99:
+            builder.add_circle(_point(center_x, center_y), radius)
+            return builder.to_path()
+
+        start_angle = -math.pi / 2
+        end_angle = start_angle + (2 * math.pi * self.percentage / 100)
+        builder.move_to(center_x + radius * math.cos(start_angle), center_y + radius * math.sin(start_angle))
+        builder.svg_arc_to(radius, radius, 0, self.percentage > 50, True,
+                           center_x + radius * math.cos(end_angle), center_y + radius * math.sin(end_angle))
+        return builder.to_path()
+
+    def snapshot(self, snapshot: Gtk.Snapshot, width: int, height: int, theme=None):
+        """Añade el nodo estático, el arco y la etiqueta"""
+        key = ('circular', width, height, self.size, theme, self.title)
+        snapshot.append_node(get_static_node(key, lambda node_snapshot:
+                                             self._build_static(node_snapshot, width, height)))
+
+        center_x, center_y, radius = self._geometry(width, height)
+
+        # Arco de progreso
+        if self.percentage > 0:
+            r, g, b = self._get_color()
+            path = self._arc_path(center_x, center_y, radius)
+
+            # Sombra del arco de progreso
+            snapshot.save()
+            snapshot.translate(_point(1, 1))
+            snapshot.append_stroke(path, _stroke(self.LINE_WIDTH + 1), _rgba(r, g, b, 0.3))
+            snapshot.restore()
+
+            # Arco principal con gradiente
+            outer = radius + self.LINE_WIDTH
+            snapshot.push_stroke(path, _stroke(self.LINE_WIDTH))
+            snapshot.append_linear_gradient(
+                _rect(center_x - outer, center_y - outer, 2 * outer, 2 * outer),
+                _point(center_x - radius, center_y), _point(center_x + radius, center_y),
+                _stops([(0, (r, g, b, 0.8)), (0.5, (r + 0.1, g + 0.1, b + 0.1, 1.0)), (1, (r, g, b, 0.8))])
+            )
+            snapshot.pop()
+
+            # Brillo interior
+            snapshot.append_stroke(path, _stroke(self.LINE_WIDTH - 4), _rgba(1, 1, 1, 0.2))
+
+        # Etiqueta del porcentaje con sombra
+        if self._label:
+            label_width, label_height = self._label_size
+            _append_layout_with_shadow(snapshot, self._label_layout, center_x - label_width / 2,
+                                       center_y - label_height / 2, 0.5, (0.95, 0.95, 0.95))
+
+
+class MiniLineChartNodeRenderer:
+    """Nodos del mini gráfico de línea, independiente del widget
+
+    Fondo, borde, rejilla y título son un nodo estático compartido. Cada
+    segmento de la serie (relleno, línea y marcador de su punto inicial)
+    se construye una sola vez como nodo en coordenadas absolutas; en cada
+    frame se reutilizan todos bajo una traslación, así que un punto nuevo
+    solo cuesta un nodo nuevo.
+    """
+
+    MARGIN_LEFT = 12
+    MARGIN_RIGHT = 12
+    MARGIN_TOP = 22
+    MARGIN_BOTTOM = 12
+    PAD = 6          # Margen del recorte para marcadores y grosor de línea
+    LINE_WIDTH = 2.5
+    MARKER_RADIUS = 3
+
+    def __init__(self, max_points: int = 30, show_markers: bool = True):
+        self.max_points = max_points
+        self.show_markers = show_markers
+        self.data_points = deque(maxlen=max_points)
+        self.title = ""
+        self.color = (0.2, 0.6, 1.0)
+        self._total = 0            # Puntos añadidos desde el principio (índice absoluto del siguiente)
+        self._value_layout = new_layout("Sans Bold 11px")
+        self._value_text = None
+        self._value_width = 0
+        # Nodos de segmento: (índice absoluto del punto final, nodo)
+        self._segments = deque(maxlen=max_points - 1)
+        self._segments_key = None
+
+    def add_data_point(self, value: float):
+        self.data_points.append(max(0.0, min(100.0, value)))
+        self._total += 1
+
+    def set_color(self, r: float, g: float, b: float):
+        self.color = (r, g, b)
+        self._segments.clear()
+
+    def _layout(self, width: int, height: int) -> Tuple[float, float, float]:
+        chart_width = width - self.MARGIN_LEFT - self.MARGIN_RIGHT
+        chart_height = height - self.MARGIN_TOP - self.MARGIN_BOTTOM
+        x_step = chart_width / (self.max_points - 1)
+        return chart_width, chart_height, x_step
+
+    def _build_static(self, snapshot: Gtk.Snapshot, width: int, height: int):
+        """Nodo estático: fondo con gradiente, borde, rejilla y título"""
+        chart_width, chart_height, _x_step = self._layout(width, height)
+        left, top = self.MARGIN_LEFT, self.MARGIN_TOP
+
+        # Fondo con gradiente
+        snapshot.append_linear_gradient(
+            _rect(left, top, chart_width, chart_height), _point(left, top), _point(left, top + chart_height),
+            _stops([(0, (0.08, 0.08, 0.08, 0.4)), (1, (0.04, 0.04, 0.04, 0.2))])
+        )
+
+        # Borde del área del gráfico
+        snapshot.append_stroke(_rect_path(left, top, chart_width, chart_height), _stroke(1, False),
+                               _rgba(0.2, 0.2, 0.2, 0.6))
+
+        # Grid horizontal (líneas superior e inferior más visibles)
+        for i in range(5):
+            y = top + (chart_height / 4) * i
+            if i == 0 or i == 4:
+                color = _rgba(0.3, 0.3, 0.3, 0.7)
+            else:
+                color = _rgba(0.2, 0.2, 0.2, 0.4)
+            snapshot.append_color(color, _rect(left, y - 0.25, chart_width, 0.5))
+
+        # Título con sombra
+        if self.title:
+            title_layout = new_layout("Sans 11px")
+            title_layout.set_text(self.title, -1)
+            baseline = title_layout.get_baseline() / Pango.SCALE
+            _append_layout_with_shadow(snapshot, title_layout, left, 12 - baseline, 0.4, (0.85, 0.85, 0.85))
+
+    def _marker_node(self) -> Gsk.RenderNode:
+        """Nodo del marcador de punto (sombra + gradiente + brillo)"""
+        r, g, b = self.color
+        radius = self.MARKER_RADIUS
+
+        def build(snapshot):
+            center = radius
+            snapshot.append_fill(_circle_path(center + 1, center + 1, radius), Gsk.FillRule.WINDING,
+                                 _rgba(0, 0, 0, 0.3))
+            snapshot.push_fill(_circle_path(center, center, radius), Gsk.FillRule.WINDING)
+            snapshot.append_radial_gradient(
+                _rect(0, 0, 2 * radius, 2 * radius), _point(center, center), radius, radius, 0, 1,
+                _stops([(0, (1, 1, 1, 0.8)), (0.5, (r, g, b, 1.0)), (1, (r * 0.7, g * 0.7, b * 0.7, 1.0))])
+            )
+            snapshot.pop()
+            snapshot.append_fill(_circle_path(center, center, radius / 2), Gsk.FillRule.WINDING,
+                                 _rgba(1, 1, 1, 0.6))
+
+        return get_static_node(('chart-marker', self.color), build)
+
+    def _point(self, index: int, chart_height: float, x_step: float) -> Tuple[float, float]:
+        """Posición de un punto (índice absoluto) en coordenadas de la serie"""
+        value = self.data_points[index - (self._total - len(self.data_points))]
+        return index * x_step, self.MARGIN_TOP + chart_height - (value / 100 * chart_height)
+
+    def _build_segment(self, index: int, chart_height: float, x_step: float, marker) -> Gsk.RenderNode:
+        """Nodo del segmento index-1 → index"""
+        r, g, b = self.color
+        top = self.MARGIN_TOP
+        bottom = top + chart_height
+        (x0, y0), (x1, y1) = self._point(index - 1, chart_height, x_step), self._point(index, chart_height, x_step)
+        snapshot = Gtk.Snapshot.new()
+
+        # Área bajo la curva con gradiente vertical (igual en todos los segmentos: no hay costuras)
+        builder = Gsk.PathBuilder.new()
+        builder.move_to(x0, bottom)
+        builder.line_to(x0, y0)
+        builder.line_to(x1, y1)
+        builder.line_to(x1, bottom)
+        builder.close()
+        snapshot.push_fill(builder.to_path(), Gsk.FillRule.WINDING)
+        snapshot.append_linear_gradient(
+            _rect(x0, top, x1 - x0, chart_height), _point(x0, bottom), _point(x0, top),
+            _stops([(0, (r, g, b, 0.3)), (1, (r, g, b, 0.05))])
+        )
+        snapshot.pop()
+
+        # Línea principal (opaca, para que los segmentos se unan sin costuras)
+        builder = Gsk.PathBuilder.new()
+        builder.move_to(x0, y0)
+        builder.line_to(x1, y1)
+        snapshot.append_stroke(builder.to_path(), _stroke(self.LINE_WIDTH), _rgba(r, g, b))
+
+        # Marcador del punto inicial; el del último punto se añade en vivo
+        if marker is not None:
+            snapshot.save()
+            snapshot.translate(_point(x0 - self.MARKER_RADIUS, y0 - self.MARKER_RADIUS))
+            snapshot.append_node(marker)
+            snapshot.restore()
+        return snapshot.to_node()
+
+    def _sync_segments(self, width: int, height: int, marker):
+        """Construye los nodos de los segmentos nuevos"""
+        _chart_width, chart_height, x_step = self._layout(width, height)
+        key = (width, height, self.max_points, self.show_markers, self.color)
+        first_visible = self._total - len(self.data_points)
+
+        if self._segments_key != key or not self._segments or self._segments[-1][0] <= first_visible:
+            self._segments.clear()
+            self._segments_key = key
+            first = first_visible + 1
+        else:
+            first = self._segments[-1][0] + 1
+
+        for index in range(first, self._total):
+            self._segments.append((index, self._build_segment(index, chart_height, x_step, marker)))
+
+    def snapshot(self, snapshot: Gtk.Snapshot, width: int, height: int, theme=None):
+        """Añade fondo, serie y valor actual"""
+        if not self.data_points:
+            return
+
+        key = ('chart', width, height, theme, self.title)
+        snapshot.append_node(get_static_node(key, lambda node_snapshot:
+                                             self._build_static(node_snapshot, width, height)))
+
+        chart_width, chart_height, x_step = self._layout(width, height)
+        marker = self._marker_node() if self.show_markers else None
+        self._sync_segments(width, height, marker)
+
+        # Serie: los segmentos se colocan según el primer punto visible
+        first_visible = self._total - len(self.data_points)
+        offset_x = self.MARGIN_LEFT - first_visible * x_step
+        snapshot.push_clip(_rect(self.MARGIN_LEFT, self.MARGIN_TOP - self.PAD,
+                                 chart_width + self.PAD, chart_height + 2 * self.PAD))
+        snapshot.save()
+        snapshot.translate(_point(offset_x, 0))
+        for index, node in self._segments:
+            if index > first_visible:
+                snapshot.append_node(node)
+
+        # Marcador del último punto
+        if marker is not None and len(self.data_points) > 1:
+            x, y = self._point(self._total - 1, chart_height, x_step)
+            snapshot.translate(_point(x - self.MARKER_RADIUS, y - self.MARKER_RADIUS))
+            snapshot.append_node(marker)
+        snapshot.restore()
+        snapshot.pop()
+
+        # Valor actual (layout cacheado mientras no cambie el texto)
+        text = f"{self.data_points[-1]:.1f}%"
+        if text != self._value_text:
+            self._value_text = text
+            self._value_layout.set_text(text, -1)
+            frame_stats.count('text_layouts')
+            self._value_width = self._value_layout.get_pixel_size()[0]
+        baseline = self._value_layout.get_baseline() / Pango.SCALE
+        _append_layout_with_shadow(snapshot, self._value_layout, width - self.MARGIN_RIGHT - self._value_width,
+                                   12 - baseline, 0.4, (0.95, 0.95, 0.95))
+
+
+class DiskUsageBarNodeRenderer:
+    """Nodos de la barra de uso de disco, independiente del widget"""
+
+    def __init__(self):
+        self.percentage = 0.0
+        self._text = None
+        self._text_layout = new_layout("Sans Bold 13px")
+        self._text_size = (0, 0)
+
+    def set_text(self, text: str):
+        if text != self._text:
+            self._text = text
+            self._text_layout.set_text(text, -1)
+            frame_stats.count('text_layouts')
+            self._text_size = self._text_layout.get_pixel_size()
+
+    @staticmethod
+    def _build_static(snapshot: Gtk.Snapshot, width: int, height: int):
+        """Nodo estático: fondo con gradiente y borde"""
+        snapshot.append_linear_gradient(
+            _rect(0, 0, width, height), _point(0, 0), _point(0, height),
+            _stops([(0, (0.15, 0.15, 0.15, 0.4)), (1, (0.08, 0.08, 0.08, 0.2))])
+        )
+        snapshot.append_stroke(_rect_path(0, 0, width, height), _stroke(1, False), _rgba(0.2, 0.2, 0.2, 0.6))
+
+    @staticmethod
+    def _gradient_stops(percentage: float) -> List[Gsk.ColorStop]:
+        if percentage < 70:
+            # Verde moderno
+            edge, middle = (0.06, 0.73, 0.39), (0.16, 0.85, 0.49)
+        elif percentage < 85:
+            # Amarillo/Naranja moderno
+            edge, middle = (0.96, 0.76, 0.07), (0.99, 0.85, 0.15)
+        else:
+            # Rojo moderno
+            edge, middle = (0.88, 0.11, 0.14), (0.95, 0.15, 0.18)
+        return _stops([(0, edge), (0.5, middle), (1, edge)])
+
+    def snapshot(self, snapshot: Gtk.Snapshot, width: int, height: int, theme=None):
+        """Añade el fondo estático, la barra y el texto"""
+        snapshot.append_node(get_static_node(('disk-bar', width, height, theme), lambda node_snapshot:
+                                             self._build_static(node_snapshot, width, height)))
+
+        if self.percentage > 0:
+            bar_width = width * (self.percentage / 100)
+            snapshot.push_clip(_rect(0, 0, width, height))
+
+            # Sombra de la barra
+            snapshot.append_color(_rgba(0, 0, 0, 0.2), _rect(2, 2, bar_width, height))
+
+            # Barra con gradiente según porcentaje
+            snapshot.append_linear_gradient(_rect(0, 0, bar_width, height), _point(0, 0), _point(bar_width, 0),
+                                            self._gradient_stops(self.percentage))
+
+            # Brillo superior y borde de la barra
+            snapshot.append_color(_rgba(1, 1, 1, 0.2), _rect(0, 0, bar_width, height * 0.3))
+            snapshot.append_stroke(_rect_path(0, 0, bar_width, height), _stroke(1, False), _rgba(1, 1, 1, 0.1))
+            snapshot.pop()
+
+        # Texto centrado con sombra
+        if self._text:
+            text_width, text_height = self._text_size
+            _append_layout_with_shadow(snapshot, self._text_layout, (width - text_width) / 2,
+                                       (height - text_height) / 2, 0.6, (0.95, 0.95, 0.95))
+
+
+class SnapshotWidget(Gtk.Widget):
+    """Widget de tamaño fijo que se dibuja con do_snapshot()
+
+    Igual que BatchedDrawingArea, varias llamadas a queue_redraw() antes
+    del siguiente frame solo invalidan el widget una vez, y cada snapshot
+    se anota en frame_stats. Las subclases implementan _snapshot().
+    """
+
+    def __init__(self, width: int, height: int):
+        super().__init__()
+        self._content_size = (width, height)
+        self._redraw_queued = False
+
+    def queue_redraw(self):
+        if not self._redraw_queued:
+            self._redraw_queued = True
+            self.queue_draw()
+
+    def do_measure(self, orientation, for_size):
+        width, height = self._content_size
+        size = width if orientation == Gtk.Orientation.HORIZONTAL else height
+        return size, size, -1, -1
+
+    def do_snapshot(self, snapshot):
+        self._redraw_queued = False
+        frame_stats.count('draws')
+        self._snapshot(snapshot, self.get_width(), self.get_height())
+
+    def _snapshot(self, snapshot, width, height):
+        raise NotImplementedError
+
+
+class CircularProgressNodeWidget(SnapshotWidget):
+    """Widget circular para mostrar progreso con nodos de GSK"""
+
+    def __init__(self, size=120):
+        super().__init__(size, size + 30)  # +30px para el título
+        self.size = size
+        self.percentage = 0.0
+        self.label = "0%"
+        self.title = ""
+        self._renderer = CircularProgressNodeRenderer(size)
+        self._renderer.set_label(self.label)
+        self._animation = ValueAnimation(self)
+
+    def set_value(self, percentage: float, label: str = None, title: str = None):
+        """Actualiza el valor del gráfico circular"""
+        new_percentage = max(0.0, min(100.0, percentage))
+        new_label = label if label else f"{new_percentage:.1f}%"
+        new_title = title if title else self.title
+
+        # Solo redibujar si los valores cambiaron significativamente
+        if (abs(new_percentage - self.percentage) > 0.5 or
+                new_label != self.label or
+                new_title != self.title):
+            self.percentage = new_percentage
+            self.label = new_label
+            self.title = new_title
+            self._renderer.title = new_title
+            self._renderer.set_label(new_label)
+            self._animation.set_target(new_percentage)
+            self.queue_redraw()
+
+    def _snapshot(self, snapshot, width, height):
+        # El arco sigue al valor animado; la etiqueta muestra ya el valor final
+        self._renderer.percentage = self._animation.value
+        self._renderer.snapshot(snapshot, width, height, theme_key())
+
+
+class MiniLineChartNodeWidget(SnapshotWidget):
+    """Mini gráfico de línea para mostrar historial, con nodos de GSK"""
+
+    def __init__(self, width=200, height=60, max_points=30, show_markers=True):
+        super().__init__(width, height)
+        self.width = width
+        self.height = height
+        self.max_points = max_points
+        self._renderer = MiniLineChartNodeRenderer(max_points, show_markers)
+
+    @property
+    def data_points(self) -> List[float]:
+        return list(self._renderer.data_points)
+
+    @property
+    def title(self) -> str:
+        return self._renderer.title
+
+    @property
+    def color(self) -> Tuple[float, float, float]:
+        return self._renderer.color
+
+    def add_data_point(self, value: float):
+        """Agrega un punto al historial"""
+        points = self._renderer.data_points
+        previous = points[-1] if points else None
+        self._renderer.add_data_point(value)
+
+        # Con el historial lleno la serie se desplaza, así que siempre hay que redibujar
+        if (previous is None or len(points) == self.max_points or
+                abs(points[-1] - previous) > 0.5):
+            self.queue_redraw()
+
+    def set_title(self, title: str):
+        """Establece el título"""
+        self._renderer.title = title
+        self.queue_redraw()
+
+    def set_color(self, r: float, g: float, b: float):
+        """Establece el color de la línea"""
+        self._renderer.set_color(r, g, b)
+        self.queue_redraw()
+
+    def _snapshot(self, snapshot, width, height):
+        self._renderer.snapshot(snapshot, width, height, theme_key())
+
+
+class DiskUsageBarNodeWidget(SnapshotWidget):
+    """Barra de uso de disco con gradiente, con nodos de GSK"""
+
+    def __init__(self, width=300, height=30):
+        super().__init__(width, height)
+        self.width = width
+        self.height = height
+        self.percentage = 0.0
+        self.used_gb = 0.0
+        self.total_gb = 0.0
+        self._renderer = DiskUsageBarNodeRenderer()
+        self._renderer.set_text("0.0 GB / 0.0 GB (0.0%)")
+        self._animation = ValueAnimation(self)
+
+    def set_value(self, percentage: float, used_gb: float, total_gb: float):
+        """Actualiza los valores (solo redibuja si cambia lo que se ve)"""
+        new_percentage = max(0.0, min(100.0, percentage))
+        if (round(new_percentage, 1) == round(self.percentage, 1) and
+                round(used_gb, 1) == round(self.used_gb, 1) and round(total_gb, 1) == round(self.total_gb, 1)):
+            return
+        self.percentage = new_percentage
+        self.used_gb = used_gb
+        self.total_gb = total_gb
+        self._renderer.set_text(f"{used_gb:.1f} GB / {total_gb:.1f} GB ({new_percentage:.1f}%)")
+        self._animation.set_target(new_percentage)
+        self.queue_redraw()
+
+    def _snapshot(self, snapshot, width, height):
+        # La barra sigue al valor animado; el texto muestra ya el valor final
+        self._renderer.percentage = self._animation.value
+        self._renderer.snapshot(snapshot, width, height, theme_key())
+
+
+if USE_RENDER_NODES:
+    CircularProgressWidget = CircularProgressNodeWidget
+    MiniLineChartWidget = MiniLineChartNodeWidget
+    DiskUsageBarWidget = DiskUsageBarNodeWidget
+else:
+    CircularProgressWidget = widgets.CircularProgressWidget
+    MiniLineChartWidget = widgets.MiniLineChartWidget
+    DiskUsageBarWidget = widgets.DiskUsageBarWidget
@@ -0,0 +1,36 @@
+"""
+Medición del tiempo de arranque
+
+Registra en el log los hitos del arranque relativos a la importación de
+este módulo (el primero que carga main.py). Con VMPANEL_STARTUP_BENCH=1
+la aplicación imprime cada hito en stdout y se cierra al mostrar los
+primeros datos, para que bench_startup.py mida arranques en frío.
+No importa GTK.
+"""
+import logging
+import os
+import time
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+T0 = time.perf_counter()
+BENCH = os.environ.get('VMPANEL_STARTUP_BENCH') == '1'
+BENCH_PREFIX = 'STARTUP'
+
+_marks: List[Tuple[str, float]] = []
+
+
+def mark(phase: str) -> float:
+    """Registra un hito y retorna los milisegundos desde el arranque"""
+    elapsed_ms = (time.perf_counter() - T0) * 1000
+    _marks.append((phase, elapsed_ms))
+    logger.info(f"[arranque +{elapsed_ms:.0f} ms] {phase}")
+    if BENCH:
+        print(f"{BENCH_PREFIX} {elapsed_ms:.1f} {phase}", flush=True)
+    return elapsed_ms
+
+
+def marks() -> List[Tuple[str, float]]:
+    """Hitos registrados hasta ahora como (fase, ms)"""
+    return list(_marks)
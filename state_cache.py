@@ -0,0 +1,82 @@
+"""
+Caché del último estado conocido de la flota (arranque en caliente)
+
+Guarda en disco el último FleetSnapshot (lista de VMs, estados, IPs,
+config de dominio parseada) junto con el historial reciente de los
+gráficos de cada tarjeta. Al arrancar, la ventana lo pinta de inmediato
+marcado como obsoleto y el recolector lo sustituye en cuanto termina su
+primer ciclo. No importa GTK.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from collector import FleetSnapshot
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+SAVE_INTERVAL = 60.0  # Segundos entre guardados mientras la ventana está abierta
+
+
+def default_cache_path() -> str:
+    """Ruta por defecto de la caché (XDG_CACHE_HOME)"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'manjaro-vm-panel', 'state.json')
+
+
+class StateCache:
+    """Lectura y escritura atómica del último estado conocido"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_cache_path()
+        self._lock = threading.Lock()
+
+    def load(self) -> Optional[Tuple[FleetSnapshot, Dict[str, Dict[str, List[float]]]]]:
+        """Retorna (snapshot obsoleto, {vm: {métrica: valores}}) o None"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = json.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Caché de estado ilegible en {self.path}: {e}")
+            return None
+
+        if not isinstance(data, dict) or data.get('version') != CACHE_VERSION:
+            logger.info("Caché de estado de otra versión, se ignora")
+            return None
+
+        try:
+            snapshot = FleetSnapshot.from_dict(data['snapshot'])
+        except (KeyError, TypeError) as e:
+            logger.warning(f"Caché de estado incompleta: {e}")
+            return None
+        return snapshot, data.get('history') or {}
+
+    def save(self, snapshot: FleetSnapshot, history: Dict[str, Dict[str, List[float]]]) -> bool:
+        """Escribe la caché de forma atómica (archivo temporal + rename)"""
+        data = {
+            'version': CACHE_VERSION,
+            'snapshot': snapshot.to_dict(),
+            'history': history,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, separators=(',', ':'))
+                os.replace(tmp_path, self.path)
+                return True
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning(f"No se pudo guardar la caché de estado: {e}")
+                return False
+
+    def save_in_background(self, snapshot: FleetSnapshot, history: Dict[str, Dict[str, List[float]]]):
+        """Igual que save() pero sin bloquear al llamador (hilo de GTK)"""
+        if self._lock.locked():
+            return  # Ya hay un guardado en curso; el siguiente lo pondrá al día
+        threading.Thread(target=self.save, args=(snapshot, history), name="state-cache", daemon=True).start()
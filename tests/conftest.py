@@ -0,0 +1,41 @@
+"""
+Configuración común de las pruebas
+
+Los módulos del panel están en la raíz del repositorio (sin paquete), así
+que se añade al path. Las pruebas no importan GTK ni cairo.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vm_manager import VMManager  # noqa: E402
+
+
+class StubVirsh:
+    """Sustituye a virsh: registra cada llamada y falla las de los subcomandos indicados"""
+
+    def __init__(self, failing=()):
+        self.calls = []
+        self.failing = set(failing)
+
+    def __call__(self, args):
+        self.calls.append(list(args))
+        if args[0] in self.failing:
+            return False, "", f"error: {args[0]} no admitido en caliente"
+        return True, "", ""
+
+
+@pytest.fixture
+def stub_virsh():
+    return StubVirsh()
+
+
+@pytest.fixture
+def vm_manager(stub_virsh):
+    """VMManager contra el driver de pruebas de libvirt con virsh sustituido por StubVirsh"""
+    manager = VMManager(check_requirements=False, connection_uri='test:///default', vm_names=['test'])
+    manager._run_virsh_command = stub_virsh
+    return manager
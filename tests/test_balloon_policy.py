@@ -0,0 +1,215 @@
+"""
+Pruebas de balloon_policy.BalloonPolicy con flujos de estadísticas simulados
+"""
+import shutil
+
+import pytest
+
+import balloon_policy
+from audit_log import AuditLog
+from balloon_policy import BalloonPolicy, parse_limit
+from collector import FleetSnapshot
+from vm_manager import VMManager
+
+GIB = 1024 * 1024  # KB
+
+
+class Guest:
+    """Flujo de muestras de una VM: cada sample() avanza el reloj y el informe del balloon"""
+
+    def __init__(self, actual=8 * GIB, used=1 * GIB, maximum=8 * GIB, interval=5.0):
+        self.actual = actual
+        self.used = used
+        self.maximum = maximum
+        self.interval = interval
+        self.now = 0.0
+        self.updated = 1000
+        self.generation = 0
+
+    def clock(self):
+        return self.now
+
+    def sample(self, cpu_percent=2.0, fresh=True, **rates) -> FleetSnapshot:
+        self.now += self.interval
+        self.generation += 1
+        if fresh:
+            self.updated += int(self.interval)
+        free = max(0, self.actual - self.used)
+        stats = {
+            'memory_actual': self.actual,
+            'memory_available': self.maximum,
+            'memory_guest_total': self.actual,
+            'memory_unused': free,
+            'memory_usable': free,
+            'memory_disk_caches': 0,
+            'memory_stats_updated': self.updated,
+        }
+        vm = {'name': 'test', 'id': 1, 'running': True, 'stats': stats,
+              'rates': dict(rates, cpu_percent=cpu_percent)}
+        return FleetSnapshot(self.generation, self.now, {'test': vm}, {}, {})
+
+    def apply(self, decisions):
+        for decision in decisions:
+            if decision['ok'] is not False:
+                self.actual = decision['to_kb']
+
+
+def run_idle(policy, guest, samples):
+    decisions = []
+    for _ in range(samples):
+        new = policy.update(guest.sample())
+        guest.apply(new)
+        decisions.extend(new)
+    return decisions
+
+
+def test_idle_vm_shrinks_after_shrink_after_samples(vm_manager, stub_virsh):
+    guest = Guest()
+    policy = BalloonPolicy(vm_manager, dry_run=False, clock=guest.clock)
+
+    assert run_idle(policy, guest, balloon_policy.SHRINK_AFTER - 1) == []
+    decisions = policy.update(guest.sample())
+
+    assert len(decisions) == 1
+    decision = decisions[0]
+    assert decision['action'] == 'shrink'
+    assert decision['ok'] is True
+    # Como mucho MAX_SHRINK_FRACTION de golpe
+    assert decision['to_kb'] == int(8 * GIB * (1 - balloon_policy.MAX_SHRINK_FRACTION))
+    assert stub_virsh.calls == [['setmem', 'test', str(decision['to_kb']), '--live']]
+
+
+def test_busy_vm_does_not_shrink(vm_manager, stub_virsh):
+    guest = Guest()
+    policy = BalloonPolicy(vm_manager, dry_run=False, clock=guest.clock)
+    for _ in range(balloon_policy.SHRINK_AFTER * 2):
+        assert policy.update(guest.sample(cpu_percent=60.0)) == []
+    assert stub_virsh.calls == []
+
+
+@pytest.mark.parametrize('rates', [{'swap_in_kbps': 2000.0, 'swap_out_kbps': 0.0}, {'major_faults_ps': 800.0}])
+def test_pressure_grows_immediately(vm_manager, rates):
+    guest = Guest(actual=4 * GIB, used=1 * GIB)
+    policy = BalloonPolicy(vm_manager, dry_run=False, clock=guest.clock)
+
+    decisions = policy.update(guest.sample(**rates))
+
+    assert [decision['action'] for decision in decisions] == ['grow']
+    assert decisions[0]['to_kb'] == 4 * GIB + max(balloon_policy.GROW_MIN_KB,
+                                                   int(4 * GIB * balloon_policy.GROW_FRACTION))
+
+
+def test_low_usable_memory_grows(vm_manager):
+    guest = Guest(actual=4 * GIB, used=int(3.8 * GIB))
+    policy = BalloonPolicy(vm_manager, dry_run=False, clock=guest.clock)
+    assert [decision['action'] for decision in policy.update(guest.sample())] == ['grow']
+
+
+def test_grow_cooldown(vm_manager):
+    guest = Guest(actual=2 * GIB, used=1 * GIB, interval=2.0)
+    policy = BalloonPolicy(vm_manager, dry_run=False, clock=guest.clock)
+
+    guest.apply(policy.update(guest.sample(swap_in_kbps=2000.0)))
+    grown = guest.actual
+    # Informes nuevos con presión, pero dentro de GROW_COOLDOWN
+    waited = 0.0
+    while waited + guest.interval < balloon_policy.GROW_COOLDOWN:
+        assert policy.update(guest.sample(swap_in_kbps=2000.0)) == []
+        waited += guest.interval
+    guest.apply(policy.update(guest.sample(swap_in_kbps=2000.0)))
+    assert guest.actual > grown
+
+
+def test_shrink_cooldown(vm_manager):
+    guest = Guest()
+    policy = BalloonPolicy(vm_manager, dry_run=False, clock=guest.clock)
+    first = run_idle(policy, guest, balloon_policy.SHRINK_AFTER)
+    assert len(first) == 1
+
+    cooldown_samples = int(balloon_policy.SHRINK_COOLDOWN // guest.interval) - 1
+    assert run_idle(policy, guest, cooldown_samples) == []
+    second = run_idle(policy, guest, 2)
+    assert [decision['action'] for decision in second] == ['shrink']
+    assert second[0]['from_kb'] == first[0]['to_kb']
+
+
+def test_no_decision_until_fresh_guest_report(vm_manager):
+    guest = Guest(actual=4 * GIB, used=1 * GIB)
+    policy = BalloonPolicy(vm_manager, dry_run=False, clock=guest.clock)
+    guest.apply(policy.update(guest.sample(swap_in_kbps=2000.0)))
+
+    # Las estadísticas siguen siendo las del balloon anterior: aunque pase el periodo de espera, nada
+    guest.now += balloon_policy.GROW_COOLDOWN
+    for _ in range(5):
+        assert policy.update(guest.sample(fresh=False, swap_in_kbps=2000.0)) == []
+    assert [decision['action'] for decision in policy.update(guest.sample(swap_in_kbps=2000.0))] == ['grow']
+
+
+def test_limits_clamp_shrink_and_grow(vm_manager):
+    vm_name, limits = parse_limit('test=7168:8448')  # 7 GiB a 8.25 GiB
+    assert vm_name == 'test'
+
+    guest = Guest(actual=8 * GIB, used=1 * GIB, maximum=16 * GIB)
+    policy = BalloonPolicy(vm_manager, dry_run=False, limits={'test': limits}, clock=guest.clock)
+    decisions = run_idle(policy, guest, balloon_policy.SHRINK_AFTER)
+    assert [decision['to_kb'] for decision in decisions] == [7 * GIB]
+    # Ya en el mínimo: no se encoge más
+    assert run_idle(policy, guest, int(balloon_policy.SHRINK_COOLDOWN // guest.interval) * 2) == []
+
+    decisions = policy.update(guest.sample(swap_in_kbps=2000.0))
+    assert [decision['to_kb'] for decision in decisions] == [8448 * 1024]
+
+
+def test_maximum_defaults_to_balloon_maximum(vm_manager):
+    guest = Guest(actual=8 * GIB - 256 * 1024, maximum=8 * GIB)
+    policy = BalloonPolicy(vm_manager, dry_run=False, clock=guest.clock)
+    decisions = policy.update(guest.sample(swap_in_kbps=2000.0))
+    assert [decision['to_kb'] for decision in decisions] == [8 * GIB]
+
+
+@pytest.mark.parametrize('text', ['test', 'test=1024', 'test=a:b', 'test=4096:1024'])
+def test_parse_limit_rejects_invalid(text):
+    with pytest.raises(ValueError):
+        parse_limit(text)
+
+
+def test_dry_run_records_without_setmem(vm_manager, stub_virsh, tmp_path):
+    guest = Guest()
+    audit_path = tmp_path / 'balloon-audit.jsonl'
+    policy = BalloonPolicy(vm_manager, dry_run=True, audit=AuditLog(str(audit_path)), clock=guest.clock)
+
+    decisions = run_idle(policy, guest, balloon_policy.SHRINK_AFTER)
+
+    assert stub_virsh.calls == []
+    assert [(decision['action'], decision['dry_run'], decision['ok']) for decision in decisions] == \
+        [('shrink', True, None)]
+    assert policy.audit.recent('test') == decisions
+    assert len(audit_path.read_text().splitlines()) == 1
+
+
+def test_failed_setmem_is_audited(vm_manager, stub_virsh):
+    stub_virsh.failing.add('setmem')
+    guest = Guest(actual=4 * GIB, used=1 * GIB)
+    policy = BalloonPolicy(vm_manager, dry_run=False, clock=guest.clock)
+    decisions = policy.update(guest.sample(swap_in_kbps=2000.0))
+    assert decisions[0]['ok'] is False
+    assert 'setmem' in decisions[0]['error']
+
+
+def test_restarted_vm_resets_state(vm_manager):
+    guest = Guest()
+    policy = BalloonPolicy(vm_manager, dry_run=False, clock=guest.clock)
+    run_idle(policy, guest, balloon_policy.SHRINK_AFTER - 1)
+    snapshot = guest.sample()
+    snapshot.vms['test']['id'] = 2  # Reinicio: nuevo id de dominio
+    assert policy.update(snapshot) == []
+
+
+@pytest.mark.skipif(shutil.which('virsh') is None, reason="virsh no está instalado")
+def test_setmem_against_libvirt_test_driver():
+    # El dominio 'test' del driver de pruebas tiene 8 GiB
+    manager = VMManager(check_requirements=False, connection_uri='test:///default', vm_names=['test'])
+    guest = Guest()
+    policy = BalloonPolicy(manager, dry_run=False, clock=guest.clock)
+    decisions = run_idle(policy, guest, balloon_policy.SHRINK_AFTER)
+    assert [(decision['action'], decision['ok']) for decision in decisions] == [('shrink', True)]
@@ -0,0 +1,100 @@
+"""
+Pruebas de collector.FleetCollector contra un cgroupfs sintético
+"""
+from cgroup_stats import CgroupCollector
+from collector import FleetCollector
+from host_metrics import HostCollector
+from qemu_threads import QemuThreadCollector
+
+
+class FakeManager:
+    """VMManager mínimo: list_all_vms da el id como texto, igual que virsh list"""
+
+    def __init__(self, vms):
+        self.vms = vms
+        self.vm_names = [vm['name'] for vm in vms]
+        self.virsh_calls = 0
+        self.virsh_seconds = 0.0
+        self.requirements_checked = True
+
+    def list_all_vms(self):
+        return [dict(vm) for vm in self.vms]
+
+    def get_vm_detailed_stats(self, vm_name):
+        return {'state': 'running', 'cpu_time': 0, 'vcpu_current': 2}
+
+    def get_vm_ip_address(self, vm_name):
+        return None
+
+    def get_vm_uptime(self, vm_name, detailed_stats=None):
+        return None
+
+    def get_vm_guest_users(self, vm_name):
+        return None
+
+    def get_vm_domain_config(self, vm_name):
+        return {}
+
+    def set_memory_stats_period(self, vm_name, period):
+        return True
+
+
+def write_scope(root, domain_id, name, psi_total=1000):
+    scope = root / 'machine.slice' / f'machine-qemu\\x2d{domain_id}\\x2d{name}.scope'
+    scope.mkdir(parents=True, exist_ok=True)
+    scope.joinpath('cpu.stat').write_text("usage_usec 5000\nuser_usec 4000\nsystem_usec 1000\n")
+    scope.joinpath('memory.current').write_text("2147483648\n")
+    scope.joinpath('memory.numa_stat').write_text("anon N0=1024 N1=4096\nfile N0=0 N1=0\n")
+    scope.joinpath('cpu.pressure').write_text(
+        f"some avg10=1.50 avg60=0.00 avg300=0.00 total={psi_total}\n"
+        f"full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n")
+
+
+def make_collector(tmp_path, vms):
+    cgroup_root = tmp_path / 'cgroup'
+    empty = tmp_path / 'empty'
+    empty.mkdir()
+    return FleetCollector(FakeManager(vms),
+                          host_collector=HostCollector(sys_root=str(empty), proc_root=str(empty)),
+                          cgroup_collector=CgroupCollector(root=str(cgroup_root)),
+                          thread_collector=QemuThreadCollector(proc_root=str(empty), run_root=str(empty)))
+
+
+def test_cgroup_metrics_join_on_domain_id(tmp_path):
+    write_scope(tmp_path / 'cgroup', 3, 'web')
+    write_scope(tmp_path / 'cgroup', 4, 'db')
+    collector = make_collector(tmp_path, [
+        {'id': '3', 'name': 'web', 'state': 'running', 'running': True},
+        {'id': '4', 'name': 'db', 'state': 'running', 'running': True},
+        {'id': None, 'name': 'off', 'state': 'shut off', 'running': False},
+    ])
+
+    snapshot = collector.collect_once()
+
+    web = snapshot.vms['web']['stats']
+    assert web['cgroup_scope'] == 'machine-qemu\\x2d3\\x2dweb.scope'
+    assert web['cgroup_memory_current'] == 2147483648
+    assert web['cgroup_memory_numa_anon'] == [1024, 4096]
+    assert snapshot.vms['db']['stats']['cgroup_scope'] == 'machine-qemu\\x2d4\\x2ddb.scope'
+    assert snapshot.vms['off']['stats'] is None
+
+
+def test_cgroup_pressure_reaches_rates(tmp_path):
+    cgroup_root = tmp_path / 'cgroup'
+    write_scope(cgroup_root, 3, 'web', psi_total=1000)
+    collector = make_collector(tmp_path, [{'id': '3', 'name': 'web', 'state': 'running', 'running': True}])
+
+    collector.collect_once()
+    write_scope(cgroup_root, 3, 'web', psi_total=2000)
+    rates = collector.collect_once().vms['web']['rates']
+
+    assert rates is not None
+    assert 'cpu_pressure_some' in rates
+
+
+def test_scope_of_other_domain_is_not_joined(tmp_path):
+    # Mismo nombre pero otro id (la VM se reinició): el scope viejo no se asocia
+    write_scope(tmp_path / 'cgroup', 3, 'web')
+    collector = make_collector(tmp_path, [{'id': '7', 'name': 'web', 'state': 'running', 'running': True}])
+    stats = collector.collect_once().vms['web']['stats']
+    assert not any(key.startswith('cgroup_') for key in stats)
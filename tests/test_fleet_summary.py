@@ -0,0 +1,79 @@
+"""
+Pruebas de fleet_summary.FleetAggregator sobre las tasas de rates.RateEngine
+"""
+import pytest
+
+import fleet_summary
+from collector import FleetSnapshot
+from rates import RateEngine
+
+MB = 1024 * 1024  # memory_* van en KB: 4 * MB son 4 GB
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def backend(request, monkeypatch):
+    if request.param == 'python':
+        monkeypatch.setattr(fleet_summary, 'np', None)
+    elif fleet_summary.np is None:
+        pytest.skip("NumPy no está instalado")
+    return request.param
+
+
+def stats(cpu_time, disks, vcpus=2):
+    return {'cpu_time': cpu_time, 'vcpu_current': vcpus, 'memory_actual': 4 * MB, 'memory_unused': 1 * MB,
+            'block_devices': [{'name': name, 'rd_reqs': reqs, 'wr_reqs': 0, 'rd_bytes': reqs * MB,
+                               'wr_bytes': 0, 'rd_times': 0, 'wr_times': 0} for name, reqs in disks.items()],
+            'net_devices': []}
+
+
+def snapshot(engine, generation, now, vms):
+    entries = {}
+    for name, (domain_id, vm_stats) in vms.items():
+        entries[name] = {'name': name, 'id': domain_id, 'running': True, 'stats': vm_stats,
+                         'rates': engine.update(name, domain_id, vm_stats, now)}
+    return FleetSnapshot(generation, now, entries, {}, {})
+
+
+def test_totals_come_from_engine_rates(backend):
+    engine = RateEngine()
+    aggregator = fleet_summary.FleetAggregator()
+    first = aggregator.update(snapshot(engine, 1, 0.0, {'web': (1, stats(0, {'vda': 0})),
+                                                        'db': (2, stats(0, {'vda': 0}, vcpus=6))}))
+    assert first['cpu_percent'] is None and first['iops'] is None
+    assert first['memory_used_gb'] == pytest.approx(6.0)
+
+    # 10 s: web al 100% de 2 vCPUs, db al 20% de 6 vCPUs -> 3.2 de 8 vCPUs
+    summary = aggregator.update(snapshot(engine, 2, 10.0, {'web': (1, stats(20 * 10**9, {'vda': 100})),
+                                                           'db': (2, stats(12 * 10**9, {'vda': 50}, vcpus=6))}))
+    assert summary['cpu_percent'] == pytest.approx(40.0)
+    assert summary['iops'] == pytest.approx(15.0)
+    assert summary['disk_read_mbps'] == pytest.approx(15.0)
+
+
+def test_replugged_disk_does_not_hide_other_devices(backend):
+    engine = RateEngine()
+    aggregator = fleet_summary.FleetAggregator()
+    aggregator.update(snapshot(engine, 1, 0.0, {'web': (1, stats(0, {'vda': 1000, 'vdb': 5000}))}))
+    # vdb se desconecta y vuelve a conectar: su contador baja, vda sigue leyendo
+    summary = aggregator.update(snapshot(engine, 2, 10.0, {'web': (1, stats(10**9, {'vda': 1200, 'vdb': 10}))}))
+    assert summary['iops'] == pytest.approx(20.0)
+    assert summary['disk_read_mbps'] == pytest.approx(20.0)
+
+
+def test_restarted_vm_has_no_rates(backend):
+    engine = RateEngine()
+    aggregator = fleet_summary.FleetAggregator()
+    aggregator.update(snapshot(engine, 1, 0.0, {'web': (1, stats(50 * 10**9, {'vda': 100}))}))
+    summary = aggregator.update(snapshot(engine, 2, 10.0, {'web': (2, stats(10**9, {'vda': 1}))}))
+    assert summary['running'] == 1
+    assert summary['cpu_percent'] is None and summary['iops'] is None
+
+
+def test_stale_snapshot_shows_no_rates(backend):
+    engine = RateEngine()
+    aggregator = fleet_summary.FleetAggregator()
+    aggregator.update(snapshot(engine, 1, 0.0, {'web': (1, stats(0, {'vda': 0}))}))
+    live = snapshot(engine, 2, 10.0, {'web': (1, stats(10**9, {'vda': 100}))})
+    summary = aggregator.update(FleetSnapshot(3, 10.0, live.vms, {}, {}, stale=True))
+    assert summary['cpu_percent'] is None
+    assert summary['memory_used_gb'] == pytest.approx(3.0)
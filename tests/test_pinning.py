@@ -0,0 +1,189 @@
+"""
+Pruebas del asistente de pinning (pinning.py) contra una topología sysfs sintética
+"""
+import pytest
+
+from collector import FleetSnapshot
+from host_topology import HostTopology
+from pinning import PinningComparison, apply_plan, propose_plan
+
+
+def write_topology(root, nodes=2, cores=4, threads=2):
+    """Árbol /sys/devices/system con nodes × cores × threads CPUs; los hilos hermanos son consecutivos"""
+    system = root / 'devices' / 'system'
+    total = nodes * cores * threads
+    (system / 'cpu').mkdir(parents=True)
+    (system / 'cpu' / 'online').write_text(f"0-{total - 1}\n")
+    for node in range(nodes):
+        first = node * cores * threads
+        node_dir = system / 'node' / f'node{node}'
+        node_dir.mkdir(parents=True)
+        node_dir.joinpath('cpulist').write_text(f"{first}-{first + cores * threads - 1}\n")
+        for core in range(cores):
+            siblings = [first + core * threads + thread for thread in range(threads)]
+            for cpu in siblings:
+                topology = system / 'cpu' / f'cpu{cpu}' / 'topology'
+                topology.mkdir(parents=True)
+                topology.joinpath('physical_package_id').write_text(f"{node}\n")
+                topology.joinpath('core_id').write_text(f"{core}\n")
+                topology.joinpath('thread_siblings_list').write_text(f"{siblings[0]}-{siblings[-1]}\n")
+    return str(root)
+
+
+@pytest.fixture
+def topology(tmp_path):
+    return HostTopology.read(write_topology(tmp_path))
+
+
+def vm(name, vcpus, memory_node=None, iothreads=(), running=True, config=None):
+    threads = [{'tid': 100 + i, 'name': f'IO iothread{i}', 'role': 'iothread', 'vcpu': None,
+                'cpu_time': 0, 'processor': 0} for i in iothreads]
+    stats = {'vcpu_current': vcpus, 'qemu_threads': {'pid': 1, 'threads': threads}}
+    if memory_node is not None:
+        stats['cgroup_memory_numa_anon'] = [1 if node == memory_node else 0 for node in range(2)]
+    return {'name': name, 'id': 1, 'running': running, 'stats': stats if running else None, 'config': config}
+
+
+def snapshot(*vms):
+    return FleetSnapshot(1, 0.0, {entry['name']: entry for entry in vms}, {}, {})
+
+
+def test_reads_synthetic_topology(topology):
+    assert len(topology) == 16
+    assert len(topology.cores) == 8
+    assert topology.nodes == {0: list(range(8)), 1: list(range(8, 16))}
+    assert topology.cpus[5]['siblings'] == (4, 5)
+
+
+def test_smt_siblings_stay_together(topology):
+    plan = propose_plan(topology, snapshot(vm('web', 4)), ['web'])
+    vcpus = plan['vms']['web']['vcpus']
+    assert sorted(vcpus) == [0, 1, 2, 3]
+    for vcpu in (0, 2):
+        assert topology.core_of(vcpus[vcpu]) == topology.core_of(vcpus[vcpu + 1])
+
+
+def test_no_core_shared_between_vms(topology):
+    plan = propose_plan(topology, snapshot(vm('web', 3), vm('db', 4), vm('cache', 2)), ['web', 'db', 'cache'])
+    assert set(plan['vms']) == {'web', 'db', 'cache'}
+    owners = {}
+    for vm_name, vm_plan in plan['vms'].items():
+        for cpu in vm_plan['vcpus'].values():
+            owners.setdefault(topology.core_of(cpu), set()).add(vm_name)
+    assert all(len(vm_names) == 1 for vm_names in owners.values())
+
+
+def test_housekeeping_cores_reserved(topology):
+    plan = propose_plan(topology, snapshot(vm('web', 6, iothreads=(1, 2))), ['web'])
+    assert plan['housekeeping'] == {0: [0, 1], 1: [8, 9]}
+    web = plan['vms']['web']
+    reserved = {cpu for cpus in plan['housekeeping'].values() for cpu in cpus}
+    assert not reserved & set(web['vcpus'].values())
+    assert web['emulator'] == plan['housekeeping'][web['node']]
+    assert web['iothreads'] == {1: web['emulator'], 2: web['emulator']}
+
+
+def test_prefers_memory_node(topology):
+    plan = propose_plan(topology, snapshot(vm('web', 2, memory_node=1)), ['web'])
+    assert plan['vms']['web']['node'] == 1
+    assert all(topology.node_of(cpu) == 1 for cpu in plan['vms']['web']['vcpus'].values())
+
+
+def test_cross_node_fallback_warns(topology):
+    # 3 núcleos libres por nodo (6 hilos): 8 vCPUs no caben en uno
+    plan = propose_plan(topology, snapshot(vm('big', 8)), ['big'])
+    big = plan['vms']['big']
+    assert big['nodeset'] == '0-1'
+    assert {topology.node_of(cpu) for cpu in big['vcpus'].values()} == {0, 1}
+    assert any("no caben en un solo nodo" in warning for warning in plan['warnings'])
+
+
+def test_vm_without_room_is_skipped_and_frees_its_cores(topology):
+    plan = propose_plan(topology, snapshot(vm('huge', 14), vm('small', 2)), ['huge', 'small'])
+    assert 'huge' not in plan['vms']
+    assert 'small' in plan['vms']
+    assert any(warning.startswith("huge: no quedan núcleos libres") for warning in plan['warnings'])
+
+
+def test_guest_without_smt_gets_one_vcpu_per_core(topology):
+    config = {'cpu_topology': {'sockets': 1, 'dies': 1, 'cores': 4, 'threads': 1}}
+    plan = propose_plan(topology, snapshot(vm('web', 4, config=config)), ['web'])
+    cpus = plan['vms']['web']['vcpus'].values()
+    assert len({topology.core_of(cpu) for cpu in cpus}) == 4
+
+
+def test_guest_smt_topology_maps_to_sibling_threads(topology):
+    config = {'cpu_topology': {'sockets': 1, 'dies': 1, 'cores': 2, 'threads': 2}}
+    plan = propose_plan(topology, snapshot(vm('web', 4, config=config)), ['web'])
+    vcpus = plan['vms']['web']['vcpus']
+    # Las vCPUs 0-1 y 2-3 son un núcleo del guest: hilos hermanos de un núcleo del host
+    assert topology.core_of(vcpus[0]) == topology.core_of(vcpus[1])
+    assert topology.core_of(vcpus[2]) == topology.core_of(vcpus[3])
+    assert topology.core_of(vcpus[0]) != topology.core_of(vcpus[2])
+
+
+def test_hugepages_skip_live_numatune(topology, vm_manager, stub_virsh):
+    config = {'hugepages': {'enabled': True, 'pages': [{'size': '2048', 'unit': 'KiB', 'nodeset': '1'}]}}
+    plan = propose_plan(topology, snapshot(vm('test', 2, config=config)), ['test'])
+    test = plan['vms']['test']
+    assert test['numatune'] is False
+    # Se prefiere el nodo de las hugepages
+    assert test['node'] == 1
+    assert any("hugepages" in warning for warning in plan['warnings'])
+
+    results = apply_plan(vm_manager, plan)
+    assert not any(call[0] == 'numatune' for call in stub_virsh.calls)
+    assert [result['step'].split()[0] for result in results] == ['emulatorpin', 'vcpupin', 'vcpupin']
+
+
+def test_hugepages_on_a_full_node_warn_about_remote_memory(topology):
+    config = {'hugepages': {'enabled': True, 'pages': [{'size': '1', 'unit': 'GiB', 'nodeset': '0'}]}}
+    plan = propose_plan(topology, snapshot(vm('db', 6), vm('web', 2, config=config)), ['db', 'web'])
+    assert plan['vms']['db']['node'] == 0
+    assert plan['vms']['web']['node'] == 1
+    assert "web: sus hugepages están en el nodo 0 y las vCPUs quedan en el 1 (memoria remota)" in plan['warnings']
+
+
+def test_stopped_vm_is_skipped(topology):
+    plan = propose_plan(topology, snapshot(vm('off', 2, running=False)), ['off'])
+    assert plan['vms'] == {}
+    assert plan['warnings'] == ["off: no está en ejecución, se omite"]
+
+
+def test_apply_plan_reports_each_step(topology, vm_manager, stub_virsh):
+    plan = propose_plan(topology, snapshot(vm('test', 2, iothreads=(1,))), ['test'])
+    stub_virsh.failing.add('numatune')
+
+    results = apply_plan(vm_manager, plan)
+
+    assert [result['step'].split()[0] for result in results] == \
+        ['numatune', 'emulatorpin', 'iothreadpin', 'vcpupin', 'vcpupin']
+    # Un paso fallido no detiene los demás
+    assert results[0]['ok'] is False and 'numatune' in results[0]['error']
+    assert all(result['ok'] and result['error'] is None for result in results[1:])
+    assert all(call[-1] == '--live' for call in stub_virsh.calls)
+    vcpus = plan['vms']['test']['vcpus']
+    assert stub_virsh.calls[-2:] == [['vcpupin', 'test', '0', str(vcpus[0]), '--live'],
+                                     ['vcpupin', 'test', '1', str(vcpus[1]), '--live']]
+
+
+def rated(name, steal, running=True):
+    return {'name': name, 'id': 1, 'running': running, 'stats': {},
+            'rates': {'cpu_steal_percent': steal, 'cpu_pressure_some': None,
+                      'read_latency_ms': None, 'write_latency_ms': None}}
+
+
+def test_comparison_keeps_before_samples_for_any_later_plan():
+    comparison = PinningComparison(['web', 'db'], window=3)
+    for steal in (10.0, 20.0, 30.0, 40.0):
+        comparison.observe(snapshot(rated('web', steal), rated('db', steal / 10)))
+
+    # El plan final solo lleva 'db', aunque al abrir la ventana estaban las dos
+    comparison.mark_applied(['db'])
+    for _ in range(3):
+        comparison.observe(snapshot(rated('web', 50.0), rated('db', 1.0)))
+
+    report = comparison.report()
+    assert list(report) == ['db']
+    assert report['db']['cpu_steal_percent'] == (pytest.approx(3.0), pytest.approx(1.0))
+    assert comparison.done
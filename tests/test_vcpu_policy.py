@@ -0,0 +1,204 @@
+"""
+Pruebas de vcpu_policy.VcpuPolicy con flujos de uso de CPU simulados
+"""
+import pytest
+
+import vcpu_policy
+from audit_log import AuditLog
+from collector import FleetSnapshot
+from vcpu_policy import VcpuPolicy, parse_limit
+
+
+class Guest:
+    """Flujo de muestras de una VM: cada sample() avanza el reloj un intervalo"""
+
+    def __init__(self, vcpus=2, maximum=8, interval=5.0):
+        self.vcpus = vcpus
+        self.maximum = maximum
+        self.interval = interval
+        self.now = 0.0
+        self.generation = 0
+
+    def clock(self):
+        return self.now
+
+    def sample(self, cpu_percent, host_cpu=None, steal=None) -> FleetSnapshot:
+        self.now += self.interval
+        self.generation += 1
+        stats = {'vcpu_current': self.vcpus, 'vcpu_count': self.maximum}
+        rates = {'cpu_percent': cpu_percent}
+        if steal is not None:
+            rates['cpu_steal_percent'] = steal
+        vm = {'name': 'test', 'id': 1, 'running': True, 'stats': stats, 'rates': rates}
+        host = {'cpu_percent': host_cpu} if host_cpu is not None else {}
+        return FleetSnapshot(self.generation, self.now, {'test': vm}, host, {})
+
+    def apply(self, decisions):
+        for decision in decisions:
+            if decision['action'] != 'hold' and decision['ok'] is not False:
+                self.vcpus = decision['to_vcpus']
+
+
+def run(policy, guest, samples, cpu_percent, **kwargs):
+    decisions = []
+    for _ in range(samples):
+        new = policy.update(guest.sample(cpu_percent, **kwargs))
+        guest.apply(new)
+        decisions.extend(new)
+    return decisions
+
+
+def actions(decisions):
+    return [(decision['action'], decision['from_vcpus'], decision['to_vcpus']) for decision in decisions]
+
+
+def test_busy_vm_scales_up_after_up_window(vm_manager, stub_virsh):
+    guest = Guest(vcpus=2)
+    policy = VcpuPolicy(vm_manager, dry_run=False, clock=guest.clock)
+
+    assert run(policy, guest, vcpu_policy.UP_WINDOW - 1, 100.0) == []
+    decisions = run(policy, guest, 1, 100.0)
+
+    # 2 vCPUs ocupadas: ceil(2 / 60%) = 4
+    assert actions(decisions) == [('up', 2, 4)]
+    assert decisions[0]['ok'] is True
+    assert stub_virsh.calls == [['setvcpus', 'test', '4', '--live']]
+
+
+def test_moderate_load_does_not_scale(vm_manager, stub_virsh):
+    guest = Guest(vcpus=4)
+    policy = VcpuPolicy(vm_manager, dry_run=False, clock=guest.clock)
+    assert run(policy, guest, vcpu_policy.DOWN_WINDOW * 2, 50.0) == []
+    assert stub_virsh.calls == []
+
+
+def test_scale_up_is_clamped_to_max_step(vm_manager):
+    guest = Guest(vcpus=4, maximum=16)
+    policy = VcpuPolicy(vm_manager, dry_run=False, clock=guest.clock)
+    # Harían falta ceil(4 / 60%) = 7 vCPUs, pero como mucho MAX_STEP_UP de golpe
+    assert actions(run(policy, guest, vcpu_policy.UP_WINDOW, 100.0)) == [('up', 4, 4 + vcpu_policy.MAX_STEP_UP)]
+
+
+def test_scale_up_stops_at_vcpu_maximum(vm_manager, stub_virsh):
+    guest = Guest(vcpus=2, maximum=3)
+    policy = VcpuPolicy(vm_manager, dry_run=False, clock=guest.clock)
+    assert actions(run(policy, guest, vcpu_policy.UP_WINDOW, 100.0)) == [('up', 2, 3)]
+    # Ya en vcpu.maximum: nada más que hacer aunque siga saturada
+    assert run(policy, guest, vcpu_policy.UP_WINDOW * 20, 100.0) == []
+    assert len(stub_virsh.calls) == 1
+
+
+def test_idle_vm_scales_down_one_vcpu_after_down_window(vm_manager, stub_virsh):
+    guest = Guest(vcpus=4)
+    policy = VcpuPolicy(vm_manager, dry_run=False, clock=guest.clock)
+
+    assert run(policy, guest, vcpu_policy.DOWN_WINDOW - 1, 5.0) == []
+    decisions = run(policy, guest, 1, 5.0)
+
+    assert actions(decisions) == [('down', 4, 3)]
+    assert stub_virsh.calls == [['setvcpus', 'test', '3', '--live']]
+
+
+def test_limits_bound_both_directions(vm_manager):
+    vm_name, limits = parse_limit('test=2:3')
+    assert (vm_name, limits) == ('test', (2, 3))
+
+    guest = Guest(vcpus=2, maximum=8)
+    policy = VcpuPolicy(vm_manager, dry_run=False, limits={'test': limits}, clock=guest.clock)
+    assert actions(run(policy, guest, vcpu_policy.UP_WINDOW, 100.0)) == [('up', 2, 3)]
+
+    guest.now += vcpu_policy.DOWN_COOLDOWN
+    decisions = run(policy, guest, vcpu_policy.DOWN_WINDOW * 10, 1.0)
+    # Baja una vez hasta el mínimo configurado y se queda ahí
+    assert actions(decisions) == [('down', 3, 2)]
+
+
+def test_up_cooldown(vm_manager):
+    guest = Guest(vcpus=2, maximum=16)
+    policy = VcpuPolicy(vm_manager, dry_run=False, clock=guest.clock)
+    first = run(policy, guest, vcpu_policy.UP_WINDOW, 100.0)
+    assert actions(first) == [('up', 2, 4)]
+    changed_at = guest.now
+
+    # La ventana se llena de nuevo antes de que pase UP_COOLDOWN: no se sube todavía
+    while guest.now + guest.interval - changed_at < vcpu_policy.UP_COOLDOWN:
+        assert policy.update(guest.sample(100.0)) == []
+    assert actions(run(policy, guest, 1, 100.0)) == [('up', 4, 6)]
+
+
+def test_down_cooldown(vm_manager):
+    guest = Guest(vcpus=4)
+    policy = VcpuPolicy(vm_manager, dry_run=False, clock=guest.clock)
+    assert actions(run(policy, guest, vcpu_policy.DOWN_WINDOW, 5.0)) == [('down', 4, 3)]
+    changed_at = guest.now
+
+    while guest.now + guest.interval - changed_at < vcpu_policy.DOWN_COOLDOWN:
+        assert policy.update(guest.sample(5.0)) == []
+    assert actions(run(policy, guest, 1, 5.0)) == [('down', 3, 2)]
+
+
+@pytest.mark.parametrize('guard', [{'host_cpu': 95.0}, {'steal': 15.0}])
+def test_guards_hold_without_resetting_cooldowns(vm_manager, stub_virsh, guard):
+    guest = Guest(vcpus=2)
+    policy = VcpuPolicy(vm_manager, dry_run=False, clock=guest.clock)
+
+    decisions = run(policy, guest, vcpu_policy.UP_WINDOW, 100.0, **guard)
+    assert actions(decisions) == [('hold', 2, 2)]
+    # Mientras dura la condición, como mucho una retención por UP_COOLDOWN
+    samples = int(vcpu_policy.UP_COOLDOWN // guest.interval)
+    assert run(policy, guest, samples - 1, 100.0, **guard) == []
+    assert actions(run(policy, guest, 1, 100.0, **guard)) == [('hold', 2, 2)]
+    assert stub_virsh.calls == []
+
+    # La retención no vació la ventana ni inició una espera: en cuanto se libera el host, sube
+    assert actions(run(policy, guest, 1, 100.0)) == [('up', 2, 4)]
+
+
+def test_hold_does_not_delay_scale_down(vm_manager):
+    guest = Guest(vcpus=4)
+    policy = VcpuPolicy(vm_manager, dry_run=False, clock=guest.clock)
+    assert actions(run(policy, guest, vcpu_policy.UP_WINDOW, 100.0, host_cpu=95.0)) == [('hold', 4, 4)]
+    # Sin cambios de vCPUs, la bajada solo espera a llenar su ventana, no a DOWN_COOLDOWN
+    decisions = run(policy, guest, vcpu_policy.DOWN_WINDOW, 1.0, host_cpu=95.0)
+    assert actions(decisions) == [('down', 4, 3)]
+    assert guest.now < vcpu_policy.DOWN_COOLDOWN
+
+
+def test_external_vcpu_change_resets_windows(vm_manager):
+    guest = Guest(vcpus=2)
+    policy = VcpuPolicy(vm_manager, dry_run=False, clock=guest.clock)
+    assert run(policy, guest, vcpu_policy.UP_WINDOW - 1, 100.0) == []
+
+    guest.vcpus = 3  # setvcpus desde fuera: el % de la ventana tenía otra base
+    assert run(policy, guest, vcpu_policy.UP_WINDOW - 1, 100.0) == []
+    assert actions(run(policy, guest, 1, 100.0)) == [('up', 3, 5)]
+
+
+def test_dry_run_records_without_setvcpus(vm_manager, stub_virsh, tmp_path):
+    guest = Guest(vcpus=2)
+    audit_path = tmp_path / 'vcpu-audit.jsonl'
+    policy = VcpuPolicy(vm_manager, dry_run=True, audit=AuditLog(str(audit_path)), clock=guest.clock)
+
+    decisions = run(policy, guest, vcpu_policy.UP_WINDOW, 100.0)
+
+    assert stub_virsh.calls == []
+    assert [(decision['action'], decision['dry_run'], decision['ok']) for decision in decisions] == \
+        [('up', True, None)]
+    assert policy.audit.recent('test') == decisions
+    assert len(audit_path.read_text().splitlines()) == 1
+    assert policy.report().startswith("test: 2 vCPUs")
+
+
+def test_failed_setvcpus_is_audited(vm_manager, stub_virsh):
+    stub_virsh.failing.add('setvcpus')
+    guest = Guest(vcpus=2)
+    policy = VcpuPolicy(vm_manager, dry_run=False, clock=guest.clock)
+    decisions = run(policy, guest, vcpu_policy.UP_WINDOW, 100.0)
+    assert decisions[0]['ok'] is False
+    assert 'setvcpus' in decisions[0]['error']
+
+
+@pytest.mark.parametrize('text', ['test', 'test=2', 'test=a:b', 'test=0:4', 'test=4:2'])
+def test_parse_limit_rejects_invalid(text):
+    with pytest.raises(ValueError):
+        parse_limit(text)
@@ -6,39 +6,58 @@ gi.require_version('Adw', '1')
 from gi.repository import Gtk, Adw, GLib, Gio
 from vm_manager import VMManager
 from notifications import NotificationManager, ErrorHandler
-from widgets import CircularProgressWidget, MiniLineChartWidget, DiskUsageBarWidget
+from metrics_store import MetricsStore
+from collector import FleetCollector
+from qemu_threads import ROLE_LABELS
+from rates import EMPTY_RATES, PRESSURE_FIELDS
+from memory_stats import RATE_COUNTERS as MEMORY_RATES
+from disk_stats import DiskHistory
+from state_cache import StateCache, SAVE_INTERVAL
+import startup
+import frame_stats
+import card_view
+import memory_stats
 import threading
 import time
 import os
 from collections import deque
 
+
+# Series del gráfico de CPU por hilo de QEMU, de abajo arriba: (rol, etiqueta, color)
+THREAD_SERIES = [
+    ('vcpu', ROLE_LABELS['vcpu'], (0.26, 0.59, 0.98)),
+    ('emulator', ROLE_LABELS['emulator'], (1.0, 0.6, 0.0)),
+    ('iothread', ROLE_LABELS['iothread'], (0.15, 0.76, 0.41)),
+    ('vhost', ROLE_LABELS['vhost'], (0.61, 0.15, 0.69)),
+]
+
+
 class VMCard(Gtk.Box):
-    def __init__(self, vm_name, vm_manager, notification_manager=None, error_handler=None):
+    def __init__(self, vm_name, vm_manager, notification_manager=None, error_handler=None, metrics_store=None,
+                 collector=None, history=None):
         super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=12)
         self.vm_name = vm_name
         self.vm_manager = vm_manager
+        self.metrics_store = metrics_store
+        self.collector = collector
         self.notification_manager = notification_manager
         self.error_handler = error_handler
         self.is_updating = False
 
-        # Historial para gráficos
-        self.cpu_history = deque(maxlen=30)
+        # Historial para gráficos (2.5 min); con el camino rápido de procfs la CPU
+        # llega cada fast_interval segundos en lugar de una vez por ciclo
+        fast_interval = collector.fast_interval if collector is not None else None
+        self.cpu_points = min(600, round(150 / fast_interval)) if fast_interval else 30
+        self._last_fast_cpu = None  # time.monotonic() de la última muestra rápida de CPU
+        self.cpu_history = deque(maxlen=self.cpu_points)
         self.memory_history = deque(maxlen=30)
         self.net_rx_history = deque(maxlen=30)
         self.net_tx_history = deque(maxlen=30)
+        self.thread_history = deque(maxlen=30)  # CPU por rol de hilo de QEMU (rates['threads']['roles'])
+
+        # Las tasas (CPU %, red, IOPS) llegan calculadas en vm_info['rates'] (rates.py)
+        self.disk_history = DiskHistory()
 
-        # Tracking para cálculo de CPU usage
-        self.last_cpu_time = None
-        self.last_update_time = None
-
-        # Tracking para cálculo de red y disco (deltas)
-        self.last_net_rx_bytes = None
-        self.last_net_tx_bytes = None
-        self.last_block_read_bytes = None
-        self.last_block_write_bytes = None
-        self.last_block_read_reqs = None
-        self.last_block_write_reqs = None
-        
         self.set_margin_top(12)
         self.set_margin_bottom(12)
         self.set_margin_start(12)
@@ -101,6 +120,86 @@ class VMCard(Gtk.Box):
         self.details_expander = Gtk.Expander()
         self.details_expander.set_label("📊 Ver detalles avanzados")
 
+        # El contenido se construye al expandir por primera vez (arranque más rápido)
+        self.details_built = False
+        self._last_details = None  # (stats, vm_info, host, métricas) de la última muestra
+        self.details_expander.connect('notify::expanded', self._on_details_expanded)
+        
+        # Botones de control
+        button_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        button_box.set_halign(Gtk.Align.CENTER)
+        
+        self.start_btn = Gtk.Button.new_with_label("Iniciar")
+        self.start_btn.set_css_classes(['vm-control-button', 'start-button'])
+        self.start_btn.connect('clicked', self.on_start_clicked)
+        
+        self.shutdown_btn = Gtk.Button.new_with_label("Apagar")
+        self.shutdown_btn.set_css_classes(['vm-control-button', 'stop-button'])
+        self.shutdown_btn.connect('clicked', self.on_shutdown_clicked)
+        
+        self.reboot_btn = Gtk.Button.new_with_label("Reiniciar")
+        self.reboot_btn.set_css_classes(['vm-control-button', 'restart-button'])
+        self.reboot_btn.connect('clicked', self.on_reboot_clicked)
+        
+        self.save_btn = Gtk.Button.new_with_label("Pausar")
+        self.save_btn.set_css_classes(['vm-control-button', 'pause-button'])
+        self.save_btn.connect('clicked', self.on_save_clicked)
+        
+        self.destroy_btn = Gtk.Button.new_with_label("Forzar")
+        self.destroy_btn.set_css_classes(['vm-control-button', 'stop-button'])
+        self.destroy_btn.connect('clicked', self.on_destroy_clicked)
+
+        self.viewer_btn = Gtk.Button.new_with_label("🖥️ Viewer")
+        self.viewer_btn.set_css_classes(['vm-control-button', 'viewer-button'])
+        self.viewer_btn.set_tooltip_text("Abrir consola gráfica de la VM")
+        self.viewer_btn.connect('clicked', self.on_viewer_clicked)
+
+        button_box.append(self.start_btn)
+        button_box.append(self.shutdown_btn)
+        button_box.append(self.reboot_btn)
+        button_box.append(self.save_btn)
+        button_box.append(self.destroy_btn)
+        button_box.append(self.viewer_btn)
+        
+        # Ensamblar la tarjeta
+        card_content.append(header_box)
+        card_content.append(Gtk.Separator())
+        card_content.append(self.info_box)
+        card_content.append(self.details_expander)
+        card_content.append(button_box)
+        
+        self.card.set_child(card_content)
+        self.append(self.card)
+
+        # Modelo de vista: cada campo solo toca su widget cuando cambia
+        self.view = card_view.ViewModel()
+        self.view.bind('status', self.status_label.set_markup)
+        self.view.bind('stale', self._set_stale)
+        self.view.bind('cpu', self.cpu_label.set_text)
+        self.view.bind('memory', self.memory_label.set_text)
+        self.view.bind('ip', self.ip_label.set_markup)
+        self.view.bind('uptime', self.uptime_label.set_text)
+        self.view.bind('start_visible', self.start_btn.set_visible)
+        self.view.bind('shutdown_visible', self.shutdown_btn.set_visible)
+        self.view.bind('reboot_visible', self.reboot_btn.set_visible)
+        self.view.bind('save_visible', self.save_btn.set_visible)
+        self.view.bind('details_visible', self.details_expander.set_visible)
+
+        # Recuperar el historial guardado en disco antes de la primera muestra
+        self._load_history(history)
+
+        # El estado llega con el primer snapshot del recolector
+        self.status_label.set_text("Cargando...")
+
+    def _on_details_expanded(self, expander, _pspec):
+        if expander.get_expanded() and not self.details_built:
+            self._build_details()
+
+    def _build_details(self):
+        """Construye el panel de detalles y lo rellena con el historial en memoria"""
+        # Los widgets de métricas solo se importan cuando alguien abre los detalles
+        from snapshot_widgets import CircularProgressWidget
+
         # Contenedor de detalles con TabView
         details_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=16)
         details_box.set_margin_top(12)
@@ -174,58 +273,54 @@ class VMCard(Gtk.Box):
         self._create_system_tab()
 
         self.details_expander.set_child(details_box)
-        
-        # Botones de control
-        button_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
-        button_box.set_halign(Gtk.Align.CENTER)
-        
-        self.start_btn = Gtk.Button.new_with_label("Iniciar")
-        self.start_btn.set_css_classes(['vm-control-button', 'start-button'])
-        self.start_btn.connect('clicked', self.on_start_clicked)
-        
-        self.shutdown_btn = Gtk.Button.new_with_label("Apagar")
-        self.shutdown_btn.set_css_classes(['vm-control-button', 'stop-button'])
-        self.shutdown_btn.connect('clicked', self.on_shutdown_clicked)
-        
-        self.reboot_btn = Gtk.Button.new_with_label("Reiniciar")
-        self.reboot_btn.set_css_classes(['vm-control-button', 'restart-button'])
-        self.reboot_btn.connect('clicked', self.on_reboot_clicked)
-        
-        self.save_btn = Gtk.Button.new_with_label("Pausar")
-        self.save_btn.set_css_classes(['vm-control-button', 'pause-button'])
-        self.save_btn.connect('clicked', self.on_save_clicked)
-        
-        self.destroy_btn = Gtk.Button.new_with_label("Forzar")
-        self.destroy_btn.set_css_classes(['vm-control-button', 'stop-button'])
-        self.destroy_btn.connect('clicked', self.on_destroy_clicked)
-
-        self.viewer_btn = Gtk.Button.new_with_label("🖥️ Viewer")
-        self.viewer_btn.set_css_classes(['vm-control-button', 'viewer-button'])
-        self.viewer_btn.set_tooltip_text("Abrir consola gráfica de la VM")
-        self.viewer_btn.connect('clicked', self.on_viewer_clicked)
-
-        button_box.append(self.start_btn)
-        button_box.append(self.shutdown_btn)
-        button_box.append(self.reboot_btn)
-        button_box.append(self.save_btn)
-        button_box.append(self.destroy_btn)
-        button_box.append(self.viewer_btn)
-        
-        # Ensamblar la tarjeta
-        card_content.append(header_box)
-        card_content.append(Gtk.Separator())
-        card_content.append(self.info_box)
-        card_content.append(self.details_expander)
-        card_content.append(button_box)
-        
-        self.card.set_child(card_content)
-        self.append(self.card)
-        
-        # Actualizar estado inicial
-        self.update_vm_status()
+        self.details_built = True
+
+        # Enlazar los campos de detalles (aplica los valores ya conocidos)
+        bindings = {
+            'cpu_gauge': lambda value: self.cpu_circular.set_value(*value),
+            'memory_gauge': lambda value: self.memory_circular.set_value(*value),
+            'disk_bar': lambda value: self.disk_usage_bar.set_value(*value),
+            'vcpu_info': self.vcpu_info_label.set_text,
+            'threads': self.thread_info_label.set_text,
+            'pressure': self.pressure_label.set_text,
+            'guest_memory': self.guest_memory_label.set_text,
+            'net_mini': self.net_mini_value.set_markup,
+            'disk_mini': self.disk_mini_value.set_markup,
+            'disk_detail': self.disk_detail_label.set_text,
+            'disk_iops': self.disk_iops_label.set_text,
+            'disk_latency': self.disk_latency_label.set_text,
+            'net_rx_total': self.net_rx_label.set_text,
+            'net_tx_total': self.net_tx_label.set_text,
+            'net_interfaces': self.net_interfaces_label.set_text,
+            'virtio': self.virtio_drivers_label.set_text,
+            'cpu_features': self.cpu_features_label.set_text,
+            'hugepages': self.hugepages_label.set_text,
+            'blkio': self.blkio_label.set_text,
+            'host_temp': self.host_temp_label.set_text,
+            'guest_users': self.guest_users_label.set_text,
+        }
+        for field, apply in bindings.items():
+            self.view.bind(field, apply)
+
+        # Volcar el historial acumulado y la última muestra recibida
+        charts = (
+            (self.cpu_line_chart, self.cpu_history),
+            (self.memory_line_chart, self.memory_history),
+            (self.net_rx_chart, self.net_rx_history),
+            (self.net_tx_chart, self.net_tx_history),
+        )
+        for chart, history in charts:
+            for value in history:
+                chart.add_data_point(value)
+        for roles in self.thread_history:
+            self.thread_chart.add_sample(roles)
+        if self._last_details is not None:
+            self._render_details(*self._last_details)
 
     def _create_performance_tab(self):
         """Crea el tab de rendimiento con gráficos de CPU, RAM y Red"""
+        from snapshot_widgets import MiniLineChartWidget
+
         perf_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=12)
         perf_box.set_margin_start(12)
         perf_box.set_margin_end(12)
@@ -240,7 +335,8 @@ class VMCard(Gtk.Box):
         perf_box.append(Gtk.Separator())
 
         # Gráficos de CPU y Memoria
-        self.cpu_line_chart = MiniLineChartWidget(width=280, height=70)
+        self.cpu_line_chart = MiniLineChartWidget(width=280, height=70, max_points=self.cpu_points,
+                                                  show_markers=self.cpu_points <= 30)
         self.cpu_line_chart.set_title("CPU")
         self.cpu_line_chart.set_color(0.26, 0.59, 0.98)  # Azul
         perf_box.append(self.cpu_line_chart)
@@ -249,6 +345,31 @@ class VMCard(Gtk.Box):
         self.memory_line_chart.set_title("Memoria")
         self.memory_line_chart.set_color(0.61, 0.15, 0.69)  # Púrpura
         perf_box.append(self.memory_line_chart)
+        self.guest_memory_label = Gtk.Label()
+        self.guest_memory_label.set_css_classes(['caption'])
+        self.guest_memory_label.set_halign(Gtk.Align.START)
+        self.guest_memory_label.set_wrap(True)
+        self.guest_memory_label.set_tooltip_text("Memoria usada dentro del guest sin contar la caché de páginas, "
+                                                 "swap y fallos de página mayores del último informe del balloon")
+        perf_box.append(self.guest_memory_label)
+
+        # CPU por rol de hilo de QEMU (% de un núcleo del host)
+        from widgets import StackedAreaChartWidget
+        self.thread_chart = StackedAreaChartWidget(THREAD_SERIES)
+        self.thread_chart.set_title("Hilos QEMU")
+        self.thread_chart.set_tooltip_text("CPU del proceso QEMU por rol de hilo, en % de un núcleo del host")
+        perf_box.append(self.thread_chart)
+        self.thread_info_label = Gtk.Label()
+        self.thread_info_label.set_css_classes(['caption'])
+        self.thread_info_label.set_halign(Gtk.Align.START)
+        self.thread_info_label.set_wrap(True)
+        perf_box.append(self.thread_info_label)
+
+        # Historial largo desde el almacén persistente (5 min a 7 días)
+        self.history_chart = None
+        if self.metrics_store:
+            perf_box.append(Gtk.Separator())
+            perf_box.append(self._create_history_chart())
 
         # vCPUs info
         perf_box.append(Gtk.Separator())
@@ -261,13 +382,61 @@ class VMCard(Gtk.Box):
         perf_box.append(vcpu_label)
         perf_box.append(self.vcpu_info_label)
 
+        # Presión (PSI) del cgroup del dominio
+        self.pressure_label = Gtk.Label()
+        self.pressure_label.set_css_classes(['caption'])
+        self.pressure_label.set_halign(Gtk.Align.START)
+        self.pressure_label.set_tooltip_text("% del último intervalo con tareas de la VM esperando CPU, "
+                                             "memoria o E/S en el host (cgroup v2)")
+        perf_box.append(self.pressure_label)
+
         # Agregar como tab
         tab_page = self.tab_view.append(perf_box)
         tab_page.set_title("📈 Rendimiento")
         tab_page.set_tooltip("CPU, Memoria y gráficos en tiempo real")
 
+    def _create_history_chart(self):
+        """Gráfico de historial largo con selector de rango y de métrica"""
+        from widgets import HistoryChartWidget
+        import history_chart
+
+        history_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
+        header_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        history_label = Gtk.Label()
+        history_label.set_markup('<span weight="bold">🕰️ Historial largo</span>')
+        history_label.set_halign(Gtk.Align.START)
+        history_label.set_hexpand(True)
+        header_box.append(history_label)
+
+        metrics = (('cpu', "CPU", (0.26, 0.59, 0.98)), ('memory', "Memoria", (0.61, 0.15, 0.69)))
+        metric_dropdown = Gtk.DropDown.new_from_strings([title for _metric, title, _color in metrics])
+        header_box.append(metric_dropdown)
+        range_dropdown = Gtk.DropDown.new_from_strings([label for label, _seconds in history_chart.RANGES])
+        header_box.append(range_dropdown)
+        history_box.append(header_box)
+
+        model = history_chart.HistoryChartModel(self.metrics_store, self.vm_name)
+        self.history_chart = HistoryChartWidget(model, height=120)
+        self.history_chart.set_title("CPU")
+        self.history_chart.set_color(*metrics[0][2])
+
+        def on_metric_selected(dropdown, _pspec):
+            metric, title, color = metrics[dropdown.get_selected()]
+            model.set_metric(metric)
+            self.history_chart.set_title(title)
+            self.history_chart.set_color(*color)
+
+        metric_dropdown.connect('notify::selected', on_metric_selected)
+        range_dropdown.connect('notify::selected', lambda dropdown, _pspec: self.history_chart.set_range(
+            history_chart.RANGES[dropdown.get_selected()][1]))
+        history_box.append(self.history_chart)
+        return history_box
+
     def _create_storage_tab(self):
         """Crea el tab de almacenamiento con disco, IOPS y latencia"""
+        from snapshot_widgets import DiskUsageBarWidget
+        from widgets import DiskBreakdownWidget
+
         storage_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=12)
         storage_box.set_margin_start(12)
         storage_box.set_margin_end(12)
@@ -286,6 +455,11 @@ class VMCard(Gtk.Box):
         self.disk_usage_bar.set_value(0, 0, 0)
         storage_box.append(self.disk_usage_bar)
 
+        # Desglose por disco: latencia del intervalo con historial, IOPS, MB/s y tamaño de petición
+        self.disk_breakdown = DiskBreakdownWidget()
+        self.disk_breakdown.set_rows(self.disk_history.rows)
+        storage_box.append(self.disk_breakdown)
+
         # Detalles de disco
         self.disk_detail_label = Gtk.Label()
         self.disk_iops_label = Gtk.Label()
@@ -318,6 +492,8 @@ class VMCard(Gtk.Box):
 
     def _create_network_tab(self):
         """Crea el tab de red con interfaces, tráfico y estadísticas"""
+        from snapshot_widgets import MiniLineChartWidget
+
         net_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=12)
         net_box.set_margin_start(12)
         net_box.set_margin_end(12)
@@ -448,6 +624,41 @@ class VMCard(Gtk.Box):
         tab_page.set_title("⚙️ Sistema")
         tab_page.set_tooltip("Virtio, CPU features, hugepages y más")
 
+    def _load_history(self, history=None):
+        """Rellena el historial en memoria
+
+        Usa el historial de la caché de arranque si lo hay (no toca disco
+        por VM); si no, el historial persistente de la VM.
+        """
+        # La red se guarda en MB/s; sobre la escala de 100 MB/s equivale al porcentaje
+        histories = (
+            (self.cpu_history, 'cpu'),
+            (self.memory_history, 'memory'),
+            (self.net_rx_history, 'net_rx'),
+            (self.net_tx_history, 'net_tx'),
+        )
+        if history:
+            for values, metric in histories:
+                values.extend(history.get(metric, [])[-values.maxlen:])
+            return
+
+        if not self.metrics_store:
+            return
+
+        stored = self.metrics_store.load(self.vm_name, '1s')
+        for values, metric in histories:
+            for _ts, _min, avg, _max in stored[metric][-values.maxlen:]:
+                values.append(avg)
+
+    def get_history(self):
+        """Historial reciente de los gráficos para la caché de arranque"""
+        return {
+            'cpu': list(self.cpu_history),
+            'memory': list(self.memory_history),
+            'net_rx': list(self.net_rx_history),
+            'net_tx': list(self.net_tx_history),
+        }
+
     def set_loading(self, loading):
         """Muestra/oculta el spinner de carga"""
         self.is_updating = loading
@@ -464,418 +675,156 @@ class VMCard(Gtk.Box):
         self.save_btn.set_sensitive(not loading)
         self.destroy_btn.set_sensitive(not loading)
     
-    def update_vm_status(self):
-        """Actualiza el estado de la VM"""
-        vms = self.vm_manager.list_all_vms()
-        vm_info = next((vm for vm in vms if vm['name'] == self.vm_name), None)
-
-        if vm_info:
-            state = vm_info['state']
-            running = vm_info['running']
-
-            # Actualizar label de estado
-            if running:
-                self.status_label.set_markup('<span color="#26a269">● En ejecución</span>')
-                self.start_btn.set_visible(False)
-                self.shutdown_btn.set_visible(True)
-                self.reboot_btn.set_visible(True)
-                self.save_btn.set_visible(True)
-            elif state in ['shut off', 'apagado', 'apagada']:
-                self.status_label.set_markup('<span color="#c01c28">● Apagada</span>')
-                self.start_btn.set_visible(True)
-                self.shutdown_btn.set_visible(False)
-                self.reboot_btn.set_visible(False)
-                self.save_btn.set_visible(False)
-            else:
-                self.status_label.set_markup(f'<span color="#f57c00">● {state}</span>')
-                self.start_btn.set_visible(True)
-                self.shutdown_btn.set_visible(False)
-                self.reboot_btn.set_visible(False)
-                self.save_btn.set_visible(False)
-
-            # Obtener estadísticas si está corriendo
-            if running:
-                # Obtener IP
-                ip = self.vm_manager.get_vm_ip_address(self.vm_name)
-                if ip:
-                    self.ip_label.set_markup(f'<span>🌐 IP: <b>{ip}</b></span>')
-                else:
-                    self.ip_label.set_text("🌐 IP: Obteniendo...")
-
-                # Obtener uptime
-                uptime_seconds = self.vm_manager.get_vm_uptime(self.vm_name)
-                if uptime_seconds:
-                    hours = uptime_seconds // 3600
-                    minutes = (uptime_seconds % 3600) // 60
-                    if hours > 0:
-                        self.uptime_label.set_text(f"⏰ Uptime: {hours}h {minutes}m")
-                    else:
-                        self.uptime_label.set_text(f"⏰ Uptime: {minutes}m")
-                else:
-                    self.uptime_label.set_text("⏰ Uptime: N/A")
-
-                # Obtener estadísticas detalladas una sola vez
-                detailed_stats = self.vm_manager.get_vm_detailed_stats(self.vm_name)
-                if detailed_stats:
-                    # CPU básico
-                    cpu_time = detailed_stats.get('cpu_time')
-                    vcpu_current = detailed_stats.get('vcpu_current', 0)
-                    if cpu_time:
-                        cpu_seconds = cpu_time / 1_000_000_000
-                        cpu_hours = cpu_seconds / 3600
-                        if cpu_hours >= 1:
-                            self.cpu_label.set_text(f"⚙️ CPU: {vcpu_current} vCPUs | {cpu_hours:.1f}h")
-                        else:
-                            cpu_minutes = cpu_seconds / 60
-                            self.cpu_label.set_text(f"⚙️ CPU: {vcpu_current} vCPUs | {cpu_minutes:.1f}m")
-                    else:
-                        self.cpu_label.set_text(f"⚙️ CPU: {vcpu_current} vCPUs activas")
-
-                    # Memoria básica - usar datos consistentes de domstats
-                    mem_actual = detailed_stats.get('memory_actual')  # Memoria asignada al balloon
-                    mem_available = detailed_stats.get('memory_available')  # Memoria máxima configurada
-                    mem_unused = detailed_stats.get('memory_unused')  # Memoria no usada dentro del guest
-                    mem_rss = detailed_stats.get('memory_rss')  # Memoria RSS del host
-
-                    if mem_actual and mem_unused is not None:
-                        # Calcular memoria usada dentro del guest (más preciso)
-                        used_kb = mem_actual - mem_unused
-                        mem_gb_used = used_kb / (1024 * 1024)
-                        mem_gb_total = mem_actual / (1024 * 1024)
-                        mem_percent = (used_kb / mem_actual) * 100 if mem_actual > 0 else 0
-                        self.memory_label.set_text(f"💾 Memoria: {mem_gb_used:.1f}/{mem_gb_total:.1f} GB ({mem_percent:.0f}%)")
-                    elif mem_actual and mem_rss:
-                        # Usar RSS como aproximación del uso real
-                        mem_gb_actual = mem_actual / (1024 * 1024)
-                        mem_gb_rss = mem_rss / (1024 * 1024)
-                        mem_percent = (mem_rss / mem_actual) * 100 if mem_actual > 0 else 0
-                        self.memory_label.set_text(f"💾 Memoria: {mem_gb_rss:.1f}/{mem_gb_actual:.1f} GB ({mem_percent:.0f}%)")
-                    elif mem_actual:
-                        # Fallback: solo memoria asignada
-                        mem_gb_actual = mem_actual / (1024 * 1024)
-                        self.memory_label.set_text(f"💾 Memoria: {mem_gb_actual:.1f} GB (Asignada)")
-                    else:
-                        self.memory_label.set_text("💾 Memoria: N/A")
-
-                    # Actualizar detalles expandibles
-                    self._update_detailed_stats(detailed_stats)
-                else:
-                    self.cpu_label.set_text("⚙️ CPU: Información no disponible")
-                    self.memory_label.set_text("💾 Memoria: Información no disponible")
-                    self._clear_detailed_stats()
-
-                self.details_expander.set_visible(True)
-            else:
-                self.cpu_label.set_text("⚙️ CPU: VM apagada")
-                self.memory_label.set_text("💾 Memoria: VM apagada")
-                self.ip_label.set_text("🌐 IP: N/A")
-                self._clear_detailed_stats()
-                self.details_expander.set_visible(False)
-
-    def _update_detailed_stats(self, stats):
-        """Actualiza las estadísticas detalladas con gráficos"""
-        import time as time_module
-
-        # Calcular porcentajes para gráficos circulares
-        mem_actual = stats.get('memory_actual')
-        mem_available = stats.get('memory_available')
-        vcpu_count = stats.get('vcpu_count', 1)
-        vcpu_current = stats.get('vcpu_current', 0)
-        cpu_time = stats.get('cpu_time')  # En nanosegundos
-
-        # Calcular % real de uso de CPU basado en tiempo
-        cpu_percent = 0
-        current_time = time_module.time()
-
-        if cpu_time and self.last_cpu_time is not None and self.last_update_time is not None:
-            # Delta de tiempo de CPU en nanosegundos
-            cpu_time_delta = cpu_time - self.last_cpu_time
-            # Delta de tiempo real en segundos
-            real_time_delta = current_time - self.last_update_time
-
-            # Convertir delta de CPU a segundos
-            cpu_time_delta_seconds = cpu_time_delta / 1_000_000_000
-
-            # Calcular porcentaje considerando todas las vCPUs
-            # % = (tiempo_cpu_usado / (tiempo_real * num_vcpus)) * 100
-            if real_time_delta > 0 and vcpu_count > 0:
-                cpu_percent = (cpu_time_delta_seconds / (real_time_delta * vcpu_count)) * 100
-                cpu_percent = max(0, min(100, cpu_percent))  # Limitar entre 0-100%
-
-        # Guardar valores actuales para próxima iteración
-        self.last_cpu_time = cpu_time
-        self.last_update_time = current_time
+    def update_vm_status(self, vm_info, host=None, stale_since=None):
+        """Actualiza la tarjeta con el estado de la VM de un FleetSnapshot
+
+        stale_since es el timestamp de un snapshot de la caché de arranque:
+        se muestra atenuado y sin calcular tasas hasta el primer ciclo real.
+        Solo se tocan los widgets cuyos campos del modelo de vista cambian.
+        """
+        if not vm_info or vm_info['state'] is None:
+            if stale_since is None:
+                self.view.update({'stale': False})
+            return
+
+        self.view.update(card_view.format_status(vm_info, stale_since))
+
+        detailed_stats = vm_info.get('stats')
+        if vm_info['running'] and detailed_stats:
+            # Actualizar detalles expandibles (las tasas necesitan dos muestras reales)
+            if stale_since is None:
+                self._update_detailed_stats(detailed_stats, vm_info, host or {})
+        else:
+            self._clear_detailed_stats()
+
+    def _set_stale(self, stale):
+        """Atenúa la tarjeta mientras muestra el último estado conocido"""
+        if stale:
+            self.card.add_css_class('stale')
+            self.card.set_tooltip_text("Último estado conocido; actualizando...")
+        else:
+            self.card.remove_css_class('stale')
+            self.card.set_tooltip_text(None)
+
+    def _update_detailed_stats(self, stats, vm_info, host):
+        """Toma las tasas del recolector y actualiza los detalles si ya existen"""
+        # Tasas del intervalo (calculadas por el RateEngine del recolector; None en la primera muestra)
+        rates = vm_info.get('rates') or EMPTY_RATES
+        cpu_percent = rates['cpu_percent']
+        net_rx_mbps = rates['net_rx_mbps']
+        net_tx_mbps = rates['net_tx_mbps']
+        read_iops = rates['read_iops']
+        write_iops = rates['write_iops']
 
         # Memoria: usar datos consistentes de domstats
+        mem_actual = stats.get('memory_actual')
         mem_percent = 0
-        mem_label = ""
-        mem_unused = stats.get('memory_unused')
         mem_rss = stats.get('memory_rss')
 
-        if mem_actual and mem_unused is not None:
-            # Calcular memoria usada dentro del guest (más preciso)
-            used_kb = mem_actual - mem_unused
-            mem_percent = (used_kb / mem_actual) * 100 if mem_actual > 0 else 0
-            mem_gb_used = used_kb / (1024 * 1024)
-            mem_gb_total = mem_actual / (1024 * 1024)
-            mem_label = f"{mem_gb_used:.1f}/{mem_gb_total:.1f} GB"
+        guest = memory_stats.guest_memory(stats)
+        if guest:
+            # Memoria usada dentro del guest sin la caché de páginas (más preciso)
+            mem_percent = guest['used_percent']
         elif mem_actual and mem_rss:
             # Usar RSS como aproximación del uso real
             mem_percent = (mem_rss / mem_actual) * 100 if mem_actual > 0 else 0
-            mem_gb_rss = mem_rss / (1024 * 1024)
-            mem_gb_total = mem_actual / (1024 * 1024)
-            mem_label = f"{mem_gb_rss:.1f}/{mem_gb_total:.1f} GB"
         elif mem_actual:
-            # Fallback: mostrar memoria asignada
-            mem_gb = mem_actual / (1024 * 1024)
+            # Fallback: memoria asignada
             mem_percent = 50  # Valor fijo visual para gráfico
-            mem_label = f"{mem_gb:.1f} GB (Asignada)"
-
-        # Actualizar gráficos circulares
-        self.cpu_circular.set_value(cpu_percent, f"{cpu_percent:.1f}%", "CPU")
-        self.memory_circular.set_value(
-            mem_percent,
-            f"{mem_percent:.1f}%",
-            "RAM Guest" if mem_unused is not None else ("RAM RSS" if mem_rss else "RAM Asignada")
-        )
 
-        # Agregar al historial
-        self.cpu_line_chart.add_data_point(cpu_percent)
-        self.memory_line_chart.add_data_point(mem_percent)
-
-        # vCPUs con tiempo de CPU
-        cpu_time = stats.get('cpu_time')
-        if cpu_time:
-            cpu_seconds = cpu_time / 1_000_000_000
-            cpu_hours = cpu_seconds / 3600
-            if cpu_hours >= 1:
-                self.vcpu_info_label.set_text(f"Activas: {vcpu_current} / {vcpu_count} | Tiempo total: {cpu_hours:.1f}h")
-            else:
-                cpu_minutes = cpu_seconds / 60
-                self.vcpu_info_label.set_text(f"Activas: {vcpu_current} / {vcpu_count} | Tiempo total: {cpu_minutes:.1f}m")
-        else:
-            self.vcpu_info_label.set_text(f"Activas: {vcpu_current} / {vcpu_count}")
-
-        # === Calcular métricas de red en tiempo real (MB/s) ===
-        rx_bytes = stats.get('net_rx_bytes', 0)
-        tx_bytes = stats.get('net_tx_bytes', 0)
-
-        net_rx_mbps = 0
-        net_tx_mbps = 0
-
-        if self.last_net_rx_bytes is not None and self.last_net_tx_bytes is not None and self.last_update_time is not None:
-            time_delta = current_time - self.last_update_time
-            if time_delta > 0:
-                # Calcular MB/s
-                rx_delta = rx_bytes - self.last_net_rx_bytes
-                tx_delta = tx_bytes - self.last_net_tx_bytes
-                net_rx_mbps = (rx_delta / time_delta) / (1024 * 1024)  # Convertir a MB/s
-                net_tx_mbps = (tx_delta / time_delta) / (1024 * 1024)
-                net_rx_mbps = max(0, net_rx_mbps)  # Evitar negativos
-                net_tx_mbps = max(0, net_tx_mbps)
-
-        self.last_net_rx_bytes = rx_bytes
-        self.last_net_tx_bytes = tx_bytes
-
-        # Agregar a historial de red (normalizar a 0-100 para gráficos, asumiendo max 100 MB/s)
+        # Historial en memoria (red normalizada sobre 100 MB/s para los gráficos)
         net_rx_percent = min(100, (net_rx_mbps / 100) * 100)
         net_tx_percent = min(100, (net_tx_mbps / 100) * 100)
-        self.net_rx_chart.add_data_point(net_rx_percent)
-        self.net_tx_chart.add_data_point(net_tx_percent)
-
-        # Actualizar quick stat de red
-        if net_rx_mbps > 0 or net_tx_mbps > 0:
-            self.net_mini_value.set_markup(f'<span size="large" weight="bold">↓{net_rx_mbps:.1f} ↑{net_tx_mbps:.1f} MB/s</span>')
-        else:
-            self.net_mini_value.set_markup('<span size="large">0 MB/s</span>')
-
-        # === Disco: calcular IOPS y latencia ===
-        block_capacity = stats.get('block_capacity', 0)
-        block_allocation = stats.get('block_allocation', 0)
-        block_read_reqs = stats.get('block_read_reqs', 0)
-        block_write_reqs = stats.get('block_write_reqs', 0)
-        block_read_bytes = stats.get('block_read_bytes', 0)
-        block_write_bytes = stats.get('block_write_bytes', 0)
-        block_rd_times = stats.get('block_rd_total_times', 0)
-        block_wr_times = stats.get('block_wr_total_times', 0)
-
-        # Calcular IOPS (operaciones por segundo)
-        read_iops = 0
-        write_iops = 0
-        avg_read_latency_ms = 0
-        avg_write_latency_ms = 0
-
-        if self.last_block_read_reqs is not None and self.last_block_write_reqs is not None and self.last_update_time is not None:
-            time_delta = current_time - self.last_update_time
-            if time_delta > 0:
-                read_ops_delta = block_read_reqs - self.last_block_read_reqs
-                write_ops_delta = block_write_reqs - self.last_block_write_reqs
-                read_iops = max(0, read_ops_delta / time_delta)
-                write_iops = max(0, write_ops_delta / time_delta)
-
-        self.last_block_read_reqs = block_read_reqs
-        self.last_block_write_reqs = block_write_reqs
-
-        # Calcular latencia promedio (nanosegundos a milisegundos)
-        if block_read_reqs > 0:
-            avg_read_latency_ms = (block_rd_times / block_read_reqs) / 1_000_000  # ns a ms
-        if block_write_reqs > 0:
-            avg_write_latency_ms = (block_wr_times / block_write_reqs) / 1_000_000
-
-        if block_capacity > 0:
-            capacity_gb = block_capacity / (1024 * 1024 * 1024)
-            allocation_gb = block_allocation / (1024 * 1024 * 1024)
-            usage_percent = (block_allocation / block_capacity) * 100 if block_capacity > 0 else 0
-
-            self.disk_usage_bar.set_value(usage_percent, allocation_gb, capacity_gb)
-            self.disk_detail_label.set_text(f"Dispositivos: {stats.get('block_count', 0)}")
-            self.disk_iops_label.set_text(f"📊 IOPS: {read_iops:.1f} lectura/s, {write_iops:.1f} escritura/s")
-            self.disk_latency_label.set_text(f"⏱️ Latencia: {avg_read_latency_ms:.2f}ms lectura, {avg_write_latency_ms:.2f}ms escritura")
-
-            # Actualizar quick stat de disco
-            self.disk_mini_value.set_markup(f'<span size="large" weight="bold">{allocation_gb:.1f}/{capacity_gb:.1f} GB</span>')
-        else:
-            self.disk_usage_bar.set_value(0, 0, 0)
-            self.disk_detail_label.set_text("Sin información de disco")
-            self.disk_iops_label.set_text("")
-            self.disk_latency_label.set_text("")
-            self.disk_mini_value.set_markup('<span size="large">N/A</span>')
-
-        # Red con formato
-        rx_bytes = stats.get('net_rx_bytes', 0)
-        tx_bytes = stats.get('net_tx_bytes', 0)
-
-        def format_bytes(bytes_val):
-            if bytes_val >= 1024 * 1024 * 1024:
-                return f"{bytes_val / (1024 * 1024 * 1024):.2f} GB"
-            elif bytes_val >= 1024 * 1024:
-                return f"{bytes_val / (1024 * 1024):.2f} MB"
-            elif bytes_val >= 1024:
-                return f"{bytes_val / 1024:.2f} KB"
-            else:
-                return f"{bytes_val} B"
-
-        self.net_rx_label.set_text(f"⬇️ Recibido total: {format_bytes(rx_bytes)}")
-        self.net_tx_label.set_text(f"⬆️ Enviado total: {format_bytes(tx_bytes)}")
-
-        # === Información Avanzada ===
-
-        # Interfaces de red con detalles
-        net_interfaces = self.vm_manager.get_vm_network_interfaces(self.vm_name)
-        if net_interfaces:
-            ifaces_text = "🔌 Interfaces: "
-            iface_details = []
-            for iface in net_interfaces:
-                mac = iface.get('mac', 'N/A')
-                model = iface.get('model', 'N/A')
-                state = iface.get('link_state', 'up')
-                state_icon = "🟢" if state == "up" else "🔴"
-                source = iface.get('source', 'N/A')
-                iface_details.append(f"{state_icon} {mac} ({model}) → {source}")
-
-            # Mostrar drops y errores si están disponibles
-            net_rx_drop = stats.get('net_rx_drop', 0)
-            net_tx_drop = stats.get('net_tx_drop', 0)
-            if net_rx_drop > 0 or net_tx_drop > 0:
-                iface_details.append(f"⚠️ Drops: RX {net_rx_drop}, TX {net_tx_drop}")
-
-            self.net_interfaces_label.set_text(ifaces_text + ", ".join(iface_details))
-        else:
-            self.net_interfaces_label.set_text("🔌 Interfaces: N/A")
-
-        # Drivers virtio
-        virtio_info = self.vm_manager.get_vm_virtio_drivers(self.vm_name)
-        if virtio_info:
-            virtio_enabled = [k for k, v in virtio_info.items() if v]
-            if virtio_enabled:
-                self.virtio_drivers_label.set_text(f"⚡ Virtio: {', '.join(virtio_enabled)}")
-            else:
-                self.virtio_drivers_label.set_text("⚡ Virtio: Ninguno activo")
-        else:
-            self.virtio_drivers_label.set_text("⚡ Virtio: N/A")
-
-        # CPU features (solo mostrar los más importantes)
-        cpu_features = self.vm_manager.get_vm_cpu_features(self.vm_name)
-        if cpu_features:
-            # Filtrar solo features importantes (SSE, AVX, etc.)
-            important = [f for f in cpu_features if any(x in f.lower() for x in ['sse', 'avx', 'aes', 'mode:'])]
-            if important:
-                self.cpu_features_label.set_text(f"🔧 CPU: {', '.join(important[:10])}")
-            else:
-                self.cpu_features_label.set_text(f"🔧 CPU: {len(cpu_features)} features habilitados")
-        else:
-            self.cpu_features_label.set_text("🔧 CPU: N/A")
-
-        # Hugepages
-        hugepages = self.vm_manager.get_vm_hugepages(self.vm_name)
-        if hugepages and hugepages.get('enabled'):
-            pages_info = hugepages.get('pages', [])
-            if pages_info:
-                page_sizes = [f"{p['size']}{p['unit']}" for p in pages_info]
-                self.hugepages_label.set_text(f"📄 Hugepages: Habilitadas ({', '.join(page_sizes)})")
-            else:
-                self.hugepages_label.set_text("📄 Hugepages: Habilitadas")
-        else:
-            self.hugepages_label.set_text("📄 Hugepages: Deshabilitadas")
-
-        # Blkio weight
-        blkio_weight = self.vm_manager.get_vm_blkio_weight(self.vm_name)
-        if blkio_weight:
-            priority = "Alta" if blkio_weight > 700 else ("Normal" if blkio_weight >= 300 else "Baja")
-            self.blkio_label.set_text(f"⚖️ Prioridad I/O: {blkio_weight} ({priority})")
-        else:
-            self.blkio_label.set_text("⚖️ Prioridad I/O: N/A")
-
-        # Temperatura del host
-        host_temp = self.vm_manager.get_vm_host_cpu_temp()
-        if host_temp:
-            temp_color = "🟢" if host_temp < 60 else ("🟡" if host_temp < 80 else "🔴")
-            self.host_temp_label.set_text(f"{temp_color} Temp. Host: {host_temp:.1f}°C")
-        else:
-            self.host_temp_label.set_text("🌡️ Temp. Host: N/A")
-
-        # Usuarios conectados
-        users = self.vm_manager.get_vm_guest_users(self.vm_name)
-        if users:
-            self.guest_users_label.set_text(f"👥 Usuarios: {', '.join(users)}")
-        else:
-            self.guest_users_label.set_text("👥 Usuarios: Ninguno")
+        # Sin muestras rápidas recientes la CPU del gráfico sale del ciclo normal
+        cpu_from_cycle = not self._has_fast_cpu()
+        if cpu_from_cycle:
+            self.cpu_history.append(cpu_percent)
+        self.memory_history.append(mem_percent)
+        self.net_rx_history.append(net_rx_percent)
+        self.net_tx_history.append(net_tx_percent)
+        threads = rates.get('threads')
+        if threads is not None:
+            self.thread_history.append(threads['roles'])
+        disk_rows = self.disk_history.update(stats.get('block_devices', []), rates.get('block'))
+
+        # Guardar la muestra en el historial persistente (no bloqueante)
+        if self.metrics_store:
+            self.metrics_store.record(self.vm_name, {
+                'cpu': cpu_percent,
+                'memory': mem_percent,
+                'net_rx': net_rx_mbps,
+                'net_tx': net_tx_mbps,
+                'disk_read_iops': read_iops,
+                'disk_write_iops': write_iops,
+            })
+
+        metrics = {
+            'cpu_percent': cpu_percent,
+            'mem_percent': mem_percent,
+            'net_rx_mbps': net_rx_mbps,
+            'net_tx_mbps': net_tx_mbps,
+            'read_iops': read_iops,
+            'write_iops': write_iops,
+            'disk_read_mbps': rates['disk_read_mbps'],
+            'disk_write_mbps': rates['disk_write_mbps'],
+            'read_latency_ms': rates['read_latency_ms'],
+            'write_latency_ms': rates['write_latency_ms'],
+            'pressure': {key: rates.get(key) for key in PRESSURE_FIELDS},
+            'threads': threads,
+            'memory': {key: rates.get(key) for key, _counter in MEMORY_RATES},
+        }
+        self._last_details = (stats, vm_info, host, metrics)
+
+        # Los detalles se construyen al expandir la tarjeta por primera vez
+        if self.details_built:
+            if cpu_from_cycle:
+                self.cpu_line_chart.add_data_point(cpu_percent)
+            self.memory_line_chart.add_data_point(mem_percent)
+            self.net_rx_chart.add_data_point(net_rx_percent)
+            self.net_tx_chart.add_data_point(net_tx_percent)
+            if threads is not None:
+                self.thread_chart.add_sample(threads['roles'])
+            if self.history_chart is not None:
+                self.history_chart.refresh()
+            self.disk_breakdown.set_rows(disk_rows)
+            self._render_details(stats, vm_info, host, metrics)
+
+    def _has_fast_cpu(self):
+        """True si la CPU del gráfico llega por el camino rápido (muestra reciente)"""
+        return (self._last_fast_cpu is not None and
+                time.monotonic() - self._last_fast_cpu < 2 * self.collector.fast_interval)
+
+    def add_fast_sample(self, sample):
+        """Muestra rápida de procfs ({'cpu_percent', 'rss_kb', ...}) para el gráfico de CPU"""
+        if sample.get('cpu_percent') is None:
+            return
+        self._last_fast_cpu = time.monotonic()
+        self.cpu_history.append(sample['cpu_percent'])
+        if self.details_built:
+            self.cpu_line_chart.add_data_point(sample['cpu_percent'])
+
+    def _render_details(self, stats, vm_info, host, metrics):
+        """Vuelca las métricas ya calculadas en los widgets de detalles"""
+        self.view.update(card_view.format_details(stats, vm_info, host, metrics))
 
     def _clear_detailed_stats(self):
         """Limpia las estadísticas detalladas"""
-        self.cpu_circular.set_value(0, "0%")
-        self.memory_circular.set_value(0, "0 GB", "RAM Asignada")
-        self.vcpu_info_label.set_text("VM apagada")
-        self.disk_usage_bar.set_value(0, 0, 0)
-        self.disk_detail_label.set_text("VM apagada")
-        self.disk_iops_label.set_text("")
-        self.disk_latency_label.set_text("")
-        self.net_rx_label.set_text("⬇️ Recibido: N/A")
-        self.net_tx_label.set_text("⬆️ Enviado: N/A")
-        self.uptime_label.set_text("⏰ Uptime: N/A")
-
-        # Limpiar información avanzada
-        self.net_interfaces_label.set_text("")
-        self.virtio_drivers_label.set_text("")
-        self.cpu_features_label.set_text("")
-        self.hugepages_label.set_text("")
-        self.blkio_label.set_text("")
-        self.host_temp_label.set_text("")
-        self.guest_users_label.set_text("")
+        self._last_details = None
+
+        # Sin enlazar (detalles sin construir) solo se guardan en el modelo de vista
+        self.view.update(card_view.CLEARED_DETAILS)
 
         # Limpiar historial
         self.cpu_history.clear()
         self.memory_history.clear()
         self.net_rx_history.clear()
         self.net_tx_history.clear()
-
-        # Resetear tracking
-        self.last_cpu_time = None
-        self.last_update_time = None
-        self.last_net_rx_bytes = None
-        self.last_net_tx_bytes = None
-        self.last_block_read_reqs = None
-        self.last_block_write_reqs = None
+        self._last_fast_cpu = None
+        self.thread_history.clear()
+        self.disk_history.clear()
+        if self.details_built:
+            self.disk_breakdown.set_rows([])
+            self.thread_chart.clear()
     
     def execute_vm_action(self, action_func, success_message, operation_name):
         """Ejecuta una acción de VM en un hilo separado"""
@@ -896,7 +845,8 @@ class VMCard(Gtk.Box):
                 time.sleep(0.5)  # Pequeña pausa para que se vea la operación
 
                 GLib.idle_add(self.set_loading, False)
-                GLib.idle_add(self.update_vm_status)
+                if self.collector:
+                    self.collector.request_refresh()
 
                 if success:
                     if self.notification_manager:
@@ -953,14 +903,182 @@ class VMCard(Gtk.Box):
         self.execute_vm_action(self.vm_manager.open_viewer, f"Abriendo viewer para '{self.vm_name}'", "viewer")
 
 
+class PinningAssistantWindow(Adw.Window):
+    """Asistente de pinning de vCPUs y NUMA: propone un plan, lo aplica en caliente y compara
+
+    La comparación antes/después empieza a acumular muestras de todas las
+    VMs al abrir la ventana (así proponer otro plan no las pierde); la
+    ventana principal le pasa cada snapshot con on_snapshot().
+    """
+
+    def __init__(self, parent, vm_manager, collector, **kwargs):
+        super().__init__(transient_for=parent, **kwargs)
+        from host_topology import HostTopology
+        import pinning
+
+        self.vm_manager = vm_manager
+        self.collector = collector
+        self.topology = HostTopology.read()
+        self.plan = None
+        self.comparison = None
+        self.set_title("Asistente de pinning y NUMA")
+        self.set_default_size(560, 520)
+
+        toolbar_view = Adw.ToolbarView()
+        toolbar_view.add_top_bar(Adw.HeaderBar())
+        content = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=12)
+        content.set_margin_top(12)
+        content.set_margin_bottom(12)
+        content.set_margin_start(16)
+        content.set_margin_end(16)
+
+        topology_label = Gtk.Label()
+        topology_label.set_css_classes(['caption'])
+        topology_label.set_halign(Gtk.Align.START)
+        topology_label.set_text(f"Host: {len(self.topology)} CPUs, {len(self.topology.cores)} núcleos, "
+                                f"{len(self.topology.nodes)} nodos NUMA · {pinning.HOUSEKEEPING_CORES} núcleo(s) "
+                                f"por nodo para el host, emuladores e IOThreads")
+        content.append(topology_label)
+
+        # VMs en ejecución del último snapshot
+        self.vm_checks = {}
+        latest = collector.latest
+        vms_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
+        for vm_name in vm_manager.vm_names:
+            vm = latest.get(vm_name) if latest is not None else None
+            check = Gtk.CheckButton.new_with_label(vm_name)
+            check.set_sensitive(bool(vm and vm['running']))
+            check.set_active(bool(vm and vm['running']))
+            vms_box.append(check)
+            self.vm_checks[vm_name] = check
+        content.append(vms_box)
+
+        buttons = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        propose_button = Gtk.Button.new_with_label("Proponer plan")
+        propose_button.connect('clicked', self._on_propose_clicked)
+        buttons.append(propose_button)
+        self.apply_button = Gtk.Button.new_with_label("Aplicar en caliente")
+        self.apply_button.set_css_classes(['suggested-action'])
+        self.apply_button.set_sensitive(False)
+        self.apply_button.connect('clicked', self._on_apply_clicked)
+        buttons.append(self.apply_button)
+        content.append(buttons)
+
+        self.plan_label = Gtk.Label()
+        self.plan_label.set_css_classes(['monospace'])
+        self.plan_label.set_halign(Gtk.Align.START)
+        self.plan_label.set_selectable(True)
+        self.plan_label.set_wrap(True)
+        content.append(self.plan_label)
+
+        comparison_title = Gtk.Label()
+        comparison_title.set_markup('<span weight="bold">Antes / después</span>')
+        comparison_title.set_halign(Gtk.Align.START)
+        content.append(comparison_title)
+        self.comparison_label = Gtk.Label()
+        self.comparison_label.set_css_classes(['monospace'])
+        self.comparison_label.set_halign(Gtk.Align.START)
+        content.append(self.comparison_label)
+
+        scroll = Gtk.ScrolledWindow()
+        scroll.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        scroll.set_child(content)
+        toolbar_view.set_content(scroll)
+        self.set_content(toolbar_view)
+
+        self.comparison = pinning.PinningComparison(list(self.vm_checks))
+
+    def _selected(self):
+        return [name for name, check in self.vm_checks.items() if check.get_active()]
+
+    def _on_propose_clicked(self, button):
+        import pinning
+
+        latest = self.collector.latest
+        if latest is None:
+            self.plan_label.set_text("Todavía no hay datos del recolector")
+            return
+        self.plan = pinning.propose_plan(self.topology, latest, self._selected())
+        self.plan_label.set_text(pinning.describe_plan(self.plan))
+        self.apply_button.set_sensitive(bool(self.plan['vms']))
+
+    def _on_apply_clicked(self, button):
+        import pinning
+
+        plan = self.plan
+        self.apply_button.set_sensitive(False)
+        self.plan_label.set_text(pinning.describe_plan(plan) + "\n\nAplicando…")
+
+        def run_apply():
+            results = pinning.apply_plan(self.vm_manager, plan)
+            GLib.idle_add(self._on_applied, plan, results)
+
+        threading.Thread(target=run_apply, daemon=True).start()
+
+    def _on_applied(self, plan, results):
+        import pinning
+
+        lines = [f"{'✓' if result['ok'] else '✗'} {result['vm']}: {result['step']}"
+                 + (f" ({result['error']})" if result['error'] else "") for result in results]
+        self.plan_label.set_text(pinning.describe_plan(plan) + "\n\n" + "\n".join(lines))
+        self.comparison.mark_applied(list(plan['vms']))
+        self.comparison_label.set_text(self.comparison.describe())
+        self.collector.request_refresh()
+        return False
+
+    def on_snapshot(self, snapshot):
+        """Llamado por la ventana principal con cada snapshot aplicado"""
+        self.comparison.observe(snapshot)
+        self.comparison_label.set_text(self.comparison.describe())
+
+
 class VMPanelWindow(Adw.ApplicationWindow):
-    def __init__(self, **kwargs):
+    def __init__(self, exporter_port=None, exporter_address='127.0.0.1', fast_interval=None,
+                 connection_uri='qemu:///system', vm_names=None, balloon=None, balloon_limits=None,
+                 vcpu_autoscale=None, vcpu_limits=None, **kwargs):
         super().__init__(**kwargs)
         
         print("🎯 Inicializando VMPanelWindow...")
         
-        self.vm_manager = VMManager()
+        # Los requisitos (systemctl) se comprueban en el hilo del recolector
+        self.vm_manager = VMManager(check_requirements=False, connection_uri=connection_uri, vm_names=vm_names)
+        self.metrics_store = MetricsStore()
+        self.collector = FleetCollector(self.vm_manager, fast_interval=fast_interval)
+        self.exporter = None
+        if exporter_port:
+            from exporter import MetricsExporter
+            self.exporter = MetricsExporter(self.collector, exporter_port, exporter_address)
+        # Política de balloon ('dry-run' o 'apply'); decide en el hilo del recolector
+        self.balloon_policy = None
+        if balloon:
+            from audit_log import AuditLog, default_audit_path
+            from balloon_policy import BalloonPolicy
+            self.balloon_policy = BalloonPolicy(self.vm_manager, dry_run=balloon == 'dry-run',
+                                                limits=balloon_limits, audit=AuditLog(default_audit_path('balloon')))
+        self.vcpu_policy = None
+        if vcpu_autoscale:
+            from audit_log import AuditLog, default_audit_path
+            from vcpu_policy import VcpuPolicy
+            self.vcpu_policy = VcpuPolicy(self.vm_manager, dry_run=vcpu_autoscale == 'dry-run',
+                                          limits=vcpu_limits, audit=AuditLog(default_audit_path('vcpu')))
         self.vm_cards = {}
+        self._first_data_shown = False
+
+        # Último snapshot pendiente de aplicar en el próximo frame (gana el más reciente)
+        self._pending_snapshot = None
+        self._pending_fast = None
+        self._pending_lock = threading.Lock()
+
+        # Último estado conocido: se pinta antes del primer ciclo del recolector
+        self.state_cache = StateCache()
+        self._last_cache_save = time.monotonic()
+        self._warm_snapshot = None
+        self._warm_history = {}
+        warm_state = self.state_cache.load()
+        if warm_state is not None:
+            self._warm_snapshot, self._warm_history = warm_state
+            self.collector.seed(self._warm_snapshot)
+            startup.mark('caché de estado cargada')
         
         # Cargar estilos CSS
         self.load_css()
@@ -981,8 +1099,32 @@ class VMPanelWindow(Adw.ApplicationWindow):
         # Crear contenido principal
         self.create_main_content()
         
+        # Pintar el último estado conocido mientras llega el primer snapshot
+        if self._warm_snapshot is not None:
+            self._apply_snapshot(self._warm_snapshot)
+            self._warm_history = {}
+
         # Configurar actualización automática
         self.setup_auto_update()
+
+        # Detener la recolección y sincronizar el historial al cerrar
+        self.connect('close-request', self.on_close_request)
+        self.connect('realize', self._on_realize)
+
+    def _on_realize(self, window):
+        """Engancha el frame clock: primer frame del arranque y contadores por frame"""
+        frame_clock = self.get_frame_clock()
+        if frame_clock is None:
+            return
+
+        def on_after_paint(clock):
+            clock.disconnect(handler_id)
+            startup.mark('primer frame')
+            # Los widgets cairo del mapa de calor no retrasan el primer frame
+            GLib.idle_add(self._build_heatmap)
+
+        handler_id = frame_clock.connect('after-paint', on_after_paint)
+        frame_clock.connect('after-paint', lambda clock: frame_stats.stats.end_frame())
     
     def create_main_content(self):
         """Crea el contenido principal de la ventana"""
@@ -1000,12 +1142,20 @@ class VMPanelWindow(Adw.ApplicationWindow):
         refresh_btn.set_tooltip_text("Actualizar estado de VMs")
         refresh_btn.connect('clicked', self.on_refresh_clicked)
         header.pack_end(refresh_btn)
+
+        # Asistente de pinning de vCPUs y NUMA
+        pinning_btn = Gtk.Button.new_from_icon_name("view-grid-symbolic")
+        pinning_btn.set_tooltip_text("Asistente de pinning de vCPUs y NUMA")
+        pinning_btn.connect('clicked', self.on_pinning_clicked)
+        header.pack_end(pinning_btn)
+        self.pinning_window = None
         
         # Añadir header al toolbar view
         toolbar_view.add_top_bar(header)
         
         # Contenedor principal con scroll
         scroll = Gtk.ScrolledWindow()
+        self.scroll = scroll
         scroll.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
         
         # Box principal
@@ -1052,10 +1202,39 @@ class VMPanelWindow(Adw.ApplicationWindow):
         self.host_temp_card = self._create_stat_card("🌡️ Temperatura Host", "N/A", "warning")
         stats_grid.attach(self.host_temp_card, 3, 0, 1, 1)
 
+        # Cards de disco y red de la flota (suma de las tasas del recolector)
+        self.total_disk_card = self._create_stat_card("💿 Disco", "N/A", "info")
+        stats_grid.attach(self.total_disk_card, 0, 1, 1, 1)
+        self.total_net_card = self._create_stat_card("🌐 Red", "N/A", "info")
+        stats_grid.attach(self.total_net_card, 1, 1, 1, 1)
+
+        # Card del host (CPU, memoria y carga de /proc, una lectura por ciclo)
+        self.host_load_card = self._create_stat_card("🖥️ Host", "N/A", "info")
+        stats_grid.attach(self.host_load_card, 2, 1, 2, 1)
+
+        # Import diferido: fleet_summary puede cargar NumPy
+        from fleet_summary import FleetAggregator
+        self.fleet_aggregator = FleetAggregator()
+
+        self.summary_view = card_view.ViewModel()
+        self.summary_view.bind('total_vms', self.total_vms_card.value_label.set_markup)
+        self.summary_view.bind('total_cpu', self.total_cpu_card.value_label.set_markup)
+        self.summary_view.bind('total_ram', self.total_ram_card.value_label.set_markup)
+        self.summary_view.bind('host_temp', self.host_temp_card.value_label.set_markup)
+        self.summary_view.bind('total_disk', self.total_disk_card.value_label.set_markup)
+        self.summary_view.bind('total_net', self.total_net_card.value_label.set_markup)
+        self.summary_view.bind('host_load', self.host_load_card.value_label.set_markup)
+
         summary_box.append(stats_grid)
         summary_frame.set_child(summary_box)
         main_box.append(summary_frame)
 
+        # === MAPA DE CALOR DE LA FLOTA ===
+        main_box.append(self._create_heatmap_section())
+
+        # === UBICACIÓN DE vCPUs EN EL HOST ===
+        main_box.append(self._create_placement_section())
+
         # Separador
         main_box.append(Gtk.Separator())
 
@@ -1076,7 +1255,9 @@ class VMPanelWindow(Adw.ApplicationWindow):
         row = 0
         col = 0
         for vm_name in self.vm_manager.vm_names:
-            vm_card = VMCard(vm_name, self.vm_manager, self.notification_manager, self.error_handler)
+            vm_card = VMCard(vm_name, self.vm_manager, self.notification_manager, self.error_handler,
+                             metrics_store=self.metrics_store, collector=self.collector,
+                             history=self._warm_history.get(vm_name))
             self.vm_cards[vm_name] = vm_card
             self.vms_box.attach(vm_card, col, row, 1, 1)
 
@@ -1101,6 +1282,121 @@ class VMPanelWindow(Adw.ApplicationWindow):
             vm_card.notification_manager = self.notification_manager
             vm_card.error_handler = self.error_handler
     
+    def _create_heatmap_section(self):
+        """Mapa de calor con una celda por VM (un solo widget para toda la flota)
+
+        Aquí solo se crean la cabecera y el contenedor: el widget (y con él
+        cairo y widgets.py) se construye en _build_heatmap tras el primer frame.
+        """
+        import heatmap
+
+        heatmap_frame = Gtk.Frame()
+        heatmap_frame.set_css_classes(['card'])
+        heatmap_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=12)
+        heatmap_box.set_margin_top(16)
+        heatmap_box.set_margin_bottom(16)
+        heatmap_box.set_margin_start(16)
+        heatmap_box.set_margin_end(16)
+
+        # Título y selector de métrica
+        header_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
+        heatmap_title = Gtk.Label()
+        heatmap_title.set_markup('<span size="large" weight="bold">🗺️ Mapa de la Flota</span>')
+        heatmap_title.set_halign(Gtk.Align.START)
+        heatmap_title.set_hexpand(True)
+        header_box.append(heatmap_title)
+
+        metrics = list(heatmap.METRICS)
+        self.heatmap_metric_dropdown = Gtk.DropDown.new_from_strings([heatmap.METRICS[metric] for metric in metrics])
+        self.heatmap_metric_dropdown.set_tooltip_text("Métrica que colorea las celdas")
+        header_box.append(self.heatmap_metric_dropdown)
+        heatmap_box.append(header_box)
+
+        self.heatmap_box = heatmap_box
+        self.heatmap_metrics = metrics
+        self.fleet_heatmap = None
+        self.heatmap_metric_dropdown.connect('notify::selected', self._on_heatmap_metric_selected)
+
+        heatmap_frame.set_child(heatmap_box)
+        return heatmap_frame
+
+    def _on_heatmap_metric_selected(self, dropdown, _pspec):
+        if self.fleet_heatmap is not None:
+            self.fleet_heatmap.set_metric(self.heatmap_metrics[dropdown.get_selected()])
+
+    def _build_heatmap(self):
+        """Crea el widget del mapa de calor (idle tras el primer frame) y le pasa el último snapshot"""
+        if self.fleet_heatmap is not None:
+            return False
+        from widgets import FleetHeatmapWidget
+
+        metric = self.heatmap_metrics[self.heatmap_metric_dropdown.get_selected()]
+        self.fleet_heatmap = FleetHeatmapWidget(metric, on_activate=self._focus_vm_card)
+        self.heatmap_box.append(self.fleet_heatmap)
+        latest = self.collector.latest
+        if latest is not None:
+            self.fleet_heatmap.set_snapshot(latest)
+        return False
+
+    def _create_placement_section(self):
+        """Expander con la ubicación de las vCPUs sobre los núcleos del host
+
+        La topología se lee de sysfs y el widget se construye al expandir
+        por primera vez; después se alimenta de los snapshots del recolector.
+        """
+        placement_frame = Gtk.Frame()
+        placement_frame.set_css_classes(['card'])
+        self.placement_expander = Gtk.Expander()
+        self.placement_expander.set_label("🧩 Ubicación de vCPUs en el host")
+        self.placement_expander.set_margin_top(12)
+        self.placement_expander.set_margin_bottom(12)
+        self.placement_expander.set_margin_start(16)
+        self.placement_expander.set_margin_end(16)
+        self.placement_map = None
+        self.placement_expander.connect('notify::expanded', self._on_placement_expanded)
+        placement_frame.set_child(self.placement_expander)
+        return placement_frame
+
+    def _on_placement_expanded(self, expander, _pspec):
+        if not expander.get_expanded() or self.placement_map is not None:
+            return
+        from host_topology import HostTopology
+        from placement import PlacementModel
+        from widgets import PlacementMapWidget
+
+        placement_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
+        placement_box.set_margin_top(8)
+        self.placement_map = PlacementMapWidget(PlacementModel(HostTopology.read()))
+        placement_box.append(self.placement_map)
+        self.placement_summary = Gtk.Label()
+        self.placement_summary.set_css_classes(['caption'])
+        self.placement_summary.set_halign(Gtk.Align.START)
+        self.placement_summary.set_wrap(True)
+        placement_box.append(self.placement_summary)
+        expander.set_child(placement_box)
+
+        latest = self.collector.latest
+        if latest is not None:
+            self._update_placement(latest)
+
+    def _update_placement(self, snapshot):
+        self.placement_map.set_snapshot(snapshot)
+        summary = self.placement_map.model.summary()
+        self.placement_summary.set_text(summary or "Sin núcleos sobresuscritos ni vCPUs fuera de su nodo")
+
+    def _focus_vm_card(self, vm_name):
+        """Desplaza la vista hasta la tarjeta de una VM y la resalta un momento"""
+        vm_card = self.vm_cards.get(vm_name)
+        if vm_card is None:
+            return
+        # Coordenadas respecto al contenido (no cambian con el desplazamiento)
+        point = vm_card.translate_coordinates(self.vms_box.get_parent(), 0, 0)
+        if point is not None:
+            adjustment = self.scroll.get_vadjustment()
+            adjustment.set_value(min(point[1], adjustment.get_upper() - adjustment.get_page_size()))
+        vm_card.card.add_css_class('focused')
+        GLib.timeout_add(1500, lambda: vm_card.card.remove_css_class('focused') or False)
+
     def _create_stat_card(self, title, value, style_class):
         """Crea una card de estadística rápida"""
         card_frame = Gtk.Frame()
@@ -1132,94 +1428,196 @@ class VMPanelWindow(Adw.ApplicationWindow):
 
         return card_frame
 
-    def _update_summary_stats(self):
+    def _update_summary_stats(self, snapshot):
         """Actualiza las estadísticas del dashboard de resumen"""
         total_vms = len(self.vm_manager.vm_names)
-        running_vms = sum(1 for vm in self.vm_manager.list_all_vms() if vm['running'])
+        running_vms = snapshot.running_count
 
         # VMs totales
-        self.total_vms_card.value_label.set_markup(
-            f'<span size="x-large" weight="bold">{running_vms} activas / {total_vms} total</span>'
-        )
+        fields = {'total_vms': f'<span size="x-large" weight="bold">{running_vms} activas / {total_vms} total</span>'}
 
-        # CPU total (promedio de todas las VMs)
-        total_cpu = 0
-        cpu_count = 0
-        for vm_card in self.vm_cards.values():
-            if hasattr(vm_card, 'last_cpu_time') and vm_card.last_cpu_time is not None:
-                stats = self.vm_manager.get_vm_detailed_stats(vm_card.vm_name)
-                if stats and stats.get('cpu_time'):
-                    # Aproximación simplificada
-                    cpu_count += 1
-
-        # Mostrar un promedio simple (esto se puede mejorar)
-        avg_cpu = total_cpu / max(1, cpu_count) if cpu_count > 0 else 0
-        self.total_cpu_card.value_label.set_markup(
-            f'<span size="x-large" weight="bold">~{avg_cpu:.1f}%</span>'
-        )
+        # CPU, memoria, IOPS y rendimiento de la flota desde la tabla columnar del snapshot
+        summary = self.fleet_aggregator.update(snapshot)
+        if summary['cpu_percent'] is not None:
+            fields['total_cpu'] = f'<span size="x-large" weight="bold">{summary["cpu_percent"]:.1f}%</span>'
+        else:
+            fields['total_cpu'] = '<span size="x-large" weight="bold">N/A</span>'
 
-        # RAM total (usar datos consistentes de domstats)
-        total_ram_gb = 0
-        for vm_card in self.vm_cards.values():
-            stats = self.vm_manager.get_vm_detailed_stats(vm_card.vm_name)
-            if stats:
-                mem_actual = stats.get('memory_actual')
-                mem_unused = stats.get('memory_unused')
-                mem_rss = stats.get('memory_rss')
-                if mem_actual and mem_unused is not None:
-                    used_kb = mem_actual - mem_unused
-                    total_ram_gb += used_kb / (1024 * 1024)
-                elif mem_actual and mem_rss:
-                    # Usar RSS como aproximación
-                    total_ram_gb += mem_rss / (1024 * 1024)
-                elif mem_actual:
-                    # Fallback: usar memoria asignada
-                    total_ram_gb += mem_actual / (1024 * 1024)
-
-        self.total_ram_card.value_label.set_markup(
-            f'<span size="x-large" weight="bold">{total_ram_gb:.1f} GB</span>'
-        )
+        fields['total_ram'] = (f'<span size="x-large" weight="bold">{summary["memory_used_gb"]:.1f} GB</span>'
+                               f'<span size="small"> / {summary["memory_assigned_gb"]:.1f} GB</span>')
+
+        if summary['iops'] is not None:
+            disk_mbps = summary['disk_read_mbps'] + summary['disk_write_mbps']
+            fields['total_disk'] = (f'<span size="x-large" weight="bold">{summary["iops"]:.0f} IOPS</span>'
+                                    f'<span size="small"> · {disk_mbps:.1f} MB/s</span>')
+            fields['total_net'] = (f'<span size="x-large" weight="bold">↓ {summary["net_rx_mbps"]:.1f} MB/s</span>'
+                                   f'<span size="x-large" weight="bold">  ↑ {summary["net_tx_mbps"]:.1f} MB/s</span>')
+        else:
+            fields['total_disk'] = fields['total_net'] = '<span size="x-large" weight="bold">N/A</span>'
 
         # Temperatura del host
-        host_temp = self.vm_manager.get_vm_host_cpu_temp()
+        host_temp = snapshot.host.get('cpu_temp')
         if host_temp:
             temp_icon = "🟢" if host_temp < 60 else ("🟡" if host_temp < 80 else "🔴")
-            self.host_temp_card.value_label.set_markup(
-                f'<span size="x-large" weight="bold">{temp_icon} {host_temp:.1f}°C</span>'
-            )
+            fields['host_temp'] = f'<span size="x-large" weight="bold">{temp_icon} {host_temp:.1f}°C</span>'
         else:
-            self.host_temp_card.value_label.set_markup(
-                f'<span size="x-large" weight="bold">N/A</span>'
-            )
+            fields['host_temp'] = '<span size="x-large" weight="bold">N/A</span>'
+
+        # CPU, memoria y carga del host
+        host = snapshot.host
+        parts = []
+        if host.get('cpu_percent') is not None:
+            parts.append(f"CPU {host['cpu_percent']:.0f}%")
+        if host.get('memory_percent') is not None:
+            parts.append(f"RAM {host['memory_percent']:.0f}%")
+        if host.get('load'):
+            parts.append(f"carga {host['load'][0]:.2f}")
+        fields['host_load'] = f'<span size="x-large" weight="bold">{" · ".join(parts) or "N/A"}</span>'
+
+        self.summary_view.update(fields)
+
+    def _apply_snapshot(self, snapshot):
+        """Aplica un FleetSnapshot a la interfaz (hilo principal de GTK)"""
+        stale_since = snapshot.timestamp if snapshot.stale else None
+        for vm_card in self.vm_cards.values():
+            if not vm_card.is_updating:
+                vm_card.update_vm_status(snapshot.get(vm_card.vm_name), snapshot.host, stale_since)
+
+        self._update_summary_stats(snapshot)
+        if self.fleet_heatmap is not None:
+            self.fleet_heatmap.set_snapshot(snapshot)
+        if self.placement_map is not None:
+            self._update_placement(snapshot)
+        if self.pinning_window is not None:
+            self.pinning_window.on_snapshot(snapshot)
+
+        if snapshot.stale:
+            startup.mark('último estado conocido mostrado')
+            return False
+
+        if not self._first_data_shown:
+            self._first_data_shown = True
+            startup.mark('primeros datos')
+            if startup.BENCH:
+                # Medición de arranque: cerrar en cuanto hay datos en pantalla
+                self.close()
+
+        # Guardado periódico de la caché de arranque (en segundo plano)
+        if time.monotonic() - self._last_cache_save >= SAVE_INTERVAL:
+            self._last_cache_save = time.monotonic()
+            self.state_cache.save_in_background(snapshot, self._collect_histories())
+        return False
+
+    def _collect_histories(self):
+        return {name: vm_card.get_history() for name, vm_card in self.vm_cards.items()}
 
     def setup_auto_update(self):
-        """Configura la actualización automática cada 5 segundos"""
-        self.update_counter = 0
-        
-        def auto_update():
-            self.update_counter += 1
-            
-            # Actualizar VMs cada 5 segundos
-            for vm_card in self.vm_cards.values():
-                if not vm_card.is_updating:
-                    vm_card.update_vm_status()
-
-            # Actualizar dashboard solo cada 15 segundos (cada 3 ciclos)
-            if self.update_counter % 3 == 0:
-                self._update_summary_stats()
-
-            return True  # Continuar el timer
-
-        # Primera actualización inmediata
-        self._update_summary_stats()
-
-        GLib.timeout_add_seconds(5, auto_update)
+        """Configura la actualización automática cada 5 segundos
+
+        El recolector hace todas las llamadas a virsh en su propio hilo y
+        cada snapshot se aplica a la interfaz desde el bucle de GTK.
+        """
+        if self.balloon_policy:
+            self.collector.add_listener(self.balloon_policy)
+        if self.vcpu_policy:
+            self.collector.add_listener(self.vcpu_policy)
+        self.collector.add_listener(self._on_collector_snapshot)
+        if self.collector.fast_interval:
+            self.collector.add_fast_listener(self._on_fast_samples)
+        if self.exporter:
+            try:
+                self.exporter.start()
+            except OSError as e:
+                print(f"⚠️ No se pudo iniciar el exportador de métricas: {e}")
+                self.exporter = None
+        self.collector.start()
+
+    def _on_collector_snapshot(self, snapshot):
+        """Listener del recolector (su hilo): deja el snapshot para el próximo frame"""
+        # La tabla columnar del resumen se construye aquí, fuera del hilo de GTK
+        snapshot.build_columns()
+        with self._pending_lock:
+            schedule = self._pending_snapshot is None
+            self._pending_snapshot = snapshot
+        if schedule:
+            GLib.idle_add(self._schedule_frame_update)
+
+    def _on_fast_samples(self, samples):
+        """Listener de muestras rápidas (hilo fleet-fast): se aplican en el bucle de GTK"""
+        with self._pending_lock:
+            schedule = self._pending_fast is None
+            self._pending_fast = samples
+        if schedule:
+            GLib.idle_add(self._apply_fast_samples)
+
+    def _apply_fast_samples(self):
+        with self._pending_lock:
+            samples = self._pending_fast
+            self._pending_fast = None
+        for vm_name, sample in (samples or {}).items():
+            vm_card = self.vm_cards.get(vm_name)
+            if vm_card is not None:
+                vm_card.add_fast_sample(sample)
+        return False
+
+    def _schedule_frame_update(self):
+        """Aplica el snapshot pendiente en la fase de actualización del siguiente frame
+
+        Todas las tarjetas se actualizan en un único lote antes del layout
+        y el pintado de ese frame. Con la ventana sin mapear no hay frames,
+        así que se aplica directamente (el historial se sigue guardando).
+        """
+        if self.get_mapped():
+            self.add_tick_callback(self._on_frame_tick)
+        else:
+            self._flush_pending_snapshot()
+        return False
+
+    def _on_frame_tick(self, widget, frame_clock):
+        self._flush_pending_snapshot()
+        return GLib.SOURCE_REMOVE
+
+    def _flush_pending_snapshot(self):
+        with self._pending_lock:
+            snapshot = self._pending_snapshot
+            self._pending_snapshot = None
+        if snapshot is not None:
+            frame_stats.count('snapshots')
+            self._apply_snapshot(snapshot)
+
+    def on_pinning_clicked(self, button):
+        if self.pinning_window is None:
+            self.pinning_window = PinningAssistantWindow(self, self.vm_manager, self.collector)
+            self.pinning_window.connect('close-request', self._on_pinning_closed)
+        self.pinning_window.present()
+
+    def _on_pinning_closed(self, window):
+        self.pinning_window = None
+        return False
 
     def on_refresh_clicked(self, button):
         """Maneja el clic del botón de actualizar"""
-        for vm_card in self.vm_cards.values():
-            vm_card.update_vm_status()
-        self._update_summary_stats()
+        self.collector.request_refresh()
+
+    def on_close_request(self, window):
+        """Detiene la recolección y cierra el historial antes de destruir la ventana"""
+        if self.exporter:
+            self.exporter.stop()
+        self.collector.stop(timeout=1.0)
+        self.metrics_store.close()
+        if self.vcpu_policy:
+            print("🧮 Autoescalado de vCPUs:\n" + (self.vcpu_policy.report() or "sin datos"))
+
+        summary = frame_stats.stats.summary()
+        if summary and frame_stats.ENABLED_LOG:
+            text = ', '.join(f"{name}={value:.1f}" for name, value in sorted(summary.items()))
+            print(f"📈 Media por frame con actividad: {text}")
+
+        # Solo se guarda si hubo al menos un ciclo real en esta ejecución
+        latest = self.collector.latest
+        if latest is not None:
+            self.state_cache.save(latest, self._collect_histories())
+        return False
 
     def load_css(self):
         """Carga los estilos CSS personalizados"""
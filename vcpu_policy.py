@@ -0,0 +1,234 @@
+"""
+Política de autoescalado de vCPUs en caliente
+
+Con cada FleetSnapshot (listener del recolector) añade a la ventana de
+cada VM sus vCPUs ocupadas en el intervalo (cpu_percent de rates.py por
+las vCPUs activas) y mantiene la suma de la ventana de forma incremental,
+así que cada muestra cuesta lo mismo sea cual sea la ventana:
+
+- subir: si la media de las últimas UP_WINDOW muestras supera
+  SCALE_UP_PERCENT de las vCPUs activas, hasta las que dejarían la VM en
+  TARGET_PERCENT (como mucho MAX_STEP_UP de golpe),
+- bajar: si la media de las últimas DOWN_WINDOW muestras no llega a
+  SCALE_DOWN_PERCENT, una vCPU por decisión y nunca por debajo de las que
+  dejarían la VM en TARGET_PERCENT.
+
+Salvaguardas: límites por VM (por defecto 1 y vcpu.maximum), periodos de
+espera distintos para subir y bajar, la ventana se vacía tras cada cambio
+(el % cambia de base) y no se sube si el host está saturado o las vCPUs
+ya esperan CPU del host (robo de CPU), porque más vCPUs no darían más
+CPU. Los cambios se aplican con setvcpus --live (o solo se registran en
+modo simulación, con report() como resumen) y todas las decisiones
+quedan en el registro de auditoría. No importa GTK.
+"""
+import logging
+import math
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from audit_log import AuditLog
+
+logger = logging.getLogger(__name__)
+
+UP_WINDOW = 6              # Muestras para decidir subir (~30 s con el ciclo por defecto)
+DOWN_WINDOW = 36           # Muestras para decidir bajar (~3 min)
+SCALE_UP_PERCENT = 80.0    # Uso medio de las vCPUs activas a partir del que se sube
+SCALE_DOWN_PERCENT = 25.0  # Uso medio por debajo del que se baja
+TARGET_PERCENT = 60.0      # Uso que se busca al calcular las vCPUs nuevas
+MAX_STEP_UP = 2            # vCPUs añadidas como máximo por decisión
+UP_COOLDOWN = 60.0         # Segundos desde el último cambio antes de volver a subir
+DOWN_COOLDOWN = 600.0      # Segundos desde el último cambio antes de volver a bajar
+HOST_BUSY_PERCENT = 90.0   # CPU del host a partir de la que no se sube
+STEAL_GUARD_PERCENT = 10.0  # Robo de CPU de las vCPUs a partir del que no se sube
+
+
+def parse_limit(text: str) -> Tuple[str, Tuple[Optional[int], Optional[int]]]:
+    """'web=2:8' -> ('web', (2, 8)); vacío = por defecto
+
+    Lanza ValueError si el texto no tiene ese formato.
+    """
+    vm_name, sep, bounds = text.partition('=')
+    low, sep2, high = bounds.partition(':')
+    if not vm_name or not sep or not sep2:
+        raise ValueError(f"Límite de vCPUs inválido '{text}' (formato NOMBRE=MÍN:MÁX)")
+    try:
+        min_vcpus = int(low) if low else None
+        max_vcpus = int(high) if high else None
+    except ValueError:
+        raise ValueError(f"Límite de vCPUs inválido '{text}': se esperan números de vCPUs") from None
+    if (min_vcpus is not None and min_vcpus < 1) or (max_vcpus is not None and max_vcpus < 1):
+        raise ValueError(f"Límite de vCPUs inválido '{text}': como mínimo 1 vCPU")
+    if min_vcpus is not None and max_vcpus is not None and min_vcpus > max_vcpus:
+        raise ValueError(f"Límite de vCPUs inválido '{text}': el mínimo supera al máximo")
+    return vm_name, (min_vcpus, max_vcpus)
+
+
+class _Window:
+    """Últimas muestras de vCPUs ocupadas con su suma (media en O(1))"""
+
+    def __init__(self, size: int):
+        self.samples = deque(maxlen=size)
+        self.total = 0.0
+
+    def add(self, value: float):
+        if len(self.samples) == self.samples.maxlen:
+            self.total -= self.samples[0]
+        self.samples.append(value)
+        self.total += value
+
+    def clear(self):
+        self.samples.clear()
+        self.total = 0.0
+
+    @property
+    def full(self) -> bool:
+        return len(self.samples) == self.samples.maxlen
+
+    @property
+    def mean(self) -> float:
+        return self.total / len(self.samples) if self.samples else 0.0
+
+
+class VcpuPolicy:
+    """Decisiones de vCPUs activas por VM a partir de cada snapshot"""
+
+    def __init__(self, vm_manager=None, dry_run: bool = True,
+                 limits: Optional[Dict[str, Tuple[Optional[int], Optional[int]]]] = None,
+                 audit: Optional[AuditLog] = None, clock=time.monotonic):
+        self.vm_manager = vm_manager
+        self.dry_run = dry_run or vm_manager is None
+        self.limits = dict(limits or {})
+        self.audit = audit or AuditLog()
+        self._clock = clock
+        # {vm: {'id', 'up': _Window, 'down': _Window, 'last_change', 'last_hold', 'vcpus', 'suggested'}}
+        self._state: Dict[str, Dict] = {}
+
+    def __call__(self, snapshot):
+        self.update(snapshot)
+
+    def limits_for(self, vm_name: str, stats: Dict) -> Tuple[int, int]:
+        """(mín, máx) de vCPUs activas de una VM: los configurados o 1 y vcpu.maximum"""
+        maximum = stats.get('vcpu_count') or stats.get('vcpu_current') or 1
+        low, high = self.limits.get(vm_name, (None, None))
+        high = min(high, maximum) if high else maximum
+        low = min(low or 1, high)
+        return low, high
+
+    def update(self, snapshot) -> List[Dict]:
+        """Añade el snapshot a las ventanas; retorna las decisiones tomadas (aplicadas o simuladas)"""
+        if snapshot.stale:
+            return []
+        host_cpu = (snapshot.host or {}).get('cpu_percent')
+        decisions = []
+        running = set()
+        for vm_name, vm in snapshot.vms.items():
+            stats = vm.get('stats')
+            if not vm.get('running') or not stats:
+                continue
+            running.add(vm_name)
+            decision = self._evaluate(vm_name, vm, stats, vm.get('rates'), host_cpu)
+            if decision:
+                decisions.append(self._apply(decision))
+        for vm_name in list(self._state):
+            if vm_name not in running:
+                del self._state[vm_name]
+        return decisions
+
+    def _evaluate(self, vm_name: str, vm: Dict, stats: Dict, rates: Optional[Dict],
+                  host_cpu: Optional[float]) -> Optional[Dict]:
+        current = stats.get('vcpu_current') or stats.get('vcpu_count')
+        state = self._state.get(vm_name)
+        if state is None or state['id'] != vm.get('id'):
+            state = self._state[vm_name] = {'id': vm.get('id'), 'up': _Window(UP_WINDOW),
+                                            'down': _Window(DOWN_WINDOW), 'last_change': None,
+                                            'last_hold': None, 'vcpus': current, 'suggested': current}
+        elif state['vcpus'] != current:
+            # vCPUs cambiadas (por la política o desde fuera): el % de la ventana tenía otra base
+            state['up'].clear()
+            state['down'].clear()
+            state['vcpus'] = state['suggested'] = current
+        if not current or not rates:
+            return None
+
+        busy = rates['cpu_percent'] / 100 * current
+        state['up'].add(busy)
+        state['down'].add(busy)
+        low, high = self.limits_for(vm_name, stats)
+        now = self._clock()
+        since_change = now - state['last_change'] if state['last_change'] is not None else None
+
+        up_percent = state['up'].mean / current * 100
+        if state['up'].full and up_percent >= SCALE_UP_PERCENT and current < high:
+            needed = math.ceil(state['up'].mean * 100 / TARGET_PERCENT)
+            wanted = min(high, current + MAX_STEP_UP, max(current + 1, needed))
+            state['suggested'] = wanted
+            if since_change is not None and since_change < UP_COOLDOWN:
+                return None
+            steal = rates.get('cpu_steal_percent')
+            hold = None
+            if host_cpu is not None and host_cpu >= HOST_BUSY_PERCENT:
+                hold = f"uso {up_percent:.0f}% pero el host está al {host_cpu:.0f}% de CPU"
+            elif steal is not None and steal >= STEAL_GUARD_PERCENT:
+                hold = f"uso {up_percent:.0f}% pero las vCPUs ya esperan CPU del host (robo {steal:.0f}%)"
+            if hold:
+                # Una retención no cambia nada: ni reinicia las esperas ni vacía las ventanas,
+                # solo se registra como mucho una vez por UP_COOLDOWN
+                if state['last_hold'] is not None and now - state['last_hold'] < UP_COOLDOWN:
+                    return None
+                state['last_hold'] = now
+                return self._decision(vm_name, 'hold', current, current, hold, state)
+            return self._decision(vm_name, 'up', current, wanted,
+                                  f"uso medio {up_percent:.0f}% en {UP_WINDOW} muestras", state)
+
+        down_percent = state['down'].mean / current * 100
+        if state['down'].full and down_percent < SCALE_DOWN_PERCENT and current > low:
+            floor = max(low, math.ceil(state['down'].mean * 100 / TARGET_PERCENT))
+            if floor >= current:
+                return None
+            state['suggested'] = current - 1
+            if since_change is not None and since_change < DOWN_COOLDOWN:
+                return None
+            return self._decision(vm_name, 'down', current, current - 1,
+                                  f"uso medio {down_percent:.0f}% en {DOWN_WINDOW} muestras", state)
+
+        state['suggested'] = current
+        return None
+
+    def _decision(self, vm_name: str, action: str, current: int, target: int, reason: str, state: Dict) -> Dict:
+        if action != 'hold':
+            state['last_change'] = self._clock()
+            state['up'].clear()
+            state['down'].clear()
+        return {'time': time.time(), 'vm': vm_name, 'action': action, 'from_vcpus': current,
+                'to_vcpus': target, 'reason': reason, 'dry_run': self.dry_run, 'ok': None, 'error': None}
+
+    def _apply(self, decision: Dict) -> Dict:
+        if decision['action'] != 'hold' and not self.dry_run:
+            success, error_info = self.vm_manager.set_vcpus(decision['vm'], decision['to_vcpus'])
+            decision['ok'] = success
+            decision['error'] = None if success else (error_info or {}).get('message')
+        prefix = "[simulación] " if self.dry_run else ""
+        if decision['action'] == 'hold':
+            logger.info(f"{prefix}vCPUs de {decision['vm']} sin cambios: {decision['reason']}")
+        else:
+            logger.info(f"{prefix}vCPUs de {decision['vm']}: {decision['from_vcpus']} → {decision['to_vcpus']} "
+                        f"({decision['reason']})")
+        self.audit.record(decision)
+        return decision
+
+    def report(self) -> str:
+        """Resumen por VM: vCPUs activas, uso medio reciente y vCPUs sugeridas"""
+        lines = []
+        for vm_name, state in sorted(self._state.items()):
+            if not state['vcpus']:
+                continue
+            window = state['down'] if state['down'].samples else state['up']
+            usage = f"{window.mean / state['vcpus'] * 100:.0f}%" if window.samples else "—"
+            suggested = state['suggested']
+            change = f" → sugerido {suggested}" if suggested != state['vcpus'] else ""
+            lines.append(f"{vm_name}: {state['vcpus']} vCPUs, uso {usage}{change}")
+        decisions = [entry for entry in self.audit.recent() if entry['action'] != 'hold']
+        if decisions:
+            lines.append(f"{len(decisions)} cambios {'simulados' if self.dry_run else 'aplicados'} recientes")
+        return "\n".join(lines)
@@ -1,10 +1,29 @@
+import shutil
 import subprocess
+import time
 from typing import List, Dict, Optional, Tuple
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Claves balloon.* de domstats (las de dommemstat con el prefijo) -> claves de las stats
+_BALLOON_KEYS = {
+    'balloon.current': 'memory_actual',
+    'balloon.maximum': 'memory_available',
+    'balloon.unused': 'memory_unused',
+    'balloon.usable': 'memory_usable',
+    'balloon.rss': 'memory_rss',
+    'balloon.available': 'memory_guest_total',
+    'balloon.disk_caches': 'memory_disk_caches',
+    'balloon.swap_in': 'memory_swap_in',
+    'balloon.swap_out': 'memory_swap_out',
+    'balloon.major_fault': 'memory_major_faults',
+    'balloon.minor_fault': 'memory_minor_faults',
+    'balloon.last-update': 'memory_stats_updated',
+}
+
+
 class VMError(Exception):
     """Excepción base para errores de VM"""
     def __init__(self, message: str, error_type: str = "unknown", details: str = ""):
@@ -14,15 +33,26 @@ class VMError(Exception):
         super().__init__(self.message)
 
 class VMManager:
-    def __init__(self):
-        self.connection_uri = "qemu:///system"
-        self.vm_names = ["manjaro1", "manjaro2"]
+    def __init__(self, check_requirements: bool = True, connection_uri: str = "qemu:///system",
+                 vm_names: Optional[List[str]] = None):
+        # test:///default (driver de pruebas de libvirt) permite probar sin libvirtd ni VMs reales
+        self.connection_uri = connection_uri
+        self.vm_names = list(vm_names) if vm_names else ["manjaro1", "manjaro2"]
         self.system_ready = False
         self.system_error = None
-        self._check_system_requirements()
+        self.requirements_checked = False
+        # Contadores acumulados para medir el coste de la recolección
+        self.virsh_calls = 0
+        self.virsh_seconds = 0.0
+        self._host_collector = None  # host_metrics.HostCollector, creado al pedir la temperatura
+        # La interfaz y el modo headless lo difieren al hilo del recolector
+        if check_requirements:
+            self.check_system_requirements()
 
     def _run_virsh_command(self, args: List[str]) -> Tuple[bool, str, str]:
         """Ejecuta un comando virsh y retorna (éxito, stdout, stderr)"""
+        started = time.monotonic()
+        self.virsh_calls += 1
         try:
             # Intentar primero sin sudo
             cmd = ["virsh", "-c", self.connection_uri] + args
@@ -52,6 +82,8 @@ class VMManager:
             error_msg = f"Error inesperado ejecutando virsh: {str(e)}"
             logger.error(error_msg)
             return False, "", error_msg
+        finally:
+            self.virsh_seconds += time.monotonic() - started
 
     def _parse_virsh_error(self, stderr: str, _operation: str) -> Dict[str, str]:
         """Analiza el error de virsh y retorna información estructurada"""
@@ -494,6 +526,13 @@ class VMManager:
                 'memory_unused': None,
                 'memory_usable': None,
                 'memory_rss': None,
+                'memory_guest_total': None,    # Memoria que ve el guest (balloon.available)
+                'memory_disk_caches': None,    # Caché de páginas del guest
+                'memory_swap_in': None,        # KB traídos de swap en el guest (acumulado)
+                'memory_swap_out': None,       # KB llevados a swap en el guest (acumulado)
+                'memory_major_faults': None,   # Fallos de página mayores del guest (acumulado)
+                'memory_minor_faults': None,
+                'memory_stats_updated': None,  # Instante (epoch) del último informe del guest
                 'block_count': 0,
                 'block_capacity': 0,
                 'block_allocation': 0,
@@ -510,7 +549,11 @@ class VMManager:
                 'net_tx_pkts': 0,
                 'net_rx_drop': 0,
                 'net_tx_drop': 0,
+                'block_devices': [],  # Contadores por disco (block.N.*)
+                'net_devices': [],    # Contadores por interfaz (net.N.*)
+                'vcpus': [],          # Estado y tiempos por vCPU (vcpu.N.state/time/wait/delay)
             }
+            devices = {'block': {}, 'net': {}, 'vcpu': {}}
 
             # Parsear la salida
             for line in stdout.split('\n'):
@@ -522,6 +565,14 @@ class VMManager:
                 key = key.strip()
                 value = value.strip()
 
+                # Contadores por dispositivo: block.0.rd.reqs -> devices['block'][0]['rd_reqs']
+                kind, _, rest = key.partition('.')
+                if kind in devices:
+                    index, _, field = rest.partition('.')
+                    if index.isdigit() and field:
+                        devices[kind].setdefault(int(index), {})[field.replace('.', '_')] = (
+                            int(value) if value.isdigit() else value)
+
                 # Estadísticas de CPU
                 if key == 'cpu.time':
                     stats['cpu_time'] = int(value)
@@ -541,17 +592,9 @@ class VMManager:
                         stats['vcpu_time'] = 0
                     stats['vcpu_time'] += int(value)
 
-                # Estadísticas de memoria (en KB)
-                elif key == 'balloon.current':
-                    stats['memory_actual'] = int(value)
-                elif key == 'balloon.maximum':
-                    stats['memory_available'] = int(value)
-                elif key == 'memory.unused':
-                    stats['memory_unused'] = int(value)
-                elif key == 'memory.usable':
-                    stats['memory_usable'] = int(value)
-                elif key == 'memory.rss':
-                    stats['memory_rss'] = int(value)
+                # Estadísticas de memoria (en KB); las del guest solo existen si informa el balloon
+                elif key in _BALLOON_KEYS:
+                    stats[_BALLOON_KEYS[key]] = int(value)
 
                 # Estadísticas de disco
                 elif key == 'block.count':
@@ -589,6 +632,9 @@ class VMManager:
                 elif key.startswith('net.') and '.tx.drop' in key:
                     stats['net_tx_drop'] += int(value)
 
+            stats['block_devices'] = [devices['block'][i] for i in sorted(devices['block'])]
+            stats['net_devices'] = [devices['net'][i] for i in sorted(devices['net'])]
+            stats['vcpus'] = [dict(devices['vcpu'][i], index=i) for i in sorted(devices['vcpu'])]
             return stats
         except Exception as e:
             logger.error(f"Error obteniendo estadísticas detalladas de {vm_name}: {e}")
@@ -628,14 +674,59 @@ class VMManager:
             logger.error(f"Error obteniendo info de vCPU de {vm_name}: {e}")
             return None
 
-    def get_vm_uptime(self, vm_name: str) -> Optional[int]:
-        """Obtiene el uptime de la VM en segundos"""
+    def _run_live_change(self, args: List[str], vm_name: str, operation: str) -> Tuple[bool, Optional[Dict[str, str]]]:
+        """Ejecuta un cambio en caliente sobre una VM. Retorna (éxito, info_error)"""
+        success, _stdout, stderr = self._run_virsh_command(args)
+        if success:
+            logger.info(f"{operation} aplicado en {vm_name}: {' '.join(args[2:])}")
+            return True, None
+        error_info = self._parse_virsh_error(stderr, operation)
+        logger.error(f"Error en {operation} de {vm_name}: {stderr}")
+        return False, error_info
+
+    def pin_vcpu(self, vm_name: str, vcpu: int, cpulist: str) -> Tuple[bool, Optional[Dict[str, str]]]:
+        """Fija una vCPU a las CPUs del host de cpulist ('4', '4-5,8') en caliente"""
+        return self._run_live_change(["vcpupin", vm_name, str(vcpu), cpulist, "--live"], vm_name, "vcpupin")
+
+    def pin_emulator(self, vm_name: str, cpulist: str) -> Tuple[bool, Optional[Dict[str, str]]]:
+        """Fija los hilos del emulador a las CPUs de cpulist en caliente"""
+        return self._run_live_change(["emulatorpin", vm_name, cpulist, "--live"], vm_name, "emulatorpin")
+
+    def pin_iothread(self, vm_name: str, iothread_id: int, cpulist: str) -> Tuple[bool, Optional[Dict[str, str]]]:
+        """Fija un IOThread a las CPUs de cpulist en caliente"""
+        return self._run_live_change(["iothreadpin", vm_name, str(iothread_id), cpulist, "--live"], vm_name,
+                                     "iothreadpin")
+
+    def set_numa_nodeset(self, vm_name: str, nodeset: str) -> Tuple[bool, Optional[Dict[str, str]]]:
+        """Mueve la memoria de la VM a los nodos NUMA de nodeset en caliente (numatune)"""
+        return self._run_live_change(["numatune", vm_name, "--nodeset", nodeset, "--live"], vm_name, "numatune")
+
+    def set_memory_stats_period(self, vm_name: str, period: int) -> Tuple[bool, Optional[Dict[str, str]]]:
+        """Pide al balloon del guest que informe sus estadísticas cada period segundos"""
+        return self._run_live_change(["dommemstat", vm_name, "--period", str(period), "--live"], vm_name,
+                                     "dommemstat --period")
+
+    def set_memory(self, vm_name: str, size_kb: int) -> Tuple[bool, Optional[Dict[str, str]]]:
+        """Ajusta el balloon de la VM a size_kb KiB en caliente (setmem)"""
+        return self._run_live_change(["setmem", vm_name, str(int(size_kb)), "--live"], vm_name, "setmem")
+
+    def set_vcpus(self, vm_name: str, count: int) -> Tuple[bool, Optional[Dict[str, str]]]:
+        """Cambia las vCPUs activas de la VM en caliente (setvcpus, hasta vcpu.maximum)"""
+        return self._run_live_change(["setvcpus", vm_name, str(int(count)), "--live"], vm_name, "setvcpus")
+
+    def get_vm_uptime(self, vm_name: str, detailed_stats: Optional[Dict] = None) -> Optional[int]:
+        """Obtiene el uptime de la VM en segundos
+
+        Si se pasan `detailed_stats` ya obtenidas en el mismo ciclo se
+        reutilizan en lugar de volver a ejecutar domstats.
+        """
         try:
             success, stdout, stderr = self._run_virsh_command(["qemu-agent-command", vm_name, '{"execute":"guest-get-time"}'])
 
             if not success:
                 # Fallback: calcular desde cpu.time si no hay guest-agent
-                detailed_stats = self.get_vm_detailed_stats(vm_name)
+                if detailed_stats is None:
+                    detailed_stats = self.get_vm_detailed_stats(vm_name)
                 if detailed_stats and detailed_stats.get('cpu_time'):
                     # Aproximación: cpu_time / vcpu_count (no es exacto pero da una idea)
                     cpu_time_ns = detailed_stats['cpu_time']
@@ -652,9 +743,9 @@ class VMManager:
             # Intentar con guest-info para obtener boot time
             success2, stdout2, stderr2 = self._run_virsh_command(["qemu-agent-command", vm_name, '{"execute":"guest-info"}'])
             if success2:
-                import time
                 # Si tenemos guest-agent, usamos cpu.time como aproximación de uptime
-                detailed_stats = self.get_vm_detailed_stats(vm_name)
+                if detailed_stats is None:
+                    detailed_stats = self.get_vm_detailed_stats(vm_name)
                 if detailed_stats and detailed_stats.get('cpu_time'):
                     cpu_time_ns = detailed_stats['cpu_time']
                     vcpu_count = detailed_stats.get('vcpu_count', 1)
@@ -666,63 +757,104 @@ class VMManager:
             logger.debug(f"Error obteniendo uptime de {vm_name}: {e}")
             return None
 
+    def _get_domain_xml(self, vm_name: str):
+        """Obtiene y parsea el XML del dominio (dumpxml). Retorna None si falla"""
+        import xml.etree.ElementTree as ET
+
+        success, stdout, stderr = self._run_virsh_command(["dumpxml", vm_name])
+        if not success:
+            logger.debug(f"No se pudo obtener el XML de {vm_name}: {stderr}")
+            return None
+        return ET.fromstring(stdout)
+
+    def get_vm_domain_config(self, vm_name: str) -> Optional[Dict]:
+        """Obtiene toda la configuración estática de la VM con un solo dumpxml
+
+        Retorna un dict con las claves 'interfaces', 'virtio', 'cpu_features',
+        'cpu_topology', 'hugepages' y 'blkio_weight', equivalentes a los
+        métodos get_vm_*.
+        """
+        try:
+            root = self._get_domain_xml(vm_name)
+            if root is None:
+                return None
+        except Exception as e:
+            logger.error(f"Error obteniendo configuración de {vm_name}: {e}")
+            return None
+
+        parsers = {
+            'interfaces': self._parse_network_interfaces,
+            'virtio': self._parse_virtio_drivers,
+            'cpu_features': self._parse_cpu_features,
+            'cpu_topology': self._parse_cpu_topology,
+            'hugepages': self._parse_hugepages,
+            'blkio_weight': self._parse_blkio_weight,
+        }
+        config = {}
+        for key, parser in parsers.items():
+            try:
+                config[key] = parser(root)
+            except Exception as e:
+                logger.error(f"Error extrayendo '{key}' de la configuración de {vm_name}: {e}")
+                config[key] = None
+        return config
+
     def get_vm_network_interfaces(self, vm_name: str) -> Optional[List[Dict]]:
         """Obtiene información detallada de las interfaces de red"""
         try:
-            import xml.etree.ElementTree as ET
-
-            # Obtener XML de la VM
-            success, stdout, stderr = self._run_virsh_command(["dumpxml", vm_name])
-            if not success:
+            root = self._get_domain_xml(vm_name)
+            if root is None:
                 return None
-
-            root = ET.fromstring(stdout)
-            interfaces = []
-
-            # Buscar todas las interfaces
-            for iface in root.findall(".//devices/interface"):
-                iface_info = {}
-                iface_info['type'] = iface.get('type', 'unknown')
-
-                # MAC address
-                mac = iface.find('mac')
-                if mac is not None:
-                    iface_info['mac'] = mac.get('address', 'N/A')
-
-                # Source (red o bridge)
-                source = iface.find('source')
-                if source is not None:
-                    iface_info['source'] = source.get('network') or source.get('bridge') or source.get('dev') or 'N/A'
-
-                # Model
-                model = iface.find('model')
-                if model is not None:
-                    iface_info['model'] = model.get('type', 'N/A')
-
-                # Target (nombre dentro del host)
-                target = iface.find('target')
-                if target is not None:
-                    iface_info['target'] = target.get('dev', 'N/A')
-
-                # Alias
-                alias = iface.find('alias')
-                if alias is not None:
-                    iface_info['alias'] = alias.get('name', 'N/A')
-
-                # Link state (si está disponible)
-                link = iface.find('link')
-                if link is not None:
-                    iface_info['link_state'] = link.get('state', 'unknown')
-                else:
-                    iface_info['link_state'] = 'up'  # Por defecto asumimos up
-
-                interfaces.append(iface_info)
-
-            return interfaces if interfaces else None
+            return self._parse_network_interfaces(root)
         except Exception as e:
             logger.error(f"Error obteniendo interfaces de red de {vm_name}: {e}")
             return None
 
+    def _parse_network_interfaces(self, root) -> Optional[List[Dict]]:
+        """Extrae información detallada de las interfaces de red desde el XML del dominio"""
+        interfaces = []
+
+        # Buscar todas las interfaces
+        for iface in root.findall(".//devices/interface"):
+            iface_info = {}
+            iface_info['type'] = iface.get('type', 'unknown')
+
+            # MAC address
+            mac = iface.find('mac')
+            if mac is not None:
+                iface_info['mac'] = mac.get('address', 'N/A')
+
+            # Source (red o bridge)
+            source = iface.find('source')
+            if source is not None:
+                iface_info['source'] = source.get('network') or source.get('bridge') or source.get('dev') or 'N/A'
+
+            # Model
+            model = iface.find('model')
+            if model is not None:
+                iface_info['model'] = model.get('type', 'N/A')
+
+            # Target (nombre dentro del host)
+            target = iface.find('target')
+            if target is not None:
+                iface_info['target'] = target.get('dev', 'N/A')
+
+            # Alias
+            alias = iface.find('alias')
+            if alias is not None:
+                iface_info['alias'] = alias.get('name', 'N/A')
+
+            # Link state (si está disponible)
+            link = iface.find('link')
+            if link is not None:
+                iface_info['link_state'] = link.get('state', 'unknown')
+            else:
+                iface_info['link_state'] = 'up'  # Por defecto asumimos up
+
+            interfaces.append(iface_info)
+
+        return interfaces if interfaces else None
+
     def get_vm_guest_users(self, vm_name: str) -> Optional[List[str]]:
         """Obtiene usuarios conectados en el guest via qemu-guest-agent"""
         try:
@@ -749,184 +881,185 @@ class VMManager:
             return None
 
     def get_vm_host_cpu_temp(self) -> Optional[float]:
-        """Obtiene temperatura de CPU del host"""
-        try:
-            import glob
-            # Buscar sensores de temperatura
-            temp_files = glob.glob('/sys/class/thermal/thermal_zone*/temp')
-
-            if not temp_files:
-                # Intentar con sensors
-                result = subprocess.run(['sensors', '-u'], capture_output=True, text=True)
-                if result.returncode == 0:
-                    for line in result.stdout.split('\n'):
-                        if 'temp1_input' in line or 'Package id 0' in line:
-                            try:
-                                temp = float(line.split(':')[1].strip())
-                                return temp
-                            except:
-                                continue
-                return None
+        """Obtiene temperatura de CPU del host
 
-            # Leer temperatura del primer sensor
-            with open(temp_files[0], 'r') as f:
-                temp_millidegrees = int(f.read().strip())
-                return temp_millidegrees / 1000.0  # Convertir a grados
-        except Exception as e:
-            logger.debug(f"Error obteniendo temperatura del host: {e}")
-            return None
+        Usa un HostCollector propio (sensor descubierto una vez, archivo
+        abierto). El recolector de la flota usa el suyo y la publica en
+        snapshot.host.
+        """
+        if self._host_collector is None:
+            from host_metrics import HostCollector
+            self._host_collector = HostCollector()
+        return self._host_collector.read_cpu_temp()
 
     def get_vm_virtio_drivers(self, vm_name: str) -> Optional[Dict]:
         """Obtiene información sobre drivers virtio activos"""
         try:
-            import xml.etree.ElementTree as ET
-
-            success, stdout, stderr = self._run_virsh_command(["dumpxml", vm_name])
-            if not success:
+            root = self._get_domain_xml(vm_name)
+            if root is None:
                 return None
-
-            root = ET.fromstring(stdout)
-            virtio_info = {
-                'disk': False,
-                'network': False,
-                'balloon': False,
-                'serial': False,
-                'rng': False,
-                'scsi': False
-            }
-
-            # Buscar discos virtio
-            for disk in root.findall(".//devices/disk"):
-                target = disk.find('target')
-                if target is not None and target.get('bus') == 'virtio':
-                    virtio_info['disk'] = True
-
-            # Buscar red virtio
-            for iface in root.findall(".//devices/interface"):
-                model = iface.find('model')
-                if model is not None and model.get('type') == 'virtio':
-                    virtio_info['network'] = True
-
-            # Buscar balloon
-            memballoon = root.find(".//devices/memballoon")
-            if memballoon is not None and memballoon.get('model') == 'virtio':
-                virtio_info['balloon'] = True
-
-            # Buscar serial virtio
-            for channel in root.findall(".//devices/channel"):
-                target = channel.find('target')
-                if target is not None and target.get('type') == 'virtio':
-                    virtio_info['serial'] = True
-
-            # Buscar RNG virtio
-            rng = root.find(".//devices/rng")
-            if rng is not None and rng.get('model') == 'virtio':
-                virtio_info['rng'] = True
-
-            # Buscar SCSI virtio
-            for controller in root.findall(".//devices/controller"):
-                if controller.get('type') == 'scsi' and controller.get('model') == 'virtio-scsi':
-                    virtio_info['scsi'] = True
-
-            return virtio_info
+            return self._parse_virtio_drivers(root)
         except Exception as e:
             logger.error(f"Error obteniendo drivers virtio de {vm_name}: {e}")
             return None
 
+    def _parse_virtio_drivers(self, root) -> Optional[Dict]:
+        """Extrae información sobre drivers virtio activos desde el XML del dominio"""
+        virtio_info = {
+            'disk': False,
+            'network': False,
+            'balloon': False,
+            'serial': False,
+            'rng': False,
+            'scsi': False
+        }
+
+        # Buscar discos virtio
+        for disk in root.findall(".//devices/disk"):
+            target = disk.find('target')
+            if target is not None and target.get('bus') == 'virtio':
+                virtio_info['disk'] = True
+
+        # Buscar red virtio
+        for iface in root.findall(".//devices/interface"):
+            model = iface.find('model')
+            if model is not None and model.get('type') == 'virtio':
+                virtio_info['network'] = True
+
+        # Buscar balloon
+        memballoon = root.find(".//devices/memballoon")
+        if memballoon is not None and memballoon.get('model') == 'virtio':
+            virtio_info['balloon'] = True
+
+        # Buscar serial virtio
+        for channel in root.findall(".//devices/channel"):
+            target = channel.find('target')
+            if target is not None and target.get('type') == 'virtio':
+                virtio_info['serial'] = True
+
+        # Buscar RNG virtio
+        rng = root.find(".//devices/rng")
+        if rng is not None and rng.get('model') == 'virtio':
+            virtio_info['rng'] = True
+
+        # Buscar SCSI virtio
+        for controller in root.findall(".//devices/controller"):
+            if controller.get('type') == 'scsi' and controller.get('model') == 'virtio-scsi':
+                virtio_info['scsi'] = True
+
+        return virtio_info
+
     def get_vm_cpu_features(self, vm_name: str) -> Optional[List[str]]:
         """Obtiene los CPU features/flags habilitados"""
         try:
-            import xml.etree.ElementTree as ET
-
-            success, stdout, stderr = self._run_virsh_command(["dumpxml", vm_name])
-            if not success:
+            root = self._get_domain_xml(vm_name)
+            if root is None:
                 return None
-
-            root = ET.fromstring(stdout)
-            features = []
-
-            # Features del CPU
-            cpu = root.find('.//cpu')
-            if cpu is not None:
-                # CPU mode
-                mode = cpu.get('mode', 'N/A')
-                features.append(f"mode:{mode}")
-
-                # Features específicos
-                for feature in cpu.findall('feature'):
-                    name = feature.get('name')
-                    policy = feature.get('policy', 'require')
-                    if name:
-                        features.append(f"{name}:{policy}")
-
-            # Features generales de la VM
-            vm_features = root.find('.//features')
-            if vm_features is not None:
-                for feature in vm_features:
-                    features.append(feature.tag)
-
-            return features if features else None
+            return self._parse_cpu_features(root)
         except Exception as e:
             logger.error(f"Error obteniendo CPU features de {vm_name}: {e}")
             return None
 
+    def _parse_cpu_features(self, root) -> Optional[List[str]]:
+        """Extrae los CPU features/flags habilitados desde el XML del dominio"""
+        features = []
+
+        # Features del CPU
+        cpu = root.find('.//cpu')
+        if cpu is not None:
+            # CPU mode
+            mode = cpu.get('mode', 'N/A')
+            features.append(f"mode:{mode}")
+
+            # Features específicos
+            for feature in cpu.findall('feature'):
+                name = feature.get('name')
+                policy = feature.get('policy', 'require')
+                if name:
+                    features.append(f"{name}:{policy}")
+
+        # Features generales de la VM
+        vm_features = root.find('.//features')
+        if vm_features is not None:
+            for feature in vm_features:
+                features.append(feature.tag)
+
+        return features if features else None
+
+    def get_vm_cpu_topology(self, vm_name: str) -> Optional[Dict[str, int]]:
+        """Obtiene la topología de CPU que ve el guest (sockets, dies, cores, threads)"""
+        try:
+            root = self._get_domain_xml(vm_name)
+            if root is None:
+                return None
+            return self._parse_cpu_topology(root)
+        except Exception as e:
+            logger.error(f"Error obteniendo la topología de CPU de {vm_name}: {e}")
+            return None
+
+    def _parse_cpu_topology(self, root) -> Optional[Dict[str, int]]:
+        """Extrae <cpu><topology> desde el XML del dominio (None si no está definida)"""
+        topology = root.find('.//cpu/topology')
+        if topology is None:
+            return None
+        return {key: int(topology.get(key, 1)) for key in ('sockets', 'dies', 'cores', 'threads')}
+
     def get_vm_hugepages(self, vm_name: str) -> Optional[Dict]:
         """Obtiene información sobre hugepages"""
         try:
-            import xml.etree.ElementTree as ET
-
-            success, stdout, stderr = self._run_virsh_command(["dumpxml", vm_name])
-            if not success:
+            root = self._get_domain_xml(vm_name)
+            if root is None:
                 return None
-
-            root = ET.fromstring(stdout)
-            hugepages_info = {'enabled': False}
-
-            # Buscar configuración de hugepages
-            memoryBacking = root.find('.//memoryBacking')
-            if memoryBacking is not None:
-                hugepages = memoryBacking.find('hugepages')
-                if hugepages is not None:
-                    hugepages_info['enabled'] = True
-                    pages = []
-                    for page in hugepages.findall('page'):
-                        page_info = {
-                            'size': page.get('size', 'N/A'),
-                            'unit': page.get('unit', 'KiB'),
-                            'nodeset': page.get('nodeset', 'all')
-                        }
-                        pages.append(page_info)
-                    hugepages_info['pages'] = pages
-
-            return hugepages_info
+            return self._parse_hugepages(root)
         except Exception as e:
             logger.error(f"Error obteniendo hugepages de {vm_name}: {e}")
             return None
 
+    def _parse_hugepages(self, root) -> Optional[Dict]:
+        """Extrae información sobre hugepages desde el XML del dominio"""
+        hugepages_info = {'enabled': False}
+
+        # Buscar configuración de hugepages
+        memoryBacking = root.find('.//memoryBacking')
+        if memoryBacking is not None:
+            hugepages = memoryBacking.find('hugepages')
+            if hugepages is not None:
+                hugepages_info['enabled'] = True
+                pages = []
+                for page in hugepages.findall('page'):
+                    page_info = {
+                        'size': page.get('size', 'N/A'),
+                        'unit': page.get('unit', 'KiB'),
+                        'nodeset': page.get('nodeset', 'all')
+                    }
+                    pages.append(page_info)
+                hugepages_info['pages'] = pages
+
+        return hugepages_info
+
     def get_vm_blkio_weight(self, vm_name: str) -> Optional[int]:
         """Obtiene el peso de I/O de disco (blkio weight)"""
         try:
-            import xml.etree.ElementTree as ET
-
-            success, stdout, stderr = self._run_virsh_command(["dumpxml", vm_name])
-            if not success:
+            root = self._get_domain_xml(vm_name)
+            if root is None:
                 return None
-
-            root = ET.fromstring(stdout)
-
-            # Buscar blkio tune
-            blkiotune = root.find('.//blkiotune')
-            if blkiotune is not None:
-                weight = blkiotune.find('weight')
-                if weight is not None and weight.text:
-                    return int(weight.text)
-
-            # Si no está configurado, retornar peso por defecto
-            return 500  # Valor por defecto de cgroups
+            return self._parse_blkio_weight(root)
         except Exception as e:
             logger.error(f"Error obteniendo blkio weight de {vm_name}: {e}")
             return None
 
+    def _parse_blkio_weight(self, root) -> Optional[int]:
+        """Extrae el peso de I/O de disco (blkio weight) desde el XML del dominio"""
+        # Buscar blkio tune
+        blkiotune = root.find('.//blkiotune')
+        if blkiotune is not None:
+            weight = blkiotune.find('weight')
+            if weight is not None and weight.text:
+                return int(weight.text)
+
+        # Si no está configurado, retornar peso por defecto
+        return 500  # Valor por defecto de cgroups
+
     def open_viewer(self, vm_name: str) -> Tuple[bool, Optional[Dict[str, str]]]:
         """Abre el visor gráfico (virt-viewer) para una VM. Retorna (éxito, info_error)"""
         try:
@@ -966,21 +1099,40 @@ class VMManager:
             logger.error(f"Error abriendo viewer para {vm_name}: {e}")
             return False, error_info
 
-    def _check_system_requirements(self):
-        """Verifica los requisitos del sistema"""
+    def check_system_requirements(self) -> bool:
+        """Verifica los requisitos del sistema
+
+        Actualiza system_ready/system_error. Puede tardar (systemctl), por
+        lo que no debe llamarse desde el hilo de la interfaz.
+        """
+        self.system_ready = False
+        self.system_error = None
         try:
             # Verificar si virsh está disponible
-            result = subprocess.run(["which", "virsh"], capture_output=True, text=True)
-            if result.returncode != 0:
-                logger.warning("virsh no está instalado o no está en el PATH")
-                return
+            if shutil.which("virsh") is None:
+                self.system_error = "virsh no está instalado o no está en el PATH"
+                logger.warning(self.system_error)
+                return False
+
+            # El driver de pruebas de libvirt no necesita libvirtd
+            if self.connection_uri.startswith("test:"):
+                self.system_ready = True
+                return True
 
             # Verificar si libvirtd está ejecutándose
-            result = subprocess.run(["systemctl", "is-active", "libvirtd"], capture_output=True, text=True)
+            result = subprocess.run(["systemctl", "is-active", "libvirtd"], capture_output=True, text=True,
+                                    timeout=5)
             if result.returncode != 0:
-                logger.warning("libvirtd no está ejecutándose")
-                return
+                self.system_error = "libvirtd no está ejecutándose"
+                logger.warning(self.system_error)
+                return False
 
+            self.system_ready = True
             logger.info("Requisitos del sistema verificados correctamente")
+            return True
         except Exception as e:
-            logger.warning(f"Error verificando requisitos del sistema: {e}")
\ No newline at end of file
+            self.system_error = f"Error verificando requisitos del sistema: {e}"
+            logger.warning(self.system_error)
+            return False
+        finally:
+            self.requirements_checked = True
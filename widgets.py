@@ -3,358 +3,633 @@ Widgets personalizados con Cairo para visualización de métricas
 """
 import gi
 gi.require_version('Gtk', '4.0')
-from gi.repository import Gtk, Gdk
+gi.require_version('Pango', '1.0')
+gi.require_version('PangoCairo', '1.0')
+from gi.repository import Gtk, Gdk, GLib, Pango, PangoCairo
 import cairo
+import disk_stats
+import frame_stats
+import heatmap
 import math
-from typing import List, Tuple
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
 
 
-class CircularProgressWidget(Gtk.DrawingArea):
-    """Widget circular para mostrar progreso con Cairo"""
+# Capas estáticas ya rasterizadas, compartidas por todos los widgets del mismo tipo
+# {(tipo, ancho, alto, escala, tema, ...): cairo.ImageSurface}
+_static_layers: Dict[tuple, cairo.ImageSurface] = {}
+_STATIC_LAYERS_MAX = 64
 
-    def __init__(self, size=120):
-        super().__init__()
+_pango_context = None
+
+
+def _get_pango_context() -> Pango.Context:
+    """Contexto Pango compartido para los layouts de texto cacheados"""
+    global _pango_context
+    if _pango_context is None:
+        _pango_context = PangoCairo.FontMap.get_default().create_context()
+    return _pango_context
+
+
+def new_layout(font: str) -> Pango.Layout:
+    """Layout Pango con la fuente dada (tamaño absoluto en px, como la API toy de cairo)"""
+    layout = Pango.Layout.new(_get_pango_context())
+    layout.set_font_description(Pango.FontDescription.from_string(font))
+    return layout
+
+
+def get_static_layer(key: tuple, ctx: cairo.Context, width: int, height: int, scale: float,
+                     paint: Callable[[cairo.Context], None]) -> cairo.ImageSurface:
+    """Retorna la capa estática para key, rasterizándola con paint() si no existe
+
+    La superficie se crea compatible con el destino de ctx y con la
+    escala del monitor, para que el compuesto no pierda nitidez en HiDPI.
+    """
+    surface = _static_layers.get(key)
+    if surface is not None:
+        return surface
+
+    if len(_static_layers) >= _STATIC_LAYERS_MAX:
+        _static_layers.clear()
+
+    surface = ctx.get_target().create_similar_image(
+        cairo.FORMAT_ARGB32, max(1, math.ceil(width * scale)), max(1, math.ceil(height * scale))
+    )
+    surface.set_device_scale(scale, scale)
+    paint(cairo.Context(surface))
+    surface.flush()
+    _static_layers[key] = surface
+    return surface
+
+
+def clear_static_layers():
+    """Descarta todas las capas estáticas (p. ej. en benchmarks)"""
+    _static_layers.clear()
+
+
+def _show_layout_with_shadow(ctx: cairo.Context, layout: Pango.Layout, x: float, y: float,
+                             shadow_alpha: float, rgb: Tuple[float, float, float]):
+    """Dibuja un layout con sombra desplazada 1px"""
+    ctx.set_source_rgba(0, 0, 0, shadow_alpha)
+    ctx.move_to(x + 1, y + 1)
+    PangoCairo.show_layout(ctx, layout)
+    ctx.set_source_rgb(*rgb)
+    ctx.move_to(x, y)
+    PangoCairo.show_layout(ctx, layout)
+
+
+class CircularProgressRenderer:
+    """Dibujo del gráfico circular, independiente de GTK
+
+    Sombra, anillo de fondo y título se rasterizan una vez por
+    (tamaño, escala, tema, título) en una capa estática; en cada frame
+    solo se dibujan el arco y la etiqueta con layouts Pango cacheados.
+    """
+
+    LINE_WIDTH = 14
+
+    def __init__(self, size: int = 120):
         self.size = size
         self.percentage = 0.0
-        self.label = "0%"
         self.title = ""
-        # Aumentar altura para que quepa el título arriba
-        self.set_content_width(size)
-        self.set_content_height(size + 30)  # +30px para el título
-        self.set_draw_func(self._on_draw)
+        self._label = None
+        self._label_layout = new_layout("Sans Bold 24px")
+        self._label_size = (0, 0)
+        self._title_layout = new_layout("Sans 13px")
 
-    def set_value(self, percentage: float, label: str = None, title: str = None):
-        """Actualiza el valor del gráfico circular"""
-        new_percentage = max(0.0, min(100.0, percentage))
-        new_label = label if label else f"{new_percentage:.1f}%"
-        new_title = title if title else self.title
-        
-        # Solo redibujar si los valores cambiaron significativamente
-        if (abs(new_percentage - self.percentage) > 0.5 or 
-            new_label != self.label or 
-            new_title != self.title):
-            self.percentage = new_percentage
-            self.label = new_label
-            self.title = new_title
-            self.queue_draw()
+    def set_label(self, label: str):
+        """Actualiza la etiqueta; el layout solo se rehace si cambia el texto"""
+        if label != self._label:
+            self._label = label
+            self._label_layout.set_text(label, -1)
+            frame_stats.count('text_layouts')
+            self._label_size = self._label_layout.get_pixel_size()
 
-    def _get_color(self) -> Tuple[float, float, float]:
-        """Retorna color según porcentaje"""
-        if self.percentage < 70:
-            # Verde
-            return (0.15, 0.76, 0.41)
-        elif self.percentage < 85:
-            # Amarillo/Naranja
-            return (0.96, 0.76, 0.07)
-        else:
-            # Rojo
-            return (0.88, 0.11, 0.14)
-
-    def _on_draw(self, area, ctx, width, height):
-        """Dibuja el gráfico circular moderno"""
-        # Centro y radio (desplazar círculo hacia abajo para dejar espacio al título)
+    def _geometry(self, width: int, height: int) -> Tuple[float, float, float]:
+        # Círculo en la parte inferior para dejar espacio al título
         center_x = width / 2
-        center_y = height - (self.size / 2)  # Posicionar círculo en la parte inferior
+        center_y = height - (self.size / 2)
         radius = (self.size / 2) - 12
-        line_width = 14
+        return center_x, center_y, radius
+
+    def _paint_static(self, ctx: cairo.Context, width: int, height: int):
+        """Capa estática: sombra, anillo de fondo con gradiente y título"""
+        center_x, center_y, radius = self._geometry(width, height)
 
         # Sombra del fondo del círculo
-        ctx.save()
-        ctx.set_line_width(line_width + 2)
+        ctx.set_line_width(self.LINE_WIDTH + 2)
         ctx.set_source_rgba(0, 0, 0, 0.15)
         ctx.arc(center_x + 2, center_y + 2, radius, 0, 2 * math.pi)
         ctx.stroke()
-        ctx.restore()
 
-        # Fondo del círculo con gradiente
-        ctx.save()
-        ctx.set_line_width(line_width)
-        
-        # Crear gradiente radial para el fondo
+        # Fondo del círculo con gradiente radial
+        ctx.set_line_width(self.LINE_WIDTH)
         pattern = cairo.RadialGradient(center_x, center_y, 0, center_x, center_y, radius)
         pattern.add_color_stop_rgba(0, 0.15, 0.15, 0.15, 0.3)
         pattern.add_color_stop_rgba(1, 0.05, 0.05, 0.05, 0.1)
         ctx.set_source(pattern)
         ctx.arc(center_x, center_y, radius, 0, 2 * math.pi)
         ctx.stroke()
-        ctx.restore()
 
-        # Arco de progreso con efectos modernos
+        # Título encima del círculo
+        if self.title:
+            self._title_layout.set_text(self.title, -1)
+            title_width, _title_height = self._title_layout.get_pixel_size()
+            title_x = center_x - title_width / 2
+            # Línea base 18px por encima del anillo
+            title_y = center_y - radius - 18 - self._title_layout.get_baseline() / Pango.SCALE
+            _show_layout_with_shadow(ctx, self._title_layout, title_x, title_y, 0.4, (0.8, 0.8, 0.8))
+
+    def _get_color(self) -> Tuple[float, float, float]:
+        """Retorna color según porcentaje"""
+        if self.percentage < 70:
+            # Verde
+            return (0.15, 0.76, 0.41)
+        elif self.percentage < 85:
+            # Amarillo/Naranja
+            return (0.96, 0.76, 0.07)
+        else:
+            # Rojo
+            return (0.88, 0.11, 0.14)
+
+    def draw(self, ctx: cairo.Context, width: int, height: int, scale: float = 1.0, theme=None):
+        """Compone la capa estática y dibuja el arco y la etiqueta"""
+        key = ('circular', width, height, self.size, scale, theme, self.title)
+        static = get_static_layer(key, ctx, width, height, scale,
+                                  lambda layer_ctx: self._paint_static(layer_ctx, width, height))
+        ctx.set_source_surface(static, 0, 0)
+        ctx.paint()
+
+        center_x, center_y, radius = self._geometry(width, height)
+
+        # Arco de progreso
         if self.percentage > 0:
             r, g, b = self._get_color()
-            
-            # Sombra del arco de progreso
-            ctx.save()
-            ctx.set_line_width(line_width + 1)
-            ctx.set_source_rgba(r, g, b, 0.3)
-            ctx.set_line_cap(cairo.LINE_CAP_ROUND)
             start_angle = -math.pi / 2
             end_angle = start_angle + (2 * math.pi * self.percentage / 100)
+            ctx.set_line_cap(cairo.LINE_CAP_ROUND)
+
+            # Sombra del arco de progreso
+            ctx.set_line_width(self.LINE_WIDTH + 1)
+            ctx.set_source_rgba(r, g, b, 0.3)
             ctx.arc(center_x + 1, center_y + 1, radius, start_angle, end_angle)
             ctx.stroke()
-            ctx.restore()
 
             # Arco principal con gradiente
-            ctx.save()
-            ctx.set_line_width(line_width)
-            ctx.set_line_cap(cairo.LINE_CAP_ROUND)
-            
-            # Crear gradiente para el arco
+            ctx.set_line_width(self.LINE_WIDTH)
             pattern = cairo.LinearGradient(center_x - radius, center_y, center_x + radius, center_y)
             pattern.add_color_stop_rgba(0, r, g, b, 0.8)
             pattern.add_color_stop_rgba(0.5, r + 0.1, g + 0.1, b + 0.1, 1.0)
             pattern.add_color_stop_rgba(1, r, g, b, 0.8)
             ctx.set_source(pattern)
-            
             ctx.arc(center_x, center_y, radius, start_angle, end_angle)
             ctx.stroke()
-            ctx.restore()
 
             # Brillo interior
-            ctx.save()
-            ctx.set_line_width(line_width - 4)
+            ctx.set_line_width(self.LINE_WIDTH - 4)
             ctx.set_source_rgba(1, 1, 1, 0.2)
-            ctx.set_line_cap(cairo.LINE_CAP_ROUND)
             ctx.arc(center_x, center_y, radius, start_angle, end_angle)
             ctx.stroke()
-            ctx.restore()
 
-        # Texto del porcentaje con sombra
-        ctx.save()
-        ctx.select_font_face("Sans", cairo.FONT_SLANT_NORMAL, cairo.FONT_WEIGHT_BOLD)
-        ctx.set_font_size(24)
-        
-        # Sombra del texto
-        ctx.set_source_rgba(0, 0, 0, 0.5)
-        text_extents = ctx.text_extents(self.label)
-        text_x = center_x - text_extents.width / 2
-        text_y = center_y + text_extents.height / 2
-        ctx.move_to(text_x + 1, text_y + 1)
-        ctx.show_text(self.label)
-        
-        # Texto principal
-        ctx.set_source_rgb(0.95, 0.95, 0.95)
-        ctx.move_to(text_x, text_y)
-        ctx.show_text(self.label)
-        ctx.restore()
+        # Etiqueta del porcentaje con sombra
+        if self._label:
+            label_width, label_height = self._label_size
+            _show_layout_with_shadow(ctx, self._label_layout, center_x - label_width / 2,
+                                     center_y - label_height / 2, 0.5, (0.95, 0.95, 0.95))
 
-        # Título encima con mejor estilo
-        if self.title:
-            ctx.save()
-            ctx.select_font_face("Sans", cairo.FONT_SLANT_NORMAL, cairo.FONT_WEIGHT_NORMAL)
-            ctx.set_font_size(13)
-            
-            # Sombra del título
-            ctx.set_source_rgba(0, 0, 0, 0.4)
-            title_extents = ctx.text_extents(self.title)
-            title_x = center_x - title_extents.width / 2
-            title_y = center_y - radius - 18
-            ctx.move_to(title_x + 1, title_y + 1)
-            ctx.show_text(self.title)
-            
-            # Título principal
-            ctx.set_source_rgb(0.8, 0.8, 0.8)
-            ctx.move_to(title_x, title_y)
-            ctx.show_text(self.title)
-            ctx.restore()
 
+def theme_key() -> tuple:
+    """Identifica el tema actual para invalidar las capas estáticas"""
+    settings = Gtk.Settings.get_default()
+    if settings is None:
+        return None
+    return (settings.props.gtk_theme_name, settings.props.gtk_application_prefer_dark_theme)
 
-class MiniLineChartWidget(Gtk.DrawingArea):
-    """Mini gráfico de línea para mostrar historial"""
 
-    def __init__(self, width=200, height=60, max_points=30):
+class BatchedDrawingArea(Gtk.DrawingArea):
+    """DrawingArea que invalida como mucho una vez por frame
+
+    Los cambios de valor llaman a queue_redraw(); varias llamadas antes
+    del siguiente dibujo solo invalidan el widget una vez. Cada dibujo
+    se anota en frame_stats. Las subclases implementan _on_draw().
+    """
+
+    def __init__(self):
         super().__init__()
-        self.width = width
-        self.height = height
-        self.max_points = max_points
-        self.data_points: List[float] = []
-        self.title = ""
-        self.color = (0.2, 0.6, 1.0)  # Azul por defecto
+        self._redraw_queued = False
+        self.set_draw_func(self._draw_batched)
 
-        self.set_content_width(width)
-        self.set_content_height(height)
-        self.set_draw_func(self._on_draw)
+    def queue_redraw(self):
+        if not self._redraw_queued:
+            self._redraw_queued = True
+            self.queue_draw()
 
-    def add_data_point(self, value: float):
-        """Agrega un punto al historial"""
-        new_value = max(0.0, min(100.0, value))
-        
-        # Solo redibujar si el valor cambió significativamente o es un nuevo punto
-        should_update = (not self.data_points or 
-                        abs(new_value - self.data_points[-1]) > 0.5)
-        
-        self.data_points.append(new_value)
-        if len(self.data_points) > self.max_points:
-            self.data_points.pop(0)
+    def _draw_batched(self, area, ctx, width, height):
+        self._redraw_queued = False
+        frame_stats.count('draws')
+        self._on_draw(area, ctx, width, height)
+
+    def _on_draw(self, area, ctx, width, height):
+        raise NotImplementedError
+
+
+class ValueAnimation:
+    """Interpolación de un valor hacia su objetivo con el frame clock del widget
+
+    Usa un tick callback que se elimina en cuanto el valor llega al
+    objetivo, así que sin cambios no consume CPU. Si GTK tiene las
+    animaciones desactivadas (gtk-enable-animations) o el widget no está
+    mapeado, el valor salta directamente.
+    """
+
+    DURATION_US = 400_000  # Menos que el intervalo de recolección
+
+    def __init__(self, widget: 'BatchedDrawingArea', value: float = 0.0):
+        self.widget = widget
+        self.value = value
+        self.target = value
+        self._from = value
+        self._start_time = None
+        self._tick_id = None
+
+    @property
+    def running(self) -> bool:
+        return self._tick_id is not None
+
+    def set_target(self, target: float):
+        if target == self.target:
+            return
+        self.target = target
+
+        settings = self.widget.get_settings()
+        if not self.widget.get_mapped() or not settings.props.gtk_enable_animations:
+            self._stop()
+            self.value = target
+            self.widget.queue_redraw()
+            return
+
+        # Reiniciar desde el valor mostrado (también a mitad de otra animación)
+        self._from = self.value
+        self._start_time = None
+        if self._tick_id is None:
+            self._tick_id = self.widget.add_tick_callback(self._on_tick)
+
+    def _stop(self):
+        if self._tick_id is not None:
+            self.widget.remove_tick_callback(self._tick_id)
+            self._tick_id = None
+
+    def _on_tick(self, widget, frame_clock):
+        now = frame_clock.get_frame_time()
+        if self._start_time is None:
+            self._start_time = now
+        progress = min(1.0, (now - self._start_time) / self.DURATION_US)
+        eased = 1 - (1 - progress) ** 3  # ease-out cúbico
+        self.value = self._from + (self.target - self._from) * eased
+        widget.queue_redraw()
+
+        if progress >= 1.0:
+            self.value = self.target
+            self._tick_id = None
+            return GLib.SOURCE_REMOVE
+        return GLib.SOURCE_CONTINUE
+
+
+class CircularProgressWidget(BatchedDrawingArea):
+    """Widget circular para mostrar progreso con Cairo"""
+
+    def __init__(self, size=120):
+        super().__init__()
+        self.size = size
+        self.percentage = 0.0
+        self.label = "0%"
+        self.title = ""
+        self._renderer = CircularProgressRenderer(size)
+        self._renderer.set_label(self.label)
+        self._animation = ValueAnimation(self)
+        # Aumentar altura para que quepa el título arriba
+        self.set_content_width(size)
+        self.set_content_height(size + 30)  # +30px para el título
+
+    def set_value(self, percentage: float, label: str = None, title: str = None):
+        """Actualiza el valor del gráfico circular"""
+        new_percentage = max(0.0, min(100.0, percentage))
+        new_label = label if label else f"{new_percentage:.1f}%"
+        new_title = title if title else self.title
         
-        if should_update:
-            self.queue_draw()
+        # Solo redibujar si los valores cambiaron significativamente
+        if (abs(new_percentage - self.percentage) > 0.5 or 
+            new_label != self.label or 
+            new_title != self.title):
+            self.percentage = new_percentage
+            self.label = new_label
+            self.title = new_title
+            self._renderer.title = new_title
+            self._renderer.set_label(new_label)
+            self._animation.set_target(new_percentage)
+            self.queue_redraw()
 
-    def set_title(self, title: str):
-        """Establece el título"""
-        self.title = title
-        self.queue_draw()
+    def _on_draw(self, area, ctx, width, height):
+        """Dibuja el gráfico circular moderno"""
+        # El arco sigue al valor animado; la etiqueta muestra ya el valor final
+        self._renderer.percentage = self._animation.value
+        self._renderer.draw(ctx, width, height, self.get_scale_factor(), theme_key())
+
+
+class MiniLineChartRenderer:
+    """Dibujo incremental del mini gráfico de línea, independiente de GTK
+
+    Fondo, borde, rejilla y título son una capa estática compartida. La
+    serie (relleno + línea en un único trazo) vive en una superficie
+    propia que, al llegar un punto nuevo, se desplaza un número entero de
+    píxeles y solo se le dibuja el último segmento. Los marcadores se
+    copian desde un sprite prerenderizado. El coste por frame es
+    constante y no depende del número de puntos.
+    """
+
+    MARGIN_LEFT = 12
+    MARGIN_RIGHT = 12
+    MARGIN_TOP = 22
+    MARGIN_BOTTOM = 12
+    PAD = 6          # Margen de la superficie de la serie para marcadores y grosor de línea
+    LINE_WIDTH = 2.5
+    MARKER_RADIUS = 3
+
+    def __init__(self, max_points: int = 30, show_markers: bool = True):
+        self.max_points = max_points
+        self.show_markers = show_markers
+        self.data_points = deque(maxlen=max_points)
+        self.title = ""
+        self.color = (0.2, 0.6, 1.0)
+        self._total = 0            # Puntos añadidos desde el principio (índice absoluto del siguiente)
+        self._value_layout = new_layout("Sans Bold 11px")
+        self._value_text = None
+        self._value_width = 0
+        # Estado de la superficie de la serie
+        self._plot = None
+        self._plot_key = None
+        self._drawn = 0            # Índice absoluto del siguiente punto aún no dibujado
+        self._shift = 0.0          # x lógica (en la superficie) del índice absoluto 0, negada
+
+    def add_data_point(self, value: float):
+        self.data_points.append(max(0.0, min(100.0, value)))
+        self._total += 1
 
     def set_color(self, r: float, g: float, b: float):
-        """Establece el color de la línea"""
         self.color = (r, g, b)
-        self.queue_draw()
-
-    def _on_draw(self, area, ctx, width, height):
-        """Dibuja el mini gráfico de línea moderno"""
-        if not self.data_points:
-            return
+        self._plot = None
 
-        # Márgenes
-        margin_left = 12
-        margin_right = 12
-        margin_top = 22
-        margin_bottom = 12
+    def _layout(self, width: int, height: int) -> Tuple[float, float, float]:
+        chart_width = width - self.MARGIN_LEFT - self.MARGIN_RIGHT
+        chart_height = height - self.MARGIN_TOP - self.MARGIN_BOTTOM
+        x_step = chart_width / (self.max_points - 1)
+        return chart_width, chart_height, x_step
 
-        chart_width = width - margin_left - margin_right
-        chart_height = height - margin_top - margin_bottom
+    def _paint_static(self, ctx: cairo.Context, width: int, height: int):
+        """Capa estática: fondo con gradiente, borde, rejilla y título"""
+        chart_width, chart_height, _x_step = self._layout(width, height)
+        left, top = self.MARGIN_LEFT, self.MARGIN_TOP
 
         # Fondo con gradiente
-        ctx.save()
-        pattern = cairo.LinearGradient(margin_left, margin_top, margin_left, margin_top + chart_height)
+        pattern = cairo.LinearGradient(left, top, left, top + chart_height)
         pattern.add_color_stop_rgba(0, 0.08, 0.08, 0.08, 0.4)
         pattern.add_color_stop_rgba(1, 0.04, 0.04, 0.04, 0.2)
         ctx.set_source(pattern)
-        ctx.rectangle(margin_left, margin_top, chart_width, chart_height)
+        ctx.rectangle(left, top, chart_width, chart_height)
         ctx.fill()
-        ctx.restore()
 
         # Borde del área del gráfico
-        ctx.save()
         ctx.set_line_width(1)
         ctx.set_source_rgba(0.2, 0.2, 0.2, 0.6)
-        ctx.rectangle(margin_left, margin_top, chart_width, chart_height)
+        ctx.rectangle(left, top, chart_width, chart_height)
         ctx.stroke()
-        ctx.restore()
 
-        # Grid horizontal mejorado
-        ctx.save()
+        # Grid horizontal (líneas superior e inferior más visibles)
         ctx.set_line_width(0.5)
         for i in range(5):
-            y = margin_top + (chart_height / 4) * i
-            if i == 0 or i == 4:  # Líneas superior e inferior más visibles
+            y = top + (chart_height / 4) * i
+            if i == 0 or i == 4:
                 ctx.set_source_rgba(0.3, 0.3, 0.3, 0.7)
             else:
                 ctx.set_source_rgba(0.2, 0.2, 0.2, 0.4)
-            ctx.move_to(margin_left, y)
-            ctx.line_to(margin_left + chart_width, y)
+            ctx.move_to(left, y)
+            ctx.line_to(left + chart_width, y)
             ctx.stroke()
+
+        # Título con sombra
+        if self.title:
+            title_layout = new_layout("Sans 11px")
+            title_layout.set_text(self.title, -1)
+            baseline = title_layout.get_baseline() / Pango.SCALE
+            _show_layout_with_shadow(ctx, title_layout, left, 12 - baseline, 0.4, (0.85, 0.85, 0.85))
+
+    def _marker_sprite(self, ctx: cairo.Context, scale: float) -> cairo.ImageSurface:
+        """Sprite del marcador de punto (sombra + gradiente + brillo)"""
+        r, g, b = self.color
+        radius = self.MARKER_RADIUS
+        size = 2 * radius + 2  # +1 por cada lado para la sombra desplazada
+
+        def paint(sprite_ctx):
+            center = radius
+            sprite_ctx.set_source_rgba(0, 0, 0, 0.3)
+            sprite_ctx.arc(center + 1, center + 1, radius, 0, 2 * math.pi)
+            sprite_ctx.fill()
+            pattern = cairo.RadialGradient(center, center, 0, center, center, radius)
+            pattern.add_color_stop_rgba(0, 1, 1, 1, 0.8)
+            pattern.add_color_stop_rgba(0.5, r, g, b, 1.0)
+            pattern.add_color_stop_rgba(1, r * 0.7, g * 0.7, b * 0.7, 1.0)
+            sprite_ctx.set_source(pattern)
+            sprite_ctx.arc(center, center, radius, 0, 2 * math.pi)
+            sprite_ctx.fill()
+            sprite_ctx.set_source_rgba(1, 1, 1, 0.6)
+            sprite_ctx.arc(center, center, radius / 2, 0, 2 * math.pi)
+            sprite_ctx.fill()
+
+        return get_static_layer(('chart-marker', self.color, scale), ctx, size, size, scale, paint)
+
+    def _point(self, index: int, chart_height: float, x_step: float) -> Tuple[float, float]:
+        """Posición de un punto (índice absoluto) en la superficie de la serie"""
+        value = self.data_points[index - (self._total - len(self.data_points))]
+        return index * x_step - self._shift, self.PAD + chart_height - (value / 100 * chart_height)
+
+    def _new_plot(self, ctx: cairo.Context, surface_width: float, surface_height: float, scale: float):
+        plot = ctx.get_target().create_similar_image(
+            cairo.FORMAT_ARGB32, math.ceil(surface_width * scale), math.ceil(surface_height * scale)
+        )
+        plot.set_device_scale(scale, scale)
+        return plot
+
+    def _draw_segments(self, plot_ctx: cairo.Context, first: int, last: int, chart_height: float,
+                       x_step: float, sprite):
+        """Dibuja los segmentos first-1 → first ... last como un único trazo"""
+        r, g, b = self.color
+        bottom = self.PAD + chart_height
+        points = [self._point(i, chart_height, x_step) for i in range(first - 1, last + 1)]
+
+        # Área bajo la curva con gradiente vertical (no depende de x: se puede desplazar)
+        pattern = cairo.LinearGradient(0, bottom, 0, self.PAD)
+        pattern.add_color_stop_rgba(0, r, g, b, 0.3)
+        pattern.add_color_stop_rgba(1, r, g, b, 0.05)
+        plot_ctx.set_source(pattern)
+        plot_ctx.move_to(points[0][0], bottom)
+        for x, y in points:
+            plot_ctx.line_to(x, y)
+        plot_ctx.line_to(points[-1][0], bottom)
+        plot_ctx.close_path()
+        plot_ctx.fill()
+
+        # Línea principal (opaca, para que los segmentos se unan sin costuras)
+        plot_ctx.set_source_rgb(r, g, b)
+        plot_ctx.set_line_width(self.LINE_WIDTH)
+        plot_ctx.set_line_join(cairo.LINE_JOIN_ROUND)
+        plot_ctx.set_line_cap(cairo.LINE_CAP_ROUND)
+        plot_ctx.move_to(*points[0])
+        for x, y in points[1:]:
+            plot_ctx.line_to(x, y)
+        plot_ctx.stroke()
+
+        # Marcadores fijos: todos salvo el último, que se dibuja en vivo
+        if sprite is not None:
+            offset = self.MARKER_RADIUS
+            for x, y in points[:-1]:
+                plot_ctx.set_source_surface(sprite, x - offset, y - offset)
+                plot_ctx.paint()
+
+    def _sync_plot(self, ctx: cairo.Context, width: int, height: int, scale: float, sprite):
+        """Pone al día la superficie de la serie con los puntos nuevos"""
+        chart_width, chart_height, x_step = self._layout(width, height)
+        surface_width = chart_width + 2 * self.PAD + 4 * x_step  # Holgura para desplazar cada pocos puntos
+        surface_height = chart_height + 2 * self.PAD
+        key = (width, height, scale, self.max_points, self.show_markers)
+        first_visible = self._total - len(self.data_points)
+
+        rebuild = (self._plot is None or self._plot_key != key or self._drawn <= first_visible)
+        if rebuild:
+            self._plot = self._new_plot(ctx, surface_width, surface_height, scale)
+            self._plot_key = key
+            self._shift = first_visible * x_step - self.PAD
+            if len(self.data_points) > 1:
+                self._draw_segments(cairo.Context(self._plot), first_visible + 1, self._total - 1,
+                                    chart_height, x_step, sprite)
+            self._drawn = self._total
+            return
+
+        if self._drawn == self._total:
+            return
+
+        # Desplazar un número entero de píxeles si el punto nuevo no cabe
+        newest_x = (self._total - 1) * x_step - self._shift
+        if newest_x + self.PAD > surface_width:
+            wanted = first_visible * x_step - self.PAD
+            shift_px = math.floor((wanted - self._shift) * scale)
+            scrolled = self._new_plot(ctx, surface_width, surface_height, scale)
+            scrolled_ctx = cairo.Context(scrolled)
+            scrolled_ctx.set_source_surface(self._plot, -shift_px / scale, 0)
+            scrolled_ctx.paint()
+            self._plot = scrolled
+            self._shift += shift_px / scale
+
+        self._draw_segments(cairo.Context(self._plot), max(self._drawn, first_visible + 1), self._total - 1,
+                            chart_height, x_step, sprite)
+        self._drawn = self._total
+
+    def draw(self, ctx: cairo.Context, width: int, height: int, scale: float = 1.0, theme=None):
+        """Compone fondo, serie y valor actual"""
+        if not self.data_points:
+            return
+
+        static = get_static_layer(('chart', width, height, scale, theme, self.title), ctx, width, height, scale,
+                                  lambda layer_ctx: self._paint_static(layer_ctx, width, height))
+        ctx.set_source_surface(static, 0, 0)
+        ctx.paint()
+
+        chart_width, chart_height, x_step = self._layout(width, height)
+        sprite = self._marker_sprite(ctx, scale) if self.show_markers else None
+        self._sync_plot(ctx, width, height, scale, sprite)
+
+        # Serie: la superficie se coloca según el primer punto visible
+        first_visible = self._total - len(self.data_points)
+        origin_x = self.MARGIN_LEFT - first_visible * x_step + self._shift
+        origin_y = self.MARGIN_TOP - self.PAD
+        ctx.save()
+        # Recortar por la izquierda oculta los segmentos ya desplazados fuera
+        ctx.rectangle(self.MARGIN_LEFT, origin_y, chart_width + self.PAD, chart_height + 2 * self.PAD)
+        ctx.clip()
+        ctx.set_source_surface(self._plot, origin_x, origin_y)
+        ctx.paint()
         ctx.restore()
 
-        # Dibujar línea de datos
-        if len(self.data_points) > 1:
-            r, g, b = self.color
-            x_step = chart_width / (self.max_points - 1)
+        # Marcador del último punto
+        if sprite is not None and len(self.data_points) > 1:
+            x, y = self._point(self._total - 1, chart_height, x_step)
+            ctx.set_source_surface(sprite, origin_x + x - self.MARKER_RADIUS, origin_y + y - self.MARKER_RADIUS)
+            ctx.paint()
 
-            # Área bajo la curva con gradiente
-            ctx.save()
-            pattern = cairo.LinearGradient(margin_left, margin_top + chart_height, margin_left, margin_top)
-            pattern.add_color_stop_rgba(0, r, g, b, 0.3)
-            pattern.add_color_stop_rgba(1, r, g, b, 0.05)
-            ctx.set_source(pattern)
+        # Valor actual (layout cacheado mientras no cambie el texto)
+        text = f"{self.data_points[-1]:.1f}%"
+        if text != self._value_text:
+            self._value_text = text
+            self._value_layout.set_text(text, -1)
+            frame_stats.count('text_layouts')
+            self._value_width = self._value_layout.get_pixel_size()[0]
+        baseline = self._value_layout.get_baseline() / Pango.SCALE
+        _show_layout_with_shadow(ctx, self._value_layout, width - self.MARGIN_RIGHT - self._value_width,
+                                 12 - baseline, 0.4, (0.95, 0.95, 0.95))
 
-            ctx.move_to(margin_left, margin_top + chart_height)
-            for i, value in enumerate(self.data_points):
-                x = margin_left + i * x_step
-                y = margin_top + chart_height - (value / 100 * chart_height)
-                ctx.line_to(x, y)
-            ctx.line_to(margin_left + len(self.data_points) * x_step, margin_top + chart_height)
-            ctx.close_path()
-            ctx.fill()
-            ctx.restore()
 
-            # Línea principal con gradiente
-            ctx.save()
-            pattern = cairo.LinearGradient(margin_left, 0, margin_left + chart_width, 0)
-            pattern.add_color_stop_rgba(0, r, g, b, 0.8)
-            pattern.add_color_stop_rgba(0.5, r + 0.1, g + 0.1, b + 0.1, 1.0)
-            pattern.add_color_stop_rgba(1, r, g, b, 0.8)
-            ctx.set_source(pattern)
-            ctx.set_line_width(2.5)
-            ctx.set_line_join(cairo.LINE_JOIN_ROUND)
-            ctx.set_line_cap(cairo.LINE_CAP_ROUND)
+class MiniLineChartWidget(BatchedDrawingArea):
+    """Mini gráfico de línea para mostrar historial"""
 
-            for i, value in enumerate(self.data_points):
-                x = margin_left + i * x_step
-                y = margin_top + chart_height - (value / 100 * chart_height)
+    def __init__(self, width=200, height=60, max_points=30, show_markers=True):
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.max_points = max_points
+        self._renderer = MiniLineChartRenderer(max_points, show_markers)
 
-                if i == 0:
-                    ctx.move_to(x, y)
-                else:
-                    ctx.line_to(x, y)
-            ctx.stroke()
-            ctx.restore()
+        self.set_content_width(width)
+        self.set_content_height(height)
 
-            # Puntos en la línea con brillo
-            ctx.save()
-            for i, value in enumerate(self.data_points):
-                x = margin_left + i * x_step
-                y = margin_top + chart_height - (value / 100 * chart_height)
-                
-                # Sombra del punto
-                ctx.set_source_rgba(0, 0, 0, 0.3)
-                ctx.arc(x + 1, y + 1, 3, 0, 2 * math.pi)
-                ctx.fill()
-                
-                # Punto principal con gradiente
-                pattern = cairo.RadialGradient(x, y, 0, x, y, 3)
-                pattern.add_color_stop_rgba(0, 1, 1, 1, 0.8)
-                pattern.add_color_stop_rgba(0.5, r, g, b, 1.0)
-                pattern.add_color_stop_rgba(1, r * 0.7, g * 0.7, b * 0.7, 1.0)
-                ctx.set_source(pattern)
-                ctx.arc(x, y, 3, 0, 2 * math.pi)
-                ctx.fill()
-                
-                # Brillo central
-                ctx.set_source_rgba(1, 1, 1, 0.6)
-                ctx.arc(x, y, 1.5, 0, 2 * math.pi)
-                ctx.fill()
-            ctx.restore()
+    @property
+    def data_points(self) -> List[float]:
+        return list(self._renderer.data_points)
 
-        # Título con sombra
-        if self.title:
-            ctx.save()
-            ctx.select_font_face("Sans", cairo.FONT_SLANT_NORMAL, cairo.FONT_WEIGHT_NORMAL)
-            ctx.set_font_size(11)
-            
-            # Sombra del título
-            ctx.set_source_rgba(0, 0, 0, 0.4)
-            ctx.move_to(margin_left + 1, 13)
-            ctx.show_text(self.title)
-            
-            # Título principal
-            ctx.set_source_rgb(0.85, 0.85, 0.85)
-            ctx.move_to(margin_left, 12)
-            ctx.show_text(self.title)
-            ctx.restore()
+    @property
+    def title(self) -> str:
+        return self._renderer.title
 
-        # Valor actual con mejor estilo
-        if self.data_points:
-            current = self.data_points[-1]
-            text = f"{current:.1f}%"
-            ctx.save()
-            ctx.select_font_face("Sans", cairo.FONT_SLANT_NORMAL, cairo.FONT_WEIGHT_BOLD)
-            ctx.set_font_size(11)
-            
-            # Sombra del valor
-            text_extents = ctx.text_extents(text)
-            ctx.set_source_rgba(0, 0, 0, 0.4)
-            ctx.move_to(width - margin_right - text_extents.width + 1, 13)
-            ctx.show_text(text)
-            
-            # Valor principal
-            ctx.set_source_rgb(0.95, 0.95, 0.95)
-            ctx.move_to(width - margin_right - text_extents.width, 12)
-            ctx.show_text(text)
-            ctx.restore()
+    @property
+    def color(self) -> Tuple[float, float, float]:
+        return self._renderer.color
 
+    def add_data_point(self, value: float):
+        """Agrega un punto al historial"""
+        points = self._renderer.data_points
+        previous = points[-1] if points else None
+        self._renderer.add_data_point(value)
 
-class DiskUsageBarWidget(Gtk.DrawingArea):
+        # Con el historial lleno la serie se desplaza, así que siempre hay que redibujar
+        if (previous is None or len(points) == self.max_points or
+                abs(points[-1] - previous) > 0.5):
+            self.queue_redraw()
+
+    def set_title(self, title: str):
+        """Establece el título"""
+        self._renderer.title = title
+        self.queue_redraw()
+
+    def set_color(self, r: float, g: float, b: float):
+        """Establece el color de la línea"""
+        self._renderer.set_color(r, g, b)
+        self.queue_redraw()
+
+    def _on_draw(self, area, ctx, width, height):
+        """Dibuja el mini gráfico de línea moderno"""
+        self._renderer.draw(ctx, width, height, self.get_scale_factor(), theme_key())
+
+
+class DiskUsageBarWidget(BatchedDrawingArea):
     """Barra de uso de disco con gradiente"""
 
     def __init__(self, width=300, height=30):
@@ -364,17 +639,22 @@ class DiskUsageBarWidget(Gtk.DrawingArea):
         self.percentage = 0.0
         self.used_gb = 0.0
         self.total_gb = 0.0
+        self._animation = ValueAnimation(self)
 
         self.set_content_width(width)
         self.set_content_height(height)
-        self.set_draw_func(self._on_draw)
 
     def set_value(self, percentage: float, used_gb: float, total_gb: float):
-        """Actualiza los valores"""
-        self.percentage = max(0.0, min(100.0, percentage))
+        """Actualiza los valores (solo redibuja si cambia lo que se ve)"""
+        new_percentage = max(0.0, min(100.0, percentage))
+        if (round(new_percentage, 1) == round(self.percentage, 1) and
+                round(used_gb, 1) == round(self.used_gb, 1) and round(total_gb, 1) == round(self.total_gb, 1)):
+            return
+        self.percentage = new_percentage
         self.used_gb = used_gb
         self.total_gb = total_gb
-        self.queue_draw()
+        self._animation.set_target(new_percentage)
+        self.queue_redraw()
 
     def _on_draw(self, area, ctx, width, height):
         """Dibuja la barra de disco moderna"""
@@ -397,8 +677,10 @@ class DiskUsageBarWidget(Gtk.DrawingArea):
         ctx.restore()
 
         # Barra de progreso con efectos modernos
-        if self.percentage > 0:
-            bar_width = width * (self.percentage / 100)
+        # La barra sigue al valor animado; el texto muestra ya el valor final
+        percentage = self._animation.value
+        if percentage > 0:
+            bar_width = width * (percentage / 100)
 
             # Sombra de la barra
             ctx.save()
@@ -411,12 +693,12 @@ class DiskUsageBarWidget(Gtk.DrawingArea):
             ctx.save()
             gradient = cairo.LinearGradient(0, 0, bar_width, 0)
 
-            if self.percentage < 70:
+            if percentage < 70:
                 # Verde moderno
                 gradient.add_color_stop_rgb(0, 0.06, 0.73, 0.39)
                 gradient.add_color_stop_rgb(0.5, 0.16, 0.85, 0.49)
                 gradient.add_color_stop_rgb(1, 0.06, 0.73, 0.39)
-            elif self.percentage < 85:
+            elif percentage < 85:
                 # Amarillo/Naranja moderno
                 gradient.add_color_stop_rgb(0, 0.96, 0.76, 0.07)
                 gradient.add_color_stop_rgb(0.5, 0.99, 0.85, 0.15)
@@ -467,3 +749,742 @@ class DiskUsageBarWidget(Gtk.DrawingArea):
         ctx.move_to(text_x, text_y)
         ctx.show_text(text)
         ctx.restore()
+
+
+class DiskBreakdownWidget(BatchedDrawingArea):
+    """Desglose por disco bajo la barra de uso: una fila por disco
+
+    Cada fila muestra la latencia del último intervalo con su historial
+    corto, IOPS, MB/s y tamaño medio de petición; los discos lentos
+    (disk_stats.DiskHistory) se resaltan en rojo.
+    """
+
+    ROW_HEIGHT = 30
+    NAME_WIDTH = 64
+    SPARK_WIDTH = 72
+
+    def __init__(self):
+        super().__init__()
+        self.rows: List[Dict] = []
+        self._layouts = {}
+
+        self.set_hexpand(True)
+        self.set_content_height(0)
+        self.set_has_tooltip(True)
+        self.connect('query-tooltip', self._on_query_tooltip)
+
+    def set_rows(self, rows: List[Dict]):
+        """Filas de disk_stats.DiskHistory.update()"""
+        if len(rows) != len(self.rows):
+            self.set_content_height(len(rows) * self.ROW_HEIGHT)
+        self.rows = rows
+        self.queue_redraw()
+
+    def _on_query_tooltip(self, widget, x, y, keyboard_mode, tooltip):
+        index = int(y // self.ROW_HEIGHT)
+        if not 0 <= index < len(self.rows):
+            return False
+        tooltip.set_text(disk_stats.DiskHistory.tooltip(self.rows[index]))
+        return True
+
+    def _layout(self, name: str, font: str, text: str) -> Pango.Layout:
+        """Layout cacheado por nombre; solo se rehace si cambia el texto"""
+        layout, current = self._layouts.get(name, (None, None))
+        if layout is None:
+            layout = new_layout(font)
+        if text != current:
+            layout.set_text(text, -1)
+            frame_stats.count('text_layouts')
+            self._layouts[name] = (layout, text)
+        return layout
+
+    def _draw_sparkline(self, ctx: cairo.Context, values: List[Optional[float]], x: float, y: float,
+                        width: float, height: float, rgb: Tuple[float, float, float]):
+        """Historial de latencia; los intervalos sin peticiones cortan la línea"""
+        ctx.set_source_rgba(0.08, 0.08, 0.08, 0.4)
+        ctx.rectangle(x, y, width, height)
+        ctx.fill()
+
+        known = [value for value in values if value is not None]
+        if not known:
+            return
+        max_value = max(max(known), 1.0)
+        step = width / max(1, len(values) - 1)
+        ctx.new_path()
+        drawing = False
+        for i, value in enumerate(values):
+            if value is None:
+                drawing = False
+                continue
+            point = (x + i * step, y + height - min(value, max_value) / max_value * height)
+            if drawing:
+                ctx.line_to(*point)
+            else:
+                ctx.move_to(*point)
+                drawing = True
+        ctx.set_source_rgb(*rgb)
+        ctx.set_line_width(1.2)
+        ctx.set_line_join(cairo.LINE_JOIN_ROUND)
+        ctx.stroke()
+
+    def _on_draw(self, area, ctx, width, height):
+        """Dibuja una fila por disco"""
+        for index, row in enumerate(self.rows):
+            top = index * self.ROW_HEIGHT
+            middle = top + self.ROW_HEIGHT / 2
+
+            if row['slow']:
+                rgb = (0.88, 0.11, 0.14)
+                ctx.set_source_rgba(*rgb, 0.15)
+                ctx.rectangle(0, top + 1, width, self.ROW_HEIGHT - 2)
+                ctx.fill()
+            elif row['latency_ms'] is not None:
+                rgb = (0.15, 0.76, 0.41)
+            else:
+                rgb = (0.5, 0.5, 0.5)
+
+            # Indicador y nombre del disco
+            ctx.set_source_rgb(*rgb)
+            ctx.arc(6, middle, 4, 0, 2 * math.pi)
+            ctx.fill()
+            name_layout = self._layout(f'name-{index}', "Sans Bold 11px", row['name'] or "?")
+            _show_layout_with_shadow(ctx, name_layout, 16, middle - name_layout.get_pixel_size()[1] / 2, 0.4,
+                                     (0.9, 0.9, 0.9))
+
+            spark_x = self.NAME_WIDTH
+            self._draw_sparkline(ctx, row['history']['latency_ms'], spark_x, top + 5, self.SPARK_WIDTH,
+                                 self.ROW_HEIGHT - 10, rgb)
+
+            if row['iops'] is None:
+                text = "sin datos del intervalo"
+            else:
+                latency = f"{row['latency_ms']:.2f} ms" if row['latency_ms'] is not None else "— ms"
+                size = f" · {row['kb_per_request']:.0f} KB/pet" if row['kb_per_request'] is not None else ""
+                text = f"{latency} · {row['iops']:.0f} IOPS · {row['mbps']:.1f} MB/s{size}"
+            text_layout = self._layout(f'text-{index}', "Sans 10px", text)
+            _show_layout_with_shadow(ctx, text_layout, spark_x + self.SPARK_WIDTH + 8,
+                                     middle - text_layout.get_pixel_size()[1] / 2, 0.4,
+                                     (0.95, 0.6, 0.6) if row['slow'] else (0.75, 0.75, 0.75))
+
+
+class StackedAreaChartWidget(BatchedDrawingArea):
+    """Áreas apiladas por serie (p. ej. CPU por rol de hilo de QEMU)
+
+    Los valores están en % de un núcleo del host; la escala vertical sube
+    en múltiplos de 100 % y cada núcleo lleva su línea de rejilla. La
+    leyenda muestra el valor de cada serie en la última muestra.
+    """
+
+    MARGIN_LEFT = 12
+    MARGIN_RIGHT = 12
+    MARGIN_TOP = 22
+    MARGIN_BOTTOM = 6
+
+    def __init__(self, series: List[Tuple[str, str, Tuple[float, float, float]]], max_points: int = 30,
+                 height: int = 90):
+        super().__init__()
+        self.series = series  # [(clave, etiqueta, rgb)] de abajo arriba
+        self.samples = deque(maxlen=max_points)
+        self.title = ""
+        self._layouts = {}
+
+        self.set_hexpand(True)
+        self.set_content_height(height)
+
+    def set_title(self, title: str):
+        self.title = title
+        self.queue_redraw()
+
+    def add_sample(self, values: Dict[str, float]):
+        """Añade una muestra {clave: valor}; las series que falten cuentan como 0"""
+        self.samples.append(tuple(values.get(key) or 0.0 for key, _label, _rgb in self.series))
+        self.queue_redraw()
+
+    def clear(self):
+        self.samples.clear()
+        self.queue_redraw()
+
+    def _layout(self, name: str, font: str, text: str) -> Pango.Layout:
+        """Layout cacheado por nombre; solo se rehace si cambia el texto"""
+        layout, current = self._layouts.get(name, (None, None))
+        if layout is None:
+            layout = new_layout(font)
+        if text != current:
+            layout.set_text(text, -1)
+            frame_stats.count('text_layouts')
+            self._layouts[name] = (layout, text)
+        return layout
+
+    def _paint_static(self, ctx: cairo.Context, width: int, height: int):
+        """Capa estática: fondo y borde del área del gráfico"""
+        left, top = self.MARGIN_LEFT, self.MARGIN_TOP
+        chart_width = width - left - self.MARGIN_RIGHT
+        chart_height = height - top - self.MARGIN_BOTTOM
+        ctx.set_source_rgba(0.08, 0.08, 0.08, 0.35)
+        ctx.rectangle(left, top, chart_width, chart_height)
+        ctx.fill()
+        ctx.set_line_width(1)
+        ctx.set_source_rgba(0.2, 0.2, 0.2, 0.6)
+        ctx.rectangle(left, top, chart_width, chart_height)
+        ctx.stroke()
+
+    def _on_draw(self, area, ctx, width, height):
+        """Dibuja las series apiladas y la leyenda"""
+        scale = self.get_scale_factor()
+        static = get_static_layer(('stacked', width, height, scale, theme_key()), ctx, width, height, scale,
+                                  lambda layer_ctx: self._paint_static(layer_ctx, width, height))
+        ctx.set_source_surface(static, 0, 0)
+        ctx.paint()
+
+        left, top = self.MARGIN_LEFT, self.MARGIN_TOP
+        chart_width = width - left - self.MARGIN_RIGHT
+        chart_height = height - top - self.MARGIN_BOTTOM
+
+        # Leyenda: título y valor actual de cada serie
+        x = left
+        if self.title:
+            layout = self._layout('title', "Sans 11px", self.title)
+            _show_layout_with_shadow(ctx, layout, x, 4, 0.4, (0.85, 0.85, 0.85))
+            x += layout.get_pixel_size()[0] + 10
+        latest = self.samples[-1] if self.samples else None
+        for index, (key, label, rgb) in enumerate(self.series):
+            ctx.set_source_rgb(*rgb)
+            ctx.rectangle(x, 8, 8, 8)
+            ctx.fill()
+            text = f"{label} {latest[index]:.0f}%" if latest is not None else label
+            layout = self._layout(f'legend-{key}', "Sans 10px", text)
+            _show_layout_with_shadow(ctx, layout, x + 11, 5, 0.4, (0.75, 0.75, 0.75))
+            x += 11 + layout.get_pixel_size()[0] + 10
+
+        if len(self.samples) < 2:
+            return
+
+        # Escala en múltiplos de un núcleo (100 %) con una línea por núcleo
+        peak = max(sum(sample) for sample in self.samples)
+        max_value = 100.0 * max(1, math.ceil(peak / 100.0))
+        ctx.set_line_width(0.5)
+        ctx.set_source_rgba(0.3, 0.3, 0.3, 0.5)
+        for core in range(1, int(max_value // 100)):
+            y = top + chart_height - core * 100 / max_value * chart_height
+            ctx.move_to(left, y)
+            ctx.line_to(left + chart_width, y)
+        ctx.stroke()
+
+        step = chart_width / (self.samples.maxlen - 1)
+        offset = left + chart_width - (len(self.samples) - 1) * step  # Los datos entran por la derecha
+        lower = [0.0] * len(self.samples)
+        for index, (_key, _label, rgb) in enumerate(self.series):
+            upper = [base + sample[index] for base, sample in zip(lower, self.samples)]
+            ctx.new_path()
+            for i, value in enumerate(upper):
+                ctx.line_to(offset + i * step, top + chart_height - value / max_value * chart_height)
+            for i in range(len(lower) - 1, -1, -1):
+                ctx.line_to(offset + i * step, top + chart_height - lower[i] / max_value * chart_height)
+            ctx.close_path()
+            ctx.set_source_rgba(*rgb, 0.75)
+            ctx.fill()
+            lower = upper
+
+
+class FleetHeatmapRenderer:
+    """Dibujo del mapa de calor de la flota, independiente de GTK
+
+    Las celdas viven en una superficie propia; en cada dibujo solo se
+    repintan las celdas marcadas como sucias (agrupadas por color, un
+    relleno por color) y la superficie se compone con un único paint.
+    """
+
+    CELL = 14
+    GAP = 2
+
+    def __init__(self, model):
+        self.model = model
+        self.hover = None
+        self._surface = None
+        self._surface_key = None
+        self._dirty = set()
+
+    def columns(self, width: int) -> int:
+        return max(1, (width + self.GAP) // (self.CELL + self.GAP))
+
+    def height_for(self, width: int) -> int:
+        rows = math.ceil(len(self.model) / self.columns(width)) if len(self.model) else 1
+        return rows * (self.CELL + self.GAP) - self.GAP
+
+    def _cell_origin(self, index: int, columns: int) -> Tuple[int, int]:
+        row, col = divmod(index, columns)
+        return col * (self.CELL + self.GAP), row * (self.CELL + self.GAP)
+
+    def cell_at(self, x: float, y: float, width: int):
+        """Índice de la celda bajo (x, y) o None (también en los huecos)"""
+        pitch = self.CELL + self.GAP
+        col, row = int(x // pitch), int(y // pitch)
+        if x < 0 or y < 0 or col >= self.columns(width) or x - col * pitch >= self.CELL or y - row * pitch >= self.CELL:
+            return None
+        index = row * self.columns(width) + col
+        return index if index < len(self.model) else None
+
+    def invalidate(self, cells):
+        self._dirty.update(cells)
+
+    def _paint_cells(self, columns: int):
+        """Repinta las celdas sucias en la superficie de celdas"""
+        ctx = cairo.Context(self._surface)
+        # Borrar primero: las celdas pueden tener transparencia
+        ctx.set_operator(cairo.OPERATOR_CLEAR)
+        by_level: Dict[int, List[int]] = {}
+        for index in self._dirty:
+            if index >= len(self.model):
+                continue
+            x, y = self._cell_origin(index, columns)
+            ctx.rectangle(x, y, self.CELL, self.CELL)
+            by_level.setdefault(self.model.levels[index], []).append(index)
+        ctx.fill()
+
+        ctx.set_operator(cairo.OPERATOR_OVER)
+        for level, cells in by_level.items():
+            ctx.set_source_rgb(*self.model.color(cells[0]))
+            for index in cells:
+                x, y = self._cell_origin(index, columns)
+                ctx.rectangle(x, y, self.CELL, self.CELL)
+            ctx.fill()
+        frame_stats.count('heatmap_cells', len(self._dirty))
+        self._dirty.clear()
+
+    def draw(self, ctx: cairo.Context, width: int, height: int, scale: float = 1.0):
+        """Pone al día las celdas sucias y compone el mapa"""
+        columns = self.columns(width)
+        key = (columns, len(self.model), scale)
+        if self._surface is None or self._surface_key != key:
+            surface_height = max(1, self.height_for(width))
+            self._surface = ctx.get_target().create_similar_image(
+                cairo.FORMAT_ARGB32, max(1, math.ceil(width * scale)), math.ceil(surface_height * scale)
+            )
+            self._surface.set_device_scale(scale, scale)
+            self._surface_key = key
+            self._dirty = set(range(len(self.model)))
+
+        if self._dirty:
+            self._paint_cells(columns)
+
+        ctx.set_source_surface(self._surface, 0, 0)
+        # Obsoleto (caché): mismo atenuado que las tarjetas
+        if self.model.stale:
+            ctx.paint_with_alpha(0.7)
+        else:
+            ctx.paint()
+
+        # Celda bajo el puntero
+        if self.hover is not None and self.hover < len(self.model):
+            x, y = self._cell_origin(self.hover, columns)
+            ctx.set_source_rgba(1, 1, 1, 0.9)
+            ctx.set_line_width(1.5)
+            ctx.rectangle(x + 0.75, y + 0.75, self.CELL - 1.5, self.CELL - 1.5)
+            ctx.stroke()
+
+
+class FleetHeatmapWidget(BatchedDrawingArea):
+    """Mapa de calor con una celda por VM: tooltip al pasar y clic para ir a su tarjeta"""
+
+    def __init__(self, metric: str = 'cpu', on_activate: Callable[[str], None] = None):
+        super().__init__()
+        self.model = heatmap.HeatmapModel(metric)
+        self._renderer = FleetHeatmapRenderer(self.model)
+        self._on_activate = on_activate
+        self._width = 0
+
+        self.set_hexpand(True)
+        self.set_content_height(FleetHeatmapRenderer.CELL)
+        self.set_has_tooltip(True)
+        self.connect('query-tooltip', self._on_query_tooltip)
+        self.connect('resize', self._on_resize)
+
+        motion = Gtk.EventControllerMotion()
+        motion.connect('motion', self._on_motion)
+        motion.connect('leave', self._on_leave)
+        self.add_controller(motion)
+
+        click = Gtk.GestureClick()
+        click.connect('released', self._on_released)
+        self.add_controller(click)
+
+    def set_snapshot(self, snapshot):
+        """Aplica un FleetSnapshot; solo se repintan las celdas que cambian de color"""
+        count = len(self.model)
+        dirty = self.model.update(snapshot)
+        if len(self.model) != count:
+            self._update_height()
+        if dirty:
+            self._renderer.invalidate(dirty)
+            self.queue_redraw()
+
+    def set_metric(self, metric: str):
+        dirty = self.model.set_metric(metric)
+        if dirty:
+            self._renderer.invalidate(dirty)
+            self.queue_redraw()
+
+    def _update_height(self):
+        if self._width:
+            height = self._renderer.height_for(self._width)
+            if height != self.get_content_height():
+                self.set_content_height(height)
+
+    def _on_resize(self, area, width, height):
+        self._width = width
+        self._update_height()
+
+    def _set_hover(self, index):
+        if index != self._renderer.hover:
+            self._renderer.hover = index
+            self.queue_redraw()
+
+    def _on_motion(self, controller, x, y):
+        self._set_hover(self._renderer.cell_at(x, y, self.get_width()))
+
+    def _on_leave(self, controller):
+        self._set_hover(None)
+
+    def _on_query_tooltip(self, widget, x, y, keyboard_mode, tooltip):
+        index = self._renderer.cell_at(x, y, self.get_width())
+        if index is None:
+            return False
+        tooltip.set_text(self.model.tooltip(index))
+        return True
+
+    def _on_released(self, gesture, n_press, x, y):
+        index = self._renderer.cell_at(x, y, self.get_width())
+        if index is not None and self._on_activate:
+            self._on_activate(self.model.names[index])
+
+    def _on_draw(self, area, ctx, width, height):
+        """Dibuja el mapa de calor"""
+        self._renderer.draw(ctx, width, height, self.get_scale_factor())
+
+
+class PlacementMapWidget(BatchedDrawingArea):
+    """CPUs del host agrupadas por nodo NUMA y núcleo, con las vCPUs colocadas en cada una
+
+    Cada celda es una CPU lógica con el número de vCPUs que corren en
+    ella; el color sale de la ocupación de su núcleo (vCPUs / hilos, rojo
+    por encima de 1) y un borde naranja marca vCPUs fuera del nodo NUMA de
+    su memoria. Modelo en placement.PlacementModel.
+    """
+
+    CELL = 20
+    GAP = 2
+    CORE_GAP = 8
+    LABEL_HEIGHT = 18
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+        self._cells: List[Tuple[int, float, float]] = []  # (cpu, x, y) del último layout
+        self._labels: List[Tuple[int, float]] = []        # (nodo, y) de las etiquetas de nodo
+        self._layout_width = None
+        self._layouts = {}
+
+        self.set_hexpand(True)
+        self.set_content_height(self.LABEL_HEIGHT + self.CELL)
+        self.set_has_tooltip(True)
+        self.connect('query-tooltip', self._on_query_tooltip)
+        self.connect('resize', lambda area, width, height: self._relayout(width))
+
+    def set_snapshot(self, snapshot):
+        self.model.update(snapshot)
+        self.queue_redraw()
+
+    def _relayout(self, width: int):
+        """Coloca las celdas: una sección por nodo y los núcleos en filas que se parten por el ancho"""
+        if width == self._layout_width:
+            return
+        self._layout_width = width
+        topology = self.model.topology
+        cells, labels = [], []
+        y = 0
+        for node in sorted(topology.nodes):
+            labels.append((node, y))
+            y += self.LABEL_HEIGHT
+            x = 0
+            cores = sorted({topology.core_of(cpu) for cpu in topology.nodes[node]})
+            for core in cores:
+                cpus = topology.cores[core]
+                core_width = len(cpus) * (self.CELL + self.GAP) - self.GAP
+                if x > 0 and x + core_width > width:
+                    x = 0
+                    y += self.CELL + self.GAP * 2
+                for i, cpu in enumerate(cpus):
+                    cells.append((cpu, x + i * (self.CELL + self.GAP), y))
+                x += core_width + self.CORE_GAP
+            y += self.CELL + self.GAP * 3
+        self._cells, self._labels = cells, labels
+        if y != self.get_content_height():
+            self.set_content_height(y)
+
+    def _cell_at(self, x: float, y: float) -> Optional[int]:
+        for cpu, cell_x, cell_y in self._cells:
+            if cell_x <= x < cell_x + self.CELL and cell_y <= y < cell_y + self.CELL:
+                return cpu
+        return None
+
+    def _on_query_tooltip(self, widget, x, y, keyboard_mode, tooltip):
+        cpu = self._cell_at(x, y)
+        if cpu is None:
+            return False
+        tooltip.set_text(self.model.tooltip(cpu))
+        return True
+
+    def _layout(self, name: str, font: str, text: str) -> Pango.Layout:
+        """Layout cacheado por nombre; solo se rehace si cambia el texto"""
+        layout, current = self._layouts.get(name, (None, None))
+        if layout is None:
+            layout = new_layout(font)
+        if text != current:
+            layout.set_text(text, -1)
+            frame_stats.count('text_layouts')
+            self._layouts[name] = (layout, text)
+        return layout
+
+    def _on_draw(self, area, ctx, width, height):
+        """Dibuja las celdas de todas las CPUs del host"""
+        self._relayout(width)
+        model = self.model
+        topology = model.topology
+
+        for node, y in self._labels:
+            cpus = topology.nodes[node]
+            placed = sum(len(model.by_cpu.get(cpu, ())) for cpu in cpus)
+            layout = self._layout(f'node-{node}', "Sans Bold 10px",
+                                  f"Nodo {node} · {len(cpus)} CPUs · {placed} vCPUs")
+            _show_layout_with_shadow(ctx, layout, 0, y + 2, 0.4, (0.8, 0.8, 0.8))
+
+        alpha = 0.7 if model.stale else 1.0
+        for cpu, x, y in self._cells:
+            count = len(model.by_cpu.get(cpu, ()))
+            if count:
+                core = topology.core_of(cpu)
+                ratio = model.core_load[core] / len(topology.cores[core])
+                level = min(heatmap.LEVELS - 1, int(ratio / 2 * heatmap.LEVELS))
+                ctx.set_source_rgba(*heatmap.level_color(level), alpha)
+            else:
+                ctx.set_source_rgba(*heatmap.SPECIAL_COLORS[heatmap.STOPPED], alpha)
+            ctx.rectangle(x, y, self.CELL, self.CELL)
+            ctx.fill()
+
+            if model.has_remote(cpu):
+                ctx.set_source_rgb(1.0, 0.6, 0.0)
+                ctx.set_line_width(2)
+                ctx.rectangle(x + 1, y + 1, self.CELL - 2, self.CELL - 2)
+                ctx.stroke()
+            if count:
+                layout = self._layout(f'count-{count}', "Sans Bold 10px", str(count))
+                text_width, text_height = layout.get_pixel_size()
+                _show_layout_with_shadow(ctx, layout, x + (self.CELL - text_width) / 2,
+                                         y + (self.CELL - text_height) / 2, 0.5, (0.97, 0.97, 0.97))
+
+
+class HistoryChartWidget(BatchedDrawingArea):
+    """Gráfico de historial largo (5 min a 7 días) con zoom y desplazamiento
+
+    Los datos vienen de un history_chart.HistoryChartModel ya reducido al
+    ancho del widget. Rueda: zoom alrededor del puntero; arrastrar:
+    desplazar en el tiempo; doble clic: volver al presente.
+    """
+
+    MARGIN_LEFT = 12
+    MARGIN_RIGHT = 12
+    MARGIN_TOP = 22
+    MARGIN_BOTTOM = 18
+
+    def __init__(self, model, height: int = 120, max_value: float = 100.0):
+        super().__init__()
+        self.model = model
+        self.max_value = max_value  # None: escala automática
+        self.title = ""
+        self.color = (0.26, 0.59, 0.98)
+        self._pointer_x = None
+        self._drag_last = 0.0
+        self._layouts = {}
+
+        self.set_hexpand(True)
+        self.set_content_height(height)
+        self.set_tooltip_text("Rueda: zoom · Arrastrar: desplazar · Doble clic: volver al presente")
+
+        scroll = Gtk.EventControllerScroll.new(Gtk.EventControllerScrollFlags.VERTICAL)
+        scroll.connect('scroll', self._on_scroll)
+        self.add_controller(scroll)
+
+        motion = Gtk.EventControllerMotion()
+        motion.connect('motion', lambda controller, x, y: setattr(self, '_pointer_x', x))
+        motion.connect('leave', lambda controller: setattr(self, '_pointer_x', None))
+        self.add_controller(motion)
+
+        drag = Gtk.GestureDrag()
+        drag.connect('drag-begin', self._on_drag_begin)
+        drag.connect('drag-update', self._on_drag_update)
+        self.add_controller(drag)
+
+        click = Gtk.GestureClick()
+        click.connect('pressed', self._on_pressed)
+        self.add_controller(click)
+
+        # En una pestaña oculta no se relee el historial; se pone al día al mostrarse
+        self.connect('map', lambda widget: self.refresh())
+
+    def set_title(self, title: str):
+        self.title = title
+        self.queue_redraw()
+
+    def set_color(self, r: float, g: float, b: float):
+        self.color = (r, g, b)
+        self.queue_redraw()
+
+    def set_range(self, range_seconds: float):
+        self.model.set_range(range_seconds)
+        self.model.follow_live()
+        self.queue_redraw()
+
+    def refresh(self):
+        """Llamar con cada muestra nueva: relee el historial y redibuja si la vista cambia"""
+        if not self.get_mapped():
+            return
+        if self.model.refresh() or self.model.live:
+            self.queue_redraw()
+
+    def _chart_width(self) -> float:
+        return max(1, self.get_width() - self.MARGIN_LEFT - self.MARGIN_RIGHT)
+
+    def _on_scroll(self, controller, dx, dy):
+        anchor = 1.0
+        if self._pointer_x is not None:
+            anchor = max(0.0, min(1.0, (self._pointer_x - self.MARGIN_LEFT) / self._chart_width()))
+        self.model.zoom(1.25 ** dy, anchor)
+        self.queue_redraw()
+        return True
+
+    def _on_drag_begin(self, gesture, x, y):
+        self._drag_last = 0.0
+
+    def _on_drag_update(self, gesture, offset_x, offset_y):
+        delta_px = offset_x - self._drag_last
+        self._drag_last = offset_x
+        self.model.pan(-delta_px * self.model.range_seconds / self._chart_width())
+        self.queue_redraw()
+
+    def _on_pressed(self, gesture, n_press, x, y):
+        if n_press == 2:
+            self.model.follow_live()
+            self.queue_redraw()
+
+    def _layout(self, name: str, font: str, text: str) -> Pango.Layout:
+        """Layout cacheado por nombre; solo se rehace si cambia el texto"""
+        layout, current = self._layouts.get(name, (None, None))
+        if layout is None:
+            layout = new_layout(font)
+        if text != current:
+            layout.set_text(text, -1)
+            frame_stats.count('text_layouts')
+            self._layouts[name] = (layout, text)
+        return layout
+
+    def _paint_static(self, ctx: cairo.Context, width: int, height: int):
+        """Capa estática: fondo con gradiente, borde y rejilla"""
+        left, top = self.MARGIN_LEFT, self.MARGIN_TOP
+        chart_width = width - left - self.MARGIN_RIGHT
+        chart_height = height - top - self.MARGIN_BOTTOM
+
+        pattern = cairo.LinearGradient(left, top, left, top + chart_height)
+        pattern.add_color_stop_rgba(0, 0.08, 0.08, 0.08, 0.4)
+        pattern.add_color_stop_rgba(1, 0.04, 0.04, 0.04, 0.2)
+        ctx.set_source(pattern)
+        ctx.rectangle(left, top, chart_width, chart_height)
+        ctx.fill()
+
+        ctx.set_line_width(1)
+        ctx.set_source_rgba(0.2, 0.2, 0.2, 0.6)
+        ctx.rectangle(left, top, chart_width, chart_height)
+        ctx.stroke()
+
+        ctx.set_line_width(0.5)
+        ctx.set_source_rgba(0.2, 0.2, 0.2, 0.4)
+        for i in range(1, 4):
+            y = top + (chart_height / 4) * i
+            ctx.move_to(left, y)
+            ctx.line_to(left + chart_width, y)
+        ctx.stroke()
+
+    def _on_draw(self, area, ctx, width, height):
+        """Dibuja la ventana visible del historial"""
+        # history_chart puede importar NumPy: no se carga hasta el primer gráfico
+        from history_chart import format_range
+
+        scale = self.get_scale_factor()
+        static = get_static_layer(('history', width, height, scale, theme_key()), ctx, width, height, scale,
+                                  lambda layer_ctx: self._paint_static(layer_ctx, width, height))
+        ctx.set_source_surface(static, 0, 0)
+        ctx.paint()
+
+        left, top = self.MARGIN_LEFT, self.MARGIN_TOP
+        chart_width = width - left - self.MARGIN_RIGHT
+        chart_height = height - top - self.MARGIN_BOTTOM
+        start, end, times, values = self.model.visible(int(chart_width))
+
+        # Título y rango visible
+        title = f"{self.title} · {format_range(self.model.range_seconds)}" if self.title else format_range(
+            self.model.range_seconds)
+        layout = self._layout('title', "Sans 11px", title)
+        _show_layout_with_shadow(ctx, layout, left, 12 - layout.get_baseline() / Pango.SCALE, 0.4, (0.85, 0.85, 0.85))
+
+        # Extremos del eje de tiempo
+        time_format = "%H:%M" if self.model.range_seconds <= 86400 else "%d/%m %H:%M"
+        start_layout = self._layout('start', "Sans 10px", time.strftime(time_format, time.localtime(start)))
+        _show_layout_with_shadow(ctx, start_layout, left, top + chart_height + 3, 0.4, (0.6, 0.6, 0.6))
+        end_text = "ahora" if self.model.live else time.strftime(time_format, time.localtime(end))
+        end_layout = self._layout('end', "Sans 10px", end_text)
+        _show_layout_with_shadow(ctx, end_layout, width - self.MARGIN_RIGHT - end_layout.get_pixel_size()[0],
+                                 top + chart_height + 3, 0.4, (0.6, 0.6, 0.6))
+
+        if len(times) < 2:
+            return
+
+        max_value = self.max_value or max(max(values), 1e-9)
+        x_scale = chart_width / (end - start)
+        r, g, b = self.color
+
+        ctx.save()
+        ctx.rectangle(left, top, chart_width, chart_height)
+        ctx.clip()
+        bottom = top + chart_height
+        ctx.move_to(left + (times[0] - start) * x_scale, bottom)
+        for t, value in zip(times, values):
+            ctx.line_to(left + (t - start) * x_scale, bottom - min(value, max_value) / max_value * chart_height)
+        ctx.line_to(left + (times[-1] - start) * x_scale, bottom)
+        ctx.close_path()
+
+        pattern = cairo.LinearGradient(0, bottom, 0, top)
+        pattern.add_color_stop_rgba(0, r, g, b, 0.3)
+        pattern.add_color_stop_rgba(1, r, g, b, 0.05)
+        ctx.set_source(pattern)
+        ctx.fill()
+
+        # Línea: el mismo trazado sin los dos segmentos verticales del relleno
+        ctx.new_path()
+        for i, (t, value) in enumerate(zip(times, values)):
+            x, y = left + (t - start) * x_scale, bottom - min(value, max_value) / max_value * chart_height
+            if i == 0:
+                ctx.move_to(x, y)
+            else:
+                ctx.line_to(x, y)
+        ctx.set_source_rgb(r, g, b)
+        ctx.set_line_width(1.5)
+        ctx.set_line_join(cairo.LINE_JOIN_ROUND)
+        ctx.stroke()
+        ctx.restore()
+
+        # Último valor de la ventana
+        visible_values = [value for t, value in zip(times, values) if start <= t <= end]
+        if visible_values:
+            unit = "%" if self.max_value == 100 else ""
+            value_layout = self._layout('value', "Sans Bold 11px", f"{visible_values[-1]:.1f}{unit}")
+            _show_layout_with_shadow(ctx, value_layout, width - self.MARGIN_RIGHT - value_layout.get_pixel_size()[0],
+                                     12 - value_layout.get_baseline() / Pango.SCALE, 0.4, (0.95, 0.95, 0.95))